@@ -1,10 +1,25 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Header, HTTPException
+import json
+from typing import Any, AsyncIterator
+
+from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 
 from app.core.config import get_settings
-from app.schemas.pipeline import ScanResult
-from app.services.pipeline_service import get_pipeline, store_result
+from app.core.logger import get_logger
+from app.schemas.pipeline import BulkScanResultItem, BulkScanResultResponse, ScanResult
+from app.services.duplicate_service import DuplicateResultError
+from app.services.ingest_service import (
+    BulkPayloadTooLargeError,
+    PipelineResolver,
+    ingest_chunk,
+    iter_ndjson,
+    read_limited,
+)
+from app.services.pipeline_service import get_pipeline, get_pipeline_by_code, store_result
+
+logger = get_logger("routes.integration")
 
 router = APIRouter(prefix="", tags=["系统集成"])
 
@@ -37,14 +52,7 @@ def receive_scan_result(
     if pipeline_id:
         pipeline = get_pipeline(pipeline_id)
     elif pipeline_code:
-        # 需要通过 code 查找流水线
-        from app.db.session import get_session
-        from app.models.pipeline import Pipeline
-        from sqlmodel import select
-        
-        with get_session() as session:
-            statement = select(Pipeline).where(Pipeline.code == pipeline_code)
-            pipeline = session.exec(statement).first()
+        pipeline = get_pipeline_by_code(pipeline_code)
     else:
         raise HTTPException(
             status_code=400,
@@ -67,11 +75,89 @@ def receive_scan_result(
         "recognized_at": payload.scan_time,
     }
     
-    result = store_result(pipeline, db_payload)
+    try:
+        result = store_result(pipeline, db_payload)
+    except DuplicateResultError as exc:
+        raise HTTPException(
+            status_code=409, detail={"message": "重复扫描", "duplicate_of": exc.original_id}
+        ) from exc
     
     return {
         "status": "accepted",
         "pipeline_id": pipeline.id,
         "pipeline_code": pipeline.code,
         "result_id": result.id,
+        "duplicate_of": result.duplicate_of,
     }
+
+
+@router.post("/scan-results/bulk", response_model=BulkScanResultResponse)
+async def receive_scan_results_bulk(
+    request: Request,
+    pipeline_id: int | None = None,
+    pipeline_code: str | None = None,
+    x_api_key: str = Header(None),
+):
+    """
+    批量接收外部系统推送的识别结果（如 MES 夜间回放历史数据）
+
+    请求体为 JSON 数组，或 NDJSON（Content-Type: application/x-ndjson，每行一条，边接收边入库）。
+    每条结果可带 pipeline_id / pipeline_code，未带时使用查询参数指定的流水线。
+    按块（INTEGRATION_BULK_CHUNK_SIZE）校验、查找流水线并在一个事务中批量插入，
+    单条校验失败不影响其他结果，返回每条的状态。请求体超过 INTEGRATION_BULK_MAX_MB
+    或 NDJSON 单行超过 1MB 时返回 413。
+    """
+    if settings.ocr_api_key and x_api_key != settings.ocr_api_key:
+        raise HTTPException(status_code=401, detail="未授权")
+
+    max_bytes = settings.integration_bulk_max_mb * 1024 * 1024
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise HTTPException(status_code=413, detail=f"请求体超过 {settings.integration_bulk_max_mb}MB")
+
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        records: AsyncIterator[Any] = iter_ndjson(request.stream(), max_bytes)
+    else:
+        try:
+            body = json.loads(await read_limited(request.stream(), max_bytes))
+        except BulkPayloadTooLargeError as exc:
+            raise HTTPException(status_code=413, detail=str(exc)) from exc
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=f"请求体不是合法的 JSON: {exc}") from exc
+        if not isinstance(body, list):
+            raise HTTPException(status_code=400, detail="请求体必须是 JSON 数组或 NDJSON")
+        records = _iterate(body)
+
+    resolver = PipelineResolver()
+    chunk_size = max(1, settings.integration_bulk_chunk_size)
+    items: list[BulkScanResultItem] = []
+    chunk: list[tuple[int, Any]] = []
+    index = 0
+    try:
+        async for record in records:
+            chunk.append((index, record))
+            index += 1
+            if len(chunk) >= chunk_size:
+                items += await run_in_threadpool(ingest_chunk, chunk, resolver, pipeline_id, pipeline_code)
+                chunk = []
+    except BulkPayloadTooLargeError as exc:
+        # NDJSON 边接收边入库，此前已写入的块保留
+        logger.warning(f"批量推送超过上限: {exc}, 已写入 {len(items)} 条")
+        raise HTTPException(status_code=413, detail=f"{exc}，已处理前 {len(items)} 条") from exc
+    if chunk:
+        items += await run_in_threadpool(ingest_chunk, chunk, resolver, pipeline_id, pipeline_code)
+
+    succeeded = sum(1 for item in items if item.status == "stored")
+    logger.info(f"批量推送完成: 总数={len(items)}, 成功={succeeded}, 失败={len(items) - succeeded}")
+    return BulkScanResultResponse(
+        total=len(items),
+        succeeded=succeeded,
+        failed=len(items) - succeeded,
+        items=items,
+    )
+
+
+async def _iterate(records: list[Any]) -> AsyncIterator[Any]:
+    for record in records:
+        yield record
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, HTTPException
+
+from app.core.logger import get_logger
+from app.db.session import get_session
+from app.models.pipeline import Pipeline, RecognitionResult
+from app.schemas.pipeline import ScanJobRead
+from app.services.job_service import get_job
+from app.services.scan_service import recognition_response
+
+logger = get_logger("routes.jobs")
+
+router = APIRouter(prefix="/jobs", tags=["扫描任务"])
+
+
+@router.get("/{job_id}", response_model=ScanJobRead)
+def get_job_endpoint(job_id: str):
+    logger.debug(f"查询扫描任务: ID={job_id}")
+    job = get_job(job_id)
+    if not job:
+        logger.warning(f"扫描任务不存在: ID={job_id}")
+        raise HTTPException(status_code=404, detail="扫描任务不存在")
+
+    response = ScanJobRead.model_validate(job, from_attributes=True)
+    if job.result_id is not None:
+        with get_session() as session:
+            result = session.get(RecognitionResult, job.result_id)
+            pipeline = session.get(Pipeline, job.pipeline_id)
+        if result is not None and pipeline is not None:
+            response.result = recognition_response(pipeline, result, job.image_filename)
+    return response
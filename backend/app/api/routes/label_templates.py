@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, HTTPException
+
+from app.core.logger import get_logger
+from app.schemas.label_template import LabelTemplateCreate, LabelTemplateRead
+from app.services.label_template import LabelTemplateError
+from app.services.label_template_service import create_template, get_template, list_templates, update_template
+
+logger = get_logger("routes.label_templates")
+
+router = APIRouter(prefix="/label-templates", tags=["标签模板"])
+
+
+@router.get("", response_model=list[LabelTemplateRead])
+def get_templates():
+    return [LabelTemplateRead.model_validate(template, from_attributes=True) for template in list_templates()]
+
+
+@router.post("", response_model=LabelTemplateRead, status_code=201)
+def create_template_endpoint(payload: LabelTemplateCreate):
+    logger.info(f"创建标签模板: {payload.name}")
+    try:
+        template = create_template(payload.name, payload.definition)
+    except LabelTemplateError as exc:
+        logger.warning(f"标签模板定义无效: {exc}")
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return LabelTemplateRead.model_validate(template, from_attributes=True)
+
+
+@router.get("/{template_id}", response_model=LabelTemplateRead)
+def get_template_endpoint(template_id: int):
+    template = get_template(template_id)
+    if template is None:
+        raise HTTPException(status_code=404, detail="标签模板不存在")
+    return LabelTemplateRead.model_validate(template, from_attributes=True)
+
+
+@router.put("/{template_id}", response_model=LabelTemplateRead)
+def update_template_endpoint(template_id: int, payload: LabelTemplateCreate):
+    logger.info(f"更新标签模板: ID={template_id}")
+    try:
+        template = update_template(template_id, payload.name, payload.definition)
+    except LabelTemplateError as exc:
+        logger.warning(f"标签模板定义无效: {exc}")
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if template is None:
+        raise HTTPException(status_code=404, detail="标签模板不存在")
+    return LabelTemplateRead.model_validate(template, from_attributes=True)
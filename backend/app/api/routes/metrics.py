@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+from typing import Iterator
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import Response
+
+from app.core.logger import get_logger
+from app.core.metrics import CONTENT_TYPE, MetricFamily, get_metrics_registry
+from app.db.session import pool_stats
+from app.services.duplicate_service import duplicate_stats
+from app.services.excel_live_writer import excel_writer_stats
+from app.services.job_service import get_scan_job_runner
+from app.services.label_template_service import get_template_cache
+from app.services.ocr_service import get_ocr_service
+from app.services.pipeline_service import get_pipeline_cache, result_writer_stats
+
+logger = get_logger("routes.metrics")
+
+router = APIRouter(tags=["系统状态"])
+
+
+def _cache_families() -> Iterator[MetricFamily]:
+    caches = {
+        "pipeline": get_pipeline_cache().stats(),
+        "label_template": get_template_cache().stats(),
+    }
+    ocr_cache = get_ocr_service().cache
+    if ocr_cache is not None:
+        stats = ocr_cache.stats()
+        caches["ocr"] = {"hits": stats["memory_hits"] + stats["disk_hits"], "misses": stats["misses"]}
+
+    hits = [({"cache": name}, stats["hits"]) for name, stats in caches.items()]
+    misses = [({"cache": name}, stats["misses"]) for name, stats in caches.items()]
+    ratios = [
+        ({"cache": name}, stats["hits"] / (stats["hits"] + stats["misses"]) if stats["hits"] + stats["misses"] else 0.0)
+        for name, stats in caches.items()
+    ]
+    yield MetricFamily("matriq_cache_hits_total", "counter", "Cache hits", hits)
+    yield MetricFamily("matriq_cache_misses_total", "counter", "Cache misses", misses)
+    yield MetricFamily("matriq_cache_hit_ratio", "gauge", "Cache hit ratio since process start", ratios)
+
+
+def _runtime_families() -> Iterator[MetricFamily]:
+    """抓取时从各组件已有的统计生成，与 /system/stats 同源"""
+    yield from _cache_families()
+
+    pool = pool_stats()
+    yield MetricFamily(
+        "matriq_db_pool_connections",
+        "gauge",
+        "SQLite connection pool usage",
+        [
+            ({"state": "size"}, pool["pool_size"]),
+            ({"state": "checked_out"}, pool["pool_checked_out"]),
+            ({"state": "idle"}, pool["pool_checked_in"]),
+            # QueuePool 在连接数未达到 pool_size 前 overflow 为负数，这里只报告实际溢出的连接
+            ({"state": "overflow"}, max(0, pool["pool_overflow"])),
+        ],
+    )
+
+    depths = []
+    runner = get_scan_job_runner()
+    if runner is not None:
+        depths.append(({"queue": "scan_jobs"}, runner.queue_depth))
+    writer = result_writer_stats()
+    if writer is not None:
+        depths.append(({"queue": "result_writer"}, writer["queue_depth"]))
+    depths.append(({"queue": "excel_writers"}, sum(stats["queue_depth"] for stats in excel_writer_stats())))
+    yield MetricFamily("matriq_queue_depth", "gauge", "Items waiting in background queues", depths)
+
+    ocr = get_ocr_service()
+    yield MetricFamily("matriq_ocr_retries_total", "counter", "OCR upstream retries", [({}, ocr.retries)])
+    if ocr.breaker is not None:
+        breaker = ocr.breaker.stats()
+        yield MetricFamily(
+            "matriq_ocr_circuit_state", "gauge", "OCR circuit breaker state (0 closed, 1 half-open, 2 open)",
+            [({}, breaker["state_code"])],
+        )
+
+    duplicates = duplicate_stats().stats()
+    yield MetricFamily(
+        "matriq_duplicate_actions_total",
+        "counter",
+        "Duplicate scans handled by policy",
+        [({"policy": policy}, count) for policy, count in duplicates["actions"].items()],
+    )
+
+
+get_metrics_registry().register_collector(_runtime_families)
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics() -> Response:
+    """Prometheus 文本格式指标；METRICS_ENABLED=false 时返回 404"""
+    registry = get_metrics_registry()
+    if not registry.enabled:
+        raise HTTPException(status_code=404, detail="指标未启用")
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
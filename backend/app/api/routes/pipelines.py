@@ -1,18 +1,47 @@
 from __future__ import annotations
 
-from datetime import datetime
+import json
+import math
+from datetime import date, datetime
 from pathlib import Path
+from typing import Any, Literal
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
 
 from app.core.config import Settings, get_settings
 from app.core.logger import get_logger
-from app.schemas.pipeline import PipelineCreate, PipelineDetail, PipelineSummary, RecognitionResponse
-from app.db.session import get_session
-from app.services.pipeline_service import create_pipeline, get_pipeline, list_pipelines, store_result, _count_scans
-from app.services.ocr_service import OcrServiceError, get_ocr_service
-from app.services.parser_service import parse_ocr_payload
+from app.core.metrics import stage_timer
+from app.schemas.label_template import PipelineTemplatesUpdate
+from app.schemas.pipeline import (
+    PipelineCreate,
+    PipelineDetail,
+    PipelineDuplicatePolicyUpdate,
+    PipelineSummary,
+    RecognitionResponse,
+    RecognitionResultPage,
+    ScanBatchItem,
+    ScanBatchResponse,
+    ScanJobRead,
+)
+from app.services.pipeline_service import (
+    create_pipeline,
+    export_pipeline_excel,
+    get_pipeline,
+    list_pipelines,
+    list_results,
+    set_duplicate_policy,
+    store_result,
+    store_results,
+)
+from app.services.duplicate_service import DuplicateResultError
+from app.services.job_service import get_scan_job_runner, new_job_image_path, register_scan_job
+from app.services.label_template import LabelTemplateError
+from app.services.label_template_service import get_pipeline_templates, set_pipeline_templates
+from app.services.ocr_service import OcrCircuitOpenError, OcrServiceError, get_ocr_service
+from app.services.scan_service import ScanItemError, build_db_payload, recognition_response, recognize_batch
+from app.utils.upload import UploadTooLargeError, read_upload, save_upload
 
 logger = get_logger("routes.pipelines")
 
@@ -25,19 +54,17 @@ def get_pipelines():
     pipelines = list_pipelines()
     logger.debug(f"找到 {len(pipelines)} 个流水线")
     
-    summaries = []
-    for pipeline in pipelines:
-        with get_session() as session:
-            total_scans = _count_scans(session, pipeline.id) if pipeline.id is not None else 0
-        summaries.append(
-            PipelineSummary(
-                id=pipeline.id if pipeline.id is not None else 0,  # type: ignore
-                code=pipeline.code,
-                name=pipeline.name,
-                created_at=pipeline.created_at,
-                total_scans=total_scans,
-            )
+    # 扫描次数读取冗余计数列，整个列表只需一次查询
+    summaries = [
+        PipelineSummary(
+            id=pipeline.id if pipeline.id is not None else 0,  # type: ignore
+            code=pipeline.code,
+            name=pipeline.name,
+            created_at=pipeline.created_at,
+            total_scans=pipeline.total_scans,
         )
+        for pipeline in pipelines
+    ]
     
     logger.info(f"返回 {len(summaries)} 个流水线摘要")
     return summaries
@@ -62,14 +89,13 @@ def create_pipeline_endpoint(payload: PipelineCreate):
 @router.get("/{pipeline_id}", response_model=PipelineDetail)
 def get_pipeline_endpoint(pipeline_id: int):
     logger.info(f"获取流水线详情: ID={pipeline_id}")
-    pipeline = get_pipeline(pipeline_id)
+    # 详情返回扫描次数，直接读数据库而不是进程内缓存
+    pipeline = get_pipeline(pipeline_id, use_cache=False)
     if not pipeline:
         logger.warning(f"流水线不存在: ID={pipeline_id}")
         raise HTTPException(status_code=404, detail="流水线不存在")
     
-    with get_session() as session:
-        total_scans = _count_scans(session, pipeline.id) if pipeline.id is not None else 0
-    
+    total_scans = pipeline.total_scans
     logger.debug(f"流水线详情: {pipeline.code}, 扫描次数: {total_scans}")
     return PipelineDetail(
         id=pipeline.id if pipeline.id is not None else 0,  # type: ignore
@@ -78,17 +104,113 @@ def get_pipeline_endpoint(pipeline_id: int):
         created_at=pipeline.created_at,
         total_scans=total_scans,
         excel_path=pipeline.excel_path,
+        label_template_ids=pipeline.label_template_ids or [],
+        duplicate_policy=pipeline.duplicate_policy,
+        duplicate_window_seconds=pipeline.duplicate_window_seconds,
+    )
+
+
+@router.put("/{pipeline_id}/label-templates", response_model=PipelineDetail)
+def set_pipeline_templates_endpoint(pipeline_id: int, payload: PipelineTemplatesUpdate):
+    """设置流水线使用的标签模板（按优先级，识别时取第一个指纹命中的模板）"""
+    logger.info(f"设置流水线标签模板: ID={pipeline_id}, 模板={payload.template_ids}")
+    try:
+        pipeline = set_pipeline_templates(pipeline_id, payload.template_ids)
+    except LabelTemplateError as exc:
+        logger.warning(f"标签模板无效: {exc}")
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if pipeline is None:
+        logger.warning(f"流水线不存在: ID={pipeline_id}")
+        raise HTTPException(status_code=404, detail="流水线不存在")
+    return PipelineDetail(
+        id=pipeline.id if pipeline.id is not None else 0,  # type: ignore
+        code=pipeline.code,
+        name=pipeline.name,
+        created_at=pipeline.created_at,
+        total_scans=pipeline.total_scans,
+        excel_path=pipeline.excel_path,
+        label_template_ids=pipeline.label_template_ids or [],
+        duplicate_policy=pipeline.duplicate_policy,
+        duplicate_window_seconds=pipeline.duplicate_window_seconds,
+    )
+
+
+@router.put("/{pipeline_id}/duplicate-policy", response_model=PipelineDetail)
+def set_duplicate_policy_endpoint(pipeline_id: int, payload: PipelineDuplicatePolicyUpdate):
+    """设置流水线的重复扫描策略（off / flag / reject / merge）与时间窗口"""
+    logger.info(f"设置流水线重复扫描策略: ID={pipeline_id}, 策略={payload.policy}, 窗口={payload.window_seconds}")
+    pipeline = set_duplicate_policy(pipeline_id, payload.policy, payload.window_seconds)
+    if pipeline is None:
+        logger.warning(f"流水线不存在: ID={pipeline_id}")
+        raise HTTPException(status_code=404, detail="流水线不存在")
+    return PipelineDetail(
+        id=pipeline.id if pipeline.id is not None else 0,  # type: ignore
+        code=pipeline.code,
+        name=pipeline.name,
+        created_at=pipeline.created_at,
+        total_scans=pipeline.total_scans,
+        excel_path=pipeline.excel_path,
+        label_template_ids=pipeline.label_template_ids or [],
+        duplicate_policy=pipeline.duplicate_policy,
+        duplicate_window_seconds=pipeline.duplicate_window_seconds,
     )
 
 
+@router.get("/{pipeline_id}/results", response_model=RecognitionResultPage)
+def get_results(
+    pipeline_id: int,
+    limit: int = Query(default=50, ge=1, le=500),
+    cursor: str | None = Query(default=None, description="上一页返回的 next_cursor"),
+    order_by: Literal["id", "recognized_at"] = "id",
+    order: Literal["asc", "desc"] = "desc",
+    fields: str | None = Query(default=None, description="逗号分隔的返回字段，默认不含 raw_ocr_text"),
+    material_code: str | None = None,
+    batch: str | None = None,
+    brand: str | None = None,
+    start: datetime | None = Query(default=None, description="识别时间下界（含）"),
+    end: datetime | None = Query(default=None, description="识别时间上界（不含）"),
+    date_from: date | None = Query(default=None, description="生产日期下界（含）"),
+    date_to: date | None = Query(default=None, description="生产日期上界（含）"),
+):
+    logger.info(f"查询识别结果: 流水线ID={pipeline_id}, cursor={cursor}, limit={limit}")
+    pipeline = get_pipeline(pipeline_id)
+    if not pipeline:
+        logger.warning(f"流水线不存在: ID={pipeline_id}")
+        raise HTTPException(status_code=404, detail="流水线不存在")
+
+    field_list = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+    try:
+        items, next_cursor = list_results(
+            pipeline_id,
+            limit=limit,
+            cursor=cursor,
+            order_by=order_by,
+            descending=order == "desc",
+            fields=field_list,
+            material_code=material_code,
+            batch=batch,
+            brand=brand,
+            start=start,
+            end=end,
+            date_from=date_from,
+            date_to=date_to,
+        )
+    except ValueError as exc:
+        logger.warning(f"结果查询参数无效: {exc}")
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    return RecognitionResultPage(items=items, next_cursor=next_cursor)
+
+
 @router.post("/{pipeline_id}/scan", response_model=RecognitionResponse)
-def scan_image(
+async def scan_image(
     pipeline_id: int,
     image: UploadFile = File(...),
     settings: Settings = Depends(get_settings),
 ):
     logger.info(f"开始扫描图像: 流水线ID={pipeline_id}, 文件名={image.filename}")
-    pipeline = get_pipeline(pipeline_id)
+    # 数据库访问仍是同步的，放到线程池中执行；OCR 调用在事件循环上异步等待
+    pipeline = await run_in_threadpool(get_pipeline, pipeline_id)
     if not pipeline:
         logger.warning(f"流水线不存在: ID={pipeline_id}")
         raise HTTPException(status_code=404, detail="流水线不存在")
@@ -98,59 +220,176 @@ def scan_image(
         logger.warning(f"不支持的文件格式: {ext}")
         raise HTTPException(status_code=400, detail="文件格式不支持")
 
-    content = image.file.read()
-    size_mb = len(content) / (1024 * 1024)
-    if size_mb > settings.max_upload_mb:
-        logger.warning(f"文件大小超过限制: {size_mb:.2f}MB > {settings.max_upload_mb}MB")
-        raise HTTPException(status_code=400, detail="文件超过大小限制")
+    try:
+        with stage_timer("upload"):
+            content = await read_upload(image, settings.max_upload_mb * 1024 * 1024)
+    except UploadTooLargeError as exc:
+        logger.warning(f"文件大小超过限制: {exc} bytes, 限制={settings.max_upload_mb}MB")
+        raise HTTPException(status_code=400, detail="文件超过大小限制") from exc
 
     logger.debug(f"调用OCR服务处理图像: 大小={len(content)} bytes")
     ocr_client = get_ocr_service()
     try:
-        ocr_payload = ocr_client.classify_and_recognize(content, image.filename or "upload.jpg")
+        ocr_payload = await ocr_client.classify_and_recognize_async(content, image.filename or "upload.jpg")
         logger.debug("OCR处理完成")
+    except OcrCircuitOpenError as exc:
+        logger.warning(f"OCR服务熔断中: {exc}")
+        raise HTTPException(
+            status_code=503,
+            detail=str(exc),
+            headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+        ) from exc
     except OcrServiceError as exc:
         logger.error(f"OCR服务错误: {exc}")
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
-    normalized = parse_ocr_payload(ocr_payload)
-    normalized.setdefault("raw_ocr_text", "")
-    normalized.setdefault("image_filename", image.filename)
-    scan_time = datetime.utcnow()
-    normalized.setdefault("scan_time", scan_time)
-    normalized.setdefault("recognized_at", scan_time)
-
-    db_payload = {
-        "material_code": normalized.get("material_code"),
-        "quantity": normalized.get("quantity"),
-        "batch": normalized.get("batch"),
-        "date": normalized.get("date"),
-        "brand": normalized.get("brand"),
-        "electrical_characteristics": normalized.get("electrical_characteristics"),
-        "raw_ocr_text": normalized.get("raw_ocr_text"),
-        "image_filename": normalized.get("image_filename"),
-        "recognized_at": scan_time,  # 确保是 datetime 对象而不是字符串
-    }
+    templates = await run_in_threadpool(get_pipeline_templates, pipeline)
+    # 解析与图片感知哈希都在线程池中计算，不阻塞事件循环
+    db_payload = await run_in_threadpool(build_db_payload, ocr_payload, image.filename, templates, content)
 
     logger.debug(f"存储识别结果: {db_payload}")
-    result = store_result(pipeline, db_payload)
+    try:
+        result = await run_in_threadpool(store_result, pipeline, db_payload)
+    except DuplicateResultError as exc:
+        raise HTTPException(
+            status_code=409, detail={"message": "重复扫描", "duplicate_of": exc.original_id}
+        ) from exc
     logger.info(f"扫描结果存储成功: 流水线={pipeline.code}, 物料代码={result.material_code}")
 
-    return RecognitionResponse(
-        pipeline_id=pipeline.id if pipeline.id is not None else 0,  # type: ignore,
+    return recognition_response(pipeline, result, image.filename)
+
+
+@router.post("/{pipeline_id}/scan/batch", response_model=ScanBatchResponse)
+async def scan_batch(
+    pipeline_id: int,
+    images: list[UploadFile] = File(...),
+    stream: bool = Query(default=False, description="以 NDJSON 流式返回，每张图片识别完成即输出一行"),
+    settings: Settings = Depends(get_settings),
+):
+    """一次上传多张图片：并发识别、并行解析，全部结果在一个事务中入库"""
+    logger.info(f"开始批量扫描: 流水线ID={pipeline_id}, 图片数={len(images)}, 流式={stream}")
+    pipeline = await run_in_threadpool(get_pipeline, pipeline_id)
+    if not pipeline:
+        logger.warning(f"流水线不存在: ID={pipeline_id}")
+        raise HTTPException(status_code=404, detail="流水线不存在")
+    if len(images) > settings.scan_batch_max_images:
+        logger.warning(f"批量图片数超过限制: {len(images)} > {settings.scan_batch_max_images}")
+        raise HTTPException(status_code=400, detail=f"单次最多上传 {settings.scan_batch_max_images} 张图片")
+
+    max_bytes = settings.max_upload_mb * 1024 * 1024
+    rejected: list[ScanBatchItem] = []
+    accepted = []
+    for index, image in enumerate(images):
+        filename = image.filename or f"upload_{index}.jpg"
+        if Path(filename).suffix.lower() not in settings.allowed_extensions:
+            rejected.append(ScanBatchItem(index=index, image_filename=filename, status="error", error="文件格式不支持"))
+            continue
+
+        async def read(image: UploadFile = image) -> bytes:
+            try:
+                return await read_upload(image, max_bytes)
+            except UploadTooLargeError as exc:
+                raise ScanItemError("文件超过大小限制") from exc
+
+        accepted.append((index, filename, read))
+
+    async def run() -> Any:
+        parsed: dict[int, tuple[str, dict]] = {}
+        for item in rejected:
+            yield item
+        templates = await run_in_threadpool(get_pipeline_templates, pipeline)
+        batch = recognize_batch(
+            accepted, settings.scan_batch_concurrency, ocr_client=get_ocr_service(), templates=templates
+        )
+        async for index, filename, db_payload, error in batch:
+            if db_payload is None:
+                yield ScanBatchItem(index=index, image_filename=filename, status="error", error=error)
+            else:
+                parsed[index] = (filename, db_payload)
+                yield ScanBatchItem(index=index, image_filename=filename, status="parsed")
+
+        order = sorted(parsed)
+        results = await run_in_threadpool(store_results, pipeline, [parsed[index][1] for index in order])
+        stored = 0
+        for index, result in zip(order, results):
+            if isinstance(result, DuplicateResultError):
+                yield ScanBatchItem(
+                    index=index,
+                    image_filename=parsed[index][0],
+                    status="duplicate",
+                    error="重复扫描",
+                    duplicate_of=result.original_id,
+                )
+                continue
+            stored += 1
+            yield ScanBatchItem(
+                index=index,
+                image_filename=parsed[index][0],
+                status="stored",
+                result_id=result.id,
+                result=recognition_response(pipeline, result, parsed[index][0]),
+            )
+        logger.info(f"批量扫描完成: 流水线={pipeline.code}, 成功={stored}, 失败={len(images) - stored}")
+
+    if stream:
+        async def ndjson():
+            async for item in run():
+                yield json.dumps(item.model_dump(mode="json", exclude_none=True), ensure_ascii=False) + "\n"
+
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    items: dict[int, ScanBatchItem] = {}
+    async for item in run():
+        if item.status != "parsed":
+            items[item.index] = item
+    succeeded = sum(1 for item in items.values() if item.status == "stored")
+    return ScanBatchResponse(
+        pipeline_id=pipeline.id if pipeline.id is not None else 0,  # type: ignore
         pipeline_code=pipeline.code,
-        material_code=result.material_code,
-        quantity=result.quantity,
-        batch=result.batch,
-        date=result.date,
-        brand=result.brand,
-        electrical_characteristics=result.electrical_characteristics,
-        raw_ocr_text=result.raw_ocr_text or "",
-        image_filename=result.image_filename or image.filename or "",  # type: ignore,
-        scan_time=result.recognized_at,
+        total=len(images),
+        succeeded=succeeded,
+        failed=len(images) - succeeded,
+        items=[items[index] for index in sorted(items)],
     )
 
 
+@router.post("/{pipeline_id}/scan/jobs", response_model=ScanJobRead, status_code=202)
+async def create_scan_job_endpoint(
+    pipeline_id: int,
+    image: UploadFile = File(...),
+    settings: Settings = Depends(get_settings),
+):
+    """异步扫描：图片落盘后立即返回任务 ID，通过 GET /jobs/{job_id} 查询结果"""
+    logger.info(f"创建异步扫描任务: 流水线ID={pipeline_id}, 文件名={image.filename}")
+    pipeline = await run_in_threadpool(get_pipeline, pipeline_id)
+    if not pipeline:
+        logger.warning(f"流水线不存在: ID={pipeline_id}")
+        raise HTTPException(status_code=404, detail="流水线不存在")
+
+    ext = Path(image.filename or "").suffix.lower()
+    if ext not in settings.allowed_extensions:
+        logger.warning(f"不支持的文件格式: {ext}")
+        raise HTTPException(status_code=400, detail="文件格式不支持")
+
+    filename = image.filename or "upload.jpg"
+    job_id, image_path = new_job_image_path(filename)
+    try:
+        # 直接分块写入任务目录，不在内存中保留整张图片
+        with stage_timer("upload"):
+            await save_upload(image, image_path, settings.max_upload_mb * 1024 * 1024)
+    except UploadTooLargeError as exc:
+        logger.warning(f"文件大小超过限制: {exc} bytes, 限制={settings.max_upload_mb}MB")
+        raise HTTPException(status_code=400, detail="文件超过大小限制") from exc
+
+    job = await run_in_threadpool(register_scan_job, pipeline, job_id, filename, image_path)
+    runner = get_scan_job_runner()
+    if runner is not None:
+        runner.submit(job.id)
+    else:
+        logger.warning(f"扫描任务 worker 未启动，任务将在下次启动时执行: ID={job.id}")
+    return ScanJobRead.model_validate(job, from_attributes=True)
+
+
 @router.get("/{pipeline_id}/export")
 def export_excel(pipeline_id: int):
     logger.info(f"导出Excel文件: 流水线ID={pipeline_id}")
@@ -159,14 +398,16 @@ def export_excel(pipeline_id: int):
         logger.warning(f"流水线不存在: ID={pipeline_id}")
         raise HTTPException(status_code=404, detail="流水线不存在")
 
-    excel_path = Path(pipeline.excel_path)
-    if not excel_path.exists():
-        logger.warning(f"Excel文件不存在: {excel_path}")
+    # 尚无识别记录时导出只有表头的文件
+    export_path = export_pipeline_excel(pipeline)
+    if export_path is None:
+        logger.warning(f"Excel文件不存在: 流水线ID={pipeline_id}")
         raise HTTPException(status_code=404, detail="Excel 文件不存在")
 
-    logger.info(f"返回Excel文件: {excel_path.name}")
+    download_name = Path(pipeline.excel_path).name
+    logger.info(f"返回Excel文件: {export_path.name} -> {download_name}")
     return FileResponse(
-        path=excel_path,
+        path=export_path,
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        filename=excel_path.name,
+        filename=download_name,
     )
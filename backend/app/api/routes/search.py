@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.core.logger import get_logger
+from app.schemas.search import SearchResultPage
+from app.services.pipeline_service import get_pipeline
+from app.services.search_service import SearchQueryError, search_results
+
+logger = get_logger("routes.search")
+
+router = APIRouter(prefix="/search", tags=["检索"])
+
+
+@router.get("", response_model=SearchResultPage)
+def search(
+    q: str = Query(description="标签文字片段，多个词以空格分隔（同时包含），每个词至少 3 个字符"),
+    pipeline_id: int | None = Query(default=None, description="只检索该流水线"),
+    limit: int = Query(default=20, ge=1, le=100),
+    offset: int = Query(default=0, ge=0, le=10000, description="上一页返回的 next_offset"),
+):
+    logger.info(f"全文检索: q={q!r}, 流水线ID={pipeline_id}, offset={offset}")
+    if pipeline_id is not None and get_pipeline(pipeline_id) is None:
+        logger.warning(f"流水线不存在: ID={pipeline_id}")
+        raise HTTPException(status_code=404, detail="流水线不存在")
+    try:
+        items, next_offset = search_results(q, pipeline_id=pipeline_id, limit=limit, offset=offset)
+    except SearchQueryError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return SearchResultPage(items=items, next_offset=next_offset)
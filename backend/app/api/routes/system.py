@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+from typing import Any
+
+from fastapi import APIRouter
+
+from app.core.logger import get_logger
+from app.db.session import database_stats
+from app.services.duplicate_service import duplicate_stats
+from app.services.excel_live_writer import excel_writer_stats
+from app.services.job_service import get_scan_job_runner
+from app.services.label_template_service import get_template_cache
+from app.services.ocr_service import get_ocr_service
+from app.services.pipeline_service import get_pipeline_cache, result_writer_stats
+
+logger = get_logger("routes.system")
+
+router = APIRouter(prefix="/system", tags=["系统状态"])
+
+
+def _process_memory() -> dict[str, Any]:
+    """当前与峰值 RSS（MB），用于观察并发上传下的内存占用"""
+    rss_mb = peak_rss_mb = None
+    statm = Path("/proc/self/statm")
+    if statm.exists():
+        rss_pages = int(statm.read_text().split()[1])
+        rss_mb = round(rss_pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024, 1)
+    try:
+        import resource
+    except ImportError:  # Windows
+        pass
+    else:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 以 KB 为单位，macOS 以字节为单位
+        peak_rss_mb = round(peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024, 1)
+    return {"rss_mb": rss_mb, "peak_rss_mb": peak_rss_mb}
+
+
+@router.get("/stats")
+def get_system_stats():
+    """运行时内部状态（写入队列等），用于排查性能问题"""
+    logger.debug("获取系统运行状态")
+    ocr = get_ocr_service()
+    ocr_cache = ocr.cache
+    runner = get_scan_job_runner()
+    return {
+        "process_memory": _process_memory(),
+        "database": database_stats(),
+        "scan_jobs_queue_depth": runner.queue_depth if runner is not None else None,
+        "pipeline_cache": get_pipeline_cache().stats(),
+        "result_writer": result_writer_stats(),
+        "excel_writers": excel_writer_stats(),
+        "ocr_cache": ocr_cache.stats() if ocr_cache is not None else None,
+        "ocr_retries": ocr.retries,
+        "ocr_circuit_breaker": ocr.breaker.stats() if ocr.breaker is not None else None,
+        "ocr_preprocess": ocr.preprocessor.stats() if ocr.preprocessor is not None else None,
+        "label_templates": get_template_cache().stats(),
+        "duplicates": duplicate_stats().stats(),
+    }
@@ -0,0 +1,78 @@
+"""用当前解析规则重新解析历史识别记录
+
+在 backend 目录下运行：
+    python -m app.cli.reparse --pipeline-id 3 --dry-run            # 只输出差异（JSON Lines）
+    python -m app.cli.reparse --since 2025-01-01 --until 2025-02-01 --checkpoint reparse.ckpt
+    python -m app.cli.reparse --fields date brand --workers 8
+
+中断后以相同参数与 --checkpoint 重跑即从断点继续；全部完成后断点文件自动删除。
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from app.db.session import init_db
+from app.services.parser_service import EXTRACTED_FIELDS
+from app.services.reparse_service import DEFAULT_CHUNK_SIZE, ReparseStats, reparse_results
+
+
+def _print_progress(stats: ReparseStats) -> None:
+    percent = stats.scanned / stats.total * 100 if stats.total else 100.0
+    remaining = (stats.total - stats.scanned) / stats.rate if stats.rate else 0.0
+    print(
+        f"\r已处理 {stats.scanned}/{stats.total} ({percent:.1f}%) 有变化 {stats.changed} "
+        f"已写回 {stats.updated} {stats.rate:.0f} 行/秒 剩余约 {remaining:.0f} 秒",
+        end="",
+        file=sys.stderr,
+        flush=True,
+    )
+
+
+def _print_diff(result_id: int, diff: dict[str, tuple[Any, Any]]) -> None:
+    changes = {field: {"old": old, "new": new} for field, (old, new) in diff.items()}
+    print(json.dumps({"id": result_id, "changes": changes}, ensure_ascii=False))
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="重新解析已保存的 OCR 文本并更新识别记录")
+    parser.add_argument("--pipeline-id", type=int, help="只处理指定流水线")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="识别时间下限（含），如 2025-01-01")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="识别时间上限（不含）")
+    parser.add_argument("--fields", nargs="+", choices=EXTRACTED_FIELDS, default=list(EXTRACTED_FIELDS))
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="每块行数")
+    parser.add_argument("--workers", type=int, default=None, help="解析进程数（默认 CPU 核数，1 为单进程）")
+    parser.add_argument("--dry-run", action="store_true", help="不写数据库，向 stdout 输出差异（JSON Lines）")
+    parser.add_argument("--checkpoint", type=Path, help="断点文件，用于中断后续跑")
+    args = parser.parse_args(argv)
+
+    init_db()
+    try:
+        stats = reparse_results(
+            pipeline_id=args.pipeline_id,
+            since=args.since,
+            until=args.until,
+            fields=args.fields,
+            chunk_size=args.chunk_size,
+            workers=args.workers,
+            dry_run=args.dry_run,
+            checkpoint=args.checkpoint,
+            on_progress=_print_progress,
+            on_diff=_print_diff if args.dry_run else None,
+        )
+    except ValueError as exc:
+        print(f"错误: {exc}", file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        print("\n已中断；使用相同参数与 --checkpoint 重跑可从断点继续", file=sys.stderr)
+        return 130
+    print(f"\n完成: {json.dumps(stats.as_dict(), ensure_ascii=False)}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,6 @@
 from functools import lru_cache
 from pathlib import Path
-from typing import List, Union
+from typing import List, Literal, Union
 
 from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings
@@ -10,10 +10,25 @@ class Settings(BaseSettings):
     app_name: str = Field(default="MatriQ OCR Service", validation_alias="APP_NAME")
     api_prefix: str = Field(default="/api/v1", validation_alias="API_PREFIX")
     sqlite_path: Path = Field(default=Path("backend/data/matriq.db"), validation_alias="SQLITE_PATH")
+    # SQLite 存储配置档（wal / compat）、每连接 PRAGMA 与连接池
+    sqlite_profile: Literal["wal", "compat"] = Field(default="wal", validation_alias="SQLITE_PROFILE")
+    sqlite_busy_timeout_ms: int = Field(default=5000, validation_alias="SQLITE_BUSY_TIMEOUT_MS")
+    sqlite_cache_size_mb: int = Field(default=64, validation_alias="SQLITE_CACHE_SIZE_MB")
+    sqlite_mmap_size_mb: int = Field(default=256, validation_alias="SQLITE_MMAP_SIZE_MB")
+    sqlite_pool_size: int = Field(default=16, validation_alias="SQLITE_POOL_SIZE")
+    sqlite_pool_max_overflow: int = Field(default=16, validation_alias="SQLITE_POOL_MAX_OVERFLOW")
+    sqlite_pool_timeout_seconds: float = Field(default=30, validation_alias="SQLITE_POOL_TIMEOUT_SECONDS")
     pipelines_root: Path = Field(default=Path("backend/data/pipelines"), validation_alias="PIPELINES_ROOT")
     excel_filename_template: str = Field(
         default="{pipeline_code}_MatriQ.xlsx", validation_alias="EXCEL_FILENAME_TEMPLATE"
     )
+    # 导出文件缓存目录（按流水线最新结果 ID 缓存，由数据库生成）
+    exports_root: Path = Field(default=Path("backend/data/exports"), validation_alias="EXPORTS_ROOT")
+
+    # 实时 Excel 文件：每个流水线一个后台写入线程，按批次追加
+    excel_live_sync: bool = Field(default=True, validation_alias="EXCEL_LIVE_SYNC")
+    excel_flush_max_rows: int = Field(default=200, validation_alias="EXCEL_FLUSH_MAX_ROWS")
+    excel_flush_interval_ms: int = Field(default=500, validation_alias="EXCEL_FLUSH_INTERVAL_MS")
 
     # PaddleOCR-VL API 配置
     paddleocr_api_url: str = Field(
@@ -24,6 +39,36 @@ class Settings(BaseSettings):
         default="your-token-here", validation_alias="PADDLEOCR_TOKEN"
     )
     
+    # PaddleOCR-VL HTTP 客户端（应用生命周期内共享连接池）
+    ocr_timeout_seconds: float = Field(default=120, validation_alias="OCR_TIMEOUT_SECONDS")
+    ocr_connect_timeout_seconds: float = Field(default=10, validation_alias="OCR_CONNECT_TIMEOUT_SECONDS")
+    ocr_max_connections: int = Field(default=200, validation_alias="OCR_MAX_CONNECTIONS")
+    ocr_max_keepalive_connections: int = Field(default=50, validation_alias="OCR_MAX_KEEPALIVE_CONNECTIONS")
+    ocr_keepalive_expiry_seconds: float = Field(default=60, validation_alias="OCR_KEEPALIVE_EXPIRY_SECONDS")
+    ocr_http2: bool = Field(default=False, validation_alias="OCR_HTTP2")
+    # OCR 前图片预处理（EXIF 方向校正、缩放、可选灰度、重新编码），减小请求体
+    ocr_preprocess_enabled: bool = Field(default=True, validation_alias="OCR_PREPROCESS_ENABLED")
+    ocr_preprocess_max_long_edge: int = Field(default=2048, validation_alias="OCR_PREPROCESS_MAX_LONG_EDGE")
+    ocr_preprocess_grayscale: bool = Field(default=False, validation_alias="OCR_PREPROCESS_GRAYSCALE")
+    ocr_preprocess_format: str = Field(default="JPEG", validation_alias="OCR_PREPROCESS_FORMAT")
+    ocr_preprocess_quality: int = Field(default=85, validation_alias="OCR_PREPROCESS_QUALITY")
+    # OCR 重试（指数退避 + 抖动，仅针对 429/5xx 与连接类错误）与熔断器
+    ocr_retry_attempts: int = Field(default=3, validation_alias="OCR_RETRY_ATTEMPTS")
+    ocr_retry_base_delay_seconds: float = Field(default=0.5, validation_alias="OCR_RETRY_BASE_DELAY_SECONDS")
+    ocr_retry_max_delay_seconds: float = Field(default=8, validation_alias="OCR_RETRY_MAX_DELAY_SECONDS")
+    ocr_circuit_enabled: bool = Field(default=True, validation_alias="OCR_CIRCUIT_ENABLED")
+    ocr_circuit_failure_ratio: float = Field(default=0.5, validation_alias="OCR_CIRCUIT_FAILURE_RATIO")
+    ocr_circuit_window: int = Field(default=20, validation_alias="OCR_CIRCUIT_WINDOW")
+    ocr_circuit_min_requests: int = Field(default=10, validation_alias="OCR_CIRCUIT_MIN_REQUESTS")
+    ocr_circuit_reset_seconds: float = Field(default=30, validation_alias="OCR_CIRCUIT_RESET_SECONDS")
+
+    # OCR 结果缓存（按图片内容哈希 + 请求参数）
+    ocr_cache_enabled: bool = Field(default=True, validation_alias="OCR_CACHE_ENABLED")
+    ocr_cache_path: Path = Field(default=Path("backend/data/ocr_cache.db"), validation_alias="OCR_CACHE_PATH")
+    ocr_cache_memory_entries: int = Field(default=512, validation_alias="OCR_CACHE_MEMORY_ENTRIES")
+    ocr_cache_ttl_seconds: float = Field(default=7 * 24 * 3600, validation_alias="OCR_CACHE_TTL_SECONDS")
+    ocr_cache_max_mb: int = Field(default=512, validation_alias="OCR_CACHE_MAX_MB")
+
     # 兼容旧配置（可选）
     ocr_endpoint: str | None = None
     ocr_api_key: str | None = None
@@ -33,6 +78,40 @@ class Settings(BaseSettings):
         default=[".jpg", ".jpeg", ".png"], validation_alias="ALLOWED_EXTENSIONS"
     )
     max_upload_mb: int = Field(default=15, validation_alias="MAX_UPLOAD_MB")
+    # 批量扫描：单次请求最多图片数与 OCR 并发上限
+    scan_batch_max_images: int = Field(default=200, validation_alias="SCAN_BATCH_MAX_IMAGES")
+    scan_batch_concurrency: int = Field(default=16, validation_alias="SCAN_BATCH_CONCURRENCY")
+    # 进程内流水线缓存：每隔多久读取一次数据库中的缓存代数（其他 worker 修改流水线后最长的过期时间）
+    pipeline_cache_check_interval_ms: float = Field(
+        default=1000, validation_alias="PIPELINE_CACHE_CHECK_INTERVAL_MS"
+    )
+    # 识别结果组提交：并发请求的结果在 window_ms 内合并为一个事务（最多 max_rows 行）
+    result_group_commit: bool = Field(default=True, validation_alias="RESULT_GROUP_COMMIT")
+    result_group_commit_window_ms: float = Field(default=2, validation_alias="RESULT_GROUP_COMMIT_WINDOW_MS")
+    result_group_commit_max_rows: int = Field(default=256, validation_alias="RESULT_GROUP_COMMIT_MAX_ROWS")
+    # 重复扫描检测（流水线可单独覆盖）：off 不检测 / flag 入库并标记 / reject 拒绝 / merge 合并到已有记录
+    duplicate_policy: Literal["off", "flag", "reject", "merge"] = Field(
+        default="flag", validation_alias="DUPLICATE_POLICY"
+    )
+    # 同一流水线内多长时间内的相同字段指纹视为重复
+    duplicate_window_seconds: int = Field(default=600, validation_alias="DUPLICATE_WINDOW_SECONDS")
+    # 双方都有图片感知哈希时，哈希最多相差多少位（共 64 位）才算同一盘卷
+    duplicate_image_max_distance: int = Field(default=10, validation_alias="DUPLICATE_IMAGE_MAX_DISTANCE")
+    # 外部系统批量推送（POST /scan-results/bulk）：每块校验并在一个事务中写入的条数
+    integration_bulk_chunk_size: int = Field(default=1000, validation_alias="INTEGRATION_BULK_CHUNK_SIZE")
+    # 批量推送请求体上限（MB）：JSON 数组整体读入内存、逐条状态随条数增长，超过时返回 413
+    integration_bulk_max_mb: int = Field(default=64, validation_alias="INTEGRATION_BULK_MAX_MB")
+    # 异步扫描任务：图片落盘目录与后台 worker 数量
+    jobs_root: Path = Field(default=Path("backend/data/jobs"), validation_alias="JOBS_ROOT")
+    scan_job_workers: int = Field(default=4, validation_alias="SCAN_JOB_WORKERS")
+    # 任务最多执行次数：OCR 熔断期间任务会重新排队，超过后判为失败，避免长时间故障时无限循环
+    scan_job_max_attempts: int = Field(default=20, validation_alias="SCAN_JOB_MAX_ATTEMPTS")
+    # 品牌词典（JSON 或 CSV），为空时使用 app/resources/label_dictionary.json
+    label_dictionary_path: Path | None = Field(default=None, validation_alias="LABEL_DICTIONARY_PATH")
+    # 标签模板编译结果缓存（按模板 ID + 版本）
+    label_template_cache_size: int = Field(default=128, validation_alias="LABEL_TEMPLATE_CACHE_SIZE")
+    # Prometheus 文本格式指标（GET /metrics）：关闭后不记录各阶段耗时，接口返回 404
+    metrics_enabled: bool = Field(default=True, validation_alias="METRICS_ENABLED")
     
     # 日志配置
     log_level: str = Field(default="DEBUG", validation_alias="LOG_LEVEL")
@@ -56,5 +135,7 @@ class Settings(BaseSettings):
 def get_settings() -> Settings:
     settings = Settings()
     settings.pipelines_root.mkdir(parents=True, exist_ok=True)
+    settings.exports_root.mkdir(parents=True, exist_ok=True)
+    settings.jobs_root.mkdir(parents=True, exist_ok=True)
     settings.sqlite_path.parent.mkdir(parents=True, exist_ok=True)
     return settings
\ No newline at end of file
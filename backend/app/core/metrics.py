@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+import math
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Iterable, NamedTuple, Sequence
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# 各阶段耗时的直方图分桶（秒）：覆盖解析的亚毫秒级到 OCR 上游的数十秒
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricFamily(NamedTuple):
+    """抓取时由采集函数生成的一组样本，samples 为 (标签, 值)"""
+
+    name: str
+    kind: str
+    documentation: str
+    samples: Sequence[tuple[dict[str, str], float]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _CounterChild:
+    __slots__ = ("_lock", "value")
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self.value = value
+
+    def track(self) -> "_Tracker":
+        """进入时加一、退出时减一，用于进行中的请求数"""
+        return _Tracker(self)
+
+
+class _Tracker:
+    # 记录在每次扫描的热路径上，用类而不是 @contextmanager 生成器以减少开销
+    __slots__ = ("_gauge",)
+
+    def __init__(self, gauge: _GaugeChild) -> None:
+        self._gauge = gauge
+
+    def __enter__(self) -> None:
+        self._gauge.inc()
+
+    def __exit__(self, *exc_info) -> None:
+        self._gauge.inc(-1.0)
+
+
+class _HistogramChild:
+    __slots__ = ("_lock", "_upper", "counts", "sum")
+
+    def __init__(self, upper: Sequence[float]) -> None:
+        self._lock = threading.Lock()
+        self._upper = upper
+        # 各桶（不累计）计数，最后一个为 +Inf
+        self.counts = [0] * (len(upper) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self._upper, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_started")
+
+    def __init__(self, histogram: _HistogramChild) -> None:
+        self._histogram = histogram
+
+    def __enter__(self) -> None:
+        self._started = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        self._histogram.observe(time.perf_counter() - self._started)
+
+
+class _NullContext:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc_info) -> None:
+        return None
+
+
+_NULL_CONTEXT = _NullContext()
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, registry: "MetricsRegistry", name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self._registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], object] = {}
+        # 以调用方传入的原始标签值为键的索引（如状态码 200 与 "200" 指向同一个子项），命中时不必转换字符串
+        self._lookup: dict[tuple[object, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: object):
+        child = self._lookup.get(values)
+        if child is None:
+            key = tuple(str(value) for value in values)
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} 需要标签 {self.labelnames}，实际为 {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+                self._lookup[values] = child
+        return child
+
+    def _items(self) -> list[tuple[dict[str, str], object]]:
+        with self._lock:
+            children = list(self._children.items())
+        return [(dict(zip(self.labelnames, key)), child) for key, child in sorted(children)]
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for labels, child in self._items():
+            lines.extend(self._render_child(labels, child))
+        return lines
+
+    def _render_child(self, labels: dict[str, str], child) -> list[str]:
+        return [f"{self.name}{_format_labels(labels)} {_format_value(child.value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, *labelvalues: object, amount: float = 1.0) -> None:
+        if self._registry.enabled:
+            self.labels(*labelvalues).inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def track(self, *labelvalues: object) -> "_Tracker | _NullContext":
+        if not self._registry.enabled:
+            return _NULL_CONTEXT
+        return _Tracker(self.labels(*labelvalues))
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = STAGE_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, *labelvalues: object, value: float) -> None:
+        if self._registry.enabled:
+            self.labels(*labelvalues).observe(value)
+
+    def time(self, *labelvalues: object) -> "_Timer | _NullContext":
+        """记录 with 块的耗时（异常退出也记录）"""
+        if not self._registry.enabled:
+            return _NULL_CONTEXT
+        return _Timer(self.labels(*labelvalues))
+
+    def _render_child(self, labels: dict[str, str], child: _HistogramChild) -> list[str]:
+        with child._lock:
+            counts = list(child.counts)
+            total = child.sum
+        lines = []
+        cumulative = 0
+        for upper, count in zip((*self.buckets, math.inf), counts):
+            cumulative += count
+            bucket_labels = {**labels, "le": _format_value(upper)}
+            lines.append(f"{self.name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+        lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """进程内指标注册表，按 Prometheus 文本格式（0.0.4）输出
+
+    记录只是一次加锁的加法（直方图另有一次二分查找），每次数微秒，一次扫描约十次；
+    缓存命中率、连接池等从已有统计读取的指标由采集函数在抓取时生成，没有抓取就没有开销。
+    """
+
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self._metrics: list[_Metric] = []
+        self._collectors: list[Callable[[], Iterable[MetricFamily]]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if any(existing.name == metric.name for existing in self._metrics):
+                raise ValueError(f"指标已注册: {metric.name}")
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(self, name, documentation, labelnames))  # type: ignore[return-value]
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(self, name, documentation, labelnames))  # type: ignore[return-value]
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = STAGE_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(self, name, documentation, labelnames, buckets=buckets))  # type: ignore[return-value]
+
+    def register_collector(self, collector: Callable[[], Iterable[MetricFamily]]) -> None:
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors)
+        lines: list[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for collector in collectors:
+            for family in collector():
+                lines.append(f"# HELP {family.name} {family.documentation}")
+                lines.append(f"# TYPE {family.name} {family.kind}")
+                for labels, value in family.samples:
+                    lines.append(f"{family.name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry(enabled=settings.metrics_enabled)
+
+# /scan 的各阶段：upload 读取上传，preprocess 预处理，encode 请求体 Base64，
+# ocr_upstream 单次上游请求（含流式编码），ocr 整个识别调用（含缓存与重试），
+# parse 字段解析，image_hash 图片感知哈希，duplicate_check 查重，db_commit 写入数据库（含组提交等待），excel_append 实时 Excel 追加（每批）
+STAGE_SECONDS = registry.histogram(
+    "matriq_stage_duration_seconds", "Duration of each scan pipeline stage in seconds", ["stage"]
+)
+OCR_UPSTREAM_RESPONSES = registry.counter(
+    "matriq_ocr_upstream_responses_total",
+    "PaddleOCR-VL upstream responses by HTTP status (transport_error when no response)",
+    ["status"],
+)
+IN_FLIGHT = registry.gauge("matriq_in_flight", "Operations currently in progress", ["operation"])
+
+
+def stage_timer(stage: str):
+    """记录一个阶段的耗时：with stage_timer("parse"): ..."""
+    return STAGE_SECONDS.time(stage)
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    STAGE_SECONDS.observe(stage, value=seconds)
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    return registry
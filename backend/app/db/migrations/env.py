@@ -0,0 +1,46 @@
+"""Alembic 运行环境
+
+init_db 通过 config.attributes["connection"] 传入应用引擎的连接（连接已按配置档执行 PRAGMA）；
+命令行运行时按 SQLITE_PATH 创建引擎。SQLite 不支持大部分 ALTER，自动生成的迁移使用 batch 模式。
+"""
+from __future__ import annotations
+
+from alembic import context
+from sqlmodel import SQLModel
+
+import app.models.pipeline  # noqa: F401  注册全部表到 SQLModel.metadata
+from app.core.config import get_settings
+from app.db.session import create_sqlite_engine, include_schema_name
+
+config = context.config
+target_metadata = SQLModel.metadata
+
+
+def run_migrations(connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        render_as_batch=True,
+        include_name=include_schema_name,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        run_migrations(connection)
+        return
+
+    engine = create_sqlite_engine(get_settings().sqlite_path)
+    try:
+        with engine.connect() as connection:
+            run_migrations(connection)
+    finally:
+        engine.dispose()
+
+
+if context.is_offline_mode():
+    raise RuntimeError("不支持离线（--sql）模式，请直接对数据库执行 alembic upgrade")
+run_migrations_online()
@@ -0,0 +1,130 @@
+"""基线：引入迁移前的全部表、列和索引
+
+引入迁移之前数据库由 create_all 创建，后续新增的列和索引在启动时补齐，
+因此已有数据库可能处于其中任意状态。本迁移逐项检查，只创建缺少的部分：
+新数据库得到完整的表结构，旧数据库补齐缺少的列（total_scans 同时回填）和索引。
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_pipelines_code", "pipelines", ["code"], True),
+    ("ix_recognition_results_pipeline_id_id", "recognition_results", ["pipeline_id", "id"], False),
+    (
+        "ix_recognition_results_pipeline_id_recognized_at",
+        "recognition_results",
+        ["pipeline_id", "recognized_at", "id"],
+        False,
+    ),
+    ("ix_scan_jobs_pipeline_id", "scan_jobs", ["pipeline_id"], False),
+    ("ix_scan_jobs_status", "scan_jobs", ["status"], False),
+]
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    if "pipelines" not in tables:
+        op.create_table(
+            "pipelines",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("code", sa.String(), nullable=False),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("excel_path", sa.String(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("total_scans", sa.Integer(), server_default="0", nullable=False),
+            sa.Column("label_template_ids", sa.JSON(), server_default="[]", nullable=False),
+            sa.PrimaryKeyConstraint("id"),
+        )
+    else:
+        columns = {column["name"] for column in inspector.get_columns("pipelines")}
+        if "total_scans" not in columns:
+            op.add_column("pipelines", sa.Column("total_scans", sa.Integer(), server_default="0", nullable=False))
+            # 用一次 GROUP BY 回填历史扫描次数
+            op.execute(
+                "UPDATE pipelines SET total_scans = counts.n "
+                "FROM (SELECT pipeline_id, COUNT(*) AS n FROM recognition_results GROUP BY pipeline_id) AS counts "
+                "WHERE counts.pipeline_id = pipelines.id"
+            )
+        if "label_template_ids" not in columns:
+            op.add_column(
+                "pipelines", sa.Column("label_template_ids", sa.JSON(), server_default="[]", nullable=False)
+            )
+
+    if "label_templates" not in tables:
+        op.create_table(
+            "label_templates",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("version", sa.Integer(), nullable=False),
+            sa.Column("definition", sa.JSON(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint("id"),
+        )
+
+    if "cache_generations" not in tables:
+        op.create_table(
+            "cache_generations",
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("generation", sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint("name"),
+        )
+
+    if "recognition_results" not in tables:
+        op.create_table(
+            "recognition_results",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("pipeline_id", sa.Integer(), nullable=False),
+            sa.Column("material_code", sa.String(), nullable=True),
+            sa.Column("quantity", sa.Integer(), nullable=True),
+            sa.Column("batch", sa.String(), nullable=True),
+            sa.Column("date", sa.String(), nullable=True),
+            sa.Column("brand", sa.String(), nullable=True),
+            sa.Column("electrical_characteristics", sa.String(), nullable=True),
+            sa.Column("raw_ocr_text", sa.String(), nullable=True),
+            sa.Column("image_filename", sa.String(), nullable=True),
+            sa.Column("recognized_at", sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(["pipeline_id"], ["pipelines.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+
+    if "scan_jobs" not in tables:
+        op.create_table(
+            "scan_jobs",
+            sa.Column("id", sa.String(), nullable=False),
+            sa.Column("pipeline_id", sa.Integer(), nullable=False),
+            sa.Column("status", sa.String(), nullable=False),
+            sa.Column("image_path", sa.String(), nullable=False),
+            sa.Column("image_filename", sa.String(), nullable=False),
+            sa.Column("attempts", sa.Integer(), nullable=False),
+            sa.Column("result_id", sa.Integer(), nullable=True),
+            sa.Column("error", sa.String(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(["pipeline_id"], ["pipelines.id"]),
+            sa.ForeignKeyConstraint(["result_id"], ["recognition_results.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+
+    for name, table, columns, unique in INDEXES:
+        op.create_index(name, table, columns, unique=unique, if_not_exists=True)
+
+
+def downgrade() -> None:
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
+    for table in ("scan_jobs", "recognition_results", "cache_generations", "label_templates", "pipelines"):
+        op.drop_table(table)
@@ -0,0 +1,137 @@
+"""识别结果查询索引与生产日期列
+
+- material_code / batch 单列索引：按物料编码、批次追溯；
+- production_date（DATE）：由自由格式的 date 标准化得到，(pipeline_id, production_date) 索引支持日期范围筛选。
+
+回填分两步：已是 YYYY-MM-DD 的记录用一条 UPDATE 直接复制；
+其余非空 date 按 ID 分块读取，解析后批量写回。解析规则是编写本迁移时 parser_service.parse_production_date
+的冻结副本，不引用应用代码：解析器之后的改动不会改变本迁移在其他数据库上的回填结果，
+历史记录按新规则重新解析请使用 app.cli.reparse。
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from __future__ import annotations
+
+import re
+from datetime import date
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+BACKFILL_CHUNK_SIZE = 1000
+
+INDEXES = [
+    ("ix_recognition_results_material_code", ["material_code"]),
+    ("ix_recognition_results_batch", ["batch"]),
+    ("ix_recognition_results_pipeline_id_production_date", ["pipeline_id", "production_date"]),
+]
+
+
+# ---------------------------------------------------------------------------
+# parser_service.parse_production_date / extract_date 的冻结副本（2026-10-18），不要随解析器修改
+# ---------------------------------------------------------------------------
+_MONTHS = {
+    name: number
+    for number, name in enumerate(("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), 1)
+}
+_DATE_SCANNER = re.compile(
+    r"(?=[\d(dm生制日])(?:"
+    r"(?<!\d)(?P<ymd_y>\d{4})(?P<ymd_sep>[-/.])(?P<ymd_m>\d{1,2})(?P=ymd_sep)(?P<ymd_d>\d{1,2})(?!\d)"
+    r"|(?<!\d)(?P<cn_y>\d{4})\s*年\s*(?P<cn_m>\d{1,2})\s*月\s*(?P<cn_d>\d{1,2})(?!\d)"
+    r"|(?<!\d)(?P<dmy_d>\d{1,2})(?P<dmy_sep>[-/.])(?P<dmy_m>\d{1,2})(?P=dmy_sep)(?P<dmy_y>\d{4})(?!\d)"
+    r"|(?<![\w])(?P<mon_d>\d{1,2})[-\s](?P<mon_m>jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?[-\s](?P<mon_y>\d{4})(?!\d)"
+    r"|(?:\bdate\s*code|\bd/c|\bdc|\(9d\)|\bmfg\s*date|\bdate|生产日期|制造日期|日期)[\s:：|]*"
+    r"(?P<code>\d{8}|\d{6}|\d{4})(?![\d./\-年]))",
+    re.IGNORECASE,
+)
+
+
+def _date_from_match(match: re.Match[str]) -> date | None:
+    groups = match.groupdict()
+    try:
+        if groups["ymd_y"]:
+            return date(int(groups["ymd_y"]), int(groups["ymd_m"]), int(groups["ymd_d"]))
+        if groups["cn_y"]:
+            return date(int(groups["cn_y"]), int(groups["cn_m"]), int(groups["cn_d"]))
+        if groups["dmy_y"]:
+            year, first, second = int(groups["dmy_y"]), int(groups["dmy_d"]), int(groups["dmy_m"])
+            try:
+                return date(year, second, first)
+            except ValueError:
+                return date(year, first, second)
+        if groups["mon_y"]:
+            return date(int(groups["mon_y"]), _MONTHS[groups["mon_m"][:3].lower()], int(groups["mon_d"]))
+        code = groups["code"]
+        if len(code) == 8:
+            return date(int(code[:4]), int(code[4:6]), int(code[6:]))
+        if len(code) == 6:
+            return date(2000 + int(code[:2]), int(code[2:4]), int(code[4:]))
+        return date.fromisocalendar(2000 + int(code[:2]), int(code[2:]), 1)
+    except ValueError:
+        return None
+
+
+def _parse_production_date(value: str | None) -> date | None:
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        pass
+    for match in _DATE_SCANNER.finditer(value):
+        parsed = _date_from_match(match)
+        if parsed is not None:
+            return parsed
+    return None
+
+
+def _backfill(connection) -> None:
+    # 加 0 天会把 2025-02-30 这类不存在的日期进位为 2025-03-02，与原值比较即可排除
+    connection.execute(
+        sa.text(
+            "UPDATE recognition_results SET production_date = date "
+            "WHERE date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]' AND date(date, '+0 days') = date"
+        )
+    )
+    select_chunk = sa.text(
+        "SELECT id, date FROM recognition_results "
+        "WHERE id > :after AND production_date IS NULL AND date IS NOT NULL AND date != '' "
+        "ORDER BY id LIMIT :limit"
+    )
+    update_row = sa.text("UPDATE recognition_results SET production_date = :value WHERE id = :id")
+    after = 0
+    while True:
+        rows = connection.execute(select_chunk, {"after": after, "limit": BACKFILL_CHUNK_SIZE}).all()
+        if not rows:
+            return
+        after = rows[-1][0]
+        params = []
+        for result_id, value in rows:
+            parsed = _parse_production_date(value)
+            if parsed is not None:
+                params.append({"id": result_id, "value": parsed.isoformat()})
+        if params:
+            connection.execute(update_row, params)
+
+
+def upgrade() -> None:
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("recognition_results")}
+    if "production_date" not in columns:
+        op.add_column("recognition_results", sa.Column("production_date", sa.Date(), nullable=True))
+    _backfill(op.get_bind())
+    for name, columns in INDEXES:
+        op.create_index(name, "recognition_results", columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    for name, _ in reversed(INDEXES):
+        op.drop_index(name, table_name="recognition_results")
+    with op.batch_alter_table("recognition_results") as batch_op:
+        batch_op.drop_column("production_date")
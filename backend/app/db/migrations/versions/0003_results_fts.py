@@ -0,0 +1,55 @@
+"""识别结果全文检索（FTS5 trigram）
+
+recognition_results_fts 是以 recognition_results 为外部内容表的 FTS5 索引，只保存倒排索引本身，
+按 id 回表取原文。trigram 分词按三字符切分，中英文片段均可做子串匹配（不区分大小写）。
+索引由触发器随 INSERT / DELETE / 相关列 UPDATE 同步，批量推送、重新解析等所有写入路径都无需额外处理；
+建表后用 'rebuild' 一次性为已有记录建立索引。
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from __future__ import annotations
+
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+COLUMNS = ("raw_ocr_text", "material_code", "batch", "brand", "electrical_characteristics")
+_columns = ", ".join(COLUMNS)
+_new = ", ".join(f"new.{column}" for column in COLUMNS)
+_old = ", ".join(f"old.{column}" for column in COLUMNS)
+
+
+def upgrade() -> None:
+    op.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS recognition_results_fts USING fts5({_columns}, "
+        "content='recognition_results', content_rowid='id', tokenize='trigram')"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS recognition_results_fts_ai AFTER INSERT ON recognition_results BEGIN "
+        f"INSERT INTO recognition_results_fts(rowid, {_columns}) VALUES (new.id, {_new}); END"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS recognition_results_fts_ad AFTER DELETE ON recognition_results BEGIN "
+        f"INSERT INTO recognition_results_fts(recognition_results_fts, rowid, {_columns}) "
+        f"VALUES ('delete', old.id, {_old}); END"
+    )
+    # 只在被索引的列变化时重建该行索引（如只回填 production_date 时不触发）
+    op.execute(
+        f"CREATE TRIGGER IF NOT EXISTS recognition_results_fts_au AFTER UPDATE OF {_columns} "
+        "ON recognition_results BEGIN "
+        f"INSERT INTO recognition_results_fts(recognition_results_fts, rowid, {_columns}) "
+        f"VALUES ('delete', old.id, {_old}); "
+        f"INSERT INTO recognition_results_fts(rowid, {_columns}) VALUES (new.id, {_new}); END"
+    )
+    op.execute("INSERT INTO recognition_results_fts(recognition_results_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    for trigger in ("recognition_results_fts_au", "recognition_results_fts_ad", "recognition_results_fts_ai"):
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS recognition_results_fts")
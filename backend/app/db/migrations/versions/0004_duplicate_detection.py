@@ -0,0 +1,104 @@
+"""重复扫描检测：字段指纹、图片感知哈希与流水线级策略
+
+- recognition_results.fingerprint：(物料编码, 批次, 数量, 日期) 的摘要，
+  (pipeline_id, fingerprint, recognized_at) 索引使入库时的查重为一次索引区间探测；
+- recognition_results.image_hash：图片 dHash（64 位），区分同一批次的不同盘卷；
+- recognition_results.duplicate_of：flag 策略下指向被重复的原始记录；
+- pipelines.duplicate_policy / duplicate_window_seconds：为空时使用全局配置。
+
+已有记录按 ID 分块回填指纹；历史图片不再保存，image_hash 保持为空。指纹算法是 duplicate_service.result_fingerprint
+的冻结副本（查重依赖回填值与入库值一致，算法变更需要新的迁移），日期部分直接取 0002 起维护的 production_date 列，
+因此不引用应用代码。
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from __future__ import annotations
+
+import hashlib
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+BACKFILL_CHUNK_SIZE = 1000
+INDEX = ("ix_recognition_results_pipeline_id_fingerprint", ["pipeline_id", "fingerprint", "recognized_at"])
+
+
+def _fingerprint(
+    material_code: str | None,
+    batch: str | None,
+    quantity: int | None,
+    date: str | None,
+    production_date: str | None,
+) -> str | None:
+    # duplicate_service.result_fingerprint 的冻结副本（2026-10-18）；
+    # production_date 即 parse_production_date(date)，由入库与 0002 的回填写入
+    if not material_code or not material_code.strip() or not batch or not batch.strip():
+        return None
+    parts = (
+        material_code.strip().upper(),
+        batch.strip().upper(),
+        "" if quantity is None else str(quantity),
+        production_date if production_date else (date or "").strip(),
+    )
+    return hashlib.blake2b("\x1f".join(parts).encode("utf-8"), digest_size=12).hexdigest()
+
+
+def _backfill(connection) -> None:
+    select_chunk = sa.text(
+        "SELECT id, material_code, batch, quantity, date, production_date FROM recognition_results "
+        "WHERE id > :after AND fingerprint IS NULL AND material_code IS NOT NULL AND batch IS NOT NULL "
+        "ORDER BY id LIMIT :limit"
+    )
+    update_row = sa.text("UPDATE recognition_results SET fingerprint = :value WHERE id = :id")
+    after = 0
+    while True:
+        rows = connection.execute(select_chunk, {"after": after, "limit": BACKFILL_CHUNK_SIZE}).all()
+        if not rows:
+            return
+        after = rows[-1][0]
+        params = []
+        for result_id, *fields in rows:
+            fingerprint = _fingerprint(*fields)
+            if fingerprint is not None:
+                params.append({"id": result_id, "value": fingerprint})
+        if params:
+            connection.execute(update_row, params)
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    pipeline_columns = {column["name"] for column in inspector.get_columns("pipelines")}
+    if "duplicate_policy" not in pipeline_columns:
+        op.add_column("pipelines", sa.Column("duplicate_policy", sa.String(), nullable=True))
+    if "duplicate_window_seconds" not in pipeline_columns:
+        op.add_column("pipelines", sa.Column("duplicate_window_seconds", sa.Integer(), nullable=True))
+
+    result_columns = {column["name"] for column in inspector.get_columns("recognition_results")}
+    if "fingerprint" not in result_columns:
+        op.add_column("recognition_results", sa.Column("fingerprint", sa.String(), nullable=True))
+    if "image_hash" not in result_columns:
+        op.add_column("recognition_results", sa.Column("image_hash", sa.BigInteger(), nullable=True))
+    if "duplicate_of" not in result_columns:
+        op.add_column("recognition_results", sa.Column("duplicate_of", sa.Integer(), nullable=True))
+
+    _backfill(op.get_bind())
+    name, columns = INDEX
+    op.create_index(name, "recognition_results", columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index(INDEX[0], table_name="recognition_results")
+    with op.batch_alter_table("recognition_results") as batch_op:
+        batch_op.drop_column("duplicate_of")
+        batch_op.drop_column("image_hash")
+        batch_op.drop_column("fingerprint")
+    with op.batch_alter_table("pipelines") as batch_op:
+        batch_op.drop_column("duplicate_window_seconds")
+        batch_op.drop_column("duplicate_policy")
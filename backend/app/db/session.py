@@ -1,17 +1,140 @@
 from contextlib import contextmanager
-from sqlmodel import Session, SQLModel, create_engine
+from pathlib import Path
+from typing import Any
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.pool import QueuePool
+from sqlmodel import Session, create_engine
 
 from app.core.config import get_settings
 
+# 存储配置档（每个连接建立时执行的 PRAGMA）：
+# - wal：写入追加到 WAL 文件，读不阻塞写、写不阻塞读；synchronous=NORMAL 只在检查点时 fsync，
+#   断电最多丢失最近提交的事务，不会损坏数据库；
+# - compat：SQLite 默认的回滚日志 + FULL 同步，用于网络文件系统等不支持 WAL 共享内存的场景。
+SQLITE_PROFILES: dict[str, dict[str, str]] = {
+    "wal": {"journal_mode": "WAL", "synchronous": "NORMAL", "temp_store": "MEMORY"},
+    "compat": {"journal_mode": "DELETE", "synchronous": "FULL"},
+}
+
+
+def sqlite_pragmas(
+    profile: str = "wal",
+    busy_timeout_ms: int = 5000,
+    cache_size_mb: int = 64,
+    mmap_size_mb: int = 256,
+) -> dict[str, Any]:
+    """按配置档生成 PRAGMA（busy_timeout 放在最前，切换 journal_mode 时也会等待锁）"""
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"未知的 SQLite 配置档: {profile}，可选: {sorted(SQLITE_PROFILES)}")
+    return {
+        "busy_timeout": busy_timeout_ms,
+        **SQLITE_PROFILES[profile],
+        # 负数表示以 KiB 为单位
+        "cache_size": -cache_size_mb * 1024,
+        "mmap_size": mmap_size_mb * 1024 * 1024,
+    }
+
+
+def create_sqlite_engine(
+    path: Path | str,
+    pragmas: dict[str, Any] | None = None,
+    pool_size: int = 16,
+    max_overflow: int = 16,
+    pool_timeout: float = 30,
+) -> Engine:
+    """创建 SQLite 引擎：连接池大小固定（QueuePool），每个新连接执行一次 PRAGMA"""
+    engine = create_engine(
+        f"sqlite:///{path}",
+        connect_args={"check_same_thread": False},
+        poolclass=QueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+    )
+    pragmas = sqlite_pragmas() if pragmas is None else pragmas
+
+    @event.listens_for(engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    return engine
+
+
 settings = get_settings()
-engine = create_engine(
-    f"sqlite:///{settings.sqlite_path}",
-    connect_args={"check_same_thread": False},
+engine = create_sqlite_engine(
+    settings.sqlite_path,
+    pragmas=sqlite_pragmas(
+        settings.sqlite_profile,
+        busy_timeout_ms=settings.sqlite_busy_timeout_ms,
+        cache_size_mb=settings.sqlite_cache_size_mb,
+        mmap_size_mb=settings.sqlite_mmap_size_mb,
+    ),
+    pool_size=settings.sqlite_pool_size,
+    max_overflow=settings.sqlite_pool_max_overflow,
+    pool_timeout=settings.sqlite_pool_timeout_seconds,
 )
 
 
+MIGRATIONS_DIR = Path(__file__).resolve().parent / "migrations"
+# 迁移中用原生 SQL 维护、模型中没有对应定义的表（FTS5 虚拟表及其影子表），比较结构时忽略
+UNMANAGED_TABLE_PREFIXES = ("recognition_results_fts",)
+
+
+def include_schema_name(name: str | None, type_: str, parent_names: dict[str, Any]) -> bool:
+    """alembic include_name 钩子：autogenerate / check 不把 UNMANAGED_TABLE_PREFIXES 中的表当作多余的表"""
+    return not (type_ == "table" and name and name.startswith(UNMANAGED_TABLE_PREFIXES))
+
+
+def alembic_config(connection: Connection | None = None) -> Config:
+    """迁移配置；传入 connection 时迁移在该连接上执行"""
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+    if connection is not None:
+        config.attributes["connection"] = connection
+    return config
+
+
+def upgrade_database(bind: Engine, revision: str = "head") -> None:
+    with bind.begin() as connection:
+        command.upgrade(alembic_config(connection), revision)
+
+
 def init_db() -> None:
-    SQLModel.metadata.create_all(engine)
+    """把数据库升级到最新迁移版本；引入迁移前创建的数据库由基线迁移补齐"""
+    upgrade_database(engine)
+
+
+def pool_stats() -> dict[str, int]:
+    """连接池占用，不需要借出连接"""
+    pool = engine.pool
+    return {
+        "pool_size": pool.size(),  # type: ignore[attr-defined]
+        "pool_checked_out": pool.checkedout(),  # type: ignore[attr-defined]
+        "pool_checked_in": pool.checkedin(),  # type: ignore[attr-defined]
+        "pool_overflow": pool.overflow(),  # type: ignore[attr-defined]
+    }
+
+
+def database_stats() -> dict[str, Any]:
+    """当前生效的 journal_mode / synchronous 与连接池占用，用于确认配置档是否生效"""
+    with engine.connect() as conn:
+        journal_mode = conn.exec_driver_sql("PRAGMA journal_mode").scalar()
+        synchronous = conn.exec_driver_sql("PRAGMA synchronous").scalar()
+    return {
+        "profile": settings.sqlite_profile,
+        "journal_mode": journal_mode,
+        "synchronous": {0: "OFF", 1: "NORMAL", 2: "FULL", 3: "EXTRA"}.get(synchronous, synchronous),
+        **pool_stats(),
+    }
 
 
 @contextmanager
@@ -2,10 +2,14 @@ from __future__ import annotations
 
 from fastapi import FastAPI
 
-from app.api.routes import integration, pipelines
+from app.api.routes import integration, jobs, label_templates, metrics, pipelines, search, system
 from app.core.config import get_settings
 from app.core.logger import setup_logger
 from app.db.session import init_db
+from app.services.excel_live_writer import shutdown_excel_writers, start_excel_writers
+from app.services.job_service import start_scan_job_workers, stop_scan_job_workers
+from app.services.ocr_service import start_ocr_service, stop_ocr_service
+from app.services.pipeline_service import shutdown_result_writer
 
 settings = get_settings()
 
@@ -16,13 +20,37 @@ logger.info(f"Starting {settings.app_name} with log level: {settings.log_level}"
 app = FastAPI(title=settings.app_name)
 app.include_router(pipelines.router, prefix=settings.api_prefix)
 app.include_router(integration.router, prefix=settings.api_prefix)
+app.include_router(jobs.router, prefix=settings.api_prefix)
+app.include_router(system.router, prefix=settings.api_prefix)
+app.include_router(label_templates.router, prefix=settings.api_prefix)
+app.include_router(search.router, prefix=settings.api_prefix)
+# Prometheus 约定的抓取路径，不带 API 前缀
+app.include_router(metrics.router)
 
 
 @app.on_event("startup")
-def on_startup():
+async def on_startup():
     logger.info("Application starting up...")
     init_db()
     logger.info("Database initialized")
+    start_excel_writers()
+    await start_ocr_service()
+    logger.info("OCR client pool started")
+    await start_scan_job_workers()
+    logger.info("Scan job workers started")
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    logger.info("Application shutting down...")
+    await stop_scan_job_workers()
+    logger.info("Scan job workers stopped")
+    await stop_ocr_service()
+    logger.info("OCR client pool closed")
+    shutdown_result_writer()
+    logger.info("Result writer drained")
+    shutdown_excel_writers()
+    logger.info("Excel writers drained")
 
 
 @app.get("/")
@@ -1,9 +1,10 @@
 from __future__ import annotations
 
+from datetime import date as date_type
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import DateTime, Integer
+from sqlalchemy import JSON, BigInteger, Date, DateTime, Index, Integer
 from sqlmodel import Field, SQLModel
 
 class Pipeline(SQLModel, table=True):
@@ -14,10 +15,47 @@ class Pipeline(SQLModel, table=True):
     name: str
     excel_path: str
     created_at: datetime = Field(default_factory=datetime.utcnow, sa_type=DateTime)
+    # 扫描次数冗余计数，与 store_result 在同一事务中更新
+    total_scans: int = Field(default=0, sa_type=Integer, sa_column_kwargs={"server_default": "0"})
+    # 引用的标签模板 ID（按优先级），见 LabelTemplate
+    label_template_ids: list[int] = Field(
+        default_factory=list, sa_type=JSON, sa_column_kwargs={"server_default": "[]"}
+    )
+    # 重复扫描策略与时间窗口，为空时使用全局配置（DUPLICATE_POLICY / DUPLICATE_WINDOW_SECONDS）
+    duplicate_policy: Optional[str] = None
+    duplicate_window_seconds: Optional[int] = Field(default=None, sa_type=Integer)
+
+
+class LabelTemplate(SQLModel, table=True):
+    """供应商标签版式模板：指纹（fingerprint）+ 字段规则（anchor/pattern/post），由流水线按优先级引用
+
+    definition 每次修改 version 递增，编译结果按 (id, version) 缓存。
+    """
+
+    __tablename__ = "label_templates"  # type: ignore
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    name: str
+    version: int = Field(default=1, sa_type=Integer)
+    definition: dict = Field(default_factory=dict, sa_type=JSON)
+    created_at: datetime = Field(default_factory=datetime.utcnow, sa_type=DateTime)
+    updated_at: datetime = Field(default_factory=datetime.utcnow, sa_type=DateTime)
 
 
 class RecognitionResult(SQLModel, table=True):
     __tablename__ = "recognition_results"  # type: ignore
+    __table_args__ = (
+        # 按流水线的 keyset 分页：深分页与首页代价一致
+        Index("ix_recognition_results_pipeline_id_id", "pipeline_id", "id"),
+        Index("ix_recognition_results_pipeline_id_recognized_at", "pipeline_id", "recognized_at", "id"),
+        # 按物料编码 / 批次追溯（可跨流水线）
+        Index("ix_recognition_results_material_code", "material_code"),
+        Index("ix_recognition_results_batch", "batch"),
+        # 按生产日期范围筛选
+        Index("ix_recognition_results_pipeline_id_production_date", "pipeline_id", "production_date"),
+        # 重复扫描检测：按 (流水线, 字段指纹) 定位时间窗口内的记录
+        Index("ix_recognition_results_pipeline_id_fingerprint", "pipeline_id", "fingerprint", "recognized_at"),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     pipeline_id: int = Field(foreign_key="pipelines.id")
@@ -25,8 +63,40 @@ class RecognitionResult(SQLModel, table=True):
     quantity: Optional[int] = Field(default=None, sa_type=Integer)
     batch: Optional[str] = None
     date: Optional[str] = None
+    # 由 date 标准化得到的 DATE 列，范围查询走索引；date 无法识别为日期时为空
+    production_date: Optional[date_type] = Field(default=None, sa_type=Date)
     brand: Optional[str] = None
     electrical_characteristics: Optional[str] = None
     raw_ocr_text: Optional[str] = None
     image_filename: Optional[str] = None
-    recognized_at: datetime = Field(default_factory=datetime.utcnow, sa_type=DateTime)
\ No newline at end of file
+    recognized_at: datetime = Field(default_factory=datetime.utcnow, sa_type=DateTime)
+    # (物料编码, 批次, 数量, 日期) 的摘要与图片 dHash，见 duplicate_service
+    fingerprint: Optional[str] = None
+    image_hash: Optional[int] = Field(default=None, sa_type=BigInteger)
+    # 按 flag 策略入库的重复扫描指向最早的那条记录
+    duplicate_of: Optional[int] = Field(default=None, sa_type=Integer)
+
+class ScanJob(SQLModel, table=True):
+    """异步扫描任务：上传的图片落盘后排队，由后台 worker 完成 OCR → 解析 → 入库"""
+
+    __tablename__ = "scan_jobs"  # type: ignore
+
+    id: str = Field(primary_key=True)
+    pipeline_id: int = Field(foreign_key="pipelines.id", index=True)
+    status: str = Field(default="queued", index=True)  # queued / running / succeeded / failed
+    image_path: str
+    image_filename: str
+    attempts: int = Field(default=0, sa_type=Integer)
+    result_id: Optional[int] = Field(default=None, foreign_key="recognition_results.id")
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow, sa_type=DateTime)
+    updated_at: datetime = Field(default_factory=datetime.utcnow, sa_type=DateTime)
+
+
+class CacheGeneration(SQLModel, table=True):
+    """进程内缓存的代数：修改被缓存的数据时递增，各 worker 发现代数变化即清空本地缓存"""
+
+    __tablename__ = "cache_generations"  # type: ignore
+
+    name: str = Field(primary_key=True)
+    generation: int = Field(default=0, sa_type=Integer)
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+from pydantic import BaseModel
+
+
+class LabelTemplateCreate(BaseModel):
+    name: str
+    definition: dict[str, Any]
+
+
+class LabelTemplateRead(LabelTemplateCreate):
+    id: int
+    version: int
+    created_at: datetime
+    updated_at: datetime
+
+
+class PipelineTemplatesUpdate(BaseModel):
+    template_ids: list[int]
@@ -1,9 +1,9 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Optional
+from typing import Any, Literal, Optional
 
-from pydantic import BaseModel, validator
+from pydantic import BaseModel, Field, validator
 
 
 class PipelineCreate(BaseModel):
@@ -20,6 +20,16 @@ class PipelineSummary(BaseModel):
 
 class PipelineDetail(PipelineSummary):
     excel_path: str
+    label_template_ids: list[int] = []
+    duplicate_policy: Optional[str] = None
+    duplicate_window_seconds: Optional[int] = None
+
+
+class PipelineDuplicatePolicyUpdate(BaseModel):
+    """为空的项使用全局配置（DUPLICATE_POLICY / DUPLICATE_WINDOW_SECONDS）"""
+
+    policy: Optional[Literal["off", "flag", "reject", "merge"]] = None
+    window_seconds: Optional[int] = Field(default=None, ge=0)
 
 
 class ScanResult(BaseModel):
@@ -40,6 +50,69 @@ class ScanResult(BaseModel):
         return value
 
 
+class BulkScanResult(ScanResult):
+    """批量推送的单条结果：可逐条指定目标流水线，未指定时使用请求参数"""
+
+    pipeline_id: Optional[int] = None
+    pipeline_code: Optional[str] = None
+
+
+class BulkScanResultItem(BaseModel):
+    index: int
+    status: str
+    pipeline_id: Optional[int] = None
+    result_id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BulkScanResultResponse(BaseModel):
+    total: int
+    succeeded: int
+    failed: int
+    items: list[BulkScanResultItem]
+
+
 class RecognitionResponse(ScanResult):
     pipeline_id: int
     pipeline_code: str
+    result_id: Optional[int] = None
+    # 重复扫描时指向已有记录；与 result_id 相同表示本次扫描已合并到该记录
+    duplicate_of: Optional[int] = None
+
+
+class RecognitionResultPage(BaseModel):
+    items: list[dict[str, Any]]
+    next_cursor: Optional[str] = None
+
+
+class ScanBatchItem(BaseModel):
+    index: int
+    image_filename: str
+    status: str
+    result_id: Optional[int] = None
+    result: Optional[RecognitionResponse] = None
+    error: Optional[str] = None
+    # status 为 duplicate（reject 策略下的重复扫描，相当于 /scan 的 409）时指向已有记录
+    duplicate_of: Optional[int] = None
+
+
+class ScanBatchResponse(BaseModel):
+    pipeline_id: int
+    pipeline_code: str
+    total: int
+    succeeded: int
+    failed: int
+    items: list[ScanBatchItem]
+
+
+class ScanJobRead(BaseModel):
+    id: str
+    pipeline_id: int
+    status: str
+    image_filename: str
+    attempts: int
+    result_id: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    result: Optional[RecognitionResponse] = None
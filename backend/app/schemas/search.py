@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class SearchHit(BaseModel):
+    id: int
+    pipeline_id: int
+    material_code: Optional[str]
+    batch: Optional[str]
+    date: Optional[str]
+    brand: Optional[str]
+    image_filename: Optional[str]
+    recognized_at: datetime
+    snippet: Optional[str]
+    score: float
+
+
+class SearchResultPage(BaseModel):
+    items: list[SearchHit]
+    next_offset: Optional[int] = None
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Sequence
+
+from sqlalchemy import union_all
+from sqlmodel import Session, col, select
+
+from app.core.config import get_settings
+from app.models.pipeline import Pipeline, RecognitionResult
+from app.services.parser_service import parse_production_date
+from app.utils.image_hash import hamming_distance
+
+settings = get_settings()
+
+DUPLICATE_POLICIES = ("off", "flag", "reject", "merge")
+# 参与字段指纹的字段；同一批次的不同盘卷通常四项都相同，因此有图片时还要比较感知哈希
+FINGERPRINT_FIELDS = ("material_code", "batch", "quantity", "date")
+# 同一指纹在窗口内最多比较的候选数（同一批次连续扫描多盘时会有多条）
+MAX_CANDIDATES = 16
+# 批量查重每条语句合并的指纹数：SQLite 复合 SELECT 最多 500 项（SQLITE_MAX_COMPOUND_SELECT）
+BATCH_PROBE_CHUNK_SIZE = 200
+
+
+class DuplicateResultError(Exception):
+    """reject 策略下的重复扫描；original_id 为已有记录"""
+
+    def __init__(self, original_id: int):
+        super().__init__(f"与识别结果 {original_id} 重复")
+        self.original_id = original_id
+
+
+def result_fingerprint(
+    material_code: str | None,
+    batch: str | None,
+    quantity: int | None,
+    date: str | None,
+) -> str | None:
+    """(物料编码, 批次, 数量, 日期) 的摘要；缺少物料编码或批次时无法判断是否同一盘卷，返回 None
+
+    编码与批次忽略大小写和首尾空白，日期按 production_date 的规则标准化，
+    因此 OCR 对同一标签的细微差异（2025/11/30 与 2025-11-30）不影响指纹。
+    """
+    if not material_code or not material_code.strip() or not batch or not batch.strip():
+        return None
+    production_date = parse_production_date(date)
+    parts = (
+        material_code.strip().upper(),
+        batch.strip().upper(),
+        "" if quantity is None else str(quantity),
+        production_date.isoformat() if production_date else (date or "").strip(),
+    )
+    return hashlib.blake2b("\x1f".join(parts).encode("utf-8"), digest_size=12).hexdigest()
+
+
+def duplicate_settings(pipeline: Pipeline) -> tuple[str, int]:
+    """流水线生效的 (策略, 时间窗口秒数)：流水线未设置时使用全局配置"""
+    policy = pipeline.duplicate_policy or settings.duplicate_policy
+    window = pipeline.duplicate_window_seconds
+    return policy, settings.duplicate_window_seconds if window is None else window
+
+
+def probe_statement(pipeline_id: int, fingerprint: str, recognized_at: datetime, window_seconds: int):
+    """时间窗口内相同指纹的记录（从最早的开始），落在 (pipeline_id, fingerprint, recognized_at) 索引的一个区间上"""
+    window = timedelta(seconds=window_seconds)
+    return (
+        select(RecognitionResult.id, RecognitionResult.image_hash, RecognitionResult.duplicate_of)
+        .where(RecognitionResult.pipeline_id == pipeline_id)
+        .where(RecognitionResult.fingerprint == fingerprint)
+        .where(col(RecognitionResult.recognized_at).between(recognized_at - window, recognized_at + window))
+        .order_by(col(RecognitionResult.recognized_at).asc())
+        .limit(MAX_CANDIDATES)
+    )
+
+
+def batch_probe_statement(pipeline_id: int, ranges: dict[str, tuple[datetime, datetime]], window_seconds: int):
+    """一批结果的查重：ranges 为 {指纹: (最早识别时间, 最晚识别时间)}，一次查询取回各指纹窗口内的记录
+
+    每个指纹一个 probe_statement 区间探测，以 UNION ALL 合并（fingerprint IN (...) 时 SQLite 可能改用时间索引）；
+    指纹数不应超过 BATCH_PROBE_CHUNK_SIZE，更多时由调用方分块。
+    """
+    window = timedelta(seconds=window_seconds)
+    probes = [
+        select(
+            RecognitionResult.id,
+            RecognitionResult.fingerprint,
+            RecognitionResult.image_hash,
+            RecognitionResult.duplicate_of,
+            RecognitionResult.recognized_at,
+        )
+        .where(RecognitionResult.pipeline_id == pipeline_id)
+        .where(RecognitionResult.fingerprint == fingerprint)
+        .where(col(RecognitionResult.recognized_at).between(earliest - window, latest + window))
+        .order_by(col(RecognitionResult.recognized_at).asc())
+        .limit(MAX_CANDIDATES)
+        .subquery()
+        for fingerprint, (earliest, latest) in ranges.items()
+    ]
+    return union_all(*[select(probe) for probe in probes])
+
+
+def _first_match(
+    candidates: Iterable[tuple[int, int | None, int | None]], image_hash: int | None, max_distance: int
+) -> int | None:
+    # 候选为 (ID, 图片哈希, duplicate_of)；命中被标记的重复扫描时返回它指向的原始记录
+    for candidate_id, candidate_hash, duplicate_of in candidates:
+        if image_hash is None or candidate_hash is None or hamming_distance(image_hash, candidate_hash) <= max_distance:
+            return duplicate_of or candidate_id
+    return None
+
+
+def find_duplicate(
+    session: Session,
+    pipeline_id: int,
+    fingerprint: str,
+    image_hash: int | None,
+    recognized_at: datetime,
+    window_seconds: int,
+    max_distance: int | None = None,
+) -> int | None:
+    """返回与新结果重复的最早记录 ID，没有时返回 None
+
+    指纹相同且（任一方没有图片哈希，或哈希相差不超过 max_distance 位）即视为重复；
+    命中的记录本身是被标记的重复扫描时，返回它指向的原始记录。
+    """
+    max_distance = settings.duplicate_image_max_distance if max_distance is None else max_distance
+    started = time.perf_counter()
+    candidates = session.exec(probe_statement(pipeline_id, fingerprint, recognized_at, window_seconds)).all()
+    original = _first_match(candidates, image_hash, max_distance)
+    _stats.record_probe(time.perf_counter() - started, found=original is not None)
+    return original
+
+
+def find_batch_duplicates(
+    session: Session,
+    pipeline_id: int,
+    items: Sequence[tuple[str | None, int | None, datetime]],
+    window_seconds: int,
+    max_distance: int | None = None,
+) -> list[tuple[int | None, int | None]]:
+    """批量查重：items 为一批新结果的 (指纹, 图片哈希, 识别时间)，每 BATCH_PROBE_CHUNK_SIZE 个指纹一次查询
+
+    每条返回 (已有记录 ID, 批内较早条目的下标)，两者都为 None 表示不重复。已有记录优先；
+    同一批中重复扫描的盘卷指向批内第一次出现的条目（该条目本身重复时指向它的原始记录）。
+    """
+    max_distance = settings.duplicate_image_max_distance if max_distance is None else max_distance
+    matches: list[tuple[int | None, int | None]] = [(None, None)] * len(items)
+    probed = [(index, item) for index, item in enumerate(items) if item[0] is not None]
+    if not probed:
+        return matches
+
+    started = time.perf_counter()
+    ranges: dict[str, tuple[datetime, datetime]] = {}
+    for _, (fingerprint, _, recognized_at) in probed:
+        earliest, latest = ranges.get(fingerprint, (recognized_at, recognized_at))  # type: ignore[arg-type]
+        ranges[fingerprint] = (min(earliest, recognized_at), max(latest, recognized_at))  # type: ignore[index]
+    fingerprints = list(ranges)
+    rows = []
+    for start in range(0, len(fingerprints), BATCH_PROBE_CHUNK_SIZE):
+        chunk = {fingerprint: ranges[fingerprint] for fingerprint in fingerprints[start:start + BATCH_PROBE_CHUNK_SIZE]}
+        rows.extend(session.exec(batch_probe_statement(pipeline_id, chunk, window_seconds)).all())  # type: ignore[call-overload]
+    rows.sort(key=lambda row: row[4])
+    existing: dict[str, list[tuple[int, int | None, int | None, datetime]]] = {}
+    for candidate_id, fingerprint, candidate_hash, duplicate_of, candidate_at in rows:
+        existing.setdefault(fingerprint, []).append((candidate_id, candidate_hash, duplicate_of, candidate_at))
+
+    window = timedelta(seconds=window_seconds)
+    # 批内已处理的条目：(下标, 图片哈希, 识别时间)，按指纹分组
+    earlier: dict[str, list[tuple[int, int | None, datetime]]] = {}
+    for index, (fingerprint, image_hash, recognized_at) in probed:
+        in_window = [
+            (candidate_id, candidate_hash, duplicate_of)
+            for candidate_id, candidate_hash, duplicate_of, candidate_at in existing.get(fingerprint, ())
+            if abs(candidate_at - recognized_at) <= window
+        ]
+        original_id = _first_match(in_window, image_hash, max_distance)
+        if original_id is None:
+            peers = [
+                (peer, peer_hash, None)
+                for peer, peer_hash, peer_at in earlier.get(fingerprint, ())
+                if abs(peer_at - recognized_at) <= window
+            ]
+            peer = _first_match(peers, image_hash, max_distance)
+            if peer is not None:
+                # 较早条目自身重复时沿用它的原始记录
+                matches[index] = matches[peer] if matches[peer] != (None, None) else (None, peer)
+        else:
+            matches[index] = (original_id, None)
+        earlier.setdefault(fingerprint, []).append((index, image_hash, recognized_at))  # type: ignore[arg-type]
+
+    found = sum(1 for index, _ in probed if matches[index] != (None, None))
+    _stats.record_probe(time.perf_counter() - started, found=found, checked=len(probed))
+    return matches
+
+
+class DuplicateStats:
+    """重复检测计数：检测次数、命中次数、各策略的处理次数与查找耗时"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.found = 0
+        self.actions = {policy: 0 for policy in DUPLICATE_POLICIES if policy != "off"}
+        self.probe_seconds = 0.0
+
+    def record_probe(self, seconds: float, found: int, checked: int = 1) -> None:
+        with self._lock:
+            self.checked += checked
+            self.found += int(found)
+            self.probe_seconds += seconds
+
+    def record_action(self, policy: str) -> None:
+        with self._lock:
+            self.actions[policy] = self.actions.get(policy, 0) + 1
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "policy": settings.duplicate_policy,
+                "window_seconds": settings.duplicate_window_seconds,
+                "checked": self.checked,
+                "found": self.found,
+                "actions": dict(self.actions),
+                "avg_probe_ms": round(self.probe_seconds / self.checked * 1000, 3) if self.checked else 0.0,
+            }
+
+
+_stats = DuplicateStats()
+
+
+def duplicate_stats() -> DuplicateStats:
+    return _stats
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from app.core.config import get_settings
+from app.core.logger import get_logger
+from app.core.metrics import observe_stage
+from app.utils.excel_writer import append_results
+
+settings = get_settings()
+logger = get_logger("services.excel_live_writer")
+
+_STOP = object()
+
+
+class ExcelLiveWriter:
+    """单个 Excel 文件的唯一写入者
+
+    识别结果先进入队列，由后台线程按微批次（满 max_rows 行或等待 flush_interval_ms）
+    合并写入，每批只做一次 load/save，避免并发请求各自重写文件导致丢行。
+    """
+
+    def __init__(self, path: Path, max_rows: int, flush_interval_ms: int):
+        self.path = path
+        self.max_rows = max(1, max_rows)
+        self.flush_interval = max(0, flush_interval_ms) / 1000
+        self._queue: queue.Queue = queue.Queue()
+        self._closed = False
+        self._lock = threading.Lock()
+
+        self.flush_count = 0
+        self.flushed_rows = 0
+        self.failed_rows = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+
+        self._thread = threading.Thread(
+            target=self._run, name=f"excel-writer-{path.stem}", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, result) -> None:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"Excel 写入线程已关闭: {self.path}")
+            self._queue.put(result)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def close(self, timeout: float | None = None) -> None:
+        """停止接收新结果，并等待队列中已有结果全部写入"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "path": str(self.path),
+            "queue_depth": self.queue_depth,
+            "flush_count": self.flush_count,
+            "flushed_rows": self.flushed_rows,
+            "failed_rows": self.failed_rows,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "max_flush_ms": round(self.max_flush_ms, 3),
+            "avg_flush_ms": round(self.total_flush_ms / self.flush_count, 3) if self.flush_count else 0.0,
+        }
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_rows:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._flush(batch)
+            if stop:
+                return
+
+    def _flush(self, batch: list) -> None:
+        started = time.perf_counter()
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            append_results(self.path, batch)
+        except Exception as exc:
+            # 数据库仍是数据源，导出可随时从数据库重建，这里只记录错误
+            self.failed_rows += len(batch)
+            logger.error(f"Excel 批量写入失败: {self.path}, 行数={len(batch)}, 错误={exc}")
+            return
+        elapsed = time.perf_counter() - started
+        observe_stage("excel_append", elapsed)
+        elapsed_ms = elapsed * 1000
+
+        self.flush_count += 1
+        self.flushed_rows += len(batch)
+        self.last_flush_ms = elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        self.total_flush_ms += elapsed_ms
+        logger.debug(f"Excel 批量写入完成: {self.path.name}, 行数={len(batch)}, 耗时={elapsed_ms:.1f}ms")
+
+
+_writers: dict[Path, ExcelLiveWriter] = {}
+_writers_lock = threading.Lock()
+# 关闭后不再创建写入线程：关闭之后才完成的请求（如组提交排空）不会启动无人回收的新线程
+_writers_closed = False
+
+
+def start_excel_writers() -> None:
+    """应用启动时调用，允许创建写入线程（同一进程中应用可能多次启动、关闭，如测试）"""
+    global _writers_closed
+    with _writers_lock:
+        _writers_closed = False
+
+
+def get_excel_writer(path: Path) -> ExcelLiveWriter:
+    """返回文件对应的写入线程；关闭后抛出 RuntimeError"""
+    key = path.resolve()
+    with _writers_lock:
+        if _writers_closed:
+            raise RuntimeError("Excel 写入线程已关闭")
+        writer = _writers.get(key)
+        if writer is None:
+            writer = ExcelLiveWriter(
+                key,
+                max_rows=settings.excel_flush_max_rows,
+                flush_interval_ms=settings.excel_flush_interval_ms,
+            )
+            _writers[key] = writer
+            logger.info(f"启动 Excel 写入线程: {key}")
+        return writer
+
+
+def enqueue_result(path: Path, result) -> None:
+    get_excel_writer(path).submit(result)
+
+
+def shutdown_excel_writers(timeout: float | None = 30) -> None:
+    """关闭所有写入线程，关闭前写完各自队列中的结果；之后的 enqueue_result 抛出 RuntimeError"""
+    global _writers_closed
+    with _writers_lock:
+        _writers_closed = True
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        depth = writer.queue_depth
+        writer.close(timeout)
+        logger.info(f"Excel 写入线程已关闭: {writer.path.name}, 关闭时排空 {depth} 行")
+
+
+def excel_writer_stats() -> list[dict[str, Any]]:
+    with _writers_lock:
+        writers = list(_writers.values())
+    return [writer.stats() for writer in writers]
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import json
+from typing import Any, AsyncIterator, Iterable, Sequence
+
+from pydantic import ValidationError
+from sqlalchemy import or_
+from sqlmodel import col, select
+
+from app.core.logger import get_logger
+from app.db.session import get_session
+from app.models.pipeline import Pipeline
+from app.schemas.pipeline import BulkScanResult, BulkScanResultItem
+from app.services.pipeline_service import store_results_bulk
+
+logger = get_logger("services.ingest")
+
+# NDJSON 单行（一条识别结果）的上限；含 raw_ocr_text 的一条结果通常只有几 KB
+MAX_LINE_BYTES = 1024 * 1024
+
+
+class BulkPayloadTooLargeError(ValueError):
+    """批量推送的请求体或 NDJSON 单行超过上限"""
+
+
+class PipelineResolver:
+    """批量推送中按 ID / 编码查找流水线：每块只查询一次尚未见过的 ID 与编码，结果在整个请求内复用"""
+
+    def __init__(self) -> None:
+        self._by_id: dict[int, Pipeline | None] = {}
+        self._by_code: dict[str, Pipeline | None] = {}
+
+    def prefetch(self, keys: Iterable[tuple[int | None, str | None]]) -> None:
+        keys = list(keys)
+        ids = {pipeline_id for pipeline_id, _ in keys if pipeline_id is not None} - self._by_id.keys()
+        codes = {code for pipeline_id, code in keys if pipeline_id is None and code} - self._by_code.keys()
+        if not ids and not codes:
+            return
+        with get_session() as session:
+            pipelines = session.exec(
+                select(Pipeline).where(or_(col(Pipeline.id).in_(ids), col(Pipeline.code).in_(codes)))
+            ).all()
+        for pipeline in pipelines:
+            self._by_id[pipeline.id] = pipeline  # type: ignore[index]
+            self._by_code[pipeline.code] = pipeline
+        for pipeline_id in ids:
+            self._by_id.setdefault(pipeline_id, None)
+        for code in codes:
+            self._by_code.setdefault(code, None)
+
+    def resolve(self, pipeline_id: int | None, pipeline_code: str | None) -> Pipeline | None:
+        if pipeline_id is not None:
+            return self._by_id.get(pipeline_id)
+        if pipeline_code:
+            return self._by_code.get(pipeline_code)
+        return None
+
+
+def _validation_message(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'item'}: {error['msg']}" for error in exc.errors()
+    )
+
+
+def ingest_chunk(
+    records: Sequence[tuple[int, Any]],
+    resolver: PipelineResolver,
+    default_pipeline_id: int | None = None,
+    default_pipeline_code: str | None = None,
+) -> list[BulkScanResultItem]:
+    """校验并写入一块推送记录 (序号, JSON 对象)，一块一个事务；返回每条的状态"""
+    statuses: dict[int, BulkScanResultItem] = {}
+    valid: list[tuple[int, BulkScanResult, tuple[int | None, str | None]]] = []
+    for index, record in records:
+        if isinstance(record, Exception):
+            statuses[index] = BulkScanResultItem(index=index, status="error", error=str(record))
+            continue
+        try:
+            item = BulkScanResult.model_validate(record)
+        except ValidationError as exc:
+            statuses[index] = BulkScanResultItem(index=index, status="error", error=_validation_message(exc))
+            continue
+        if item.pipeline_id is not None or item.pipeline_code:
+            key = (item.pipeline_id, item.pipeline_code)
+        else:
+            key = (default_pipeline_id, default_pipeline_code)
+        if key[0] is None and not key[1]:
+            statuses[index] = BulkScanResultItem(
+                index=index, status="error", error="必须提供 pipeline_id 或 pipeline_code 以指定目标流水线"
+            )
+            continue
+        valid.append((index, item, key))
+
+    resolver.prefetch(key for _, _, key in valid)
+    rows: list[tuple[Pipeline, dict[str, Any]]] = []
+    indexes: list[int] = []
+    for index, item, key in valid:
+        pipeline = resolver.resolve(*key)
+        if pipeline is None:
+            statuses[index] = BulkScanResultItem(index=index, status="error", error="指定的流水线不存在")
+            continue
+        rows.append((pipeline, {
+            "material_code": item.material_code,
+            "quantity": item.quantity,
+            "batch": item.batch,
+            "date": item.date,
+            "brand": item.brand,
+            "electrical_characteristics": item.electrical_characteristics,
+            "raw_ocr_text": item.raw_ocr_text,
+            "image_filename": item.image_filename,
+            "recognized_at": item.scan_time,
+        }))
+        indexes.append(index)
+
+    if rows:
+        try:
+            results = store_results_bulk(rows)
+        except Exception as exc:
+            logger.error(f"批量推送写入失败: 条数={len(rows)}, 错误={exc}")
+            for index, (pipeline, _) in zip(indexes, rows):
+                statuses[index] = BulkScanResultItem(
+                    index=index, status="error", pipeline_id=pipeline.id, error=f"写入失败: {exc}"
+                )
+        else:
+            for index, result in zip(indexes, results):
+                statuses[index] = BulkScanResultItem(
+                    index=index, status="stored", pipeline_id=result.pipeline_id, result_id=result.id
+                )
+    return [statuses[index] for index, _ in records]
+
+
+async def read_limited(stream: AsyncIterator[bytes], max_bytes: int) -> bytes:
+    """读取整个请求体，超过 max_bytes 时抛出 BulkPayloadTooLargeError（不再继续接收）"""
+    chunks: list[bytes] = []
+    total = 0
+    async for chunk in stream:
+        total += len(chunk)
+        if total > max_bytes:
+            raise BulkPayloadTooLargeError(f"请求体超过 {max_bytes} 字节")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+async def iter_ndjson(
+    stream: AsyncIterator[bytes], max_bytes: int, max_line_bytes: int = MAX_LINE_BYTES
+) -> AsyncIterator[Any]:
+    """逐行解析 NDJSON 请求体（跳过空行）；无法解析的行产出 ValueError，由调用方记为该条失败
+
+    只在新到达的分块中查找换行，未结束的行按分块暂存，长行不会被反复拼接和切分；
+    请求体累计超过 max_bytes 或单行超过 max_line_bytes 时抛出 BulkPayloadTooLargeError。
+    """
+    pending: list[bytes] = []
+    pending_bytes = 0
+    total = 0
+    async for chunk in stream:
+        total += len(chunk)
+        if total > max_bytes:
+            raise BulkPayloadTooLargeError(f"请求体超过 {max_bytes} 字节")
+        start = 0
+        while (end := chunk.find(b"\n", start)) != -1:
+            if pending_bytes + end - start > max_line_bytes:
+                raise BulkPayloadTooLargeError(f"单行超过 {max_line_bytes} 字节")
+            line = b"".join([*pending, chunk[start:end]]) if pending else chunk[start:end]
+            pending.clear()
+            pending_bytes = 0
+            start = end + 1
+            if line.strip():
+                yield _parse_line(line)
+        if start < len(chunk):
+            pending.append(chunk[start:])
+            pending_bytes += len(chunk) - start
+            if pending_bytes > max_line_bytes:
+                raise BulkPayloadTooLargeError(f"单行超过 {max_line_bytes} 字节")
+    line = b"".join(pending)
+    if line.strip():
+        yield _parse_line(line)
+
+
+def _parse_line(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError as exc:
+        return ValueError(f"JSON 解析失败: {exc}")
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import asyncio
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import col, select, update
+
+from app.core.config import get_settings
+from app.core.logger import get_logger
+from app.db.session import get_session
+from app.models.pipeline import Pipeline, ScanJob
+from app.services.duplicate_service import DuplicateResultError
+from app.services.ocr_service import OcrCircuitOpenError, OcrServiceError, get_ocr_service
+from app.services.label_template_service import get_pipeline_templates
+from app.services.pipeline_service import get_pipeline, store_result
+from app.services.scan_service import build_db_payload
+
+settings = get_settings()
+logger = get_logger("services.jobs")
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+
+def new_job_image_path(filename: str) -> tuple[str, Path]:
+    """为新任务分配 ID 与图片落盘路径"""
+    job_id = uuid.uuid4().hex
+    return job_id, settings.jobs_root / f"{job_id}{Path(filename).suffix.lower()}"
+
+
+def register_scan_job(pipeline: Pipeline, job_id: str, filename: str, image_path: Path) -> ScanJob:
+    """图片已落盘后写入任务表，返回排队中的任务"""
+    if pipeline.id is None:
+        raise ValueError("Pipeline ID is None, cannot create ScanJob")
+
+    with get_session() as session:
+        job = ScanJob(
+            id=job_id,
+            pipeline_id=pipeline.id,
+            image_path=str(image_path),
+            image_filename=filename,
+        )
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+    logger.info(f"创建扫描任务: ID={job_id}, 流水线={pipeline.code}, 文件名={filename}")
+    return job
+
+
+def get_job(job_id: str) -> ScanJob | None:
+    with get_session() as session:
+        return session.get(ScanJob, job_id)
+
+
+def _update_job(job_id: str, **values: Any) -> None:
+    with get_session() as session:
+        session.exec(update(ScanJob).where(col(ScanJob.id) == job_id).values(updated_at=datetime.utcnow(), **values))
+        session.commit()
+
+
+def _pending_job_ids() -> list[str]:
+    """启动时恢复未完成的任务：上次运行中断的 running 任务重新排队"""
+    with get_session() as session:
+        session.exec(
+            update(ScanJob)
+            .where(col(ScanJob.status) == JOB_RUNNING)
+            .values(status=JOB_QUEUED, updated_at=datetime.utcnow())
+        )
+        session.commit()
+        statement = select(ScanJob.id).where(ScanJob.status == JOB_QUEUED).order_by(ScanJob.created_at)
+        return list(session.exec(statement).all())
+
+
+def _finish_job(job: ScanJob, **values: Any) -> None:
+    _update_job(job.id, **values)
+    Path(job.image_path).unlink(missing_ok=True)
+
+
+def _claim_job(job_id: str) -> ScanJob | None:
+    """原子地把排队中的任务标记为 running，已被其他 worker 领取时返回 None"""
+    with get_session() as session:
+        claimed = session.exec(
+            update(ScanJob)
+            .where(col(ScanJob.id) == job_id, col(ScanJob.status) == JOB_QUEUED)
+            .values(status=JOB_RUNNING, attempts=ScanJob.attempts + 1, updated_at=datetime.utcnow())
+        ).rowcount
+        session.commit()
+        return session.get(ScanJob, job_id) if claimed else None
+
+
+async def run_scan_job(job_id: str) -> None:
+    """执行单个任务：OCR → parse_ocr_payload → store_result"""
+    job = await run_in_threadpool(_claim_job, job_id)
+    if job is None:
+        return
+    if job.result_id is not None:
+        # 上次运行在结果入库后、任务完成前中断：结果与 result_id 同一事务写入，无需重跑
+        logger.info(f"扫描任务结果已入库，直接完成: ID={job_id}, 结果ID={job.result_id}")
+        await run_in_threadpool(_finish_job, job, status=JOB_SUCCEEDED, error=None)
+        return
+    logger.info(f"开始执行扫描任务: ID={job_id}")
+
+    pipeline = await run_in_threadpool(get_pipeline, job.pipeline_id)
+    if pipeline is None:
+        await run_in_threadpool(_finish_job, job, status=JOB_FAILED, error="流水线不存在")
+        return
+
+    try:
+        content = await asyncio.to_thread(Path(job.image_path).read_bytes)
+        ocr_payload = await get_ocr_service().classify_and_recognize_async(content, job.image_filename)
+        templates = await run_in_threadpool(get_pipeline_templates, pipeline)
+        db_payload = await run_in_threadpool(build_db_payload, ocr_payload, job.image_filename, templates, content)
+        result = await run_in_threadpool(store_result, pipeline, db_payload, job_id)
+    except asyncio.CancelledError:
+        # 关闭时中断的任务保持 running，下次启动重新排队；线程池中的 store_result 可能仍会完成，
+        # 此时任务已带有 result_id，重跑时直接完成而不会重复入库
+        raise
+    except OcrCircuitOpenError as exc:
+        # 上游熔断期间任务不判失败，重新排队等熔断器半开后再试；次数用尽后判为失败
+        if job.attempts >= settings.scan_job_max_attempts:
+            logger.error(f"OCR 熔断中，扫描任务重试次数已用尽: ID={job_id}, 已执行 {job.attempts} 次")
+            await run_in_threadpool(
+                _finish_job, job, status=JOB_FAILED, error=f"OCR 服务不可用，已执行 {job.attempts} 次: {exc}"
+            )
+            return
+        logger.warning(f"OCR 熔断中，扫描任务重新排队: ID={job_id}, {exc.retry_after:.1f}s 后重试")
+        await run_in_threadpool(_update_job, job_id, status=JOB_QUEUED)
+        _requeue_later(job_id, max(1.0, exc.retry_after))
+        return
+    except DuplicateResultError as exc:
+        logger.warning(f"扫描任务为重复扫描，已拒绝: ID={job_id}, 已有记录ID={exc.original_id}")
+        await run_in_threadpool(_finish_job, job, status=JOB_FAILED, error=str(exc))
+        return
+    except (OcrServiceError, OSError) as exc:
+        logger.error(f"扫描任务失败: ID={job_id}, 错误={exc}")
+        await run_in_threadpool(_finish_job, job, status=JOB_FAILED, error=str(exc))
+        return
+    except Exception as exc:
+        logger.error(f"扫描任务异常: ID={job_id}, 错误={exc}")
+        await run_in_threadpool(_finish_job, job, status=JOB_FAILED, error=f"处理异常: {exc}")
+        return
+
+    await run_in_threadpool(_finish_job, job, status=JOB_SUCCEEDED, result_id=result.id, error=None)
+    logger.info(f"扫描任务完成: ID={job_id}, 结果ID={result.id}")
+
+
+def _requeue_later(job_id: str, delay: float) -> None:
+    runner = get_scan_job_runner()
+    if runner is not None:
+        asyncio.get_running_loop().call_later(delay, runner.submit, job_id)
+
+
+class ScanJobRunner:
+    """进程内 worker 池，从队列中取任务执行；任务状态以数据库为准"""
+
+    def __init__(self, workers: int):
+        self.workers = max(1, workers)
+        self._queue: asyncio.Queue[str] = asyncio.Queue()
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self) -> None:
+        for job_id in await run_in_threadpool(_pending_job_ids):
+            self._queue.put_nowait(job_id)
+        if self._queue.qsize():
+            logger.info(f"恢复未完成的扫描任务: {self._queue.qsize()} 个")
+        self._tasks = [asyncio.create_task(self._worker(n)) for n in range(self.workers)]
+
+    def submit(self, job_id: str) -> None:
+        self._queue.put_nowait(job_id)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self, n: int) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await run_scan_job(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.error(f"扫描任务 worker-{n} 异常: ID={job_id}, 错误={exc}")
+            finally:
+                self._queue.task_done()
+
+
+_runner: ScanJobRunner | None = None
+
+
+def get_scan_job_runner() -> ScanJobRunner | None:
+    return _runner
+
+
+async def start_scan_job_workers() -> ScanJobRunner:
+    global _runner
+    if _runner is None:
+        _runner = ScanJobRunner(settings.scan_job_workers)
+        await _runner.start()
+        logger.info(f"扫描任务 worker 已启动: {_runner.workers} 个")
+    return _runner
+
+
+async def stop_scan_job_workers() -> None:
+    global _runner
+    if _runner is not None:
+        await _runner.stop()
+        _runner = None
+        logger.info("扫描任务 worker 已停止")
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import csv
+import json
+from pathlib import Path
+from typing import Iterable, Mapping, NamedTuple
+
+from app.utils.aho_corasick import AhoCorasick
+
+# 随代码发布的默认词典（品牌及其别名）
+DEFAULT_DICTIONARY_PATH = Path(__file__).resolve().parents[1] / "resources" / "label_dictionary.json"
+
+
+class DictionaryHit(NamedTuple):
+    """词典命中：start/end 为原始文本中的位置；name 为规范品牌名，alias 为命中的写法"""
+
+    start: int
+    end: int
+    name: str
+    alias: str
+
+
+class LabelDictionary:
+    """品牌词典（品牌名及其别名），一次编译为 Aho-Corasick 自动机
+
+    匹配不区分大小写（与 extract_brand 一致，对文本与别名都做 upper()）。
+    品牌按词典顺序确定优先级：文本同时出现多个品牌时，返回词典中排在最前的那个。
+    """
+
+    def __init__(self, brands: Mapping[str, Iterable[str]]) -> None:
+        self.brands: dict[str, list[str]] = {}
+        self._brand_rank: dict[str, int] = {}
+        self._automaton: AhoCorasick[tuple[str, str]] = AhoCorasick()
+        seen: set[tuple[str, str]] = set()
+
+        for name, aliases in brands.items():
+            self.brands[name] = []
+            self._brand_rank[name] = len(self._brand_rank)
+            for alias in (name, *aliases):
+                alias = alias.strip()
+                key = (name, alias.upper())
+                if not alias or key in seen:
+                    continue
+                seen.add(key)
+                self.brands[name].append(alias)
+                self._automaton.add(alias.upper(), (name, alias))
+        self._automaton.build()
+
+    def __len__(self) -> int:
+        return len(self._automaton)
+
+    @classmethod
+    def from_file(cls, path: Path | str) -> "LabelDictionary":
+        """从 JSON 或 CSV 加载词典
+
+        JSON: {"brands": [{"name": "Sunlord", "aliases": ["顺络"]}, "TDK"]}
+        CSV（可由物料主数据表导出）: 表头 name,alias；alias 可为空，同一品牌的多个别名分多行
+        """
+        path = Path(path)
+        brands: dict[str, list[str]] = {}
+        if path.suffix.lower() == ".csv":
+            with path.open(encoding="utf-8-sig", newline="") as f:
+                for row in csv.DictReader(f):
+                    name = (row.get("name") or "").strip()
+                    alias = (row.get("alias") or "").strip()
+                    if not name:
+                        continue
+                    brands.setdefault(name, [])
+                    if alias:
+                        brands[name].append(alias)
+        else:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            for entry in data.get("brands", []):
+                if isinstance(entry, str):
+                    entry = {"name": entry}
+                brands.setdefault(entry["name"], []).extend(entry.get("aliases", []))
+        return cls(brands)
+
+    def find_all(self, text: str) -> list[DictionaryHit]:
+        """一次线性扫描返回全部命中（含重叠），按结束位置排序"""
+        upper = text.upper()
+        matches = self._automaton.find_all(upper)
+        if len(upper) == len(text):
+            return [DictionaryHit(start, end, *value) for start, end, value in matches]
+        # upper() 改变了长度（如 ß → SS），把位置映射回原文
+        origin: list[int] = []
+        for i, ch in enumerate(text):
+            origin.extend([i] * len(ch.upper()))
+        return [DictionaryHit(origin[start], origin[end - 1] + 1, *value) for start, end, value in matches]
+
+    def find_brand(self, text: str) -> str | None:
+        """返回文本中出现的、词典顺序最靠前的品牌"""
+        return self.brand_from_hits(self.find_all(text))
+
+    def brand_from_hits(self, hits: Iterable[DictionaryHit]) -> str | None:
+        """从已有命中中选出品牌（供已做过 find_all 的调用方复用）"""
+        rank = self._brand_rank
+        best: str | None = None
+        for hit in hits:
+            if best is None or rank[hit.name] < rank[best]:
+                best = hit.name
+                if rank[best] == 0:
+                    break
+        return best
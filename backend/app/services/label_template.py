@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, Mapping, Sequence
+
+from app.services.parser_service import EXTRACTED_FIELDS, extract_date
+
+
+class LabelTemplateError(ValueError):
+    """标签模板定义不合法"""
+
+
+def _no_space(value: str) -> str:
+    return "".join(value.split())
+
+
+def _to_int(value: str) -> int | None:
+    digits = "".join(ch for ch in value if ch.isdigit())
+    return int(digits) if digits else None
+
+
+# 字段值后处理：按顺序执行，任一步返回 None/空值则该字段视为未匹配（均为模块级函数，编译结果可 pickle）
+POST_PROCESSORS: dict[str, Callable[[str], Any]] = {
+    "strip": str.strip,
+    "upper": str.upper,
+    "lower": str.lower,
+    "nospace": _no_space,
+    "int": _to_int,
+    "date": extract_date,
+}
+
+# 非文本字段的类型转换：规则的后处理总是以它结束（模板未写时编译时补上），入库的值与 ScanResult 的类型一致
+FIELD_CONVERTERS = {"quantity": "int", "date": "date"}
+
+# 锚点与值之间允许的分隔符
+_SEPARATORS = r"[\s:：|=]*"
+
+
+class _FieldRule:
+    """单个字段的规则：anchor 之后紧接 pattern（锚定匹配），或 pattern 全文搜索，或固定 value"""
+
+    __slots__ = ("anchor", "pattern", "post", "value")
+
+    def __init__(self, field: str, spec: Mapping[str, Any]):
+        if not isinstance(spec, Mapping):
+            raise LabelTemplateError(f"字段 {field} 的规则必须是对象")
+        self.value = spec.get("value")
+        self.anchor: re.Pattern[str] | None = None
+        self.pattern: re.Pattern[str] | None = None
+        self.post: list[Callable[[str], Any]] = []
+        converter = FIELD_CONVERTERS.get(field)
+        if self.value is not None:
+            if converter is not None:
+                self.value = POST_PROCESSORS[converter](str(self.value))
+                if self.value is None:
+                    raise LabelTemplateError(f"字段 {field} 的固定值无法按 {converter} 转换")
+            elif not isinstance(self.value, str):
+                raise LabelTemplateError(f"字段 {field} 的固定值必须是字符串")
+            return
+        if not spec.get("pattern"):
+            raise LabelTemplateError(f"字段 {field} 缺少 pattern 或 value")
+        try:
+            if spec.get("anchor"):
+                self.anchor = re.compile(re.escape(spec["anchor"]), re.IGNORECASE)
+                self.pattern = re.compile(f"{_SEPARATORS}(?:{spec['pattern']})", re.IGNORECASE)
+            else:
+                self.pattern = re.compile(spec["pattern"], re.IGNORECASE)
+        except re.error as exc:
+            raise LabelTemplateError(f"字段 {field} 的正则无效: {exc}") from exc
+        names = spec.get("post", [])
+        if not isinstance(names, list):
+            raise LabelTemplateError(f"字段 {field} 的 post 必须是列表")
+        if converter is not None and (not names or names[-1] != converter):
+            names = [*names, converter]
+        for position, name in enumerate(names):
+            if name not in POST_PROCESSORS:
+                raise LabelTemplateError(f"字段 {field} 的后处理 {name} 不存在，可选: {sorted(POST_PROCESSORS)}")
+            if name == "int" and converter != "int":
+                raise LabelTemplateError(f"字段 {field} 是文本字段，不能使用后处理 int")
+            # int 之后的值不再是字符串，不能接字符串处理
+            if name == "int" and position != len(names) - 1:
+                raise LabelTemplateError(f"字段 {field} 的后处理 int 之后不能再有其他处理: {spec['post']}")
+            self.post.append(POST_PROCESSORS[name])
+
+    def apply(self, text: str) -> Any:
+        if self.value is not None:
+            return self.value
+        assert self.pattern is not None
+        if self.anchor is not None:
+            anchor = self.anchor.search(text)
+            if anchor is None:
+                return None
+            match = self.pattern.match(text, anchor.end())
+        else:
+            match = self.pattern.search(text)
+        if match is None:
+            return None
+        value: Any = match.group(1) if match.re.groups else match.group()
+        for post in self.post:
+            value = post(value)
+            if value is None or value == "":
+                return None
+        return value
+
+
+class CompiledTemplate:
+    """编译后的标签模板：markers（全部出现才算匹配的指纹）+ 各字段规则"""
+
+    __slots__ = ("template_id", "version", "name", "markers", "rules")
+
+    def __init__(self, definition: Mapping[str, Any], template_id: int | None = None, version: int = 0):
+        if not isinstance(definition, Mapping):
+            raise LabelTemplateError("模板定义必须是对象")
+        markers = definition.get("fingerprint") or []
+        if not markers or not all(isinstance(marker, str) and marker.strip() for marker in markers):
+            raise LabelTemplateError("fingerprint 至少需要一个非空字符串")
+        fields = definition.get("fields") or {}
+        unknown = [field for field in fields if field not in EXTRACTED_FIELDS]
+        if unknown:
+            raise LabelTemplateError(f"不支持的字段: {unknown}，可选: {list(EXTRACTED_FIELDS)}")
+        if not fields:
+            raise LabelTemplateError("fields 不能为空")
+        self.template_id = template_id
+        self.version = version
+        self.name = definition.get("name")
+        self.markers = tuple(marker.lower() for marker in markers)
+        self.rules = {field: _FieldRule(field, spec) for field, spec in fields.items()}
+
+    def matches(self, text_lower: str) -> bool:
+        return all(marker in text_lower for marker in self.markers)
+
+    def extract(self, text: str, fields: Iterable[str] = EXTRACTED_FIELDS) -> dict[str, Any]:
+        """返回模板匹配到的字段（未匹配的字段不出现在结果中）"""
+        values = {}
+        for field in fields:
+            rule = self.rules.get(field)
+            if rule is None:
+                continue
+            value = rule.apply(text)
+            if value is not None:
+                values[field] = value
+        return values
+
+
+def select_template(templates: Sequence[CompiledTemplate], text: str) -> CompiledTemplate | None:
+    """按优先级返回第一个指纹全部命中的模板"""
+    if not templates or not text:
+        return None
+    text_lower = text.lower()
+    for template in templates:
+        if template.matches(text_lower):
+            return template
+    return None
+
+
+class TemplateCache:
+    """按 (模板 ID, 版本) 缓存编译结果的 LRU；模板更新后版本递增，旧版本自然淘汰"""
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[int, int], CompiledTemplate] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, template_id: int, version: int, load: Callable[[], Mapping[str, Any]]) -> CompiledTemplate:
+        """命中时直接返回；未命中时调用 load() 取定义并编译"""
+        key = (template_id, version)
+        with self._lock:
+            compiled = self._entries.get(key)
+            if compiled is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return compiled
+            self.misses += 1
+        compiled = CompiledTemplate(load(), template_id, version)
+        with self._lock:
+            self._entries[key] = compiled
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return compiled
+
+    def cached(self, template_id: int, version: int) -> bool:
+        with self._lock:
+            return (template_id, version) in self._entries
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Sequence
+
+from sqlmodel import col, select
+
+from app.core.config import get_settings
+from app.core.logger import get_logger
+from app.db.session import get_session
+from app.models.pipeline import LabelTemplate, Pipeline
+from app.services.label_template import CompiledTemplate, LabelTemplateError, TemplateCache
+from app.services.pipeline_service import invalidate_pipeline_cache
+
+settings = get_settings()
+logger = get_logger("services.label_template")
+
+# 编译结果按 (模板 ID, 版本) 缓存；模板更新后版本递增，旧条目不再命中并按 LRU 淘汰
+_template_cache = TemplateCache(max_entries=settings.label_template_cache_size)
+
+
+def get_template_cache() -> TemplateCache:
+    return _template_cache
+
+
+def _validate(definition: dict[str, Any]) -> None:
+    # 入库前先编译一次，非法定义直接拒绝
+    CompiledTemplate(definition)
+
+
+def create_template(name: str, definition: dict[str, Any]) -> LabelTemplate:
+    _validate(definition)
+    with get_session() as session:
+        template = LabelTemplate(name=name, definition=definition)
+        session.add(template)
+        session.commit()
+        session.refresh(template)
+    logger.info(f"创建标签模板: ID={template.id}, 名称={name}")
+    return template
+
+
+def update_template(template_id: int, name: str, definition: dict[str, Any]) -> LabelTemplate | None:
+    _validate(definition)
+    with get_session() as session:
+        template = session.get(LabelTemplate, template_id)
+        if template is None:
+            return None
+        template.name = name
+        template.definition = definition
+        template.version += 1
+        template.updated_at = datetime.utcnow()
+        session.add(template)
+        session.commit()
+        session.refresh(template)
+    logger.info(f"更新标签模板: ID={template_id}, 版本={template.version}")
+    return template
+
+
+def list_templates() -> list[LabelTemplate]:
+    with get_session() as session:
+        return list(session.exec(select(LabelTemplate).order_by(LabelTemplate.id)).all())
+
+
+def get_template(template_id: int) -> LabelTemplate | None:
+    with get_session() as session:
+        return session.get(LabelTemplate, template_id)
+
+
+def set_pipeline_templates(pipeline_id: int, template_ids: Sequence[int]) -> Pipeline | None:
+    """设置流水线引用的模板（按优先级），模板必须已存在"""
+    template_ids = list(dict.fromkeys(template_ids))
+    with get_session() as session:
+        pipeline = session.get(Pipeline, pipeline_id)
+        if pipeline is None:
+            return None
+        if template_ids:
+            existing = set(session.exec(select(LabelTemplate.id).where(col(LabelTemplate.id).in_(template_ids))).all())
+            missing = [template_id for template_id in template_ids if template_id not in existing]
+            if missing:
+                raise LabelTemplateError(f"标签模板不存在: {missing}")
+        pipeline.label_template_ids = template_ids
+        session.add(pipeline)
+        session.commit()
+        session.refresh(pipeline)
+    # 缓存的流水线带有模板列表，通知各进程重新加载
+    invalidate_pipeline_cache()
+    logger.info(f"流水线 {pipeline.code} 使用标签模板: {template_ids}")
+    return pipeline
+
+
+def get_pipeline_templates(pipeline: Pipeline) -> list[CompiledTemplate]:
+    """返回流水线引用的已编译模板（保持优先级顺序）
+
+    每次只查询 (id, version)；定义仅在缓存未命中时读取并编译，
+    因此模板修改后下一次扫描即生效，未修改时不重复编译。
+    """
+    template_ids = pipeline.label_template_ids or []
+    if not template_ids:
+        return []
+    with get_session() as session:
+        versions = dict(
+            session.exec(
+                select(LabelTemplate.id, LabelTemplate.version).where(col(LabelTemplate.id).in_(template_ids))
+            ).all()
+        )
+
+        def loader(template_id: int):
+            def load() -> dict[str, Any]:
+                return session.exec(
+                    select(LabelTemplate.definition).where(LabelTemplate.id == template_id)
+                ).one()
+
+            return load
+
+        compiled = []
+        for template_id in template_ids:
+            version = versions.get(template_id)
+            if version is None:
+                logger.warning(f"流水线 {pipeline.code} 引用的标签模板不存在: ID={template_id}")
+                continue
+            compiled.append(_template_cache.get(template_id, version, loader(template_id)))
+    return compiled
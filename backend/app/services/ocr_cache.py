@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+from app.core.logger import get_logger
+
+logger = get_logger("services.ocr_cache")
+
+# 与单次请求相关、不应随缓存复用的字段
+_VOLATILE_FIELDS = ("image_filename", "scan_time")
+
+
+def make_cache_key(image_bytes: bytes, options: dict[str, Any]) -> str:
+    """图片内容 SHA-256 + 请求参数，作为 OCR 结果缓存键"""
+    digest = hashlib.sha256(image_bytes)
+    digest.update(b"\0")
+    digest.update(json.dumps(options, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class OcrResultCache:
+    """两级 OCR 结果缓存：进程内 LRU + SQLite 持久层
+
+    持久层按 TTL 过期，并在总大小超过 max_disk_bytes 时按最近访问时间淘汰；单条超过 max_disk_bytes 的结果只进内存层。
+    get 返回深拷贝，调用方修改返回值（包括 _raw_response 等嵌套结构）不影响缓存。
+    """
+
+    def __init__(
+        self,
+        path: Path | None,
+        memory_entries: int = 512,
+        ttl_seconds: float = 7 * 24 * 3600,
+        max_disk_bytes: int = 512 * 1024 * 1024,
+    ):
+        self.memory_entries = max(0, memory_entries)
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._conn: sqlite3.Connection | None = None
+        self._disk_bytes = 0
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS ocr_cache ("
+                "key TEXT PRIMARY KEY, payload TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_ocr_cache_accessed_at ON ocr_cache (accessed_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_ocr_cache_created_at ON ocr_cache (created_at)")
+            self._disk_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM ocr_cache").fetchone()[0]
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, payload = entry
+                if now - created_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return copy.deepcopy(payload)
+                del self._memory[key]
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT payload, created_at FROM ocr_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    payload_text, created_at = row
+                    if now - created_at <= self.ttl_seconds:
+                        self._conn.execute("UPDATE ocr_cache SET accessed_at = ? WHERE key = ?", (now, key))
+                        payload = json.loads(payload_text)
+                        self._remember(key, created_at, payload)
+                        self.disk_hits += 1
+                        return copy.deepcopy(payload)
+                    self._delete(key)
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, payload: dict[str, Any]) -> None:
+        stored = copy.deepcopy({k: v for k, v in payload.items() if k not in _VOLATILE_FIELDS})
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, stored)
+            if self._conn is None:
+                return
+            payload_text = json.dumps(stored, ensure_ascii=False, default=str)
+            size = len(payload_text.encode("utf-8"))
+            self._delete(key)
+            if size > self.max_disk_bytes:
+                logger.warning(f"OCR结果超过持久层容量，只缓存在内存中: {size} > {self.max_disk_bytes} bytes")
+                return
+            self._conn.execute(
+                "INSERT INTO ocr_cache (key, payload, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, payload_text, size, now, now),
+            )
+            self._disk_bytes += size
+            self._evict(now, keep=key)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "memory_entries": len(self._memory),
+                "disk_bytes": self._disk_bytes,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _remember(self, key: str, created_at: float, payload: dict[str, Any]) -> None:
+        if self.memory_entries == 0:
+            return
+        self._memory[key] = (created_at, payload)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _delete(self, key: str) -> None:
+        assert self._conn is not None
+        row = self._conn.execute("DELETE FROM ocr_cache WHERE key = ? RETURNING size", (key,)).fetchone()
+        if row is not None:
+            self._disk_bytes -= row[0]
+
+    def _evict(self, now: float, keep: str) -> None:
+        assert self._conn is not None
+        expired = self._conn.execute(
+            "DELETE FROM ocr_cache WHERE created_at < ? RETURNING size", (now - self.ttl_seconds,)
+        ).fetchall()
+        self._disk_bytes -= sum(size for (size,) in expired)
+        self.evictions += len(expired)
+
+        while self._disk_bytes > self.max_disk_bytes:
+            # 按最近访问时间淘汰最旧的一小批，保留刚写入的条目
+            evicted = self._conn.execute(
+                "DELETE FROM ocr_cache WHERE key IN "
+                "(SELECT key FROM ocr_cache WHERE key != ? ORDER BY accessed_at LIMIT 8) RETURNING key, size",
+                (keep,),
+            ).fetchall()
+            if not evicted:
+                # 只剩刚写入的条目：以表中的实际大小为准，不能把计数清零
+                self._disk_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM ocr_cache").fetchone()[0]
+                break
+            for key, size in evicted:
+                self._disk_bytes -= size
+                self._memory.pop(key, None)
+            self.evictions += len(evicted)
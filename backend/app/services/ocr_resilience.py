@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable
+
+import httpx
+
+from app.core.logger import get_logger
+
+logger = get_logger("services.ocr_resilience")
+
+# 上游临时性错误：限流与网关/服务不可用
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+# 请求尚未被上游处理（或连接被重置）的传输错误；读超时不重试，避免重复占用长耗时的识别
+RETRYABLE_TRANSPORT_ERRORS = (
+    httpx.ConnectError,
+    httpx.ConnectTimeout,
+    httpx.ReadError,
+    httpx.WriteError,
+    httpx.RemoteProtocolError,
+)
+
+
+def is_upstream_failure(exc: BaseException) -> bool:
+    """是否说明上游不可用（计入熔断器失败率）；4xx、响应格式错误等不算"""
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(exc, httpx.TransportError)
+
+
+class RetryPolicy:
+    """指数退避 + 全抖动重试；OCR 识别是幂等的，可安全重放"""
+
+    def __init__(self, attempts: int = 3, base_delay: float = 0.5, max_delay: float = 8.0):
+        self.attempts = max(1, attempts)
+        self.base_delay = max(0.0, base_delay)
+        self.max_delay = max(0.0, max_delay)
+
+    def is_retryable(self, exc: BaseException) -> bool:
+        if isinstance(exc, httpx.HTTPStatusError):
+            return exc.response.status_code in RETRYABLE_STATUS_CODES
+        return isinstance(exc, RETRYABLE_TRANSPORT_ERRORS)
+
+    def delay(self, attempt: int, exc: BaseException | None = None) -> float:
+        """第 attempt 次失败后的等待秒数；上游给出 Retry-After 时优先采用（不超过 max_delay）"""
+        retry_after = _retry_after_seconds(exc)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+
+def _retry_after_seconds(exc: BaseException | None) -> float | None:
+    if not isinstance(exc, httpx.HTTPStatusError):
+        return None
+    try:
+        value = float(exc.response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, value)
+
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+# 便于作为指标上报的数值编码
+CIRCUIT_STATE_CODES = {CIRCUIT_CLOSED: 0, CIRCUIT_HALF_OPEN: 1, CIRCUIT_OPEN: 2}
+
+
+class CircuitBreaker:
+    """基于最近 window 次调用失败率的熔断器
+
+    closed：正常放行，失败率达到阈值后转为 open；
+    open：直接拒绝，reset_timeout 秒后转为 half_open；
+    half_open：只放行 half_open_max_calls 个探测请求，成功则恢复 closed，失败则重新 open。
+    """
+
+    def __init__(
+        self,
+        failure_ratio: float = 0.5,
+        window: int = 20,
+        min_requests: int = 10,
+        reset_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_ratio = failure_ratio
+        self.min_requests = max(1, min_requests)
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = max(1, half_open_max_calls)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._outcomes: deque[bool] = deque(maxlen=max(self.min_requests, window))
+
+        self._state = CIRCUIT_CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_started_at = 0.0
+
+        self.opens = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh(self._clock())
+            return self._state
+
+    def allow(self) -> bool:
+        """是否放行一次调用；放行后调用方必须调用 record_success / record_failure"""
+        now = self._clock()
+        with self._lock:
+            self._refresh(now)
+            if self._state == CIRCUIT_CLOSED:
+                return True
+            if self._state == CIRCUIT_HALF_OPEN:
+                # 探测请求长时间没有结果（如被取消）时允许新的探测，避免卡在 half_open
+                if self._probes < self.half_open_max_calls or now - self._probe_started_at >= self.reset_timeout:
+                    self._probes += 1
+                    self._probe_started_at = now
+                    return True
+            self.rejected += 1
+            return False
+
+    def retry_after(self) -> float:
+        """距离下一次允许探测的秒数"""
+        with self._lock:
+            if self._state != CIRCUIT_OPEN:
+                return 0.0
+            return max(0.0, self._opened_at + self.reset_timeout - self._clock())
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state == CIRCUIT_HALF_OPEN:
+                logger.info("OCR 熔断器探测成功，恢复为 closed")
+                self._state = CIRCUIT_CLOSED
+                self._outcomes.clear()
+                self._probes = 0
+                return
+            self._outcomes.append(True)
+
+    def record_failure(self) -> None:
+        now = self._clock()
+        with self._lock:
+            if self._state == CIRCUIT_HALF_OPEN:
+                logger.warning("OCR 熔断器探测失败，重新 open")
+                self._trip(now)
+                return
+            if self._state == CIRCUIT_OPEN:
+                return
+            self._outcomes.append(False)
+            failures = self._outcomes.count(False)
+            total = len(self._outcomes)
+            if total >= self.min_requests and failures / total >= self.failure_ratio:
+                logger.warning(f"OCR 上游失败率过高（{failures}/{total}），熔断器 open {self.reset_timeout}s")
+                self._trip(now)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            self._refresh(self._clock())
+            total = len(self._outcomes)
+            failures = self._outcomes.count(False)
+            return {
+                "state": self._state,
+                "state_code": CIRCUIT_STATE_CODES[self._state],
+                "window_requests": total,
+                "window_failure_ratio": round(failures / total, 4) if total else 0.0,
+                "opens": self.opens,
+                "rejected": self.rejected,
+            }
+
+    def _trip(self, now: float) -> None:
+        self._state = CIRCUIT_OPEN
+        self._opened_at = now
+        self._probes = 0
+        self._outcomes.clear()
+        self.opens += 1
+
+    def _refresh(self, now: float) -> None:
+        if self._state == CIRCUIT_OPEN and now - self._opened_at >= self.reset_timeout:
+            self._state = CIRCUIT_HALF_OPEN
+            self._probes = 0
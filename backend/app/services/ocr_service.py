@@ -1,13 +1,21 @@
 from __future__ import annotations
 
+import asyncio
 import base64
+import importlib.util
+import json
+import time
 from datetime import datetime
-from typing import Any
+from typing import Any, AsyncIterator, Iterator
 
 import httpx
 
 from app.core.config import get_settings
 from app.core.logger import get_logger
+from app.core.metrics import IN_FLIGHT, OCR_UPSTREAM_RESPONSES, observe_stage, stage_timer
+from app.services.ocr_cache import OcrResultCache, make_cache_key
+from app.services.ocr_resilience import CircuitBreaker, RetryPolicy, is_upstream_failure
+from app.utils.image_preprocess import ImagePreprocessor
 
 settings = get_settings()
 logger = get_logger("services.ocr")
@@ -17,79 +25,160 @@ class OcrServiceError(Exception):
     pass
 
 
+class OcrCircuitOpenError(OcrServiceError):
+    """熔断器打开期间直接拒绝调用，不再等待上游超时"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"OCR 服务暂不可用，请 {retry_after:.0f} 秒后重试")
+        self.retry_after = retry_after
+
+
+def _client_options() -> dict[str, Any]:
+    """共享连接池参数：保持长连接，避免每次识别重新建立 TCP/TLS"""
+    return {
+        # PaddleOCR-VL 可能需要更长时间
+        "timeout": httpx.Timeout(settings.ocr_timeout_seconds, connect=settings.ocr_connect_timeout_seconds),
+        "limits": httpx.Limits(
+            max_connections=settings.ocr_max_connections,
+            max_keepalive_connections=settings.ocr_max_keepalive_connections,
+            keepalive_expiry=settings.ocr_keepalive_expiry_seconds,
+        ),
+    }
+
+
+def _http2_enabled() -> bool:
+    if not settings.ocr_http2:
+        return False
+    if importlib.util.find_spec("h2") is None:
+        logger.warning("已配置 OCR_HTTP2 但未安装 h2，回退到 HTTP/1.1（pip install 'httpx[http2]'）")
+        return False
+    return True
+
+
+# 除图片外的请求参数，参与缓存键计算
+REQUEST_OPTIONS: dict[str, Any] = {
+    "fileType": 1,  # 1 表示图片，0 表示 PDF
+    "useDocOrientationClassify": False,
+    "useDocUnwarping": False,
+    "useChartRecognition": False,
+}
+
+
+# 每块原始字节数为 3 的倍数，分块 Base64 结果可直接拼接
+_BASE64_CHUNK = 3 * 64 * 1024
+# 请求体（图片类型 fileType=1）：{"file": "<base64>", **REQUEST_OPTIONS}
+_BODY_PREFIX = b'{"file": "'
+_BODY_SUFFIX = b'", ' + json.dumps(REQUEST_OPTIONS).encode("ascii")[1:]
+
+
+def json_body_length(image_size: int) -> int:
+    return len(_BODY_PREFIX) + 4 * ((image_size + 2) // 3) + len(_BODY_SUFFIX)
+
+
+def iter_json_body(image_bytes: bytes) -> Iterator[bytes]:
+    """分块生成 JSON 请求体，不构造完整的 Base64 字符串与 JSON 文本（避免多份图片副本）"""
+    view = memoryview(image_bytes)
+    yield _BODY_PREFIX
+    # 编码与发送交替进行，只累计编码本身的耗时
+    encode_seconds = 0.0
+    for start in range(0, len(view), _BASE64_CHUNK):
+        started = time.perf_counter()
+        chunk = base64.b64encode(view[start : start + _BASE64_CHUNK])
+        encode_seconds += time.perf_counter() - started
+        yield chunk
+    observe_stage("encode", encode_seconds)
+    yield _BODY_SUFFIX
+
+
+async def aiter_json_body(image_bytes: bytes) -> AsyncIterator[bytes]:
+    for chunk in iter_json_body(image_bytes):
+        yield chunk
+
+
 class OcrService:
-    def __init__(self):
-        self.client = httpx.Client(timeout=120)  # PaddleOCR-VL 可能需要更长时间
+    def __init__(
+        self,
+        async_client: httpx.AsyncClient | None = None,
+        cache: OcrResultCache | None = None,
+        retry: RetryPolicy | None = None,
+        breaker: CircuitBreaker | None = None,
+        preprocessor: ImagePreprocessor | None = None,
+    ):
+        self._client: httpx.Client | None = None
+        self._async_client = async_client
+        self.cache = cache
+        self.retry = retry or RetryPolicy(attempts=1)
+        self.breaker = breaker
+        self.preprocessor = preprocessor
+        self.retries = 0
         logger.info("OCR服务初始化完成")
 
-    def classify_and_recognize(self, image_bytes: bytes, filename: str) -> dict[str, Any]:
-        """调用 PaddleOCR-VL API 进行布局解析和文字识别"""
+    @property
+    def client(self) -> httpx.Client:
+        if self._client is None:
+            self._client = httpx.Client(**_client_options())
+        return self._client
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(http2=_http2_enabled(), **_client_options())
+        return self._async_client
+
+    def _build_request(self, image_bytes: bytes, filename: str) -> dict[str, str]:
         logger.info(f"开始OCR处理: 文件名={filename}, 大小={len(image_bytes)} bytes")
-        
+
         if not settings.paddleocr_api_url:
             logger.error("未配置PaddleOCR-VL API端点")
             raise OcrServiceError("未配置 PaddleOCR-VL API 端点")
 
-        # Base64 编码图片
-        file_data = base64.b64encode(image_bytes).decode("ascii")
-        logger.debug("图片Base64编码完成")
-
-        # 构建请求头
+        # 构建请求头；请求体分块流式编码，显式给出长度以避免 chunked 传输
         headers = {
             "Authorization": f"token {settings.paddleocr_token}",
             "Content-Type": "application/json",
+            "Content-Length": str(json_body_length(len(image_bytes))),
         }
+        logger.debug("构建OCR API请求")
+        return headers
+
+    def _parse_response(self, response: httpx.Response, filename: str) -> dict[str, Any]:
+        response.raise_for_status()
+        logger.debug("OCR API请求成功")
+
+        result_data = response.json()
+        if "result" not in result_data:
+            logger.error("OCR API返回格式异常：缺少result字段")
+            raise OcrServiceError("API 返回格式异常：缺少 result 字段")
+
+        result = result_data["result"]
+        logger.debug(f"OCR API响应解析成功 {result}")
 
-        # 构建请求体（图片类型 fileType=1）
-        payload = {
-            "file": file_data,
-            "fileType": 1,  # 1 表示图片，0 表示 PDF
-            "useDocOrientationClassify": False,
-            "useDocUnwarping": False,
-            "useChartRecognition": False,
+        # 提取 markdown 文本（合并所有布局解析结果）
+        raw_text_parts = []
+        if "layoutParsingResults" in result:
+            for layout_result in result["layoutParsingResults"]:
+                if "markdown" in layout_result and "text" in layout_result["markdown"]:
+                    raw_text_parts.append(layout_result["markdown"]["text"])
+
+        raw_ocr_text = "\n".join(raw_text_parts) if raw_text_parts else ""
+        logger.debug(f"提取到OCR文本: 长度={len(raw_ocr_text)} 字符")
+
+        # 返回标准化的结果
+        result_payload = {
+            "raw_ocr_text": raw_ocr_text,
+            "image_filename": filename,
+            "scan_time": datetime.utcnow().isoformat(),
+            # 原始 API 响应保留在 _raw_response 中，供调试使用
+            "_raw_response": result,
         }
-        logger.debug("构建OCR API请求")
 
-        try:
-            logger.debug(f"发送OCR API请求到: {settings.paddleocr_api_url}")
-            response = self.client.post(
-                settings.paddleocr_api_url,
-                json=payload,
-                headers=headers,
-            )
-            response.raise_for_status()
-            logger.debug("OCR API请求成功")
-
-            result_data = response.json()
-            if "result" not in result_data:
-                logger.error("OCR API返回格式异常：缺少result字段")
-                raise OcrServiceError("API 返回格式异常：缺少 result 字段")
-
-            result = result_data["result"]
-            logger.debug(f"OCR API响应解析成功 {result}")
-
-            # 提取 markdown 文本（合并所有布局解析结果）
-            raw_text_parts = []
-            if "layoutParsingResults" in result:
-                for layout_result in result["layoutParsingResults"]:
-                    if "markdown" in layout_result and "text" in layout_result["markdown"]:
-                        raw_text_parts.append(layout_result["markdown"]["text"])
-
-            raw_ocr_text = "\n".join(raw_text_parts) if raw_text_parts else ""
-            logger.debug(f"提取到OCR文本: 长度={len(raw_ocr_text)} 字符")
-
-            # 返回标准化的结果
-            result_payload = {
-                "raw_ocr_text": raw_ocr_text,
-                "image_filename": filename,
-                "scan_time": datetime.utcnow().isoformat(),
-                # 原始 API 响应保留在 _raw_response 中，供调试使用
-                "_raw_response": result,
-            }
-            
-            logger.info("OCR处理完成")
-            return result_payload
-        except httpx.HTTPStatusError as e:
+        logger.info("OCR处理完成")
+        return result_payload
+
+    def _translate_error(self, e: Exception) -> OcrServiceError:
+        if isinstance(e, OcrServiceError):
+            return e
+        if isinstance(e, httpx.HTTPStatusError):
             error_msg = f"OCR API 调用失败 (HTTP {e.response.status_code})"
             logger.error(f"HTTP错误: {error_msg}")
             try:
@@ -99,14 +188,205 @@ class OcrService:
             except Exception:
                 error_msg += f": {e.response.text}"
                 logger.error(f"错误响应: {e.response.text}")
-            raise OcrServiceError(error_msg) from e
-        except httpx.RequestError as e:
+            return OcrServiceError(error_msg)
+        if isinstance(e, httpx.RequestError):
             logger.error(f"OCR API请求失败: {str(e)}")
-            raise OcrServiceError(f"OCR API 请求失败: {str(e)}") from e
-        except Exception as e:
-            logger.error(f"OCR处理异常: {str(e)}")
-            raise OcrServiceError(f"OCR 处理异常: {str(e)}") from e
+            return OcrServiceError(f"OCR API 请求失败: {str(e)}")
+        logger.error(f"OCR处理异常: {str(e)}")
+        return OcrServiceError(f"OCR 处理异常: {str(e)}")
+
+    def _cache_key(self, image_bytes: bytes) -> str | None:
+        if self.cache is None:
+            return None
+        options: dict[str, Any] = {"url": settings.paddleocr_api_url, **REQUEST_OPTIONS}
+        if self.preprocessor is not None:
+            options["preprocess"] = self.preprocessor.options()
+        # 缓存键基于原始图片，命中时可跳过预处理
+        return make_cache_key(image_bytes, options)
+
+    def _preprocess(self, image_bytes: bytes) -> bytes:
+        if self.preprocessor is None:
+            return image_bytes
+        with stage_timer("preprocess"):
+            processed, _ = self.preprocessor.process(image_bytes)
+        return processed
+
+    def _from_cache(self, cached: dict[str, Any], filename: str) -> dict[str, Any]:
+        logger.info(f"命中OCR结果缓存: 文件名={filename}")
+        cached["image_filename"] = filename
+        cached["scan_time"] = datetime.utcnow().isoformat()
+        return cached
+
+    def _acquire(self, attempt: int) -> None:
+        if self.breaker is not None and not self.breaker.allow():
+            retry_after = self.breaker.retry_after()
+            logger.warning(f"OCR 熔断器已打开，拒绝请求: 第{attempt}次尝试, {retry_after:.1f}s 后探测")
+            raise OcrCircuitOpenError(retry_after)
+
+    def _on_success(self) -> None:
+        if self.breaker is not None:
+            self.breaker.record_success()
+
+    def _on_failure(self, attempt: int, e: Exception) -> float | None:
+        """记录一次失败，返回重试前的等待秒数；不应重试时返回 None"""
+        if isinstance(e, httpx.RequestError):
+            OCR_UPSTREAM_RESPONSES.inc("transport_error")
+        if self.breaker is not None:
+            if is_upstream_failure(e):
+                self.breaker.record_failure()
+            else:
+                # 上游可达（如 4xx、响应格式错误），不计入失败率
+                self.breaker.record_success()
+        if attempt >= self.retry.attempts or not self.retry.is_retryable(e):
+            return None
+        delay = self.retry.delay(attempt, e)
+        self.retries += 1
+        logger.warning(f"OCR 请求失败，{delay:.2f}s 后重试: 第{attempt}次尝试, 错误={e}")
+        return delay
+
+    def classify_and_recognize(self, image_bytes: bytes, filename: str) -> dict[str, Any]:
+        """调用 PaddleOCR-VL API 进行布局解析和文字识别"""
+        with IN_FLIGHT.track("ocr"), stage_timer("ocr"):
+            return self._classify_and_recognize(image_bytes, filename)
+
+    def _classify_and_recognize(self, image_bytes: bytes, filename: str) -> dict[str, Any]:
+        cache_key = self._cache_key(image_bytes)
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)  # type: ignore[union-attr]
+            if cached is not None:
+                return self._from_cache(cached, filename)
+
+        image_bytes = self._preprocess(image_bytes)
+        headers = self._build_request(image_bytes, filename)
+        attempt = 0
+        while True:
+            attempt += 1
+            self._acquire(attempt)
+            try:
+                logger.debug(f"发送OCR API请求到: {settings.paddleocr_api_url}")
+                with IN_FLIGHT.track("ocr_upstream"), stage_timer("ocr_upstream"):
+                    response = self.client.post(
+                        settings.paddleocr_api_url,
+                        content=iter_json_body(image_bytes),
+                        headers=headers,
+                    )
+                OCR_UPSTREAM_RESPONSES.inc(response.status_code)
+                result = self._parse_response(response, filename)
+            except Exception as e:
+                delay = self._on_failure(attempt, e)
+                if delay is None:
+                    raise self._translate_error(e) from e
+                time.sleep(delay)
+                continue
+            self._on_success()
+            break
+
+        if cache_key is not None:
+            self.cache.set(cache_key, result)  # type: ignore[union-attr]
+        return result
+
+    async def classify_and_recognize_async(self, image_bytes: bytes, filename: str) -> dict[str, Any]:
+        """classify_and_recognize 的异步版本，等待上游期间不占用线程池"""
+        with IN_FLIGHT.track("ocr"), stage_timer("ocr"):
+            return await self._classify_and_recognize_async(image_bytes, filename)
+
+    async def _classify_and_recognize_async(self, image_bytes: bytes, filename: str) -> dict[str, Any]:
+        cache_key = self._cache_key(image_bytes)
+        if cache_key is not None:
+            cached = await asyncio.to_thread(self.cache.get, cache_key)  # type: ignore[union-attr]
+            if cached is not None:
+                return self._from_cache(cached, filename)
+
+        if self.preprocessor is not None:
+            # 解码/缩放/编码是 CPU 密集操作，放到线程中执行
+            image_bytes = await asyncio.to_thread(self._preprocess, image_bytes)
+        headers = self._build_request(image_bytes, filename)
+        attempt = 0
+        while True:
+            attempt += 1
+            self._acquire(attempt)
+            try:
+                logger.debug(f"发送OCR API请求到: {settings.paddleocr_api_url}")
+                with IN_FLIGHT.track("ocr_upstream"), stage_timer("ocr_upstream"):
+                    response = await self.async_client.post(
+                        settings.paddleocr_api_url,
+                        content=aiter_json_body(image_bytes),
+                        headers=headers,
+                    )
+                OCR_UPSTREAM_RESPONSES.inc(response.status_code)
+                result = self._parse_response(response, filename)
+            except Exception as e:
+                delay = self._on_failure(attempt, e)
+                if delay is None:
+                    raise self._translate_error(e) from e
+                await asyncio.sleep(delay)
+                continue
+            self._on_success()
+            break
+
+        if cache_key is not None:
+            await asyncio.to_thread(self.cache.set, cache_key, result)  # type: ignore[union-attr]
+        return result
+
+    async def aclose(self) -> None:
+        if self._async_client is not None:
+            await self._async_client.aclose()
+        if self._client is not None:
+            self._client.close()
+        if self.cache is not None:
+            self.cache.close()
+
+
+_ocr_service: OcrService | None = None
 
 
 def get_ocr_service() -> OcrService:
-    return OcrService()
+    """返回应用级共享的 OCR 服务（连接池在整个应用生命周期内复用）"""
+    global _ocr_service
+    if _ocr_service is None:
+        cache = None
+        if settings.ocr_cache_enabled:
+            cache = OcrResultCache(
+                settings.ocr_cache_path,
+                memory_entries=settings.ocr_cache_memory_entries,
+                ttl_seconds=settings.ocr_cache_ttl_seconds,
+                max_disk_bytes=settings.ocr_cache_max_mb * 1024 * 1024,
+            )
+        breaker = None
+        if settings.ocr_circuit_enabled:
+            breaker = CircuitBreaker(
+                failure_ratio=settings.ocr_circuit_failure_ratio,
+                window=settings.ocr_circuit_window,
+                min_requests=settings.ocr_circuit_min_requests,
+                reset_timeout=settings.ocr_circuit_reset_seconds,
+            )
+        retry = RetryPolicy(
+            attempts=settings.ocr_retry_attempts,
+            base_delay=settings.ocr_retry_base_delay_seconds,
+            max_delay=settings.ocr_retry_max_delay_seconds,
+        )
+        preprocessor = None
+        if settings.ocr_preprocess_enabled:
+            preprocessor = ImagePreprocessor(
+                max_long_edge=settings.ocr_preprocess_max_long_edge,
+                grayscale=settings.ocr_preprocess_grayscale,
+                fmt=settings.ocr_preprocess_format,
+                quality=settings.ocr_preprocess_quality,
+            )
+        _ocr_service = OcrService(cache=cache, retry=retry, breaker=breaker, preprocessor=preprocessor)
+    return _ocr_service
+
+
+async def start_ocr_service() -> OcrService:
+    service = get_ocr_service()
+    # 启动时即建立连接池，而不是等到第一次扫描
+    service.async_client
+    return service
+
+
+async def stop_ocr_service() -> None:
+    global _ocr_service
+    if _ocr_service is not None:
+        await _ocr_service.aclose()
+        _ocr_service = None
+        logger.info("OCR服务连接池已关闭")
@@ -1,8 +1,15 @@
 from __future__ import annotations
 
 import re
-from datetime import datetime
-from typing import Any, Dict
+from datetime import date, datetime
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, Iterable
+
+from app.core.config import get_settings
+from app.services.label_dictionary import DEFAULT_DICTIONARY_PATH, DictionaryHit, LabelDictionary
+
+if TYPE_CHECKING:
+    from app.services.label_template import CompiledTemplate
 
 FIELD_ALIASES = {
     "material_code": ["material", "material code", "code", "料号", "物料编码", "part no", "part number"],
@@ -76,15 +83,42 @@ def extract_numeric(value: str | None) -> int | None:
     return None
 
 
+# 各字段的候选模式（按优先级），extract_* 与预编译引擎共用
+# 匹配常见的物料编码模式：字母-字母-数字-数字
+MATERIAL_CODE_PATTERNS = [
+    r"[A-Z]{2,}-[A-Z]+-\d+-\d+",  # SL-IND-1008-100
+    r"[A-Z]+\d+[A-Z]*",  # ABC123
+    r"[A-Z]{2,}\d+[-]?\d*",  # SL1008-100
+]
+BATCH_PATTERNS = [
+    r"(?:batch|lot|批次)[\s:]*([A-Z0-9]+)",
+    r"B\d+[A-Z]*",
+    r"LOT[\s:]*([A-Z0-9]+)",
+]
+# 内置词典中的品牌（按优先级）；实际匹配使用 get_label_dictionary()，可通过 LABEL_DICTIONARY_PATH 扩展
+BRANDS = ["Sunlord", "Murata", "TDK", "Vishay", "Coilcraft"]
+ELECTRICAL_PATTERNS = [
+    r"L\s*=\s*(\d+[mu]?H[±\s]*\d+%?)",  # L=10uH±10%
+    r"(\d+[mu]?H[±\s]*\d+%?)",  # 10uH±10%
+    r"(\d+[mu]?H)",  # 10uH
+]
+QUANTITY_PATTERNS = [
+    r"(?:qty|quantity|数量)[\s:]*(\d{1,3}(?:,\d{3})*)",
+    r"(?:qty|quantity|数量)[\s:]*(\d+)",
+]
+QUANTITY_FALLBACK_PATTERN = r"\d{3,}"
+
+
+@lru_cache
+def get_label_dictionary() -> LabelDictionary:
+    """加载并编译品牌词典（进程内只编译一次）"""
+    path = get_settings().label_dictionary_path or DEFAULT_DICTIONARY_PATH
+    return LabelDictionary.from_file(path)
+
+
 def extract_material_code(text: str) -> str | None:
     """提取物料编码（通常包含字母和数字，如 SL-IND-1008-100）"""
-    # 匹配常见的物料编码模式：字母-字母-数字-数字
-    patterns = [
-        r"[A-Z]{2,}-[A-Z]+-\d+-\d+",  # SL-IND-1008-100
-        r"[A-Z]+\d+[A-Z]*",  # ABC123
-        r"[A-Z]{2,}\d+[-]?\d*",  # SL1008-100
-    ]
-    for pattern in patterns:
+    for pattern in MATERIAL_CODE_PATTERNS:
         match = re.search(pattern, text, re.IGNORECASE)
         if match:
             return match.group().upper()
@@ -93,12 +127,7 @@ def extract_material_code(text: str) -> str | None:
 
 def extract_batch(text: str) -> str | None:
     """提取批次号（通常以 B、LOT、批次等开头）"""
-    patterns = [
-        r"(?:batch|lot|批次)[\s:]*([A-Z0-9]+)",
-        r"B\d+[A-Z]*",
-        r"LOT[\s:]*([A-Z0-9]+)",
-    ]
-    for pattern in patterns:
+    for pattern in BATCH_PATTERNS:
         match = re.search(pattern, text, re.IGNORECASE)
         if match:
             return match.group(1) if match.groups() else match.group()
@@ -106,24 +135,13 @@ def extract_batch(text: str) -> str | None:
 
 
 def extract_brand(text: str) -> str | None:
-    """提取品牌名称（常见品牌如 Sunlord）"""
-    # 常见品牌列表（可根据实际情况扩展）
-    brands = ["Sunlord", "Murata", "TDK", "Vishay", "Coilcraft"]
-    text_upper = text.upper()
-    for brand in brands:
-        if brand.upper() in text_upper:
-            return brand
-    return None
+    """提取品牌名称（词典中的品牌或别名，如 Sunlord、顺络），多个品牌时取词典顺序靠前者"""
+    return get_label_dictionary().find_brand(text)
 
 
 def extract_electrical_characteristics(text: str) -> str | None:
     """提取电气特性（如 L=10uH±10%）"""
-    patterns = [
-        r"L\s*=\s*(\d+[mu]?H[±\s]*\d+%?)",  # L=10uH±10%
-        r"(\d+[mu]?H[±\s]*\d+%?)",  # 10uH±10%
-        r"(\d+[mu]?H)",  # 10uH
-    ]
-    for pattern in patterns:
+    for pattern in ELECTRICAL_PATTERNS:
         match = re.search(pattern, text, re.IGNORECASE)
         if match:
             return match.group(1) if match.groups() else match.group()
@@ -132,11 +150,7 @@ def extract_electrical_characteristics(text: str) -> str | None:
 
 def extract_quantity(text: str) -> int | None:
     """从文本中提取数量（查找 Qty、Quantity、数量等关键词后的数字）"""
-    patterns = [
-        r"(?:qty|quantity|数量)[\s:]*(\d{1,3}(?:,\d{3})*)",
-        r"(?:qty|quantity|数量)[\s:]*(\d+)",
-    ]
-    for pattern in patterns:
+    for pattern in QUANTITY_PATTERNS:
         match = re.search(pattern, text, re.IGNORECASE)
         if match:
             num_str = match.group(1).replace(",", "")
@@ -145,7 +159,7 @@ def extract_quantity(text: str) -> int | None:
             except ValueError:
                 continue
     # 如果没有找到关键词，尝试提取较大的数字（可能是数量）
-    numbers = re.findall(r"\d{3,}", text.replace(",", ""))
+    numbers = re.findall(QUANTITY_FALLBACK_PATTERN, text.replace(",", ""))
     if numbers:
         try:
             # 返回最大的数字（通常是数量）
@@ -155,8 +169,240 @@ def extract_quantity(text: str) -> int | None:
     return None
 
 
-def parse_ocr_payload(ocr_payload: Dict[str, Any]) -> Dict[str, Any]:
-    """从 OCR 结果中解析并提取结构化字段"""
+# 日期扫描器：一次扫描找出形似日期的片段，只对这些片段做校验
+_MONTHS = {
+    name: number
+    for number, name in enumerate(("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), 1)
+}
+_DATE_SCANNER = re.compile(
+    # 先用字符集排除不可能开始匹配的位置（数字或日期关键词首字符），再尝试各分支
+    r"(?=[\d(dm生制日])(?:"
+    # 2024-03-15、2024/3/5、2024.03.15
+    r"(?<!\d)(?P<ymd_y>\d{4})(?P<ymd_sep>[-/.])(?P<ymd_m>\d{1,2})(?P=ymd_sep)(?P<ymd_d>\d{1,2})(?!\d)"
+    # 2024年3月15日
+    r"|(?<!\d)(?P<cn_y>\d{4})\s*年\s*(?P<cn_m>\d{1,2})\s*月\s*(?P<cn_d>\d{1,2})(?!\d)"
+    # 15/03/2024、03-15-2024（先按日/月/年，无效时按月/日/年）
+    r"|(?<!\d)(?P<dmy_d>\d{1,2})(?P<dmy_sep>[-/.])(?P<dmy_m>\d{1,2})(?P=dmy_sep)(?P<dmy_y>\d{4})(?!\d)"
+    # 15-Mar-2024、15 March 2024
+    r"|(?<![\w])(?P<mon_d>\d{1,2})[-\s](?P<mon_m>jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?[-\s](?P<mon_y>\d{4})(?!\d)"
+    # 日期代码（卷盘标签常见）：关键词后的 YYYYMMDD / YYMMDD / YYWW
+    r"|(?:\bdate\s*code|\bd/c|\bdc|\(9d\)|\bmfg\s*date|\bdate|生产日期|制造日期|日期)[\s:：|]*"
+    r"(?P<code>\d{8}|\d{6}|\d{4})(?![\d./\-年]))",
+    re.IGNORECASE,
+)
+DATE_CACHE_SIZE = 4096
+
+
+def _date_from_match(match: re.Match[str]) -> date | None:
+    groups = match.groupdict()
+    try:
+        if groups["ymd_y"]:
+            return date(int(groups["ymd_y"]), int(groups["ymd_m"]), int(groups["ymd_d"]))
+        if groups["cn_y"]:
+            return date(int(groups["cn_y"]), int(groups["cn_m"]), int(groups["cn_d"]))
+        if groups["dmy_y"]:
+            year, first, second = int(groups["dmy_y"]), int(groups["dmy_d"]), int(groups["dmy_m"])
+            try:
+                return date(year, second, first)
+            except ValueError:
+                return date(year, first, second)
+        if groups["mon_y"]:
+            return date(int(groups["mon_y"]), _MONTHS[groups["mon_m"][:3].lower()], int(groups["mon_d"]))
+        code = groups["code"]
+        if len(code) == 8:
+            return date(int(code[:4]), int(code[4:6]), int(code[6:]))
+        if len(code) == 6:
+            return date(2000 + int(code[:2]), int(code[2:4]), int(code[4:]))
+        # YYWW：取该 ISO 周的周一
+        return date.fromisocalendar(2000 + int(code[:2]), int(code[2:]), 1)
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def extract_date(text: str | None) -> str | None:
+    """从自由文本中提取日期并标准化为 YYYY-MM-DD，没有有效日期时返回 None
+
+    与 normalize_date 不同，不会把无法识别的原文当作日期返回；相同文本的结果会被缓存。
+    """
+    if not text:
+        return None
+    for match in _DATE_SCANNER.finditer(text):
+        value = _date_from_match(match)
+        if value is not None:
+            return value.isoformat()
+    return None
+
+
+def parse_production_date(value: str | None) -> date | None:
+    """把识别结果的 date 字段转换为 DATE 列的值：已标准化的 YYYY-MM-DD 直接解析，否则按自由文本提取"""
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        pass
+    normalized = extract_date(value)
+    return date.fromisoformat(normalized) if normalized else None
+
+
+# ---------------------------------------------------------------------------
+# 预编译的字段提取引擎
+#
+# 与上面的 extract_* 函数逐字段结果完全一致（见 test_parser_engine 的差分测试），区别在于：
+# - 所有模式在导入时编译一次；
+# - 对文本只做一次小写化，建立关键词首次出现位置的索引：关键词不存在的模式直接跳过，
+#   存在时从首个关键词处开始搜索（模式均以关键词开头且不含后顾/锚点，起点之前不可能匹配）。
+# ---------------------------------------------------------------------------
+
+EXTRACTED_FIELDS = ("material_code", "quantity", "batch", "date", "brand", "electrical_characteristics")
+
+_MATERIAL_CODE_RES = [re.compile(p, re.IGNORECASE) for p in MATERIAL_CODE_PATTERNS]
+_BATCH_RES = [re.compile(p, re.IGNORECASE) for p in BATCH_PATTERNS]
+_ELECTRICAL_RES = [re.compile(p, re.IGNORECASE) for p in ELECTRICAL_PATTERNS]
+_QUANTITY_RES = [re.compile(p, re.IGNORECASE) for p in QUANTITY_PATTERNS]
+_QUANTITY_FALLBACK_RE = re.compile(QUANTITY_FALLBACK_PATTERN)
+
+# IGNORECASE 下与 ASCII 字母等价、但 str.lower() 后不是该字母的字符（İ ı ſ K）；
+# 文本含有这些字符时关键词索引不精确，退化为从头搜索
+_CASE_FOLD_SPECIALS = re.compile("[\u0130\u0131\u017f\u212a]")
+
+# 关键词索引：名称 → 小写关键词；模式只可能从这些关键词的出现位置开始匹配
+_KEYWORDS = {
+    "quantity": ("qty", "quantity", "数量"),
+    "batch": ("batch", "lot", "批次"),
+    "lot": ("lot",),
+    "b": ("b",),
+    "l": ("l",),
+    "h": ("h",),
+}
+# 与 BATCH_PATTERNS 一一对应的关键词
+_BATCH_KEYWORDS = ("batch", "b", "lot")
+
+
+class _TextIndex:
+    """对 OCR 文本做一次小写化，记录各关键词首次出现的位置（-1 表示不存在）
+
+    品牌词典命中（含位置）在首次使用时一次扫描得到。
+    """
+
+    __slots__ = ("text", "offsets", "_hits")
+
+    def __init__(self, text: str):
+        self.text = text
+        self._hits: list[DictionaryHit] | None = None
+        if not text.isascii() and _CASE_FOLD_SPECIALS.search(text):
+            self.offsets = dict.fromkeys(_KEYWORDS, 0)
+            return
+        lower = text.lower()
+        self.offsets = {}
+        for name, keywords in _KEYWORDS.items():
+            positions = [pos for pos in map(lower.find, keywords) if pos >= 0]
+            self.offsets[name] = min(positions) if positions else -1
+
+    @property
+    def hits(self) -> list[DictionaryHit]:
+        if self._hits is None:
+            self._hits = get_label_dictionary().find_all(self.text)
+        return self._hits
+
+
+def _first_group(match: re.Match[str]) -> str:
+    return match.group(1) if match.re.groups else match.group()
+
+
+def _engine_material_code(index: _TextIndex) -> str | None:
+    text = index.text
+    for i, pattern in enumerate(_MATERIAL_CODE_RES):
+        if i == 0 and "-" not in text:
+            continue
+        match = pattern.search(text)
+        if match:
+            return match.group().upper()
+    return None
+
+
+def _engine_quantity(index: _TextIndex) -> int | None:
+    text = index.text
+    start = index.offsets["quantity"]
+    if start >= 0:
+        for pattern in _QUANTITY_RES:
+            match = pattern.search(text, start)
+            if match:
+                try:
+                    return int(match.group(1).replace(",", ""))
+                except ValueError:
+                    continue
+    numbers = _QUANTITY_FALLBACK_RE.findall(text.replace(",", ""))
+    if numbers:
+        try:
+            return max(int(n) for n in numbers)
+        except (ValueError, TypeError):
+            pass
+    return None
+
+
+def _engine_batch(index: _TextIndex) -> str | None:
+    for pattern, keyword in zip(_BATCH_RES, _BATCH_KEYWORDS):
+        start = index.offsets[keyword]
+        if start < 0:
+            continue
+        match = pattern.search(index.text, start)
+        if match:
+            return _first_group(match)
+    return None
+
+
+def _engine_date(index: _TextIndex) -> str | None:
+    return extract_date(index.text)
+
+
+def _engine_brand(index: _TextIndex) -> str | None:
+    return get_label_dictionary().brand_from_hits(index.hits)
+
+
+def _engine_electrical(index: _TextIndex) -> str | None:
+    offsets = index.offsets
+    # 三个模式都要求出现 H
+    if offsets["h"] < 0:
+        return None
+    text = index.text
+    for i, pattern in enumerate(_ELECTRICAL_RES):
+        start = 0
+        if i == 0:
+            if offsets["l"] < 0 or "=" not in text:
+                continue
+            start = offsets["l"]
+        match = pattern.search(text, start)
+        if match:
+            return _first_group(match)
+    return None
+
+
+_ENGINE_EXTRACTORS = {
+    "material_code": _engine_material_code,
+    "quantity": _engine_quantity,
+    "batch": _engine_batch,
+    "date": _engine_date,
+    "brand": _engine_brand,
+    "electrical_characteristics": _engine_electrical,
+}
+
+
+def extract_fields(text: str, fields: Iterable[str] = EXTRACTED_FIELDS) -> Dict[str, Any]:
+    """一次建立文本索引，提取全部（或指定）字段；结果与对应的 extract_* 函数一致
+
+    date 对应 extract_date(text)，quantity 对应 extract_quantity(text)。
+    """
+    index = _TextIndex(text)
+    return {field: _ENGINE_EXTRACTORS[field](index) for field in fields}
+
+
+def parse_ocr_payload(ocr_payload: Dict[str, Any], template: CompiledTemplate | None = None) -> Dict[str, Any]:
+    """从 OCR 结果中解析并提取结构化字段
+
+    template 为按指纹选中的标签模板（见 label_template.select_template），其字段规则先于通用提取执行。
+    """
     raw_text = ocr_payload.get("raw_ocr_text", "")
     
     # 如果 OCR 已经返回了结构化字段，优先使用
@@ -172,25 +418,15 @@ def parse_ocr_payload(ocr_payload: Dict[str, Any]) -> Dict[str, Any]:
         "scan_time": ocr_payload.get("scan_time", datetime.utcnow()),
     }
 
-    # 如果字段缺失，从原始文本中提取
-    if not normalized["material_code"] and raw_text:
-        normalized["material_code"] = extract_material_code(raw_text)
-    
-    if not normalized["quantity"] and raw_text:
-        normalized["quantity"] = extract_quantity(raw_text)
-        if not normalized["quantity"]:
+    # 如果字段缺失，从原始文本中提取（一次索引提取全部缺失字段）
+    missing = [field for field in EXTRACTED_FIELDS if not normalized[field]] if raw_text else []
+    if missing and template is not None:
+        normalized.update(template.extract(raw_text, missing))
+        missing = [field for field in missing if not normalized[field]]
+    if missing:
+        for field, value in extract_fields(raw_text, missing).items():
+            normalized[field] = value
+        if "quantity" in missing and not normalized["quantity"]:
             normalized["quantity"] = extract_numeric(raw_text)
-    
-    if not normalized["batch"] and raw_text:
-        normalized["batch"] = extract_batch(raw_text)
-    
-    if not normalized["date"] and raw_text:
-        normalized["date"] = normalize_date(raw_text)
-    
-    if not normalized["brand"] and raw_text:
-        normalized["brand"] = extract_brand(raw_text)
-    
-    if not normalized["electrical_characteristics"] and raw_text:
-        normalized["electrical_characteristics"] = extract_electrical_characteristics(raw_text)
 
     return normalized
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any
+
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import Session, select
+
+from app.models.pipeline import CacheGeneration, Pipeline
+
+PIPELINE_CACHE = "pipelines"
+
+
+def read_generation(session: Session, name: str) -> int:
+    generation = session.exec(select(CacheGeneration.generation).where(CacheGeneration.name == name)).first()
+    return generation or 0
+
+
+def bump_generation(session: Session, name: str) -> None:
+    """代数加一（调用方负责提交）"""
+    statement = insert(CacheGeneration).values(name=name, generation=1)
+    session.exec(  # type: ignore[call-overload]
+        statement.on_conflict_do_update(
+            index_elements=[CacheGeneration.name],
+            set_={"generation": CacheGeneration.generation + 1},
+        )
+    )
+
+
+class PipelineCache:
+    """进程内的流水线元数据缓存（按 ID 与编码）
+
+    流水线创建后很少修改；修改时递增数据库中的代数，各进程最多每 check_interval_ms
+    读取一次代数，发现变化即清空本地缓存。缓存的对象只用于读取 code / excel_path /
+    模板等元数据，total_scans 等计数字段可能过期，需要时应直接查询数据库。
+    """
+
+    def __init__(self, check_interval_ms: float):
+        self.check_interval = max(0.0, check_interval_ms) / 1000
+        self._by_id: dict[int, Pipeline] = {}
+        self._by_code: dict[str, Pipeline] = {}
+        self._generation: int | None = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def check_due(self) -> bool:
+        return self._generation is None or time.monotonic() - self._checked_at >= self.check_interval
+
+    def sync(self, generation: int) -> None:
+        """用数据库中的代数校验本地缓存"""
+        with self._lock:
+            if self._generation is not None and generation != self._generation:
+                self._by_id.clear()
+                self._by_code.clear()
+                self.invalidations += 1
+            self._generation = generation
+            self._checked_at = time.monotonic()
+
+    def get(self, pipeline_id: int | None = None, code: str | None = None) -> Pipeline | None:
+        with self._lock:
+            pipeline = self._by_id.get(pipeline_id) if pipeline_id is not None else self._by_code.get(code or "")
+            if pipeline is not None:
+                self.hits += 1
+            return pipeline
+
+    def record_miss(self) -> None:
+        with self._lock:
+            self.misses += 1
+
+    def put(self, pipeline: Pipeline) -> Pipeline:
+        """缓存一份与会话无关的副本（调用方修改原对象不影响缓存），返回该副本"""
+        if pipeline.id is None:
+            return pipeline
+        pipeline = Pipeline(**pipeline.model_dump())
+        with self._lock:
+            self._by_id[pipeline.id] = pipeline
+            self._by_code[pipeline.code] = pipeline
+        return pipeline
+
+    def clear(self) -> None:
+        with self._lock:
+            self._by_id.clear()
+            self._by_code.clear()
+            self._generation = None
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._by_id),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "generation": self._generation,
+                "invalidations": self.invalidations,
+            }
@@ -1,19 +1,61 @@
 from __future__ import annotations
 
-from datetime import datetime
+import base64
+import json
+import threading
+from contextlib import nullcontext
+from datetime import date, datetime
 from pathlib import Path
-from typing import Iterable
+from collections import Counter
+from typing import Any, Callable, Iterable, Sequence
 
-from sqlmodel import select
+from sqlalchemy import insert, tuple_
+from sqlmodel import col, func, select, update
 
 from app.core.config import get_settings
 from app.core.logger import get_logger
+from app.core.metrics import stage_timer
 from app.db.session import get_session
-from app.models.pipeline import Pipeline, RecognitionResult
+from app.models.pipeline import Pipeline, RecognitionResult, ScanJob
+from app.services.duplicate_service import (
+    DuplicateResultError,
+    duplicate_settings,
+    duplicate_stats,
+    find_batch_duplicates,
+    find_duplicate,
+    result_fingerprint,
+)
+from app.services.excel_live_writer import enqueue_result
+from app.services.parser_service import parse_production_date
+from app.services.pipeline_cache import PIPELINE_CACHE, PipelineCache, bump_generation, read_generation
+from app.services.result_writer import GroupCommitWriter
+from app.utils.excel_writer import build_export, initialize_excel
 
 settings = get_settings()
 logger = get_logger("services.pipeline")
 
+# 结果查询可投影的字段；raw_ocr_text 体积大，仅在显式请求时返回
+RESULT_FIELDS = (
+    "id",
+    "pipeline_id",
+    "material_code",
+    "quantity",
+    "batch",
+    "date",
+    "brand",
+    "electrical_characteristics",
+    "raw_ocr_text",
+    "image_filename",
+    "recognized_at",
+    "duplicate_of",
+)
+DEFAULT_RESULT_FIELDS = tuple(field for field in RESULT_FIELDS if field != "raw_ocr_text")
+# merge 策略下可由重复扫描补齐的字段（指纹相关字段两者一致，无需合并）
+MERGE_FIELDS = ("brand", "electrical_characteristics", "raw_ocr_text", "image_filename", "image_hash")
+RESULT_ORDER_FIELDS = ("id", "recognized_at")
+
+_pipeline_cache = PipelineCache(check_interval_ms=settings.pipeline_cache_check_interval_ms)
+
 
 def _generate_code(name: str) -> str:
     sanitized = "".join(ch for ch in name if ch.isalnum()) or "line"
@@ -38,15 +80,15 @@ def create_pipeline(name: str) -> Pipeline:
         session.commit()
         session.refresh(pipeline)
         logger.info(f"流水线数据库记录创建完成: ID={pipeline.id}")
+    _pipeline_cache.put(pipeline)
 
-    excel_path.parent.mkdir(parents=True, exist_ok=True)
-    if not excel_path.exists():
-        logger.debug("初始化Excel文件")
-        from app.utils.excel_writer import initialize_excel
+    if settings.excel_live_sync:
+        excel_path.parent.mkdir(parents=True, exist_ok=True)
+        if not excel_path.exists():
+            logger.debug("初始化Excel文件")
+            initialize_excel(excel_path)
+            logger.debug("Excel文件初始化完成")
 
-        initialize_excel(excel_path)
-        logger.debug("Excel文件初始化完成")
-    
     logger.info(f"流水线创建成功: {code}")
     return pipeline
 
@@ -60,45 +102,568 @@ def list_pipelines() -> list[Pipeline]:
         return pipelines
 
 
-def get_pipeline(pipeline_id: int) -> Pipeline | None:
+def _cached_pipeline(
+    find: Callable[[], Pipeline | None],
+    load: Callable[[Any], Pipeline | None],
+) -> Pipeline | None:
+    """先查进程内缓存；到了校验间隔时在同一个会话里先比对代数再查缓存，未命中才查询流水线"""
+    if not _pipeline_cache.check_due():
+        pipeline = find()
+        if pipeline is not None:
+            return pipeline
+    with get_session() as session:
+        if _pipeline_cache.check_due():
+            _pipeline_cache.sync(read_generation(session, PIPELINE_CACHE))
+            pipeline = find()
+            if pipeline is not None:
+                return pipeline
+        _pipeline_cache.record_miss()
+        pipeline = load(session)
+    if pipeline is not None:
+        pipeline = _pipeline_cache.put(pipeline)
+    return pipeline
+
+
+def get_pipeline(pipeline_id: int, use_cache: bool = True) -> Pipeline | None:
+    """按 ID 查询流水线；use_cache=False 时直接读数据库（需要最新 total_scans 等字段时）"""
     logger.debug(f"根据ID查询流水线: {pipeline_id}")
+    if use_cache:
+        pipeline = _cached_pipeline(
+            lambda: _pipeline_cache.get(pipeline_id=pipeline_id),
+            lambda session: session.get(Pipeline, pipeline_id),
+        )
+    else:
+        with get_session() as session:
+            pipeline = session.get(Pipeline, pipeline_id)
+    if pipeline:
+        logger.debug(f"找到流水线: ID={pipeline.id}, Code={pipeline.code}")
+    else:
+        logger.debug(f"未找到流水线: ID={pipeline_id}")
+    return pipeline
+
+
+def get_pipeline_by_code(code: str) -> Pipeline | None:
+    logger.debug(f"根据编码查询流水线: {code}")
+    return _cached_pipeline(
+        lambda: _pipeline_cache.get(code=code),
+        lambda session: session.exec(select(Pipeline).where(Pipeline.code == code)).first(),
+    )
+
+
+def invalidate_pipeline_cache() -> None:
+    """修改流水线元数据后调用：递增数据库代数，本进程立即清空，其他进程在下次校验时清空"""
+    with get_session() as session:
+        bump_generation(session, PIPELINE_CACHE)
+        session.commit()
+    _pipeline_cache.clear()
+
+
+def get_pipeline_cache() -> PipelineCache:
+    return _pipeline_cache
+
+
+def set_duplicate_policy(pipeline_id: int, policy: str | None, window_seconds: int | None) -> Pipeline | None:
+    """设置流水线的重复扫描策略与时间窗口，None 表示使用全局配置"""
     with get_session() as session:
         pipeline = session.get(Pipeline, pipeline_id)
-        if pipeline:
-            logger.debug(f"找到流水线: ID={pipeline.id}, Code={pipeline.code}")
-        else:
-            logger.debug(f"未找到流水线: ID={pipeline_id}")
-        return pipeline
+        if pipeline is None:
+            return None
+        pipeline.duplicate_policy = policy
+        pipeline.duplicate_window_seconds = window_seconds
+        session.add(pipeline)
+        session.commit()
+        session.refresh(pipeline)
+    invalidate_pipeline_cache()
+    logger.info(f"流水线 {pipeline.code} 重复扫描策略: {policy or '全局'}, 窗口={window_seconds}")
+    return pipeline
+
+
+def count_statement(pipeline_id: int):
+    return select(func.count()).select_from(RecognitionResult).where(RecognitionResult.pipeline_id == pipeline_id)
 
 
 def _count_scans(session, pipeline_id: int) -> int:
     logger.debug(f"统计流水线扫描次数: ID={pipeline_id}")
-    statement = select(RecognitionResult).where(RecognitionResult.pipeline_id == pipeline_id)
-    count = len(session.exec(statement).all())
+    count = session.exec(count_statement(pipeline_id)).one()
     logger.debug(f"流水线 {pipeline_id} 的扫描次数: {count}")
     return count
 
 
-def store_result(pipeline: Pipeline, result_data: dict) -> RecognitionResult:
-    logger.info(f"存储识别结果到流水线: {pipeline.code}")
-    excel_path = Path(pipeline.excel_path)
-    excel_path.parent.mkdir(parents=True, exist_ok=True)
+def _insert_results(
+    rows: Sequence[tuple[int, dict[str, Any]]],
+    links: dict[int, int] | None = None,
+    jobs: dict[int, str] | None = None,
+) -> list[int]:
+    """在一个事务中插入 (pipeline_id, 字段) 并累加各流水线扫描计数，按输入顺序返回主键
 
+    主键通过 INSERT ... RETURNING 取回，无需逐条 refresh。links 为 {行下标: 原始行下标}，
+    同一批中被标记的重复扫描在插入后于同一事务内指向原始行（插入前还没有主键）。
+    jobs 为 {行下标: 扫描任务 ID}，在同一事务内写入任务的 result_id。
+    """
+    statement = insert(RecognitionResult).returning(RecognitionResult.id, sort_by_parameter_order=True)
     with get_session() as session:
-        # 确保 pipeline.id 不为空
-        if pipeline.id is None:
-            logger.error("Pipeline ID为None，无法创建识别结果")
-            raise ValueError("Pipeline ID is None, cannot create RecognitionResult")
-        
-        result = RecognitionResult(pipeline_id=pipeline.id, **result_data)
-        session.add(result)
+        ids = list(
+            session.exec(
+                statement,  # type: ignore[call-overload]
+                params=[{"pipeline_id": pipeline_id, **values} for pipeline_id, values in rows],
+            ).scalars()
+        )
+        for position, original in (links or {}).items():
+            session.exec(
+                update(RecognitionResult)
+                .where(RecognitionResult.id == ids[position])
+                .values(duplicate_of=ids[original])
+            )
+        for position, job_id in (jobs or {}).items():
+            session.exec(update(ScanJob).where(col(ScanJob.id) == job_id).values(result_id=ids[position]))
+        for pipeline_id, count in Counter(pipeline_id for pipeline_id, _ in rows).items():
+            session.exec(
+                update(Pipeline)
+                .where(Pipeline.id == pipeline_id)
+                .values(total_scans=Pipeline.total_scans + count)
+            )
         session.commit()
-        session.refresh(result)
-        logger.debug(f"识别结果存储到数据库: ID={result.id}")
+    return ids
+
+
+_result_writer: GroupCommitWriter | None = None
+_result_writer_lock = threading.Lock()
+
+
+def get_result_writer() -> GroupCommitWriter:
+    global _result_writer
+    with _result_writer_lock:
+        if _result_writer is None:
+            _result_writer = GroupCommitWriter(
+                # 每次调用时查找，便于测试替换 get_session
+                lambda rows: _insert_results(rows),
+                max_rows=settings.result_group_commit_max_rows,
+                window_ms=settings.result_group_commit_window_ms,
+            )
+            logger.info("启动识别结果组提交线程")
+        return _result_writer
+
+
+def shutdown_result_writer(timeout: float | None = 30) -> None:
+    """关闭组提交线程，关闭前提交队列中的结果"""
+    global _result_writer
+    with _result_writer_lock:
+        writer, _result_writer = _result_writer, None
+    if writer is not None:
+        depth = writer.queue_depth
+        writer.close(timeout)
+        logger.info(f"识别结果组提交线程已关闭, 关闭时排空 {depth} 行")
+
+
+def result_writer_stats() -> dict[str, Any] | None:
+    with _result_writer_lock:
+        writer = _result_writer
+    return writer.stats() if writer is not None else None
+
+
+def _result_values(result: RecognitionResult) -> dict[str, Any]:
+    # production_date 与字段指纹由其他字段派生，随结果一起写入，调用方无需关心
+    if result.production_date is None:
+        result.production_date = parse_production_date(result.date)
+    if result.fingerprint is None:
+        result.fingerprint = result_fingerprint(result.material_code, result.batch, result.quantity, result.date)
+    return result.model_dump(exclude={"id", "pipeline_id"})
+
+
+# 查重到插入之间按流水线串行：同一进程内并发提交同一盘卷时，后到的请求一定能查到先到的记录。
+# 多个进程写同一数据库时不保证，查重只是尽力而为
+_duplicate_locks: dict[int, threading.Lock] = {}
+_duplicate_locks_guard = threading.Lock()
+
+
+def _duplicate_guard(pipeline_id: int, policy: str):
+    if policy == "off":
+        return nullcontext()
+    with _duplicate_locks_guard:
+        return _duplicate_locks.setdefault(pipeline_id, threading.Lock())
+
+
+def _merge_into(pipeline: Pipeline, original_id: int, values: dict[str, Any]) -> RecognitionResult:
+    """merge 策略：不新增记录，用本次扫描补齐已有记录中为空的字段，返回已有记录"""
+    with get_session() as session:
+        original = session.get(RecognitionResult, original_id)
+        if original is None:
+            raise ValueError(f"识别结果不存在: ID={original_id}")
+        filled = [field for field in MERGE_FIELDS if getattr(original, field) is None and values.get(field) is not None]
+        for field in filled:
+            setattr(original, field, values[field])
+        if filled:
+            session.add(original)
+            session.commit()
+            session.refresh(original)
+        # 调用方会在返回的对象上标记 duplicate_of，与会话分离以免被写回
+        session.expunge(original)
+    if filled:
+        # 导出缓存按最新结果 ID 命名，原地修改后需要重新生成
+        discard_export_cache(pipeline.code)
+    logger.info(f"重复扫描已合并: 流水线={pipeline.code}, 结果ID={original_id}, 补齐字段={filled}")
+    return original
+
+
+def store_result(pipeline: Pipeline, result_data: dict, job_id: str | None = None) -> RecognitionResult:
+    """存储单条识别结果；按流水线的重复扫描策略处理时间窗口内的重复结果
+
+    - flag：照常入库，duplicate_of 指向已有记录；
+    - reject：抛出 DuplicateResultError，不入库；
+    - merge：不入库，返回已有记录（其 duplicate_of 设为自身 ID，仅用于告知调用方，不写库）。
+
+    job_id 为异步扫描任务时，任务的 result_id 与结果在同一事务中写入（不走组提交），
+    任务中断后重跑可据此判断结果是否已入库。查重与插入在本进程内按流水线串行（见 _duplicate_guard）。
+    """
+    logger.info(f"存储识别结果到流水线: {pipeline.code}")
+
+    # 确保 pipeline.id 不为空
+    if pipeline.id is None:
+        logger.error("Pipeline ID为None，无法创建识别结果")
+        raise ValueError("Pipeline ID is None, cannot create RecognitionResult")
+
+    result = RecognitionResult(pipeline_id=pipeline.id, **result_data)
+    values = _result_values(result)
 
-    from app.utils.excel_writer import append_result
+    policy, window_seconds = duplicate_settings(pipeline)
+    if result.fingerprint is None:
+        policy = "off"
+    with _duplicate_guard(pipeline.id, policy):
+        if policy != "off":
+            with stage_timer("duplicate_check"), get_session() as session:
+                original_id = find_duplicate(
+                    session, pipeline.id, result.fingerprint, result.image_hash, result.recognized_at, window_seconds
+                )
+            if original_id is not None:
+                duplicate_stats().record_action(policy)
+                logger.warning(f"检测到重复扫描: 流水线={pipeline.code}, 原记录ID={original_id}, 策略={policy}")
+                if policy == "reject":
+                    raise DuplicateResultError(original_id)
+                if policy == "merge":
+                    merged = _merge_into(pipeline, original_id, values)
+                    merged.duplicate_of = original_id
+                    return merged
+                result.duplicate_of = values["duplicate_of"] = original_id
+
+        with stage_timer("db_commit"):
+            if job_id is not None:
+                (result.id,) = _insert_results([(pipeline.id, values)], jobs={0: job_id})
+            elif settings.result_group_commit:
+                # 与同一时间窗口内其他请求的结果合并为一个事务提交
+                result.id = get_result_writer().write(pipeline.id, values)
+            else:
+                (result.id,) = _insert_results([(pipeline.id, values)])
+    logger.debug(f"识别结果存储到数据库: ID={result.id}")
+
+    # 实时 Excel 文件由该流水线的后台写入线程批量追加，不在请求路径中重写
+    if settings.excel_live_sync:
+        try:
+            enqueue_result(Path(pipeline.excel_path), result)
+            logger.debug("识别结果已加入Excel写入队列")
+        except RuntimeError as exc:
+            logger.warning(f"Excel写入队列不可用，跳过实时写入: {exc}")
 
-    logger.debug("将结果追加到Excel文件")
-    append_result(excel_path, result)
     logger.info(f"识别结果存储完成: 流水线={pipeline.code}, 结果ID={result.id}")
     return result
+
+
+def store_results(pipeline: Pipeline, rows: list[dict]) -> list[RecognitionResult | DuplicateResultError]:
+    """在一个事务中批量存储识别结果，并同步更新扫描计数；按流水线的重复扫描策略逐条处理
+
+    整批只做一次查重查询，同一批中重复扫描的盘卷也会被识别。返回与 rows 一一对应：
+    reject 策略下被拒绝的条目为 DuplicateResultError，merge 策略下为被合并的记录（duplicate_of 为其自身 ID），
+    其余与 store_result 相同（包括查重与插入按流水线串行）。
+    """
+    logger.info(f"批量存储识别结果到流水线: {pipeline.code}, 条数={len(rows)}")
+    if pipeline.id is None:
+        logger.error("Pipeline ID为None，无法创建识别结果")
+        raise ValueError("Pipeline ID is None, cannot create RecognitionResult")
+
+    results = [RecognitionResult(pipeline_id=pipeline.id, **row) for row in rows]
+    values = [_result_values(result) for result in results]
+    policy, window_seconds = duplicate_settings(pipeline)
+    with _duplicate_guard(pipeline.id, policy):
+        matches: list[tuple[int | None, int | None]] = [(None, None)] * len(results)
+        if policy != "off":
+            with stage_timer("duplicate_check"), get_session() as session:
+                matches = find_batch_duplicates(
+                    session,
+                    pipeline.id,
+                    [(result.fingerprint, result.image_hash, result.recognized_at) for result in results],
+                    window_seconds,
+                )
+
+        outcomes: list[RecognitionResult | DuplicateResultError | None] = [None] * len(results)
+        inserted: list[int] = []
+        # 批内重复：{条目下标: 批内原始条目下标}，插入后才有主键
+        peers: dict[int, int] = {}
+        for position, (original_id, peer) in enumerate(matches):
+            if original_id is None and peer is None:
+                inserted.append(position)
+                continue
+            duplicate_stats().record_action(policy)
+            logger.warning(
+                f"检测到重复扫描: 流水线={pipeline.code}, 原记录ID={original_id}, 批内条目={peer}, 策略={policy}"
+            )
+            if policy == "reject":
+                if original_id is not None:
+                    outcomes[position] = DuplicateResultError(original_id)
+                else:
+                    peers[position] = peer  # type: ignore[assignment]
+            elif policy == "merge":
+                if original_id is not None:
+                    merged = _merge_into(pipeline, original_id, values[position])
+                    merged.duplicate_of = original_id
+                    outcomes[position] = merged
+                else:
+                    # 原始条目尚未入库，直接补齐它待插入的字段
+                    for field in MERGE_FIELDS:
+                        if values[peer][field] is None and values[position][field] is not None:  # type: ignore[index]
+                            values[peer][field] = values[position][field]  # type: ignore[index]
+                            setattr(results[peer], field, values[position][field])  # type: ignore[index]
+                    peers[position] = peer  # type: ignore[assignment]
+            else:
+                inserted.append(position)
+                if original_id is not None:
+                    results[position].duplicate_of = values[position]["duplicate_of"] = original_id
+                else:
+                    peers[position] = peer  # type: ignore[assignment]
+
+        offsets = {position: offset for offset, position in enumerate(inserted)}
+        links = {offsets[position]: offsets[peer] for position, peer in peers.items() if position in offsets}
+        ids = _insert_results([(pipeline.id, values[position]) for position in inserted], links) if inserted else []
+    for position, result_id in zip(inserted, ids):
+        results[position].id = result_id
+        outcomes[position] = results[position]
+    for position, peer in peers.items():
+        original_id = results[peer].id
+        if policy == "reject":
+            outcomes[position] = DuplicateResultError(original_id)  # type: ignore[arg-type]
+        elif policy == "merge":
+            outcomes[position] = RecognitionResult(
+                id=original_id, pipeline_id=pipeline.id, **{**values[peer], "duplicate_of": original_id}
+            )
+        else:
+            results[position].duplicate_of = original_id
+
+    if settings.excel_live_sync:
+        try:
+            for position in inserted:
+                enqueue_result(Path(pipeline.excel_path), results[position])
+        except RuntimeError as exc:
+            logger.warning(f"Excel写入队列不可用，跳过实时写入: {exc}")
+    logger.info(f"批量识别结果存储完成: 流水线={pipeline.code}, 入库={len(ids)}, 重复={len(results) - len(inserted)}")
+    return outcomes  # type: ignore[return-value]
+
+
+def store_results_bulk(rows: Sequence[tuple[Pipeline, dict]]) -> list[RecognitionResult]:
+    """跨流水线批量存储（一个事务，executemany + RETURNING），各流水线的扫描计数各更新一次
+
+    用于外部系统推送已有结果，只写入指纹，不按重复扫描策略处理。
+    """
+    if not rows:
+        return []
+    results = [RecognitionResult(pipeline_id=pipeline.id, **row) for pipeline, row in rows]
+    ids = _insert_results([(result.pipeline_id, _result_values(result)) for result in results])
+    for result, result_id in zip(results, ids):
+        result.id = result_id
+    logger.debug(f"批量识别结果存储到数据库: 条数={len(ids)}, ID范围={ids[0]}-{ids[-1]}")
+
+    if settings.excel_live_sync:
+        try:
+            for (pipeline, _), result in zip(rows, results):
+                enqueue_result(Path(pipeline.excel_path), result)
+        except RuntimeError as exc:
+            logger.warning(f"Excel写入队列不可用，跳过实时写入: {exc}")
+    return results
+
+
+def latest_id_statement(pipeline_id: int):
+    return select(func.max(RecognitionResult.id)).where(RecognitionResult.pipeline_id == pipeline_id)
+
+
+def _latest_result_id(session, pipeline_id: int) -> int | None:
+    return session.exec(latest_id_statement(pipeline_id)).one()
+
+
+def export_statement(pipeline_id: int, latest_id: int):
+    """导出查询：按 ID 顺序读取截至 latest_id 的结果，与导出缓存文件名对应"""
+    return (
+        select(
+            RecognitionResult.recognized_at,
+            RecognitionResult.material_code,
+            RecognitionResult.quantity,
+            RecognitionResult.batch,
+            RecognitionResult.date,
+            RecognitionResult.brand,
+            RecognitionResult.electrical_characteristics,
+            RecognitionResult.raw_ocr_text,
+            RecognitionResult.image_filename,
+        )
+        .where(RecognitionResult.pipeline_id == pipeline_id)
+        .where(RecognitionResult.id <= latest_id)
+        .order_by(RecognitionResult.id)
+    )
+
+
+def _export_path(code: str, latest_id: int) -> Path:
+    return settings.exports_root / f"{code}_{latest_id}.xlsx"
+
+
+def export_pipeline_excel(pipeline: Pipeline, batch_size: int = 1000) -> Path | None:
+    """从 recognition_results 生成流水线导出文件
+
+    导出文件按流水线最新结果 ID 缓存，只有出现新记录时才重新生成；
+    流水线尚无识别记录时生成只有表头的文件（{code}_0.xlsx）。
+    """
+    if pipeline.id is None:
+        return None
+
+    with get_session() as session:
+        latest_id = _latest_result_id(session, pipeline.id) or 0
+        export_path = _export_path(pipeline.code, latest_id)
+        if export_path.exists():
+            logger.debug(f"命中导出缓存: {export_path.name}")
+            return export_path
+
+        logger.info(f"生成导出文件: 流水线={pipeline.code}, 最新结果ID={latest_id}")
+        statement = export_statement(pipeline.id, latest_id).execution_options(yield_per=batch_size)
+        rows = build_export(export_path, session.exec(statement))
+        logger.info(f"导出文件生成完成: {export_path.name}, 共 {rows} 行")
+
+    # 清理同一流水线的旧缓存文件
+    discard_export_cache(pipeline.code, keep=export_path)
+    return export_path
+
+
+def discard_export_cache(code: str, keep: Path | None = None) -> None:
+    """删除流水线的导出缓存文件；结果被原地修改（如重新解析）后，按最新结果 ID 命名的缓存不再有效"""
+    for stale in settings.exports_root.glob(f"{code}_*.xlsx"):
+        if stale != keep and stale.stem.rsplit("_", 1)[0] == code:
+            stale.unlink(missing_ok=True)
+
+
+def encode_cursor(order_by: str, row: dict[str, Any]) -> str:
+    key: dict[str, Any] = {"o": order_by, "id": row["id"]}
+    if order_by == "recognized_at":
+        key["t"] = row["recognized_at"].isoformat()
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, order_by: str) -> tuple[int, datetime | None]:
+    """解析分页游标，格式不合法或与排序字段不一致时抛出 ValueError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if key["o"] != order_by:
+            raise ValueError("cursor does not match order_by")
+        recognized_at = datetime.fromisoformat(key["t"]) if order_by == "recognized_at" else None
+        return int(key["id"]), recognized_at
+    except (KeyError, TypeError, ValueError) as exc:
+        raise ValueError(f"invalid cursor: {cursor}") from exc
+
+
+def results_statement(
+    pipeline_id: int,
+    query_fields: Sequence[str],
+    *,
+    limit: int = 50,
+    cursor: str | None = None,
+    order_by: str = "id",
+    descending: bool = True,
+    material_code: str | None = None,
+    batch: str | None = None,
+    brand: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+):
+    """构造分页查询（多取一行用于判断是否有下一页）；各条件对应的索引见 RecognitionResult.__table_args__"""
+    if order_by not in RESULT_ORDER_FIELDS:
+        raise ValueError(f"unsupported order_by: {order_by}")
+    columns = [getattr(RecognitionResult, field) for field in query_fields]
+    statement = select(*columns).where(RecognitionResult.pipeline_id == pipeline_id)
+
+    if material_code is not None:
+        statement = statement.where(RecognitionResult.material_code == material_code)
+    if batch is not None:
+        statement = statement.where(RecognitionResult.batch == batch)
+    if brand is not None:
+        statement = statement.where(RecognitionResult.brand == brand)
+    if start is not None:
+        statement = statement.where(RecognitionResult.recognized_at >= start)
+    if end is not None:
+        statement = statement.where(RecognitionResult.recognized_at < end)
+    if date_from is not None:
+        statement = statement.where(RecognitionResult.production_date >= date_from)
+    if date_to is not None:
+        statement = statement.where(RecognitionResult.production_date <= date_to)
+
+    if order_by == "id":
+        sort_keys = [RecognitionResult.id]
+    else:
+        sort_keys = [RecognitionResult.recognized_at, RecognitionResult.id]
+
+    if cursor:
+        last_id, last_recognized_at = decode_cursor(cursor, order_by)
+        if order_by == "id":
+            key, value = RecognitionResult.id, last_id
+        else:
+            key, value = tuple_(*sort_keys), tuple_(last_recognized_at, last_id)
+        statement = statement.where(key < value if descending else key > value)
+
+    return statement.order_by(*[k.desc() if descending else k.asc() for k in sort_keys]).limit(limit + 1)
+
+
+def list_results(
+    pipeline_id: int,
+    *,
+    limit: int = 50,
+    cursor: str | None = None,
+    order_by: str = "id",
+    descending: bool = True,
+    fields: Iterable[str] | None = None,
+    material_code: str | None = None,
+    batch: str | None = None,
+    brand: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+) -> tuple[list[dict[str, Any]], str | None]:
+    """按 keyset 分页读取流水线识别结果，返回 (结果行, 下一页游标)
+
+    分页条件直接落在 (pipeline_id, id) / (pipeline_id, recognized_at, id) 索引上，
+    只查询请求的列，未请求时不读取 raw_ocr_text。date_from / date_to 按生产日期（含两端）筛选。
+    """
+    selected = list(fields) if fields else list(DEFAULT_RESULT_FIELDS)
+    unknown = [field for field in selected if field not in RESULT_FIELDS]
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(unknown)}")
+
+    # 游标需要排序键，查询时总是带上
+    query_fields = list(dict.fromkeys(["id", "recognized_at", *selected]))
+    statement = results_statement(
+        pipeline_id,
+        query_fields,
+        limit=limit,
+        cursor=cursor,
+        order_by=order_by,
+        descending=descending,
+        material_code=material_code,
+        batch=batch,
+        brand=brand,
+        start=start,
+        end=end,
+        date_from=date_from,
+        date_to=date_to,
+    )
+
+    with get_session() as session:
+        rows = [dict(zip(query_fields, row)) for row in session.exec(statement).all()]
+
+    next_cursor = encode_cursor(order_by, rows[limit - 1]) if len(rows) > limit else None
+    items = [{field: row[field] for field in selected} for row in rows[:limit]]
+    logger.debug(f"查询流水线识别结果: ID={pipeline_id}, 返回 {len(items)} 条, 有下一页={next_cursor is not None}")
+    return items, next_cursor
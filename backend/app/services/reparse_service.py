@@ -0,0 +1,277 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Iterable, Mapping, Sequence
+
+from sqlmodel import col, func, select, update
+
+from app.core.logger import get_logger
+from app.db.session import get_session
+from app.models.pipeline import Pipeline, RecognitionResult
+from app.services.duplicate_service import FINGERPRINT_FIELDS, result_fingerprint
+from app.services.label_template import CompiledTemplate, select_template
+from app.services.label_template_service import get_pipeline_templates
+from app.services.parser_service import EXTRACTED_FIELDS, parse_ocr_payload, parse_production_date
+from app.services.pipeline_service import discard_export_cache
+
+logger = get_logger("services.reparse")
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+class ReparseStats:
+    """重新解析的进度：scanned 已解析行数，changed 结果有变化的行数，updated 已写回的行数"""
+
+    __slots__ = ("total", "scanned", "changed", "updated", "last_id", "started_at")
+
+    def __init__(self, total: int = 0, last_id: int = 0):
+        self.total = total
+        self.scanned = 0
+        self.changed = 0
+        self.updated = 0
+        self.last_id = last_id
+        self.started_at = time.monotonic()
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    @property
+    def rate(self) -> float:
+        elapsed = self.elapsed
+        return self.scanned / elapsed if elapsed > 0 else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "total": self.total,
+            "scanned": self.scanned,
+            "changed": self.changed,
+            "updated": self.updated,
+            "last_id": self.last_id,
+            "elapsed_seconds": round(self.elapsed, 1),
+            "rows_per_second": round(self.rate, 1),
+        }
+
+
+class ReparseCheckpoint:
+    """断点文件：记录过滤条件与最后处理完成的结果 ID，中断后按相同条件重跑即从断点继续"""
+
+    def __init__(self, path: Path, scope: dict[str, Any]):
+        self.path = path
+        self.scope = scope
+
+    def load(self) -> int:
+        """返回上次处理到的 ID；条件不一致时拒绝续跑，避免漏处理"""
+        if not self.path.exists():
+            return 0
+        data = json.loads(self.path.read_text(encoding="utf-8"))
+        if data.get("scope") != self.scope:
+            raise ValueError(f"断点文件 {self.path} 的过滤条件与本次不一致: {data.get('scope')}")
+        return int(data.get("last_id", 0))
+
+    def save(self, stats: ReparseStats) -> None:
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(
+            json.dumps({"scope": self.scope, "last_id": stats.last_id, "stats": stats.as_dict()}, ensure_ascii=False),
+            encoding="utf-8",
+        )
+        os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+def parse_chunk(
+    rows: Sequence[tuple[int, int, str]],
+    fields: Sequence[str],
+    templates: Mapping[int, Sequence[CompiledTemplate]] | None = None,
+) -> list[tuple[int, dict[str, Any]]]:
+    """解析一批 (id, pipeline_id, raw_ocr_text)，在进程池中执行；templates 为各流水线的标签模板"""
+    parsed = []
+    for result_id, pipeline_id, raw_text in rows:
+        template = select_template(templates.get(pipeline_id, ()), raw_text) if templates else None
+        normalized = parse_ocr_payload({"raw_ocr_text": raw_text, "scan_time": None}, template=template)
+        parsed.append((result_id, {field: normalized[field] for field in fields}))
+    return parsed
+
+
+def _filters(pipeline_id: int | None, since: datetime | None, until: datetime | None) -> list[Any]:
+    conditions = [col(RecognitionResult.raw_ocr_text).is_not(None), RecognitionResult.raw_ocr_text != ""]
+    if pipeline_id is not None:
+        conditions.append(RecognitionResult.pipeline_id == pipeline_id)
+    if since is not None:
+        conditions.append(RecognitionResult.recognized_at >= since)
+    if until is not None:
+        conditions.append(RecognitionResult.recognized_at < until)
+    return conditions
+
+
+def _read_chunks(
+    conditions: list[Any],
+    fields: Sequence[str],
+    after_id: int,
+    chunk_size: int,
+) -> Iterable[list[tuple[Any, ...]]]:
+    """按 ID keyset 分块读取 (id, pipeline_id, raw_ocr_text, 当前字段...)，每块一个短查询"""
+    columns = [RecognitionResult.id, RecognitionResult.pipeline_id, RecognitionResult.raw_ocr_text]
+    columns += [getattr(RecognitionResult, field) for field in fields]
+    while True:
+        with get_session() as session:
+            statement = (
+                select(*columns)
+                .where(*conditions)
+                .where(RecognitionResult.id > after_id)
+                .order_by(RecognitionResult.id)
+                .limit(chunk_size)
+            )
+            chunk = [tuple(row) for row in session.exec(statement)]
+        if not chunk:
+            return
+        after_id = chunk[-1][0]
+        yield chunk
+
+
+def _write_changes(changes: list[dict[str, Any]]) -> None:
+    """按主键批量 UPDATE（executemany），一块一个事务"""
+    with get_session() as session:
+        session.exec(update(RecognitionResult), params=changes)  # type: ignore[call-overload]
+        session.commit()
+
+
+def _load_templates(pipeline_id: int | None) -> dict[int, list[CompiledTemplate]]:
+    """各流水线的已编译标签模板，随每块一起发送给 worker"""
+    statement = select(Pipeline)
+    if pipeline_id is not None:
+        statement = statement.where(Pipeline.id == pipeline_id)
+    with get_session() as session:
+        pipelines = list(session.exec(statement).all())
+    templates = {}
+    for pipeline in pipelines:
+        if pipeline.id is not None and pipeline.label_template_ids:
+            templates[pipeline.id] = get_pipeline_templates(pipeline)
+    return templates
+
+
+def _discard_exports(pipeline_ids: set[int]) -> None:
+    with get_session() as session:
+        codes = session.exec(select(Pipeline.code).where(col(Pipeline.id).in_(pipeline_ids))).all()
+    for code in codes:
+        discard_export_cache(code)
+
+
+def reparse_results(
+    pipeline_id: int | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    fields: Sequence[str] = EXTRACTED_FIELDS,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    workers: int | None = None,
+    dry_run: bool = False,
+    checkpoint: Path | None = None,
+    on_progress: Callable[[ReparseStats], None] | None = None,
+    on_diff: Callable[[int, dict[str, tuple[Any, Any]]], None] | None = None,
+) -> ReparseStats:
+    """用当前解析规则重新解析已保存的 raw_ocr_text，并把有变化的字段写回
+
+    - 按 ID keyset 分块读取，解析在进程池中并行（workers<=1 时在当前进程），
+      预读块数受限，内存占用与总行数无关；
+    - 写回只包含有变化且新值非空的字段（解析不出的字段不会把已有值清空），每块一个事务；每块提交后更新断点；
+    - dry_run 只产出差异（on_diff），不写数据库、不写断点；
+    - 使用各流水线当前引用的标签模板（与在线识别一致）。
+    """
+    unknown = [field for field in fields if field not in EXTRACTED_FIELDS]
+    if unknown:
+        raise ValueError(f"不支持重新解析的字段: {unknown}")
+    fields = tuple(fields)
+    # 指纹由多个字段派生，只重解析其中部分字段时仍需读出其余字段的当前值
+    read_fields = fields + tuple(field for field in FINGERPRINT_FIELDS if field not in fields)
+    conditions = _filters(pipeline_id, since, until)
+    scope = {
+        "pipeline_id": pipeline_id,
+        "since": since.isoformat() if since else None,
+        "until": until.isoformat() if until else None,
+        "fields": list(fields),
+    }
+    tracker = ReparseCheckpoint(checkpoint, scope) if checkpoint is not None and not dry_run else None
+    start_id = tracker.load() if tracker is not None else 0
+
+    with get_session() as session:
+        total = session.exec(
+            select(func.count()).select_from(RecognitionResult).where(*conditions).where(RecognitionResult.id > start_id)
+        ).one()
+    stats = ReparseStats(total=total, last_id=start_id)
+    templates = _load_templates(pipeline_id)
+    logger.info(f"开始重新解析: 条件={scope}, 起始ID={start_id}, 待处理={total}, dry_run={dry_run}")
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    executor: Executor | None = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    # 预读的块数：保持每个 worker 有活干，同时限制驻留内存
+    window = max(2, workers * 2)
+    pending: deque[tuple[list[tuple[Any, ...]], Future | list]] = deque()
+
+    def submit(chunk: list[tuple[Any, ...]]) -> None:
+        texts = [row[:3] for row in chunk]
+        if executor is None:
+            pending.append((chunk, parse_chunk(texts, fields, templates)))
+        else:
+            pending.append((chunk, executor.submit(parse_chunk, texts, fields, templates)))
+
+    def finish_oldest() -> None:
+        chunk, result = pending.popleft()
+        parsed = result.result() if isinstance(result, Future) else result
+        changes = []
+        touched: set[int] = set()
+        for row, (result_id, values) in zip(chunk, parsed):
+            current = dict(zip(read_fields, row[3:]))
+            # 新规则解析不出的字段保留原值：可能来自 /scan-result、批量推送，或当时的 OCR 结果
+            diff = {
+                field: (current[field], values[field])
+                for field in fields
+                if values[field] not in (None, "") and current[field] != values[field]
+            }
+            if not diff:
+                continue
+            if on_diff is not None:
+                on_diff(result_id, diff)
+            change = {"id": result_id, **{field: new for field, (_, new) in diff.items()}}
+            if "date" in diff:
+                change["production_date"] = parse_production_date(change["date"])
+            if any(field in diff for field in FINGERPRINT_FIELDS):
+                merged = {**current, **change}
+                change["fingerprint"] = result_fingerprint(*(merged[field] for field in FINGERPRINT_FIELDS))
+            changes.append(change)
+            touched.add(row[1])
+        if changes and not dry_run:
+            _write_changes(changes)
+            _discard_exports(touched)
+            stats.updated += len(changes)
+        stats.scanned += len(chunk)
+        stats.changed += len(changes)
+        stats.last_id = chunk[-1][0]
+        if tracker is not None:
+            tracker.save(stats)
+        if on_progress is not None:
+            on_progress(stats)
+
+    try:
+        for chunk in _read_chunks(conditions, read_fields, start_id, chunk_size):
+            submit(chunk)
+            if len(pending) >= window:
+                finish_oldest()
+        while pending:
+            finish_oldest()
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    if tracker is not None:
+        tracker.clear()
+    logger.info(f"重新解析完成: {stats.as_dict()}")
+    return stats
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Sequence
+
+from app.core.logger import get_logger
+
+logger = get_logger("services.result_writer")
+
+_STOP = object()
+
+# 一批待写入的行 -> 按顺序返回的主键
+CommitFunction = Callable[[Sequence[tuple[int, dict[str, Any]]]], list[int]]
+
+
+class GroupCommitWriter:
+    """识别结果的组提交写入者
+
+    并发请求把 (pipeline_id, 字段) 放入队列后等待各自的 Future；后台线程收集
+    一个窗口（window_ms 或满 max_rows 行）内到达的结果，在一个事务中批量插入，
+    每批只有一次提交（一次 fsync），吞吐随批大小增长而不受限于每秒 fsync 次数。
+    整批失败时逐条重试，只有出错的那条结果向调用方抛出异常。
+    """
+
+    def __init__(self, commit: CommitFunction, max_rows: int, window_ms: float):
+        self.commit = commit
+        self.max_rows = max(1, max_rows)
+        self.window = max(0.0, window_ms) / 1000
+        self._queue: queue.Queue = queue.Queue()
+        self._closed = False
+        self._lock = threading.Lock()
+
+        self.batch_count = 0
+        self.committed_rows = 0
+        self.failed_rows = 0
+        self.max_batch_rows = 0
+        self.last_commit_ms = 0.0
+        self.max_commit_ms = 0.0
+
+        self._thread = threading.Thread(target=self._run, name="result-group-commit", daemon=True)
+        self._thread.start()
+
+    def submit(self, pipeline_id: int, values: dict[str, Any]) -> Future:
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("识别结果写入线程已关闭")
+            self._queue.put((pipeline_id, values, future))
+        return future
+
+    def write(self, pipeline_id: int, values: dict[str, Any], timeout: float | None = None) -> int:
+        """提交一条结果并等待所在批次提交完成，返回分配的主键"""
+        return self.submit(pipeline_id, values).result(timeout)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def close(self, timeout: float | None = None) -> None:
+        """停止接收新结果，并等待队列中已有结果全部提交"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "queue_depth": self.queue_depth,
+            "batch_count": self.batch_count,
+            "committed_rows": self.committed_rows,
+            "failed_rows": self.failed_rows,
+            "max_batch_rows": self.max_batch_rows,
+            "avg_batch_rows": round(self.committed_rows / self.batch_count, 2) if self.batch_count else 0.0,
+            "last_commit_ms": round(self.last_commit_ms, 3),
+            "max_commit_ms": round(self.max_commit_ms, 3),
+        }
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_rows:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._flush(batch)
+            if stop:
+                return
+
+    def _flush(self, batch: list[tuple[int, dict[str, Any], Future]]) -> None:
+        started = time.perf_counter()
+        try:
+            ids = self.commit([(pipeline_id, values) for pipeline_id, values, _ in batch])
+        except Exception as exc:
+            logger.warning(f"识别结果批量提交失败，逐条重试: 行数={len(batch)}, 错误={exc}")
+            self._flush_each(batch)
+            return
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        for (_, _, future), result_id in zip(batch, ids):
+            future.set_result(result_id)
+        self.batch_count += 1
+        self.committed_rows += len(batch)
+        self.max_batch_rows = max(self.max_batch_rows, len(batch))
+        self.last_commit_ms = elapsed_ms
+        self.max_commit_ms = max(self.max_commit_ms, elapsed_ms)
+        logger.debug(f"识别结果批量提交完成: 行数={len(batch)}, 耗时={elapsed_ms:.1f}ms")
+
+    def _flush_each(self, batch: list[tuple[int, dict[str, Any], Future]]) -> None:
+        for pipeline_id, values, future in batch:
+            try:
+                (result_id,) = self.commit([(pipeline_id, values)])
+            except Exception as exc:
+                self.failed_rows += 1
+                future.set_exception(exc)
+            else:
+                self.batch_count += 1
+                self.committed_rows += 1
+                future.set_result(result_id)
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Sequence
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.logger import get_logger
+from app.models.pipeline import Pipeline, RecognitionResult
+from app.schemas.pipeline import RecognitionResponse
+from app.services.label_template import CompiledTemplate, select_template
+from app.services.ocr_service import OcrService, OcrServiceError, get_ocr_service
+from app.core.metrics import stage_timer
+from app.services.parser_service import parse_ocr_payload
+from app.utils.image_hash import dhash
+
+logger = get_logger("services.scan")
+
+
+class ScanItemError(Exception):
+    """批量扫描中单张图片的失败（不影响其他图片）"""
+
+
+def recognition_response(pipeline: Pipeline, result: RecognitionResult, filename: str | None) -> RecognitionResponse:
+    """/scan、/scan/batch 与扫描任务查询共用的识别结果响应"""
+    return RecognitionResponse(
+        pipeline_id=pipeline.id if pipeline.id is not None else 0,  # type: ignore,
+        pipeline_code=pipeline.code,
+        material_code=result.material_code,
+        quantity=result.quantity,
+        batch=result.batch,
+        date=result.date,
+        brand=result.brand,
+        electrical_characteristics=result.electrical_characteristics,
+        raw_ocr_text=result.raw_ocr_text or "",
+        image_filename=result.image_filename or filename or "",  # type: ignore,
+        scan_time=result.recognized_at,
+        result_id=result.id,
+        duplicate_of=result.duplicate_of,
+    )
+
+
+def build_db_payload(
+    ocr_payload: dict[str, Any],
+    filename: str | None,
+    templates: Sequence[CompiledTemplate] = (),
+    image: bytes | None = None,
+) -> dict[str, Any]:
+    """解析 OCR 结果并转换为 RecognitionResult 字段；templates 为流水线的标签模板（按优先级）
+
+    传入原图时计算感知哈希（image_hash），用于重复扫描检测。
+    """
+    # 在线识别路径在这里计时；重新解析（reparse）的批量解析不计入 parse 阶段
+    with stage_timer("parse"):
+        template = select_template(templates, ocr_payload.get("raw_ocr_text") or "")
+        normalized = parse_ocr_payload(ocr_payload, template=template)
+    normalized.setdefault("raw_ocr_text", "")
+    normalized.setdefault("image_filename", filename)
+    scan_time = datetime.utcnow()
+    normalized.setdefault("scan_time", scan_time)
+    normalized.setdefault("recognized_at", scan_time)
+
+    image_hash = None
+    if image:
+        with stage_timer("image_hash"):
+            image_hash = dhash(image)
+
+    return {
+        "material_code": normalized.get("material_code"),
+        "quantity": normalized.get("quantity"),
+        "batch": normalized.get("batch"),
+        "date": normalized.get("date"),
+        "brand": normalized.get("brand"),
+        "electrical_characteristics": normalized.get("electrical_characteristics"),
+        "raw_ocr_text": normalized.get("raw_ocr_text"),
+        "image_filename": normalized.get("image_filename"),
+        "recognized_at": scan_time,  # 确保是 datetime 对象而不是字符串
+        "image_hash": image_hash,
+    }
+
+
+async def recognize_batch(
+    items: Sequence[tuple[int, str, Callable[[], Awaitable[bytes]]]],
+    concurrency: int,
+    ocr_client: OcrService | None = None,
+    templates: Sequence[CompiledTemplate] = (),
+) -> AsyncIterator[tuple[int, str, dict[str, Any] | None, str | None]]:
+    """并发识别多张图片，按完成顺序产出 (序号, 文件名, 数据库字段, 错误信息)
+
+    items 中的读取函数在获得并发名额后才调用，同一时刻驻留内存的图片数不超过 concurrency；
+    解析在线程池中并行执行，不阻塞事件循环。
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    ocr_client = ocr_client or get_ocr_service()
+
+    async def run(index: int, filename: str, read: Callable[[], Awaitable[bytes]]):
+        try:
+            async with semaphore:
+                content = await read()
+                ocr_payload = await ocr_client.classify_and_recognize_async(content, filename)
+            db_payload = await run_in_threadpool(build_db_payload, ocr_payload, filename, templates, content)
+            return index, filename, db_payload, None
+        except (OcrServiceError, ScanItemError) as exc:
+            logger.warning(f"批量扫描单张失败: 序号={index}, 文件名={filename}, 错误={exc}")
+            return index, filename, None, str(exc)
+        except Exception as exc:
+            logger.error(f"批量扫描单张处理异常: 序号={index}, 文件名={filename}, 错误={exc}")
+            return index, filename, None, f"处理异常: {exc}"
+
+    tasks = [asyncio.create_task(run(index, filename, read)) for index, filename, read in items]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import time
+from typing import Any
+
+from sqlalchemy import DateTime, text
+
+from app.core.logger import get_logger
+from app.db.session import get_session
+
+logger = get_logger("services.search")
+
+FTS_TABLE = "recognition_results_fts"
+# trigram 分词：少于 3 个字符的词无法走索引
+MIN_TERM_LENGTH = 3
+FTS_COLUMNS = ("raw_ocr_text", "material_code", "batch", "brand", "electrical_characteristics")
+# bm25 列权重，与 FTS_COLUMNS 一一对应：命中结构化字段比命中整段原文更相关
+FTS_WEIGHTS = (1.0, 10.0, 8.0, 2.0, 4.0)
+
+SEARCH_FIELDS = ("id", "pipeline_id", "material_code", "batch", "date", "brand", "image_filename", "recognized_at")
+
+
+class SearchQueryError(ValueError):
+    """搜索内容不合法（为空或含过短的词）"""
+
+
+def parse_query(query: str) -> tuple[str, list[str]]:
+    """把用户输入转换为 (FTS5 MATCH 表达式, 短词列表)
+
+    按空白拆词，词之间为 AND。不少于 MIN_TERM_LENGTH 个字符的词作为短语（子串）交给倒排索引；
+    更短的词（如两个汉字）无法走 trigram 索引，在索引命中的行上再按子串过滤，因此至少要有一个长词。
+    词内的引号转义后原样匹配，用户输入不会被当作 FTS5 语法解析。
+    """
+    terms = query.split()
+    if not terms:
+        raise SearchQueryError("搜索内容不能为空")
+    long_terms = [term for term in terms if len(term) >= MIN_TERM_LENGTH]
+    if not long_terms:
+        raise SearchQueryError(f"至少需要一个不少于 {MIN_TERM_LENGTH} 个字符的搜索词")
+    short_terms = [term for term in terms if len(term) < MIN_TERM_LENGTH]
+    match = " AND ".join('"' + term.replace('"', '""') + '"' for term in long_terms)
+    return match, short_terms
+
+
+def _like_pattern(term: str) -> str:
+    return "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def search_statement(pipeline_id: int | None = None, short_terms: int = 0):
+    """按相关度排序的检索语句，参数 :query / :limit / :offset（及 :pipeline_id、短词 :term0...）
+
+    CROSS JOIN 固定以 FTS 索引为外层：先由倒排索引得到命中行，再按主键回表并过滤流水线与短词，
+    不会退化为按流水线逐行扫描。
+    """
+    weights = ", ".join(str(weight) for weight in FTS_WEIGHTS)
+    columns = ", ".join(f"r.{field}" for field in SEARCH_FIELDS)
+    conditions = [f"{FTS_TABLE} MATCH :query"]
+    if pipeline_id is not None:
+        conditions.append("r.pipeline_id = :pipeline_id")
+    for index in range(short_terms):
+        conditions.append(
+            "(" + " OR ".join(f"r.{column} LIKE :term{index} ESCAPE '\\'" for column in FTS_COLUMNS) + ")"
+        )
+    return text(
+        f"SELECT {columns}, "
+        f"snippet({FTS_TABLE}, -1, '[', ']', '…', 64) AS snippet, "
+        f"bm25({FTS_TABLE}, {weights}) AS rank "
+        f"FROM {FTS_TABLE} CROSS JOIN recognition_results AS r ON r.id = {FTS_TABLE}.rowid "
+        f"WHERE {' AND '.join(conditions)} "
+        "ORDER BY rank, r.id LIMIT :limit OFFSET :offset"
+    ).columns(recognized_at=DateTime)
+
+
+def search_results(
+    query: str,
+    *,
+    pipeline_id: int | None = None,
+    limit: int = 20,
+    offset: int = 0,
+) -> tuple[list[dict[str, Any]], int | None]:
+    """全文检索识别结果，返回 (命中行, 下一页 offset)
+
+    每行包含 SEARCH_FIELDS、带 [ ] 标记命中位置的 snippet，以及 score（越大越相关）。
+    """
+    match, short_terms = parse_query(query)
+    params: dict[str, Any] = {"query": match, "limit": limit + 1, "offset": offset}
+    if pipeline_id is not None:
+        params["pipeline_id"] = pipeline_id
+    for index, term in enumerate(short_terms):
+        params[f"term{index}"] = _like_pattern(term)
+
+    started = time.perf_counter()
+    with get_session() as session:
+        rows = session.exec(search_statement(pipeline_id, len(short_terms)), params=params).mappings().all()  # type: ignore[call-overload]
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    items = []
+    for row in rows[:limit]:
+        item = {field: row[field] for field in SEARCH_FIELDS}
+        item["snippet"] = row["snippet"]
+        item["score"] = -row["rank"]
+        items.append(item)
+    next_offset = offset + limit if len(rows) > limit else None
+    logger.debug(f"全文检索: q={query!r}, 流水线={pipeline_id}, 返回 {len(items)} 条, 耗时 {elapsed_ms:.1f}ms")
+    return items, next_offset
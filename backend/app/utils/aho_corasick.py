@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import re
+from collections import deque
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class AhoCorasick(Generic[T]):
+    """多模式字符串匹配自动机
+
+    build() 之后对文本只做一次线性扫描即可找出所有模式（含重叠）的出现位置，
+    耗时与文本长度和命中数成正比，与词典大小无关。
+    """
+
+    def __init__(self) -> None:
+        self._children: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._output: list[tuple[int, ...]] = [()]
+        self._patterns: list[tuple[int, T]] = []
+        # 展开后的转移表：包含沿失败链（不含根）可达的转移；未命中时退回根状态的转移
+        self._delta: list[dict[str, int]] = []
+        self._root_skip: re.Pattern[str] | None = None
+        self._built = False
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    def add(self, pattern: str, value: T) -> None:
+        if not pattern:
+            raise ValueError("模式不能为空")
+        if self._built:
+            raise RuntimeError("自动机已构建，不能再添加模式")
+        state = 0
+        for ch in pattern:
+            next_state = self._children[state].get(ch)
+            if next_state is None:
+                next_state = len(self._children)
+                self._children[state][ch] = next_state
+                self._children.append({})
+                self._fail.append(0)
+                self._output.append(())
+            state = next_state
+        self._output[state] += (len(self._patterns),)
+        self._patterns.append((len(pattern), value))
+
+    def build(self) -> "AhoCorasick[T]":
+        """按层次计算失败指针，合并失败状态的输出与转移（扫描时无需逐级回溯失败链）"""
+        children, fail, output = self._children, self._fail, self._output
+        root = children[0]
+        delta: list[dict[str, int]] = [{} for _ in children]
+        queue = deque(root.values())
+        while queue:
+            state = queue.popleft()
+            # 失败状态层次更浅，转移表已展开
+            delta[state] = {**delta[fail[state]], **children[state]}
+            for ch, next_state in children[state].items():
+                queue.append(next_state)
+                fail[next_state] = delta[fail[state]].get(ch) or root.get(ch, 0)
+                output[next_state] += output[fail[next_state]]
+        delta[0] = {}
+        self._delta = delta
+        # 处于根状态时，用正则（C 层扫描）直接跳到下一个可能开始匹配的位置：
+        # 取最短模式长度内（至多 3 个字符）各位置可能出现的字符集合，逐位置检查
+        if self._patterns:
+            width = min(3, min(size for size, _ in self._patterns))
+            classes = [set() for _ in range(width)]
+            for chars in self._prefixes(width):
+                for position, ch in enumerate(chars):
+                    classes[position].add(ch)
+            sets = ["[" + re.escape("".join(sorted(chars))) + "]" for chars in classes]
+            lookahead = f"(?={''.join(sets[1:])})" if width > 1 else ""
+            self._root_skip = re.compile(sets[0] + lookahead)
+        self._built = True
+        return self
+
+    def _prefixes(self, width: int) -> list[str]:
+        """各模式的前 width 个字符（沿 trie 遍历 width 层）"""
+        prefixes = [("", 0)]
+        for _ in range(width):
+            prefixes = [
+                (prefix + ch, child)
+                for prefix, state in prefixes
+                for ch, child in self._children[state].items()
+            ]
+        return [prefix for prefix, _ in prefixes]
+
+    def find_all(self, text: str) -> list[tuple[int, int, T]]:
+        """返回全部 (start, end, value)，按结束位置排序"""
+        if not self._built:
+            self.build()
+        matches: list[tuple[int, int, T]] = []
+        if self._root_skip is None:
+            return matches
+        delta, output, patterns = self._delta, self._output, self._patterns
+        root = self._children[0]
+        search = self._root_skip.search
+        length = len(text)
+        i = 0
+        while i < length:
+            found = search(text, i)
+            if found is None:
+                break
+            i = found.start()
+            state = root[text[i]]
+            i += 1
+            while True:
+                for index in output[state]:
+                    size, value = patterns[index]
+                    matches.append((i - size, i, value))
+                if i >= length:
+                    break
+                ch = text[i]
+                state = delta[state].get(ch) or root.get(ch, 0)
+                if not state:
+                    break
+                i += 1
+        return matches
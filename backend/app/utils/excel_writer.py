@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+import os
+import tempfile
 from datetime import datetime
 from pathlib import Path
-from typing import cast
+from typing import Iterable, cast
 
 from openpyxl import Workbook, load_workbook
 from openpyxl.worksheet.worksheet import Worksheet
@@ -20,34 +22,73 @@ HEADER = [
     "图片文件名",
 ]
 
+SHEET_TITLE = "识别记录"
+
+
+def _row_values(index: int, result) -> list:
+    return [
+        index,
+        result.recognized_at.strftime("%Y-%m-%d %H:%M:%S"),
+        result.material_code,
+        result.quantity,
+        result.batch,
+        result.date,
+        result.brand,
+        result.electrical_characteristics,
+        result.raw_ocr_text,
+        result.image_filename,
+    ]
+
 
 def initialize_excel(path: Path) -> None:
     wb = Workbook()
     ws = cast(Worksheet, wb.active)
-    ws.title = "识别记录"
+    ws.title = SHEET_TITLE
     ws.append(HEADER)
     wb.save(path)
 
 
 def append_result(path: Path, result) -> None:
+    append_results(path, [result])
+
+
+def append_results(path: Path, results: Iterable) -> int:
+    """一次 load/save 追加多条结果，返回追加的行数"""
     if not path.exists():
         initialize_excel(path)
 
     wb = load_workbook(path)
     ws = cast(Worksheet, wb.active)
-    next_index = ws.max_row
-    ws.append(
-        [
-            next_index,
-            result.recognized_at.strftime("%Y-%m-%d %H:%M:%S"),
-            result.material_code,
-            result.quantity,
-            result.batch,
-            result.date,
-            result.brand,
-            result.electrical_characteristics,
-            result.raw_ocr_text,
-            result.image_filename,
-        ]
-    )
-    wb.save(path)
\ No newline at end of file
+    count = 0
+    for result in results:
+        ws.append(_row_values(ws.max_row, result))
+        count += 1
+    if count:
+        wb.save(path)
+    return count
+
+
+def build_export(path: Path, results: Iterable) -> int:
+    """以 write-only 模式流式写出导出文件，内存占用与行数无关
+
+    先写入同目录下的临时文件再原子替换，避免并发下载读到半成品。
+    返回写入的数据行数。
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(SHEET_TITLE)
+    ws.append(HEADER)
+
+    count = 0
+    for count, result in enumerate(results, start=1):
+        ws.append(_row_values(count, result))
+
+    fd, tmp_name = tempfile.mkstemp(suffix=".xlsx", prefix=f".{path.stem}_", dir=path.parent)
+    os.close(fd)
+    try:
+        wb.save(tmp_name)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    return count
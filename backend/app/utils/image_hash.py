@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import io
+
+from PIL import ExifTags, Image
+
+from app.core.logger import get_logger
+from app.utils.image_preprocess import DECODE_ERRORS, ORIENTATION_TRANSPOSE
+
+logger = get_logger("utils.image_hash")
+
+HASH_SIZE = 8
+_MASK = (1 << 64) - 1
+
+
+def dhash(image_bytes: bytes) -> int | None:
+    """计算图片的 64 位差值哈希（dHash），无法解码时返回 None
+
+    缩放为 9x8 灰度图，逐行比较相邻像素的明暗。同一盘卷重复拍摄（轻微的曝光、压缩差异）哈希只差几位，
+    不同内容的图片约一半位不同。JPEG 在解码时即按 1/8 缩放，耗时主要是熵解码，12MP 手机照片约 40ms。
+    返回值按有符号 64 位整数表示，可直接存入 SQLite INTEGER 列。
+    """
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        orientation = image.getexif().get(ExifTags.Base.Orientation, 1)
+        image.draft("L", (HASH_SIZE * 8, HASH_SIZE * 8))
+        image = image.convert("L")
+    except DECODE_ERRORS as exc:
+        logger.warning(f"图片无法解码，跳过感知哈希: {exc}")
+        return None
+
+    method = ORIENTATION_TRANSPOSE.get(orientation)
+    if method is not None:
+        image = image.transpose(method)
+    pixels = image.resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.BOX).tobytes()
+
+    value = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for col in range(HASH_SIZE):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def hamming_distance(left: int, right: int) -> int:
+    return ((left ^ right) & _MASK).bit_count()
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import io
+import threading
+import time
+from typing import Any
+
+from PIL import ExifTags, Image, UnidentifiedImageError
+
+from app.core.logger import get_logger
+
+logger = get_logger("utils.image_preprocess")
+
+STAGES = ("decode", "resize", "orient", "grayscale", "encode")
+
+# EXIF Orientation → 对应的转置操作（与 ImageOps.exif_transpose 一致）
+ORIENTATION_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+SUPPORTED_FORMATS = ("JPEG", "WEBP")
+# 解码上传图片时可能抛出的异常：格式无法识别、数据截断（OSError），超大像素数（DecompressionBombError），
+# 以及构造的畸形文件在各解码器中触发的 ValueError / SyntaxError
+DECODE_ERRORS = (UnidentifiedImageError, OSError, ValueError, SyntaxError, Image.DecompressionBombError)
+
+
+class ImagePreprocessor:
+    """OCR 前的图片预处理：缩放到最长边 → EXIF 方向校正 → 可选灰度 → 按质量重新编码
+
+    手机照片动辄 4~12MB，而标签文字识别不需要原始分辨率；压缩后 Base64 请求体与上游耗时都显著下降。
+    无法解码、或处理后反而更大的图片保持原样发送。
+    """
+
+    def __init__(
+        self,
+        max_long_edge: int = 2048,
+        grayscale: bool = False,
+        fmt: str = "JPEG",
+        quality: int = 85,
+    ):
+        fmt = fmt.upper()
+        if fmt not in SUPPORTED_FORMATS:
+            raise ValueError(f"不支持的预处理输出格式: {fmt}")
+        self.max_long_edge = max(1, max_long_edge)
+        self.grayscale = grayscale
+        self.fmt = fmt
+        self.quality = min(max(1, quality), 100)
+
+        self._lock = threading.Lock()
+        self.processed = 0
+        self.passthrough = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.stage_ms = {stage: 0.0 for stage in STAGES}
+
+    def options(self) -> dict[str, Any]:
+        """影响输出的参数，参与 OCR 缓存键计算"""
+        return {
+            "max_long_edge": self.max_long_edge,
+            "grayscale": self.grayscale,
+            "format": self.fmt,
+            "quality": self.quality,
+        }
+
+    def process(self, image_bytes: bytes) -> tuple[bytes, dict[str, Any]]:
+        """返回 (发送给 OCR 的图片, 各阶段耗时与尺寸信息)"""
+        timings: dict[str, float] = {}
+        started = time.perf_counter()
+
+        def lap(stage: str) -> None:
+            nonlocal started
+            now = time.perf_counter()
+            timings[stage] = (now - started) * 1000
+            started = now
+
+        try:
+            image = Image.open(io.BytesIO(image_bytes))
+            original_format = image.format
+            original_size = image.size
+            if original_format == "JPEG":
+                # JPEG 可在解码时按 1/2、1/4、1/8 缩放，避免完整解码超大照片
+                image.draft("RGB", self._target_size(image.size))
+            image.load()
+            lap("decode")
+        except DECODE_ERRORS as exc:
+            logger.warning(f"图片无法解码，跳过预处理: {exc}")
+            return self._passthrough(image_bytes, timings)
+
+        changed = False
+        orientation = image.getexif().get(ExifTags.Base.Orientation, 1)
+        target = self._target_size(image.size)
+        if target != image.size:
+            # 最长边与方向无关，先缩小再旋转，旋转的像素量更少
+            image = image.resize(target, Image.Resampling.LANCZOS, reducing_gap=3.0)
+            changed = True
+        lap("resize")
+
+        method = ORIENTATION_TRANSPOSE.get(orientation)
+        if method is not None:
+            image = image.transpose(method)
+            changed = True
+        lap("orient")
+
+        if self.grayscale and image.mode != "L":
+            image = image.convert("L")
+            changed = True
+        elif image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        lap("grayscale")
+
+        if not changed and original_format == self.fmt and image.size == original_size:
+            return self._passthrough(image_bytes, timings)
+
+        buffer = io.BytesIO()
+        save_options: dict[str, Any] = {"quality": self.quality}
+        if self.fmt == "JPEG":
+            save_options["optimize"] = True
+        else:
+            save_options["method"] = 4
+        image.save(buffer, format=self.fmt, **save_options)
+        output = buffer.getvalue()
+        lap("encode")
+
+        if len(output) >= len(image_bytes):
+            return self._passthrough(image_bytes, timings)
+
+        info = {
+            "preprocessed": True,
+            "bytes_in": len(image_bytes),
+            "bytes_out": len(output),
+            "size_in": original_size,
+            "size_out": image.size,
+            "timings_ms": {stage: round(ms, 3) for stage, ms in timings.items()},
+        }
+        self._record(len(image_bytes), len(output), timings, preprocessed=True)
+        logger.info(
+            f"图片预处理完成: {original_size[0]}x{original_size[1]} → {image.size[0]}x{image.size[1]}, "
+            f"{len(image_bytes)} → {len(output)} bytes, 耗时={sum(timings.values()):.1f}ms"
+        )
+        return output, info
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "processed": self.processed,
+                "passthrough": self.passthrough,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "stage_ms": {stage: round(ms, 3) for stage, ms in self.stage_ms.items()},
+            }
+
+    def _target_size(self, size: tuple[int, int]) -> tuple[int, int]:
+        width, height = size
+        long_edge = max(width, height)
+        if long_edge <= self.max_long_edge:
+            return size
+        scale = self.max_long_edge / long_edge
+        return max(1, round(width * scale)), max(1, round(height * scale))
+
+    def _passthrough(self, image_bytes: bytes, timings: dict[str, float]) -> tuple[bytes, dict[str, Any]]:
+        self._record(len(image_bytes), len(image_bytes), timings, preprocessed=False)
+        return image_bytes, {
+            "preprocessed": False,
+            "bytes_in": len(image_bytes),
+            "bytes_out": len(image_bytes),
+            "timings_ms": {stage: round(ms, 3) for stage, ms in timings.items()},
+        }
+
+    def _record(self, bytes_in: int, bytes_out: int, timings: dict[str, float], preprocessed: bool) -> None:
+        with self._lock:
+            if preprocessed:
+                self.processed += 1
+            else:
+                self.passthrough += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            for stage, ms in timings.items():
+                self.stage_ms[stage] += ms
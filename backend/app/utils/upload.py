@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+# 分块读取大小；Starlette 已把超过 1MB 的上传文件落到 SpooledTemporaryFile 的磁盘部分
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLargeError(Exception):
+    """上传文件超过大小限制"""
+
+
+async def read_upload(upload: UploadFile, max_bytes: int, chunk_size: int = UPLOAD_CHUNK_SIZE) -> bytes:
+    """读取上传文件，超过 max_bytes 时尽早中止，不把超限文件整体读入内存"""
+    if upload.size is not None:
+        if upload.size > max_bytes:
+            raise UploadTooLargeError(f"{upload.size} > {max_bytes}")
+        # 大小已知且未超限：一次读入，只产生一份副本
+        return await upload.read()
+
+    chunks: list[bytes] = []
+    total = 0
+    while chunk := await upload.read(chunk_size):
+        total += len(chunk)
+        if total > max_bytes:
+            raise UploadTooLargeError(f"> {max_bytes}")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+async def save_upload(
+    upload: UploadFile,
+    destination: Path,
+    max_bytes: int,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+) -> int:
+    """把上传文件分块写入 destination，内存中最多驻留一个分块；超限时删除已写入部分"""
+    if upload.size is not None and upload.size > max_bytes:
+        raise UploadTooLargeError(f"{upload.size} > {max_bytes}")
+
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    total = 0
+    handle = await run_in_threadpool(destination.open, "wb")
+    try:
+        while chunk := await upload.read(chunk_size):
+            total += len(chunk)
+            if total > max_bytes:
+                raise UploadTooLargeError(f"> {max_bytes}")
+            await run_in_threadpool(handle.write, chunk)
+    except BaseException:
+        handle.close()
+        destination.unlink(missing_ok=True)
+        raise
+    handle.close()
+    return total
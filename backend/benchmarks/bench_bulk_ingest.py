@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""外部系统推送吞吐基准测试：逐条 POST /scan-result 与批量 POST /scan-results/bulk
+
+通过 TestClient 走完整的 HTTP 路由、校验与入库流程，数据库放在临时目录。
+默认关闭实时 Excel 同步（两种方式都只是把结果放入后台写入队列，对比的是接口与入库部分）。
+
+用法（在 backend 目录下）：
+    python benchmarks/bench_bulk_ingest.py --items 5000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+_tmp = tempfile.TemporaryDirectory()
+os.environ["SQLITE_PATH"] = str(Path(_tmp.name) / "bench.db")
+os.environ["PIPELINES_ROOT"] = str(Path(_tmp.name) / "pipelines")
+os.environ["EXPORTS_ROOT"] = str(Path(_tmp.name) / "exports")
+os.environ["JOBS_ROOT"] = str(Path(_tmp.name) / "jobs")
+os.environ.setdefault("EXCEL_LIVE_SYNC", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("ENABLE_FILE_LOGGING", "false")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+
+
+def make_item(index: int) -> dict:
+    return {
+        "material_code": f"SL-IND-1008-{index % 1000:03d}",
+        "quantity": 4000,
+        "batch": f"B{index:06d}",
+        "date": "2025-11-30",
+        "brand": "Sunlord",
+        "electrical_characteristics": "L=10uH±10%",
+        "raw_ocr_text": "Sunlord SL-IND-1008-100\nQty: 4,000\nBatch: B2511A\nDate: 2025-11-30\n" * 4,
+        "image_filename": f"reel_{index}.jpg",
+        "scan_time": "2025-11-30T12:00:00",
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="批量推送吞吐基准测试")
+    parser.add_argument("--items", type=int, default=5000, help="推送条数")
+    parser.add_argument("--single-items", type=int, default=1000, help="逐条接口推送条数（较慢，可少于 --items）")
+    args = parser.parse_args()
+
+    items = [make_item(index) for index in range(args.items)]
+    with TestClient(app) as client:
+        pipeline = client.post("/api/v1/pipelines", json={"name": "bench"}).json()
+        print(f"{'mode':>14}{'items':>8}{'seconds':>10}{'items/s':>10}")
+
+        started = time.perf_counter()
+        for item in items[: args.single_items]:
+            response = client.post(f"/api/v1/scan-result?pipeline_id={pipeline['id']}", json=item)
+            assert response.status_code == 201, response.text
+        elapsed = time.perf_counter() - started
+        single_rate = args.single_items / elapsed
+        print(f"{'single':>14}{args.single_items:>8}{elapsed:>10.2f}{single_rate:>10.0f}")
+
+        for mode in ("bulk json", "bulk ndjson"):
+            if mode == "bulk json":
+                request = {"json": items}
+            else:
+                body = "\n".join(json.dumps(item, ensure_ascii=False) for item in items).encode("utf-8")
+                request = {"content": body, "headers": {"Content-Type": "application/x-ndjson"}}
+            started = time.perf_counter()
+            response = client.post(f"/api/v1/scan-results/bulk?pipeline_id={pipeline['id']}", **request)
+            elapsed = time.perf_counter() - started
+            data = response.json()
+            assert data["succeeded"] == args.items, data
+            rate = args.items / elapsed
+            print(f"{mode:>14}{args.items:>8}{elapsed:>10.2f}{rate:>10.0f}  ({rate / single_rate:.0f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""品牌词典匹配基准测试：词典规模增大时每条标签的耗时
+
+对比原先逐个品牌 `in` 判断（耗时随品牌数线性增长）与 Aho-Corasick 词典（一次扫描，与词典大小无关）。
+词典由内置品牌加随机生成的厂商名/中文别名补足到指定规模，文本取 benchmarks/corpus/labels.jsonl。
+
+用法（在 backend 目录下）：
+    python benchmarks/bench_dictionary.py --sizes 5 50 500 5000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.label_dictionary import LabelDictionary  # noqa: E402
+from app.services.parser_service import BRANDS  # noqa: E402
+
+CORPUS = Path(__file__).resolve().parent / "corpus" / "labels.jsonl"
+
+
+def make_brands(size: int, seed: int = 20251201) -> dict[str, list[str]]:
+    rng = random.Random(seed)
+    brands: dict[str, list[str]] = {brand: [] for brand in BRANDS}
+    while len(brands) < size:
+        name = "".join(rng.choices("ABCDEFGHIJKLMNOPQRSTUVWXYZ", k=rng.randint(4, 10))).title()
+        brands[name] = ["".join(rng.choices("顺络村田威世线艺国巨风华电子", k=rng.randint(2, 4)))]
+    return brands
+
+
+def per_label_us(func, texts: list[str], number: int) -> float:
+    best = min(timeit.repeat(lambda: [func(text) for text in texts], number=number, repeat=5))
+    return best / number / len(texts) * 1e6
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="品牌词典匹配基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 50, 500, 5000], help="品牌数")
+    parser.add_argument("--number", type=int, default=50, help="每次计时遍历语料的轮数")
+    args = parser.parse_args()
+
+    with CORPUS.open(encoding="utf-8") as f:
+        texts = [json.loads(line)["raw_ocr_text"] for line in f if line.strip()]
+
+    print(f"语料: {len(texts)} 条，单位 µs/条（5 次取最快）")
+    print(f"{'brands':>8}{'aliases':>10}{'legacy in':>12}{'find_brand':>12}{'find_all':>12}")
+    for size in args.sizes:
+        brands = make_brands(size)
+        patterns = [alias.upper() for name, aliases in brands.items() for alias in (name, *aliases)]
+
+        def legacy(text: str, patterns: list[str] = patterns) -> str | None:
+            text_upper = text.upper()
+            return next((alias for alias in patterns if alias in text_upper), None)
+
+        dictionary = LabelDictionary(brands)
+        print(
+            f"{len(brands):>8}{len(dictionary):>10}"
+            f"{per_label_us(legacy, texts, args.number):>12.1f}"
+            f"{per_label_us(dictionary.find_brand, texts, args.number):>12.1f}"
+            f"{per_label_us(dictionary.find_all, texts, args.number):>12.1f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""重复扫描检测基准测试：入库查重（find_duplicate）的延迟随表大小的变化，以及图片感知哈希的耗时
+
+分阶段向临时数据库写入合成识别结果（带指纹与图片哈希，识别时间按扫描节奏递增），
+每个阶段对命中（窗口内有同一盘卷）与未命中（新盘卷）各做 --probes 次查重，输出中位数与 p99。
+查重落在 (pipeline_id, fingerprint, recognized_at) 索引的一个区间上，延迟应与总行数基本无关。
+
+用法（在 backend 目录下）：
+    python benchmarks/bench_duplicates.py --rows 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from PIL import Image  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+from sqlmodel import Session  # noqa: E402
+
+from app.db.session import create_sqlite_engine, upgrade_database  # noqa: E402
+from app.services.duplicate_service import find_duplicate, result_fingerprint  # noqa: E402
+from app.utils.image_hash import dhash  # noqa: E402
+
+START = datetime(2025, 1, 1)
+WINDOW_SECONDS = 600
+
+
+def make_row(rng: random.Random, index: int, pipelines: int) -> dict:
+    code = f"SL-IND-{rng.randint(1000, 9999)}-{rng.randint(100, 999)}"
+    # 同一批次连续多盘：批次号每 20 行变化一次，数量相同，只有图片不同
+    batch = f"B{index // 20:07d}"
+    return {
+        "pipeline_id": index % pipelines + 1,
+        "material_code": code,
+        "batch": batch,
+        "quantity": 4000,
+        "date": "2025-11-30",
+        "fingerprint": result_fingerprint(code, batch, 4000, "2025-11-30"),
+        "image_hash": rng.getrandbits(64) - (1 << 63),
+        "recognized_at": START + timedelta(seconds=index * 2),
+    }
+
+
+def percentile(samples: list[float], q: float) -> float:
+    return sorted(samples)[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="重复扫描检测基准测试")
+    parser.add_argument("--rows", type=int, default=200_000, help="识别结果总条数")
+    parser.add_argument("--stages", type=int, default=3, help="分几个数量级测量（每级 10 倍）")
+    parser.add_argument("--pipelines", type=int, default=10, help="流水线数")
+    parser.add_argument("--probes", type=int, default=2000, help="每个阶段的查重次数")
+    parser.add_argument("--dir", type=Path, default=None, help="数据库所在目录")
+    args = parser.parse_args()
+
+    # 放大的低分辨率噪声，体积（约 2.7MB）接近手机拍摄的 12MP 照片；JPEG 熵解码耗时与文件体积成正比
+    photo = io.BytesIO()
+    Image.effect_noise((500, 375), 60).resize((4000, 3000)).convert("RGB").save(photo, format="JPEG", quality=90)
+    started = time.perf_counter()
+    for _ in range(20):
+        dhash(photo.getvalue())
+    elapsed_ms = (time.perf_counter() - started) / 20 * 1000
+    print(f"dHash 12MP JPEG（{len(photo.getvalue()) // 1024}KB）: {elapsed_ms:.1f}ms/张")
+
+    rng = random.Random(42)
+    checkpoints = sorted({max(1, args.rows // 10**stage) for stage in range(args.stages)})
+    insert = text(
+        "INSERT INTO recognition_results (pipeline_id, material_code, batch, quantity, date, fingerprint, image_hash, "
+        "recognized_at) VALUES (:pipeline_id, :material_code, :batch, :quantity, :date, :fingerprint, :image_hash, "
+        ":recognized_at)"
+    )
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        engine = create_sqlite_engine(Path(tmp) / "duplicates.db")
+        upgrade_database(engine)
+        with engine.begin() as conn:
+            conn.exec_driver_sql(
+                "INSERT INTO pipelines (id, code, name, excel_path, created_at) "
+                + " UNION ALL ".join(
+                    f"SELECT {i}, 'line_{i}', 'line_{i}', 'line_{i}.xlsx', '2025-11-30'" for i in range(1, args.pipelines + 1)
+                )
+            )
+
+        written: list[dict] = []
+        print(f"{'rows':>10}{'probe':>8}{'p50 ms':>10}{'p99 ms':>10}{'found':>8}")
+        for checkpoint in checkpoints:
+            while len(written) < checkpoint:
+                chunk = [make_row(rng, index, args.pipelines) for index in range(len(written), min(checkpoint, len(written) + 10_000))]
+                with engine.begin() as conn:
+                    conn.execute(insert, chunk)
+                written.extend(
+                    {key: row[key] for key in ("pipeline_id", "fingerprint", "image_hash", "recognized_at")} for row in chunk
+                )
+
+            with Session(engine) as session:
+                for probe in ("hit", "miss"):
+                    samples = []
+                    found = 0
+                    for _ in range(args.probes):
+                        row = rng.choice(written)
+                        fingerprint = row["fingerprint"] if probe == "hit" else result_fingerprint("NEW", str(rng.random()), 1, None)
+                        started = time.perf_counter()
+                        original = find_duplicate(
+                            session, row["pipeline_id"], fingerprint, row["image_hash"] ^ 0b11,
+                            row["recognized_at"] + timedelta(seconds=30), WINDOW_SECONDS,
+                        )
+                        samples.append((time.perf_counter() - started) * 1000)
+                        found += original is not None
+                    print(
+                        f"{checkpoint:>10}{probe:>8}{statistics.median(samples):>10.3f}"
+                        f"{percentile(samples, 0.99):>10.3f}{found:>8}"
+                    )
+        engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
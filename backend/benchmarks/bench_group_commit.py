@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""识别结果组提交基准测试：大量并发扫描同时入库时的吞吐与单次入库延迟
+
+每个线程循环调用 pipeline_service.store_result（与扫描接口相同的入库路径），
+对比逐条提交（RESULT_GROUP_COMMIT=false）与组提交，在 wal / compat 两种 SQLite 配置档下分别运行。
+compat 配置档每次提交都要 fsync，最能体现组提交的效果。
+
+用法（在 backend 目录下）：
+    python benchmarks/bench_group_commit.py --threads 128 --seconds 5 --dir ./data
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("EXCEL_LIVE_SYNC", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("ENABLE_FILE_LOGGING", "false")
+
+from sqlmodel import Session, SQLModel  # noqa: E402
+
+from app.db import session as db_session  # noqa: E402
+from app.db.session import create_sqlite_engine, sqlite_pragmas  # noqa: E402
+from app.models.pipeline import Pipeline  # noqa: E402
+from app.services import pipeline_service  # noqa: E402
+
+RESULT = {
+    "material_code": "SL-IND-1008-100",
+    "quantity": 4000,
+    "batch": "B2511A",
+    "date": "2025-11-30",
+    "brand": "Sunlord",
+    "raw_ocr_text": "Sunlord SL-IND-1008-100\nQty: 4,000\nBatch: B2511A\nDate: 2025-11-30\n" * 6,
+    "image_filename": "reel.jpg",
+}
+
+
+def run(pipeline: Pipeline, threads: int, seconds: float) -> dict[str, float]:
+    stop = threading.Event()
+    lock = threading.Lock()
+    latencies: list[float] = []
+    errors = [0]
+
+    def worker() -> None:
+        local: list[float] = []
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                pipeline_service.store_result(pipeline, dict(RESULT))
+            except Exception:
+                with lock:
+                    errors[0] += 1
+                continue
+            local.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    pipeline_service.shutdown_result_writer()
+
+    ordered = sorted(latencies) or [0.0]
+    return {
+        "scans_per_s": len(latencies) / elapsed,
+        "p50_ms": statistics.median(ordered) * 1000,
+        "p99_ms": ordered[int(len(ordered) * 0.99)] * 1000,
+        "errors": errors[0],
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="识别结果组提交基准测试")
+    parser.add_argument("--threads", type=int, default=128, help="并发入库线程数")
+    parser.add_argument("--seconds", type=float, default=5, help="每种配置的运行时长")
+    parser.add_argument("--window-ms", type=float, default=2, help="组提交窗口")
+    parser.add_argument("--profiles", nargs="+", default=["wal", "compat"], help="SQLite 配置档")
+    parser.add_argument("--dir", type=Path, default=None, help="数据库所在目录（应在真实磁盘上）")
+    args = parser.parse_args()
+
+    settings = pipeline_service.settings
+    settings.result_group_commit_window_ms = args.window_ms
+    print(f"并发线程 {args.threads}，每种配置 {args.seconds}s，组提交窗口 {args.window_ms}ms")
+    print(f"{'profile':>8}{'group':>7}{'scans/s':>10}{'p50':>10}{'p99':>10}{'avg batch':>11}{'errors':>8}")
+    for profile in args.profiles:
+        for group_commit in (False, True):
+            with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+                # 每种配置使用独立数据库，get_session 在调用时读取模块级 engine
+                engine = create_sqlite_engine(
+                    Path(tmp) / "bench.db", sqlite_pragmas(profile), pool_size=args.threads, max_overflow=8
+                )
+                db_session.engine = engine
+                SQLModel.metadata.create_all(engine)
+                with Session(engine) as session:
+                    pipeline = Pipeline(code="bench", name="bench", excel_path=str(Path(tmp) / "bench.xlsx"))
+                    session.add(pipeline)
+                    session.commit()
+                    session.refresh(pipeline)
+
+                settings.result_group_commit = group_commit
+                writer_stats: dict = {}
+                if group_commit:
+                    writer = pipeline_service.get_result_writer()
+                    result = run(pipeline, args.threads, args.seconds)
+                    writer_stats = writer.stats()
+                else:
+                    result = run(pipeline, args.threads, args.seconds)
+                engine.dispose()
+
+            avg_batch = writer_stats.get("avg_batch_rows", 1.0)
+            print(
+                f"{profile:>8}{'on' if group_commit else 'off':>7}{result['scans_per_s']:>10.0f}"
+                f"{result['p50_ms']:>8.1f}ms{result['p99_ms']:>8.1f}ms{avg_batch:>11.1f}{result['errors']:>8}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""parser_service 基准测试：吞吐、延迟与逐字段准确率，并可与 JSON 基线对比
+
+语料 benchmarks/corpus/labels.jsonl 每行一个标签：
+    {"id", "vendor", "noisy", "raw_ocr_text", "expected": {字段: 期望值}}
+expected 为标签上的真实值（不是当前解析器的输出），准确率因此能反映解析能力的提升或退化。
+
+用法（在 backend 目录下）：
+    python benchmarks/bench_parser.py                 # 打印报告
+    python benchmarks/bench_parser.py --save          # 写入/更新基线
+    python benchmarks/bench_parser.py --check         # 与基线对比，退化时返回非 0
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import platform
+import re
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services import parser_service  # noqa: E402
+
+BENCH_DIR = Path(__file__).resolve().parent
+DEFAULT_CORPUS = BENCH_DIR / "corpus" / "labels.jsonl"
+DEFAULT_BASELINE = BENCH_DIR / "baselines" / "parser.json"
+
+FIELDS = ("material_code", "quantity", "batch", "date", "brand", "electrical_characteristics")
+
+# 单字段函数与端到端入口
+FUNCTIONS: dict[str, Callable[[str], Any]] = {
+    "extract_material_code": parser_service.extract_material_code,
+    "extract_quantity": parser_service.extract_quantity,
+    "extract_batch": parser_service.extract_batch,
+    "normalize_date": parser_service.normalize_date,
+    # extract_date 带结果缓存，这里测量未命中缓存的扫描耗时
+    "extract_date": parser_service.extract_date.__wrapped__,
+    "extract_brand": parser_service.extract_brand,
+    "extract_electrical_characteristics": parser_service.extract_electrical_characteristics,
+    "extract_fields": parser_service.extract_fields,
+    "parse_ocr_payload": lambda text: parser_service.parse_ocr_payload({"raw_ocr_text": text, "scan_time": ""}),
+}
+
+
+def load_corpus(path: Path) -> list[dict[str, Any]]:
+    with path.open(encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def time_function(func: Callable[[str], Any], texts: list[str], rounds: int, repeats: int) -> dict[str, float]:
+    """吞吐取 repeats 次中最快的一次（条/秒），p50/p99 为逐条单次延迟（微秒）"""
+    for text in texts:  # 预热
+        func(text)
+    clock = time.perf_counter_ns
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        best_ns = None
+        for _ in range(repeats):
+            started = clock()
+            for _ in range(rounds):
+                for text in texts:
+                    func(text)
+            elapsed = clock() - started
+            best_ns = elapsed if best_ns is None else min(best_ns, elapsed)
+
+        samples: list[int] = []
+        for _ in range(rounds):
+            for text in texts:
+                started = clock()
+                func(text)
+                samples.append(clock() - started)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    samples.sort()
+    return {
+        "labels_per_s": round(len(texts) * rounds / (best_ns / 1e9), 1) if best_ns else 0.0,
+        "p50_us": round(samples[len(samples) // 2] / 1000, 2),
+        "p99_us": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))] / 1000, 2),
+    }
+
+
+_CALIBRATION_RE = re.compile(r"(?:qty|lot)[\s:]*(\d+)", re.IGNORECASE)
+
+
+def calibrate(repeats: int) -> float:
+    """固定的正则/字符串负载（次/秒），用于把吞吐换算成与机器快慢无关的相对值"""
+    text = "Sunlord SL-IND-1008-100\nQty: 4000\nLot: B2511A\n" * 4
+
+    def workload() -> None:
+        _CALIBRATION_RE.search(text)
+        text.lower().find("batch")
+        text.upper()
+
+    return time_function(lambda _: workload(), [text], rounds=2000, repeats=repeats)["labels_per_s"]
+
+
+def measure_accuracy(corpus: list[dict[str, Any]]) -> dict[str, Any]:
+    """端到端 parse_ocr_payload 的逐字段准确率（期望为空时，输出也为空才算正确）"""
+    correct: dict[str, int] = defaultdict(int)
+    by_vendor: dict[str, list[int]] = defaultdict(lambda: [0, 0])
+    failures: dict[str, list[str]] = defaultdict(list)
+    for label in corpus:
+        parsed = parser_service.parse_ocr_payload({"raw_ocr_text": label["raw_ocr_text"], "scan_time": ""})
+        for field in FIELDS:
+            ok = parsed.get(field) == label["expected"].get(field)
+            correct[field] += ok
+            by_vendor[label["vendor"]][0] += ok
+            by_vendor[label["vendor"]][1] += 1
+            if not ok:
+                failures[field].append(label["id"])
+    count = len(corpus)
+    per_field = {field: round(correct[field] / count, 4) for field in FIELDS}
+    return {
+        "per_field": per_field,
+        "overall": round(sum(correct.values()) / (count * len(FIELDS)), 4),
+        "per_vendor": {vendor: round(ok / total, 4) for vendor, (ok, total) in sorted(by_vendor.items())},
+        "failures": {field: ids for field, ids in failures.items()},
+    }
+
+
+def run(corpus: list[dict[str, Any]], rounds: int, repeats: int) -> dict[str, Any]:
+    texts = [label["raw_ocr_text"] for label in corpus]
+    speed = {}
+    calibrations = []
+    for name, func in FUNCTIONS.items():
+        # 每个函数前重新校准，抵消测量过程中机器负载的漂移
+        calibration = calibrate(repeats)
+        calibrations.append(calibration)
+        speed[name] = time_function(func, texts, rounds, repeats)
+        speed[name]["relative"] = round(speed[name]["labels_per_s"] / calibration, 5)
+    calibration = round(sum(calibrations) / len(calibrations), 1)
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "corpus_size": len(corpus),
+        "rounds": rounds,
+        "repeats": repeats,
+        "calibration_ops_per_s": calibration,
+        "speed": speed,
+        "accuracy": measure_accuracy(corpus),
+    }
+
+
+def compare(report: dict[str, Any], baseline: dict[str, Any], max_slowdown: float) -> list[str]:
+    """返回退化项：相对吞吐（已按校准负载折算）下降超过 max_slowdown，或任一字段准确率下降"""
+    problems = []
+    for name, speed in baseline["speed"].items():
+        current = report["speed"].get(name)
+        if current is None:
+            continue
+        change = current["relative"] / speed["relative"] - 1
+        if change < -max_slowdown:
+            problems.append(f"{name}: 相对吞吐下降 {-change:.1%}（允许 {max_slowdown:.0%}）")
+    for field, accuracy in baseline["accuracy"]["per_field"].items():
+        current = report["accuracy"]["per_field"].get(field, 0.0)
+        if current < accuracy:
+            problems.append(f"{field}: 准确率 {current:.1%} 低于基线 {accuracy:.1%}")
+    return problems
+
+
+def print_report(report: dict[str, Any], baseline: dict[str, Any] | None) -> None:
+    print(f"语料: {report['corpus_size']} 条 × {report['rounds']} 轮 × {report['repeats']} 次, Python {report['python']}")
+    print(f"校准负载: {report['calibration_ops_per_s']:.0f} 次/秒（对比基线时按此折算吞吐）")
+    print(f"{'function':<36}{'labels/s':>12}{'p50 µs':>10}{'p99 µs':>10}{'vs 基线':>10}")
+    for name, speed in report["speed"].items():
+        delta = "-"
+        if baseline is not None and name in baseline["speed"]:
+            delta = f"{speed['relative'] / baseline['speed'][name]['relative'] - 1:+.1%}"
+        print(f"{name:<36}{speed['labels_per_s']:>12.0f}{speed['p50_us']:>10.1f}{speed['p99_us']:>10.1f}{delta:>10}")
+
+    accuracy = report["accuracy"]
+    print(f"\n{'field':<36}{'accuracy':>12}{'vs 基线':>10}")
+    for field, value in accuracy["per_field"].items():
+        delta = "-"
+        if baseline is not None:
+            delta = f"{value - baseline['accuracy']['per_field'].get(field, 0.0):+.1%}"
+        print(f"{field:<36}{value:>12.1%}{delta:>10}")
+    print(f"{'overall':<36}{accuracy['overall']:>12.1%}")
+    print("按厂商: " + ", ".join(f"{vendor} {value:.0%}" for vendor, value in accuracy["per_vendor"].items()))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="parser_service 基准测试")
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--rounds", type=int, default=50, help="每次计时遍历语料的轮数")
+    parser.add_argument("--repeats", type=int, default=5, help="吞吐计时重复次数（取最快一次，降低抖动）")
+    parser.add_argument("--save", action="store_true", help="把本次结果写为基线")
+    parser.add_argument("--check", action="store_true", help="与基线对比，退化时返回 1")
+    parser.add_argument("--max-slowdown", type=float, default=0.2, help="允许的吞吐下降比例（默认 20%%）")
+    args = parser.parse_args()
+
+    report = run(load_corpus(args.corpus), args.rounds, args.repeats)
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8")) if args.baseline.exists() else None
+    print_report(report, baseline)
+
+    if args.save:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"\n基线已写入: {args.baseline}")
+
+    if args.check:
+        if baseline is None:
+            print(f"\n基线不存在: {args.baseline}（先运行 --save）", file=sys.stderr)
+            return 1
+        problems = compare(report, baseline, args.max_slowdown)
+        if problems:
+            print("\n性能/准确率退化:", file=sys.stderr)
+            for problem in problems:
+                print(f"  - {problem}", file=sys.stderr)
+            return 1
+        print("\n未发现退化")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
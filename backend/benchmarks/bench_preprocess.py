@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""OCR 前图片预处理基准测试
+
+对一组标签照片分别应用不同的预处理参数，统计：
+  - 请求体大小（Base64 后）与预处理各阶段耗时（始终统计）
+  - OCR 往返耗时与标签字段识别准确率（指定 --ocr 时调用真实 PaddleOCR-VL）
+
+准确率以 --labels 指定的标注文件为准（{"文件名": {"material_code": ..., ...}}）；
+未提供标注时，以不做预处理（original）的识别结果作为参照。
+
+用法（在 backend 目录下）：
+    python benchmarks/bench_preprocess.py --images ./samples
+    python benchmarks/bench_preprocess.py --images ./samples --ocr --labels ./samples/labels.json
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.ocr_service import OcrService, OcrServiceError  # noqa: E402
+from app.services.parser_service import parse_ocr_payload  # noqa: E402
+from app.utils.image_preprocess import STAGES, ImagePreprocessor  # noqa: E402
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp"}
+FIELDS = ("material_code", "quantity", "batch", "date", "brand")
+
+# 预设参数：None 表示原图直接发送
+PRESETS: dict[str, ImagePreprocessor | None] = {
+    "original": None,
+    "2048": ImagePreprocessor(max_long_edge=2048),
+    "1600": ImagePreprocessor(max_long_edge=1600),
+    "1280": ImagePreprocessor(max_long_edge=1280),
+    "1600-gray": ImagePreprocessor(max_long_edge=1600, grayscale=True),
+    "1600-webp": ImagePreprocessor(max_long_edge=1600, fmt="WEBP", quality=80),
+}
+
+
+def _load_images(directory: Path) -> list[tuple[str, bytes]]:
+    paths = sorted(p for p in directory.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+    return [(p.name, p.read_bytes()) for p in paths]
+
+
+def _fields(ocr_payload: dict[str, Any]) -> dict[str, Any]:
+    parsed = parse_ocr_payload(ocr_payload)
+    return {field: parsed.get(field) for field in FIELDS}
+
+
+def _accuracy(results: dict[str, dict[str, Any]], expected: dict[str, dict[str, Any]]) -> float | None:
+    total = matched = 0
+    for name, fields in expected.items():
+        if name not in results:
+            continue
+        for field, value in fields.items():
+            if field not in FIELDS or value is None:
+                continue
+            total += 1
+            matched += results[name].get(field) == value
+    return matched / total if total else None
+
+
+def run_preset(
+    name: str,
+    preprocessor: ImagePreprocessor | None,
+    images: list[tuple[str, bytes]],
+    ocr: OcrService | None,
+) -> dict[str, Any]:
+    payload_bytes: list[int] = []
+    preprocess_ms: list[float] = []
+    stage_ms = {stage: 0.0 for stage in STAGES}
+    ocr_ms: list[float] = []
+    fields: dict[str, dict[str, Any]] = {}
+    errors = 0
+
+    for filename, data in images:
+        started = time.perf_counter()
+        if preprocessor is not None:
+            data, info = preprocessor.process(data)
+            for stage, ms in info["timings_ms"].items():
+                stage_ms[stage] += ms
+        preprocess_ms.append((time.perf_counter() - started) * 1000)
+        payload_bytes.append(len(base64.b64encode(data)))
+
+        if ocr is not None:
+            started = time.perf_counter()
+            try:
+                ocr_payload = ocr.classify_and_recognize(data, filename)
+            except OcrServiceError as exc:
+                print(f"  [{name}] {filename}: OCR 失败 {exc}", file=sys.stderr)
+                errors += 1
+                continue
+            ocr_ms.append((time.perf_counter() - started) * 1000)
+            fields[filename] = _fields(ocr_payload)
+
+    count = len(images)
+    return {
+        "preset": name,
+        "images": count,
+        "payload_mb_total": round(sum(payload_bytes) / 1024 / 1024, 3),
+        "payload_kb_mean": round(statistics.mean(payload_bytes) / 1024, 1) if count else 0.0,
+        "preprocess_ms_mean": round(statistics.mean(preprocess_ms), 2) if count else 0.0,
+        "stage_ms_mean": {stage: round(ms / count, 2) for stage, ms in stage_ms.items()} if count else {},
+        "ocr_ms_mean": round(statistics.mean(ocr_ms), 1) if ocr_ms else None,
+        "ocr_ms_p95": round(statistics.quantiles(ocr_ms, n=20)[-1], 1) if len(ocr_ms) >= 2 else None,
+        "ocr_errors": errors,
+        "fields": fields,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="OCR 前图片预处理基准测试")
+    parser.add_argument("--images", type=Path, required=True, help="样本图片目录")
+    parser.add_argument("--ocr", action="store_true", help="调用真实 OCR 服务，统计耗时与准确率")
+    parser.add_argument("--labels", type=Path, help="标注文件（JSON：文件名 → 字段期望值）")
+    parser.add_argument("--presets", nargs="+", choices=sorted(PRESETS), default=list(PRESETS))
+    parser.add_argument("--json", type=Path, help="把完整结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    images = _load_images(args.images)
+    if not images:
+        print(f"目录中没有图片: {args.images}", file=sys.stderr)
+        return 1
+
+    # 基准中由 PRESETS 控制预处理，OCR 服务本身不做预处理、不读缓存
+    ocr = OcrService() if args.ocr else None
+    presets = args.presets if "original" in args.presets or not args.ocr else ["original", *args.presets]
+
+    reports = [run_preset(name, PRESETS[name], images, ocr) for name in presets]
+
+    expected: dict[str, dict[str, Any]] | None = None
+    if args.labels is not None:
+        expected = json.loads(args.labels.read_text(encoding="utf-8"))
+    elif args.ocr:
+        expected = next(r["fields"] for r in reports if r["preset"] == "original")
+    for report in reports:
+        report["accuracy"] = _accuracy(report["fields"], expected) if expected is not None else None
+
+    baseline = next((r for r in reports if r["preset"] == "original"), reports[0])
+    print(f"样本数: {len(images)}")
+    print(f"{'preset':<12}{'payload MB':>12}{'vs 原图':>9}{'预处理 ms':>11}{'OCR ms':>10}{'OCR p95':>10}{'准确率':>9}")
+    for report in reports:
+        ratio = report["payload_mb_total"] / baseline["payload_mb_total"] if baseline["payload_mb_total"] else 0
+        accuracy = f"{report['accuracy']:.1%}" if report["accuracy"] is not None else "-"
+        print(
+            f"{report['preset']:<12}{report['payload_mb_total']:>12.3f}{ratio:>9.1%}"
+            f"{report['preprocess_ms_mean']:>11.1f}{report['ocr_ms_mean'] or '-':>10}"
+            f"{report['ocr_ms_p95'] or '-':>10}{accuracy:>9}"
+        )
+
+    if args.json is not None:
+        args.json.write_text(json.dumps(reports, ensure_ascii=False, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
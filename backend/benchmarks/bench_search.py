@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""全文检索基准测试：FTS5 trigram 索引与 LIKE '%…%' 全表扫描的检索延迟，以及索引带来的写入开销
+
+生成 --rows 条合成标签文本（多个厂商版式、随机物料编码 / 批次），数据库放在临时目录，
+用 search_service 的检索语句（按相关度排序、限定流水线、取 20 条）与等价的 LIKE 查询对比。
+
+用法（在 backend 目录下）：
+    python benchmarks/bench_search.py --rows 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import text  # noqa: E402
+
+from app.db.session import create_sqlite_engine, upgrade_database  # noqa: E402
+from app.services.search_service import parse_query, search_statement  # noqa: E402
+
+BRANDS = ["Sunlord", "Murata", "TDK", "Vishay", "Coilcraft", "顺络", "风华"]
+TEMPLATES = [
+    "{brand}\nP/N: {code}\nQty: {qty} PCS\nBatch: {batch}\nDate: 2025-11-{day:02d}\nL=10uH±10%\n",
+    "{brand} 电感 物料编码 {code}\n数量 {qty}\n批次 {batch}\nD/C: 25{day:02d}\nMADE IN CHINA\n",
+    "<div>{brand}</div>\nMPN:{code}\nQTY:{qty}\nLOT:{batch}\nDES: 0603 5% 1K 1/10W\n",
+]
+
+
+def make_row(rng: random.Random, index: int, pipelines: int) -> dict:
+    code = f"SL-IND-{rng.randint(1000, 9999)}-{rng.randint(100, 999)}"
+    batch = f"B{rng.randint(2401, 2552)}{rng.choice('ABCDEFGH')}{index:07d}"
+    raw = rng.choice(TEMPLATES).format(
+        brand=rng.choice(BRANDS), code=code, qty=rng.choice([1000, 2000, 4000, 5000]), batch=batch, day=rng.randint(1, 28)
+    )
+    return {
+        "pipeline_id": index % pipelines + 1,
+        "material_code": code,
+        "batch": batch,
+        "raw_ocr_text": raw,
+        "recognized_at": "2025-11-30 12:00:00",
+    }
+
+
+def timed(run, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="全文检索基准测试")
+    parser.add_argument("--rows", type=int, default=200_000, help="识别结果条数")
+    parser.add_argument("--pipelines", type=int, default=10, help="流水线数")
+    parser.add_argument("--repeat", type=int, default=5, help="每个查询重复次数（取中位数）")
+    parser.add_argument("--dir", type=Path, default=None, help="数据库所在目录")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    rows = [make_row(rng, index, args.pipelines) for index in range(args.rows)]
+    sample = rows[len(rows) // 2]
+    queries = {
+        "batch fragment": sample["batch"][-7:],
+        "material code": sample["material_code"],
+        "two terms": f"{sample['material_code'][-7:]} {sample['batch'][1:5]}",
+        "common term": "Sunlord",
+    }
+    insert = text(
+        "INSERT INTO recognition_results (pipeline_id, material_code, batch, raw_ocr_text, recognized_at) "
+        "VALUES (:pipeline_id, :material_code, :batch, :raw_ocr_text, :recognized_at)"
+    )
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        write_rates = {}
+        for revision in ("0002", "0003"):
+            engine = create_sqlite_engine(Path(tmp) / f"search_{revision}.db")
+            upgrade_database(engine, revision)
+            with engine.begin() as conn:
+                conn.exec_driver_sql(
+                    "INSERT INTO pipelines (id, code, name, excel_path, created_at) "
+                    + " UNION ALL ".join(
+                        f"SELECT {i}, 'line_{i}', 'line_{i}', 'line_{i}.xlsx', '2025-11-30'" for i in range(1, args.pipelines + 1)
+                    )
+                )
+            started = time.perf_counter()
+            for offset in range(0, len(rows), 10_000):
+                with engine.begin() as conn:
+                    conn.execute(insert, rows[offset : offset + 10_000])
+            write_rates[revision] = len(rows) / (time.perf_counter() - started)
+            if revision == "0002":
+                engine.dispose()
+        print(f"写入 {args.rows} 行: 无全文索引 {write_rates['0002']:.0f} 行/s, "
+              f"FTS5 触发器同步 {write_rates['0003']:.0f} 行/s")
+
+        print(f"{'query':>16}{'hits':>8}{'fts ms':>10}{'like ms':>10}{'speedup':>9}")
+        with engine.connect() as conn:
+            for name, query in queries.items():
+                match, short_terms = parse_query(query)
+                params = {"query": match, "pipeline_id": sample["pipeline_id"], "limit": 21, "offset": 0}
+                statement = search_statement(sample["pipeline_id"], len(short_terms))
+                hits = len(conn.execute(statement, params).all())
+                fts_ms = timed(lambda: conn.execute(statement, params).all(), args.repeat)
+
+                like = " AND ".join(
+                    f"(raw_ocr_text LIKE :t{i} OR material_code LIKE :t{i} OR batch LIKE :t{i})"
+                    for i in range(len(query.split()))
+                )
+                like_params = {f"t{i}": f"%{term}%" for i, term in enumerate(query.split())}
+                like_params["pipeline_id"] = sample["pipeline_id"]
+                like_sql = text(
+                    f"SELECT id FROM recognition_results WHERE pipeline_id = :pipeline_id AND {like} ORDER BY id DESC LIMIT 21"
+                )
+                like_ms = timed(lambda: conn.execute(like_sql, like_params).all(), args.repeat)
+                print(f"{name:>16}{hits:>8}{fts_ms:>10.2f}{like_ms:>10.2f}{like_ms / fts_ms:>8.0f}x")
+        engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""SQLite 并发基准测试：扫描写入与结果列表查询混合负载下的写入吞吐和读延迟
+
+对比三种引擎配置：
+- legacy：原先的 create_engine（默认回滚日志、默认连接池、无额外 PRAGMA）；
+- compat：create_sqlite_engine + compat 配置档（回滚日志 + FULL，固定连接池）；
+- wal：create_sqlite_engine + wal 配置档（WAL + synchronous=NORMAL + mmap/cache）。
+
+写线程模拟 store_result（插入一条结果 + 更新扫描计数，一次提交），读线程模拟结果分页查询。
+数据库放在 --dir 指定的目录（默认系统临时目录）；tmpfs 上 fsync 几乎无代价，应放到真实磁盘上对比。
+
+用法（在 backend 目录下）：
+    python benchmarks/bench_sqlite.py --writers 8 --readers 4 --seconds 10 --dir ./data
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy.engine import Engine  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlmodel import Session, SQLModel, create_engine, select, update  # noqa: E402
+
+from app.db.session import create_sqlite_engine, sqlite_pragmas  # noqa: E402
+from app.models.pipeline import Pipeline, RecognitionResult  # noqa: E402
+
+RAW_TEXT = "Sunlord SL-IND-1008-100\nQty: 4,000\nBatch: B2511A\nDate: 2025-11-30\nL=10uH±10%\n" * 6
+
+
+def legacy_engine(path: Path) -> Engine:
+    return create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+
+
+ENGINES: dict[str, Callable[[Path], Engine]] = {
+    "legacy": legacy_engine,
+    "compat": lambda path: create_sqlite_engine(path, sqlite_pragmas("compat")),
+    "wal": lambda path: create_sqlite_engine(path, sqlite_pragmas("wal")),
+}
+
+
+def seed(engine: Engine, rows: int) -> int:
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        pipeline = Pipeline(code="bench", name="bench", excel_path="bench.xlsx")
+        session.add(pipeline)
+        session.commit()
+        session.refresh(pipeline)
+        assert pipeline.id is not None
+        session.add_all(
+            RecognitionResult(pipeline_id=pipeline.id, material_code=f"SL-{i}", quantity=i, raw_ocr_text=RAW_TEXT)
+            for i in range(rows)
+        )
+        session.commit()
+        return pipeline.id
+
+
+def run(engine: Engine, pipeline_id: int, writers: int, readers: int, seconds: float) -> dict[str, float]:
+    stop = threading.Event()
+    lock = threading.Lock()
+    writes = [0]
+    errors = [0]
+    read_latencies: list[float] = []
+
+    def writer() -> None:
+        while not stop.is_set():
+            try:
+                with Session(engine) as session:
+                    session.add(RecognitionResult(
+                        pipeline_id=pipeline_id,
+                        material_code="SL-IND-1008-100",
+                        quantity=4000,
+                        raw_ocr_text=RAW_TEXT,
+                        recognized_at=datetime.utcnow(),
+                    ))
+                    session.exec(
+                        update(Pipeline).where(Pipeline.id == pipeline_id).values(total_scans=Pipeline.total_scans + 1)
+                    )
+                    session.commit()
+                with lock:
+                    writes[0] += 1
+            except OperationalError:
+                with lock:
+                    errors[0] += 1
+
+    def reader() -> None:
+        statement = (
+            select(RecognitionResult.id, RecognitionResult.material_code, RecognitionResult.quantity)
+            .where(RecognitionResult.pipeline_id == pipeline_id)
+            .order_by(RecognitionResult.id.desc())  # type: ignore[union-attr]
+            .limit(50)
+        )
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                with Session(engine) as session:
+                    session.exec(statement).all()
+                    session.get(Pipeline, pipeline_id)
+            except OperationalError:
+                with lock:
+                    errors[0] += 1
+                continue
+            elapsed = time.perf_counter() - started
+            with lock:
+                read_latencies.append(elapsed)
+
+    threads = [threading.Thread(target=writer) for _ in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(read_latencies) or [0.0]
+    return {
+        "writes_per_s": writes[0] / elapsed,
+        "reads_per_s": len(read_latencies) / elapsed,
+        "read_p50_ms": statistics.median(latencies) * 1000,
+        "read_p95_ms": latencies[int(len(latencies) * 0.95)] * 1000,
+        "read_p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+        "locked_errors": errors[0],
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="SQLite 并发写入/读取基准测试")
+    parser.add_argument("--writers", type=int, default=8, help="写线程数（模拟并发扫描）")
+    parser.add_argument("--readers", type=int, default=4, help="读线程数（模拟结果列表查询）")
+    parser.add_argument("--seconds", type=float, default=5, help="每种配置的运行时长")
+    parser.add_argument("--rows", type=int, default=20000, help="预置结果行数")
+    parser.add_argument("--dir", type=Path, default=None, help="数据库所在目录")
+    parser.add_argument("--engines", nargs="+", choices=list(ENGINES), default=list(ENGINES))
+    args = parser.parse_args()
+
+    print(f"写线程 {args.writers}，读线程 {args.readers}，每种配置 {args.seconds}s，预置 {args.rows} 行")
+    print(f"{'engine':>8}{'writes/s':>10}{'reads/s':>10}{'read p50':>10}{'read p95':>10}{'read p99':>10}{'locked':>8}")
+    for name in args.engines:
+        with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+            engine = ENGINES[name](Path(tmp) / "bench.db")
+            pipeline_id = seed(engine, args.rows)
+            result = run(engine, pipeline_id, args.writers, args.readers, args.seconds)
+            engine.dispose()
+        print(
+            f"{name:>8}{result['writes_per_s']:>10.0f}{result['reads_per_s']:>10.0f}"
+            f"{result['read_p50_ms']:>8.2f}ms{result['read_p95_ms']:>8.2f}ms{result['read_p99_ms']:>8.2f}ms"
+            f"{result['locked_errors']:>8}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""上传 → OCR 请求体的内存占用基准测试
+
+用 tracemalloc 统计单张图片从上传文件读取到发出 OCR 请求期间的峰值内存，对比：
+  - legacy：整体读入 + Base64 字符串 + JSON 字典（httpx json=）
+  - streamed：read_upload 分块读取 + iter_json_body 流式请求体
+
+再以 --concurrency 个并发请求走 OcrService.classify_and_recognize_async（DrainTransport 逐块读取请求体），
+给出总峰值与每请求峰值。OCR 上游被替换为本地 DrainTransport，不产生网络请求。
+
+用法（在 backend 目录下）：
+    python benchmarks/bench_upload_memory.py --size-mb 8 --concurrency 16
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import os
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Awaitable, Callable
+from unittest.mock import patch
+
+import httpx
+from fastapi import UploadFile
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.ocr_service import REQUEST_OPTIONS, OcrService  # noqa: E402
+from app.utils.upload import read_upload  # noqa: E402
+
+OCR_URL = "http://ocr.local/layout-parsing"
+
+
+class DrainTransport(httpx.AsyncBaseTransport):
+    """模拟上游：逐块消费请求体（块之间让出事件循环，使并发请求真正交错），不累积内容"""
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        size = 0
+        async for chunk in request.stream:  # type: ignore[union-attr]
+            size += len(chunk)
+            await asyncio.sleep(0)
+        return httpx.Response(200, json={"result": {"layoutParsingResults": []}, "size": size})
+
+
+def make_upload(image: bytes) -> UploadFile:
+    """与 Starlette 解析 multipart 一致：超过 1MB 的文件落到 SpooledTemporaryFile 的磁盘部分"""
+    file = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    file.write(image)
+    file.seek(0)
+    return UploadFile(file, filename="a.jpg", size=len(image))
+
+
+async def legacy_request(upload: UploadFile, client: httpx.AsyncClient) -> None:
+    content = await upload.read()
+    payload = {"file": base64.b64encode(content).decode("ascii"), **REQUEST_OPTIONS}
+    await client.post(OCR_URL, json=payload)
+
+
+async def streamed_request(upload: UploadFile, client: httpx.AsyncClient) -> None:
+    content = await read_upload(upload, max_bytes=upload.size or 0)
+    await OcrService(async_client=client).classify_and_recognize_async(content, "a.jpg")
+
+
+async def measure(
+    request: Callable[[UploadFile, httpx.AsyncClient], Awaitable[None]],
+    image: bytes,
+    concurrency: int,
+) -> float:
+    """返回 concurrency 个并发请求期间的 tracemalloc 峰值（MB）"""
+    async with httpx.AsyncClient(transport=DrainTransport()) as client:
+        await request(make_upload(image), client)  # 预热，排除首次导入与连接池初始化
+        uploads = [make_upload(image) for _ in range(concurrency)]
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        await asyncio.gather(*(request(upload, client) for upload in uploads))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        for upload in uploads:
+            await upload.close()
+    return peak / 1024 / 1024
+
+
+async def run(size_mb: float, concurrency: int) -> None:
+    image = os.urandom(int(size_mb * 1024 * 1024))
+    print(f"图片大小: {size_mb}MB, 并发: {concurrency}")
+    print(f"{'mode':<10}{'单请求峰值 MB':>16}{'倍数':>8}{'并发总峰值 MB':>16}{'每请求 MB':>12}")
+    with patch("app.services.ocr_service.settings") as settings:
+        settings.paddleocr_api_url = OCR_URL
+        settings.paddleocr_token = "bench"
+        for name, request in (("legacy", legacy_request), ("streamed", streamed_request)):
+            single = await measure(request, image, 1)
+            total = await measure(request, image, concurrency)
+            print(
+                f"{name:<10}{single:>16.1f}{single / size_mb:>8.2f}"
+                f"{total:>16.1f}{total / concurrency:>12.1f}"
+            )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="上传与 OCR 请求体内存占用基准测试")
+    parser.add_argument("--size-mb", type=float, default=8, help="模拟图片大小（MB）")
+    parser.add_argument("--concurrency", type=int, default=16, help="并发请求数")
+    args = parser.parse_args()
+    asyncio.run(run(args.size_mb, args.concurrency))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -14,6 +14,16 @@ from app.core.config import Settings
 from app.models.pipeline import Pipeline, RecognitionResult
 
 
+@pytest.fixture(autouse=True)
+def clear_pipeline_cache() -> Generator[None, None, None]:
+    """每个测试使用各自的临时数据库，进程内流水线缓存不能跨测试复用"""
+    from app.services.pipeline_service import get_pipeline_cache
+
+    get_pipeline_cache().clear()
+    yield
+    get_pipeline_cache().clear()
+
+
 @pytest.fixture
 def temp_db() -> Generator[Session, None, None]:
     """创建临时数据库用于测试"""
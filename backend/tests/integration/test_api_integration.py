@@ -1,6 +1,10 @@
 """测试系统集成 API"""
 from __future__ import annotations
 
+import json
+import uuid
+from unittest.mock import patch
+
 import pytest
 from fastapi.testclient import TestClient
 
@@ -9,8 +13,9 @@ from app.main import app
 
 @pytest.fixture
 def client():
-    """创建测试客户端"""
-    return TestClient(app)
+    """创建测试客户端（触发 startup/shutdown 事件以完成数据库初始化）"""
+    with TestClient(app) as test_client:
+        yield test_client
 
 
 class TestIntegrationAPI:
@@ -38,3 +43,113 @@ class TestIntegrationAPI:
             data = response.json()
             assert data["status"] == "accepted"
 
+
+
+def _bulk_item(index: int, **extra) -> dict:
+    return {
+        "material_code": f"SL-IND-1008-{index:03d}",
+        "quantity": 1000 + index,
+        "batch": "B2511A",
+        "date": "2025-11-30",
+        "brand": "Sunlord",
+        "electrical_characteristics": None,
+        "raw_ocr_text": "Test OCR text",
+        "image_filename": f"reel_{index}.jpg",
+        "scan_time": "2025-11-30T12:00:00",
+        **extra,
+    }
+
+
+class TestBulkScanResults:
+    """测试批量推送识别结果"""
+
+    def test_bulk_json_array(self, client):
+        """测试 JSON 数组：逐条状态，单条失败不影响其他结果"""
+        pipeline = client.post("/api/v1/pipelines", json={"name": "批量推送JSON"}).json()
+        items = [_bulk_item(i) for i in range(5)]
+        items[1] = {"material_code": "missing required fields"}
+        items[3] = _bulk_item(3, pipeline_id=999999)
+
+        response = client.post(f"/api/v1/scan-results/bulk?pipeline_id={pipeline['id']}", json=items)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert (data["total"], data["succeeded"], data["failed"]) == (5, 3, 2)
+        statuses = [item["status"] for item in data["items"]]
+        assert statuses == ["stored", "error", "stored", "error", "stored"]
+        assert "scan_time" in data["items"][1]["error"]
+        assert data["items"][3]["error"] == "指定的流水线不存在"
+        assert all(item["pipeline_id"] == pipeline["id"] for item in data["items"] if item["status"] == "stored")
+
+        detail = client.get(f"/api/v1/pipelines/{pipeline['id']}").json()
+        assert detail["total_scans"] == 3
+
+    def test_bulk_ndjson(self, client):
+        """测试 NDJSON：按行解析，可逐条按编码指定流水线"""
+        pipeline = client.post("/api/v1/pipelines", json={"name": "批量推送NDJSON"}).json()
+        lines = [json.dumps(_bulk_item(i, pipeline_code=pipeline["code"])) for i in range(3)]
+        body = "\n".join([lines[0], "", "{not json", lines[1], lines[2]]) + "\n"
+
+        response = client.post(
+            "/api/v1/scan-results/bulk",
+            content=body.encode("utf-8"),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+
+        data = response.json()
+        assert [item["status"] for item in data["items"]] == ["stored", "error", "stored", "stored"]
+        result_ids = [item["result_id"] for item in data["items"] if item["status"] == "stored"]
+        assert result_ids == sorted(result_ids)
+
+    def test_bulk_too_large(self, client):
+        """测试请求体超过 INTEGRATION_BULK_MAX_MB、NDJSON 单行超过上限时返回 413"""
+        from app.api.routes import integration
+
+        oversized = json.dumps([_bulk_item(0, raw_ocr_text="x" * (1024 * 1024))]).encode("utf-8")
+        with patch.object(integration.settings, "integration_bulk_max_mb", 1):
+            response = client.post(
+                "/api/v1/scan-results/bulk", content=oversized, headers={"Content-Type": "application/json"}
+            )
+        assert response.status_code == 413
+
+        long_line = json.dumps(_bulk_item(0, raw_ocr_text="x" * (1024 * 1024 + 1))).encode("utf-8")
+        response = client.post(
+            "/api/v1/scan-results/bulk", content=long_line, headers={"Content-Type": "application/x-ndjson"}
+        )
+        assert response.status_code == 413
+
+    def test_bulk_requires_array(self, client):
+        """测试请求体不是数组或未指定流水线"""
+        assert client.post("/api/v1/scan-results/bulk", json={"a": 1}).status_code == 400
+        data = client.post("/api/v1/scan-results/bulk", json=[_bulk_item(0)]).json()
+        assert data["failed"] == 1
+
+
+class TestSearchAPI:
+    """测试全文检索接口"""
+
+    def test_search_scoped_to_pipeline(self, client):
+        """测试按标签文字片段检索，并限定流水线"""
+        token = f"QA{uuid.uuid4().hex[:10].upper()}"
+        pipeline = client.post("/api/v1/pipelines", json={"name": "全文检索"}).json()
+        other = client.post("/api/v1/pipelines", json={"name": "全文检索对照"}).json()
+        for target in (pipeline, other):
+            items = [_bulk_item(0, raw_ocr_text=f"Sunlord 电感 {token} Qty 4000"), _bulk_item(1)]
+            client.post(f"/api/v1/scan-results/bulk?pipeline_id={target['id']}", json=items)
+
+        response = client.get("/api/v1/search", params={"q": token.lower(), "pipeline_id": pipeline["id"]})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["items"]) == 1
+        assert data["items"][0]["pipeline_id"] == pipeline["id"]
+        assert f"[{token}]" in data["items"][0]["snippet"]
+        assert data["next_offset"] is None
+
+        data = client.get("/api/v1/search", params={"q": f"电感 {token}", "limit": 1}).json()
+        assert len(data["items"]) == 1 and data["next_offset"] == 1
+
+    def test_search_invalid(self, client):
+        """测试搜索词过短与流水线不存在"""
+        assert client.get("/api/v1/search", params={"q": "电感"}).status_code == 400
+        assert client.get("/api/v1/search", params={"q": "Sunlord", "pipeline_id": 999999}).status_code == 404
@@ -1,20 +1,25 @@
 """测试流水线 API 端点"""
 from __future__ import annotations
 
+import io
+import json
 import tempfile
+import time
 from pathlib import Path
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from fastapi.testclient import TestClient
+from openpyxl import load_workbook
 
 from app.main import app
 
 
 @pytest.fixture
 def client():
-    """创建测试客户端"""
-    return TestClient(app)
+    """创建测试客户端（触发 startup/shutdown 事件以完成数据库初始化）"""
+    with TestClient(app) as test_client:
+        yield test_client
 
 
 @pytest.fixture
@@ -22,11 +27,11 @@ def mock_ocr_service():
     """模拟 OCR 服务"""
     with patch("app.api.routes.pipelines.get_ocr_service") as mock:
         mock_service = MagicMock()
-        mock_service.classify_and_recognize.return_value = {
+        mock_service.classify_and_recognize_async = AsyncMock(return_value={
             "raw_ocr_text": "Sunlord SL-IND-1008-100 Qty:4000 Batch:B2511A Date:30/11/2025 L=10uH±10%",
             "image_filename": "test.jpg",
             "scan_time": "2025-11-30T12:00:00",
-        }
+        })
         mock.return_value = mock_service
         yield mock_service
 
@@ -110,11 +115,11 @@ class TestPipelineAPI:
 
         # 模拟 OCR 服务
         mock_service = MagicMock()
-        mock_service.classify_and_recognize.return_value = {
+        mock_service.classify_and_recognize_async = AsyncMock(return_value={
             "raw_ocr_text": "Sunlord SL-IND-1008-100 Qty:4000 Batch:B2511A",
             "image_filename": "test.jpg",
             "scan_time": "2025-11-30T12:00:00",
-        }
+        })
         mock_get_ocr.return_value = mock_service
 
         # 上传图片
@@ -131,7 +136,7 @@ class TestPipelineAPI:
         assert data["pipeline_id"] == pipeline_id
 
         # 验证 OCR 服务被调用
-        mock_service.classify_and_recognize.assert_called_once()
+        mock_service.classify_and_recognize_async.assert_awaited_once()
 
     def test_scan_image_invalid_format(self, client, sample_image):
         """测试无效图片格式"""
@@ -175,7 +180,7 @@ class TestPipelineAPI:
         from app.services.ocr_service import OcrServiceError
 
         mock_service = MagicMock()
-        mock_service.classify_and_recognize.side_effect = OcrServiceError("OCR 服务失败")
+        mock_service.classify_and_recognize_async = AsyncMock(side_effect=OcrServiceError("OCR 服务失败"))
         mock_get_ocr.return_value = mock_service
 
         # 上传图片
@@ -212,8 +217,214 @@ class TestPipelineAPI:
         )
         assert len(response.content) > 0
 
-    def test_export_nonexistent_excel(self, client):
-        """测试导出不存在的 Excel"""
+    def test_total_scans_counter(self, client, sample_image, mock_ocr_service):
+        """测试列表与详情返回的扫描次数随扫描递增"""
+        create_response = client.post(
+            "/api/v1/pipelines",
+            json={"name": "计数流水线"},
+        )
+        pipeline_id = create_response.json()["id"]
+        assert create_response.json()["total_scans"] == 0
+
+        for _ in range(2):
+            client.post(
+                f"/api/v1/pipelines/{pipeline_id}/scan",
+                files={"image": ("test.jpg", sample_image, "image/jpeg")},
+            )
+
+        detail = client.get(f"/api/v1/pipelines/{pipeline_id}").json()
+        assert detail["total_scans"] == 2
+
+        summaries = client.get("/api/v1/pipelines").json()
+        summary = next(item for item in summaries if item["id"] == pipeline_id)
+        assert summary["total_scans"] == 2
+
+    def test_duplicate_scan_rejected(self, client, sample_image, mock_ocr_service):
+        """测试流水线设为 reject 后，时间窗口内重复扫描同一盘卷返回 409"""
+        pipeline_id = client.post("/api/v1/pipelines", json={"name": "查重流水线"}).json()["id"]
+        response = client.put(
+            f"/api/v1/pipelines/{pipeline_id}/duplicate-policy",
+            json={"policy": "reject", "window_seconds": 300},
+        )
+        assert response.status_code == 200
+        assert response.json()["duplicate_policy"] == "reject"
+
+        first = client.post(
+            f"/api/v1/pipelines/{pipeline_id}/scan",
+            files={"image": ("test.jpg", sample_image, "image/jpeg")},
+        )
+        assert first.status_code == 200
+        second = client.post(
+            f"/api/v1/pipelines/{pipeline_id}/scan",
+            files={"image": ("test.jpg", sample_image, "image/jpeg")},
+        )
+
+        assert second.status_code == 409
+        assert second.json()["detail"]["duplicate_of"] == first.json()["result_id"]
+        assert client.get(f"/api/v1/pipelines/{pipeline_id}").json()["total_scans"] == 1
+
+    def test_duplicate_scan_batch(self, client, sample_image, mock_ocr_service):
+        """测试批量扫描同样按 reject 策略处理：批内与跨批重复的盘卷各自报告 duplicate，不入库"""
+        pipeline_id = client.post("/api/v1/pipelines", json={"name": "批量查重流水线"}).json()["id"]
+        client.put(
+            f"/api/v1/pipelines/{pipeline_id}/duplicate-policy",
+            json={"policy": "reject", "window_seconds": 300},
+        )
+
+        first = client.post(
+            f"/api/v1/pipelines/{pipeline_id}/scan/batch",
+            files=[("images", (f"{i}.jpg", sample_image, "image/jpeg")) for i in range(2)],
+        ).json()
+        assert first["succeeded"] == 1
+        original_id = first["items"][0]["result_id"]
+        assert first["items"][1]["status"] == "duplicate"
+        assert first["items"][1]["duplicate_of"] == original_id
+
+        second = client.post(
+            f"/api/v1/pipelines/{pipeline_id}/scan/batch",
+            files=[("images", ("again.jpg", sample_image, "image/jpeg"))],
+        ).json()
+        assert second["failed"] == 1
+        assert second["items"][0]["status"] == "duplicate"
+        assert second["items"][0]["duplicate_of"] == original_id
+        assert client.get(f"/api/v1/pipelines/{pipeline_id}").json()["total_scans"] == 1
+
+    def test_list_results_paginated(self, client, sample_image, mock_ocr_service):
+        """测试识别结果分页接口"""
+        create_response = client.post(
+            "/api/v1/pipelines",
+            json={"name": "分页流水线"},
+        )
+        pipeline_id = create_response.json()["id"]
+
+        for _ in range(3):
+            client.post(
+                f"/api/v1/pipelines/{pipeline_id}/scan",
+                files={"image": ("test.jpg", sample_image, "image/jpeg")},
+            )
+
+        response = client.get(f"/api/v1/pipelines/{pipeline_id}/results", params={"limit": 2})
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page["items"]) == 2
+        assert "raw_ocr_text" not in page["items"][0]
+        assert page["next_cursor"]
+
+        response = client.get(
+            f"/api/v1/pipelines/{pipeline_id}/results",
+            params={"limit": 2, "cursor": page["next_cursor"], "fields": "id,raw_ocr_text"},
+        )
+        page = response.json()
+        assert len(page["items"]) == 1
+        assert set(page["items"][0]) == {"id", "raw_ocr_text"}
+        assert page["next_cursor"] is None
+
+        response = client.get(f"/api/v1/pipelines/{pipeline_id}/results", params={"cursor": "bogus"})
+        assert response.status_code == 400
+
+    def test_scan_batch(self, client, sample_image, mock_ocr_service):
+        """测试批量扫描：合法图片入库，非法图片单独报错"""
+        create_response = client.post(
+            "/api/v1/pipelines",
+            json={"name": "批量流水线"},
+        )
+        pipeline_id = create_response.json()["id"]
+
+        response = client.post(
+            f"/api/v1/pipelines/{pipeline_id}/scan/batch",
+            files=[
+                ("images", ("a.jpg", sample_image, "image/jpeg")),
+                ("images", ("b.txt", b"not an image", "text/plain")),
+                ("images", ("c.jpg", sample_image, "image/jpeg")),
+            ],
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] == 3
+        assert data["succeeded"] == 2
+        assert data["failed"] == 1
+        assert [item["index"] for item in data["items"]] == [0, 1, 2]
+        assert data["items"][1]["status"] == "error"
+        assert data["items"][1]["error"] == "文件格式不支持"
+        assert data["items"][0]["status"] == "stored"
+        assert data["items"][0]["result_id"] is not None
+        assert data["items"][2]["result"]["material_code"] == "SL-IND-1008-100"
+        assert mock_ocr_service.classify_and_recognize_async.await_count == 2
+
+        detail = client.get(f"/api/v1/pipelines/{pipeline_id}").json()
+        assert detail["total_scans"] == 2
+
+    def test_scan_batch_stream(self, client, sample_image, mock_ocr_service):
+        """测试批量扫描以 NDJSON 流式返回"""
+        create_response = client.post(
+            "/api/v1/pipelines",
+            json={"name": "流式批量流水线"},
+        )
+        pipeline_id = create_response.json()["id"]
+
+        response = client.post(
+            f"/api/v1/pipelines/{pipeline_id}/scan/batch",
+            params={"stream": "true"},
+            files=[("images", (f"{i}.jpg", sample_image, "image/jpeg")) for i in range(3)],
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines() if line]
+        assert [line["status"] for line in lines].count("parsed") == 3
+        stored = [line for line in lines if line["status"] == "stored"]
+        assert len(stored) == 3
+        assert all(line["result_id"] for line in stored)
+
+    def test_scan_job(self, client, sample_image):
+        """测试异步扫描任务：立即返回 202，轮询得到识别结果"""
+        create_response = client.post(
+            "/api/v1/pipelines",
+            json={"name": "任务流水线"},
+        )
+        pipeline_id = create_response.json()["id"]
+
+        with patch("app.services.job_service.get_ocr_service") as mock_get_ocr:
+            mock_service = MagicMock()
+            mock_service.classify_and_recognize_async = AsyncMock(return_value={
+                "raw_ocr_text": "Sunlord SL-IND-1008-100 Qty:4000 Batch:B2511A",
+                "image_filename": "test.jpg",
+                "scan_time": "2025-11-30T12:00:00",
+            })
+            mock_get_ocr.return_value = mock_service
+
+            response = client.post(
+                f"/api/v1/pipelines/{pipeline_id}/scan/jobs",
+                files={"image": ("test.jpg", sample_image, "image/jpeg")},
+            )
+            assert response.status_code == 202
+            job = response.json()
+            assert job["status"] in ["queued", "running", "succeeded"]
+
+            deadline = time.monotonic() + 10
+            while job["status"] in ["queued", "running"] and time.monotonic() < deadline:
+                time.sleep(0.05)
+                job = client.get(f"/api/v1/jobs/{job['id']}").json()
+
+        assert job["status"] == "succeeded"
+        assert job["attempts"] == 1
+        assert job["result_id"] is not None
+        assert job["result"]["material_code"] == "SL-IND-1008-100"
+        assert job["result"]["pipeline_id"] == pipeline_id
+        # 与 /scan 的响应一致，带有结果 ID 与重复标记
+        assert job["result"]["result_id"] == job["result_id"]
+        assert "duplicate_of" in job["result"]
+
+    def test_get_nonexistent_job(self, client):
+        """测试查询不存在的任务"""
+        response = client.get("/api/v1/jobs/does-not-exist")
+
+        assert response.status_code == 404
+        assert "扫描任务不存在" in response.json()["detail"]
+
+    def test_export_empty_pipeline(self, client):
+        """测试导出尚无扫描记录的流水线，返回只有表头的 Excel"""
         # 创建流水线但不扫描图片
         create_response = client.post(
             "/api/v1/pipelines",
@@ -221,11 +432,62 @@ class TestPipelineAPI:
         )
         pipeline_id = create_response.json()["id"]
 
-        # 尝试导出（Excel 文件不存在）
         response = client.get(f"/api/v1/pipelines/{pipeline_id}/export")
 
-        assert response.status_code == 404
-        assert "Excel 文件不存在" in response.json()["detail"]
+        assert response.status_code == 200
+        workbook = load_workbook(io.BytesIO(response.content))
+        assert workbook.active.max_row == 1
+
+
+class TestLabelTemplateAPI:
+    """测试标签模板 API"""
+
+    def test_template_applied_to_scan(self, client, sample_image, mock_ocr_service):
+        """测试创建模板、分配给流水线后扫描按模板抽取，更新模板后立即生效"""
+        definition = {
+            "fingerprint": ["sunlord", "batch"],
+            "fields": {"batch": {"anchor": "Batch:", "pattern": r"(\S+)", "post": ["lower"]}},
+        }
+        response = client.post("/api/v1/label-templates", json={"name": "顺络卷盘", "definition": definition})
+        assert response.status_code == 201
+        template = response.json()
+        assert template["version"] == 1
+
+        pipeline_id = client.post("/api/v1/pipelines", json={"name": "模板流水线"}).json()["id"]
+        response = client.put(
+            f"/api/v1/pipelines/{pipeline_id}/label-templates", json={"template_ids": [template["id"]]}
+        )
+        assert response.status_code == 200
+        assert response.json()["label_template_ids"] == [template["id"]]
+
+        def scan():
+            return client.post(
+                f"/api/v1/pipelines/{pipeline_id}/scan",
+                files={"image": ("test.jpg", sample_image, "image/jpeg")},
+            ).json()
+
+        data = scan()
+        assert data["batch"] == "b2511a"
+        assert data["material_code"] == "SL-IND-1008-100"
+
+        definition["fields"]["batch"]["post"] = ["upper"]
+        response = client.put(
+            f"/api/v1/label-templates/{template['id']}", json={"name": "顺络卷盘", "definition": definition}
+        )
+        assert response.json()["version"] == 2
+        assert scan()["batch"] == "B2511A"
+
+    def test_invalid_template(self, client):
+        """测试非法模板与不存在的模板 ID"""
+        response = client.post(
+            "/api/v1/label-templates",
+            json={"name": "bad", "definition": {"fingerprint": ["x"], "fields": {"batch": {"pattern": "("}}}},
+        )
+        assert response.status_code == 400
+
+        pipeline_id = client.post("/api/v1/pipelines", json={"name": "模板流水线无效"}).json()["id"]
+        response = client.put(f"/api/v1/pipelines/{pipeline_id}/label-templates", json={"template_ids": [999999]})
+        assert response.status_code == 400
 
 
 class TestHealthCheck:
@@ -240,3 +502,20 @@ class TestHealthCheck:
         assert data["status"] == "ok"
         assert "app" in data
 
+
+    def test_metrics(self, client, sample_image, mock_ocr_service):
+        """测试 /metrics 以 Prometheus 文本格式输出扫描各阶段耗时与运行时状态"""
+        pipeline_id = client.post("/api/v1/pipelines", json={"name": "指标流水线"}).json()["id"]
+        client.post(
+            f"/api/v1/pipelines/{pipeline_id}/scan",
+            files={"image": ("test.jpg", sample_image, "image/jpeg")},
+        )
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        for stage in ("upload", "parse", "db_commit"):
+            assert f'matriq_stage_duration_seconds_count{{stage="{stage}"}}' in response.text
+        assert 'matriq_cache_hit_ratio{cache="pipeline"}' in response.text
+        assert 'matriq_db_pool_connections{state="checked_out"}' in response.text
@@ -0,0 +1,124 @@
+"""测试 SQLite 引擎配置档与连接 PRAGMA"""
+from __future__ import annotations
+
+import pytest
+
+from app.db.session import create_sqlite_engine, sqlite_pragmas
+
+
+def _pragma(engine, name: str):
+    with engine.connect() as conn:
+        return conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+
+class TestSqliteEngine:
+    """测试每个新连接都应用配置档"""
+
+    def test_wal_profile(self, tmp_path):
+        """测试 wal 配置档的 PRAGMA"""
+        engine = create_sqlite_engine(
+            tmp_path / "wal.db",
+            sqlite_pragmas("wal", busy_timeout_ms=1234, cache_size_mb=8, mmap_size_mb=16),
+            pool_size=2,
+            max_overflow=0,
+        )
+
+        assert _pragma(engine, "journal_mode") == "wal"
+        assert _pragma(engine, "synchronous") == 1
+        assert _pragma(engine, "busy_timeout") == 1234
+        assert _pragma(engine, "cache_size") == -8 * 1024
+        assert _pragma(engine, "mmap_size") == 16 * 1024 * 1024
+        assert engine.pool.size() == 2  # type: ignore[attr-defined]
+        engine.dispose()
+
+    def test_compat_profile(self, tmp_path):
+        """测试 compat 配置档保持回滚日志"""
+        engine = create_sqlite_engine(tmp_path / "compat.db", sqlite_pragmas("compat"))
+
+        assert _pragma(engine, "journal_mode") == "delete"
+        assert _pragma(engine, "synchronous") == 2
+        engine.dispose()
+
+    def test_unknown_profile(self):
+        """测试未知配置档"""
+        with pytest.raises(ValueError):
+            sqlite_pragmas("fast")
+
+
+LEGACY_SCHEMA = [
+    # 引入 total_scans / label_template_ids 之前由 create_all 创建的结构
+    "CREATE TABLE pipelines (id INTEGER NOT NULL, code VARCHAR NOT NULL, name VARCHAR NOT NULL, "
+    "excel_path VARCHAR NOT NULL, created_at DATETIME NOT NULL, PRIMARY KEY (id))",
+    "CREATE UNIQUE INDEX ix_pipelines_code ON pipelines (code)",
+    "CREATE TABLE recognition_results (id INTEGER NOT NULL, pipeline_id INTEGER NOT NULL, material_code VARCHAR, "
+    "quantity INTEGER, batch VARCHAR, date VARCHAR, brand VARCHAR, electrical_characteristics VARCHAR, "
+    "raw_ocr_text VARCHAR, image_filename VARCHAR, recognized_at DATETIME NOT NULL, PRIMARY KEY (id), "
+    "FOREIGN KEY(pipeline_id) REFERENCES pipelines (id))",
+]
+
+
+class TestMigrations:
+    """测试迁移得到的结构与模型一致，并能升级引入迁移前的数据库"""
+
+    def test_fresh_database_matches_models(self, tmp_path):
+        """测试空数据库升级后与模型定义没有差异"""
+        from alembic.autogenerate import compare_metadata
+        from alembic.migration import MigrationContext
+        from sqlmodel import SQLModel
+
+        from app.db.session import include_schema_name, upgrade_database
+
+        engine = create_sqlite_engine(tmp_path / "fresh.db")
+        upgrade_database(engine)
+        upgrade_database(engine)  # 重复执行无副作用
+
+        with engine.connect() as conn:
+            context = MigrationContext.configure(conn, opts={"include_name": include_schema_name})
+            assert compare_metadata(context, SQLModel.metadata) == []
+            assert conn.exec_driver_sql("SELECT version_num FROM alembic_version").scalar() == "0004"
+        engine.dispose()
+
+    def test_legacy_database_upgrade(self, tmp_path):
+        """测试旧数据库补齐列与索引，并从自由格式的 date 回填 production_date"""
+        from app.db.session import upgrade_database
+        from app.services.duplicate_service import result_fingerprint
+
+        engine = create_sqlite_engine(tmp_path / "legacy.db")
+        with engine.begin() as conn:
+            for statement in LEGACY_SCHEMA:
+                conn.exec_driver_sql(statement)
+            conn.exec_driver_sql(
+                "INSERT INTO pipelines VALUES (1, 'P1', 'line', 'p1.xlsx', '2025-01-01 00:00:00')"
+            )
+            for result_id, value in enumerate(["2025-11-30", "生产日期 2025/12/01", "2025-02-30", "无日期", None], 1):
+                conn.exec_driver_sql(
+                    "INSERT INTO recognition_results (id, pipeline_id, date, recognized_at) "
+                    "VALUES (?, 1, ?, '2025-01-01 00:00:00')",
+                    (result_id, value),
+                )
+
+            conn.exec_driver_sql(
+                "INSERT INTO recognition_results (id, pipeline_id, material_code, quantity, batch, date, recognized_at) "
+                "VALUES (6, 1, 'sl-ind-1008-100', 4000, 'B2511A ', '生产日期 2025/12/01', '2025-01-01 00:00:00')"
+            )
+
+        upgrade_database(engine)
+
+        with engine.connect() as conn:
+            dates = conn.exec_driver_sql("SELECT production_date FROM recognition_results ORDER BY id").scalars()
+            assert list(dates) == ["2025-11-30", "2025-12-01", None, None, None, "2025-12-01"]
+            assert conn.exec_driver_sql("SELECT total_scans FROM pipelines").scalar() == 6
+            fingerprints = conn.exec_driver_sql("SELECT fingerprint FROM recognition_results ORDER BY id").scalars()
+            # 回填的指纹与入库时计算的一致，历史记录同样参与查重
+            assert list(fingerprints) == [None] * 5 + [
+                result_fingerprint("SL-IND-1008-100", "B2511A", 4000, "2025-12-01")
+            ]
+            indexes = {row[1] for row in conn.exec_driver_sql("PRAGMA index_list(recognition_results)")}
+        assert {
+            "ix_recognition_results_pipeline_id_id",
+            "ix_recognition_results_pipeline_id_recognized_at",
+            "ix_recognition_results_material_code",
+            "ix_recognition_results_batch",
+            "ix_recognition_results_pipeline_id_production_date",
+        } <= indexes
+        engine.dispose()
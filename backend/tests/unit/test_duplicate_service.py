@@ -0,0 +1,290 @@
+"""测试入库时的重复扫描检测"""
+from __future__ import annotations
+
+import io
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from PIL import Image, ImageDraw
+from sqlmodel import Session
+
+from app.models.pipeline import Pipeline, RecognitionResult
+from app.services import duplicate_service, pipeline_service
+from app.services.duplicate_service import DuplicateResultError, duplicate_stats, result_fingerprint
+from app.utils.image_hash import dhash, hamming_distance
+
+SCAN_TIME = datetime(2025, 11, 30, 12, 0, 0)
+
+
+def _label(text: str, quality: int = 90, brightness: int = 255) -> bytes:
+    image = Image.new("RGB", (640, 480), (brightness, brightness, brightness))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((40, 40, 600, 200), fill=(20, 20, 20))
+    draw.text((60, 260), text, fill=(0, 0, 0))
+    draw.ellipse((380, 240, 560, 420), fill=(90, 90, 90))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+class TestFingerprint:
+    """测试字段指纹"""
+
+    def test_normalized(self):
+        """测试编码与批次忽略大小写和空白，日期按生产日期标准化"""
+        assert result_fingerprint("SL-IND-1008-100", "B2511A", 4000, "2025-11-30") == result_fingerprint(
+            " sl-ind-1008-100", "b2511a ", 4000, "2025/11/30"
+        )
+
+    def test_fields_distinguish(self):
+        """测试数量或批次不同指纹不同"""
+        base = result_fingerprint("SL-IND-1008-100", "B2511A", 4000, "2025-11-30")
+        assert base != result_fingerprint("SL-IND-1008-100", "B2511A", 2000, "2025-11-30")
+        assert base != result_fingerprint("SL-IND-1008-100", "B2511B", 4000, "2025-11-30")
+
+    @pytest.mark.parametrize("material_code, batch", [(None, "B2511A"), ("SL-IND-1008-100", None), (" ", "B2511A")])
+    def test_missing_key_fields(self, material_code, batch):
+        """测试缺少物料编码或批次时不生成指纹"""
+        assert result_fingerprint(material_code, batch, 4000, "2025-11-30") is None
+
+
+class TestImageHash:
+    """测试图片感知哈希"""
+
+    def test_same_label_close(self):
+        """测试同一标签不同压缩质量与曝光的哈希只差几位"""
+        first = dhash(_label("SL-IND-1008-100 B2511A", quality=95))
+        second = dhash(_label("SL-IND-1008-100 B2511A", quality=40, brightness=235))
+        assert first is not None and second is not None
+        assert hamming_distance(first, second) <= 6
+
+    def test_different_images_far(self):
+        """测试内容不同的图片哈希差异明显"""
+        noise = io.BytesIO()
+        Image.effect_noise((640, 480), 80).convert("RGB").save(noise, format="JPEG")
+        assert hamming_distance(dhash(_label("B2511A")), dhash(noise.getvalue())) > 16
+
+    def test_undecodable(self):
+        """测试无法解码的数据返回 None"""
+        assert dhash(b"not an image") is None
+        assert dhash(_label("B2511A")[:400]) is None
+
+    def test_decompression_bomb(self):
+        """测试像素数超过 Pillow 上限的图片返回 None 而不是抛出异常"""
+        with patch.object(Image, "MAX_IMAGE_PIXELS", 1000):
+            assert dhash(_label("B2511A")) is None
+
+
+def _reel(offset_seconds: int = 0, **fields) -> dict:
+    data = {
+        "material_code": "SL-IND-1008-100",
+        "quantity": 4000,
+        "batch": "B2511A",
+        "date": "2025-11-30",
+        "raw_ocr_text": "Sunlord SL-IND-1008-100",
+        "recognized_at": SCAN_TIME + timedelta(seconds=offset_seconds),
+    }
+    data.update(fields)
+    return data
+
+
+@pytest.fixture
+def store(temp_db, temp_data_dir: Path):
+    """返回 (流水线, 存储函数)，存储函数按给定策略调用 store_result"""
+    pipeline = Pipeline(code="line_dup", name="查重流水线", excel_path=str(temp_data_dir / "line_dup.xlsx"))
+    temp_db.add(pipeline)
+    temp_db.commit()
+    temp_db.refresh(pipeline)
+
+    @contextmanager
+    def mock_session():
+        yield temp_db
+
+    def run(policy: str, offset_seconds: int = 0, **fields):
+        pipeline.duplicate_policy = policy
+        pipeline.duplicate_window_seconds = 600
+        return pipeline_service.store_result(pipeline, _reel(offset_seconds, **fields))
+
+    def run_batch(policy: str, rows: list[dict]):
+        pipeline.duplicate_policy = policy
+        pipeline.duplicate_window_seconds = 600
+        return pipeline_service.store_results(pipeline, rows)
+
+    run.batch = run_batch
+
+    with patch("app.services.pipeline_service.get_session", side_effect=lambda: mock_session()), \
+            patch("app.services.pipeline_service.enqueue_result"), \
+            patch.object(pipeline_service.settings, "result_group_commit", False), \
+            patch.object(pipeline_service.settings, "exports_root", temp_data_dir):
+        yield temp_db, run
+
+
+class TestStorePolicies:
+    """测试 store_result 按策略处理重复扫描"""
+
+    def test_flag(self, store):
+        """测试 flag 策略照常入库并指向原始记录，再次重复仍指向最早的记录"""
+        session, run = store
+        original = run("flag")
+        second = run("flag", offset_seconds=30)
+        third = run("flag", offset_seconds=60)
+
+        assert original.duplicate_of is None
+        assert second.duplicate_of == original.id
+        assert third.duplicate_of == original.id
+        assert session.get(RecognitionResult, second.id).duplicate_of == original.id
+
+    def test_earliest_original(self, store):
+        """测试窗口内有多条未标记的相同记录时指向最早的一条"""
+        _, run = store
+        first = run("off")
+        run("off", offset_seconds=30)
+        assert run("flag", offset_seconds=60).duplicate_of == first.id
+
+    def test_reject(self, store):
+        """测试 reject 策略不入库"""
+        session, run = store
+        original = run("reject")
+        checked = duplicate_stats().checked
+        with pytest.raises(DuplicateResultError) as exc_info:
+            run("reject", offset_seconds=30)
+
+        assert exc_info.value.original_id == original.id
+        assert session.query(RecognitionResult).count() == 1
+        assert duplicate_stats().checked == checked + 1
+
+    def test_merge(self, store):
+        """测试 merge 策略补齐原记录的空字段并返回原记录"""
+        session, run = store
+        original = run("merge")
+        merged = run("merge", offset_seconds=30, brand="Sunlord", image_filename="reel.jpg")
+
+        assert merged.id == original.id
+        assert merged.duplicate_of == original.id
+        assert session.query(RecognitionResult).count() == 1
+        stored = session.get(RecognitionResult, original.id)
+        assert stored.brand == "Sunlord"
+        assert stored.image_filename == "reel.jpg"
+        assert stored.duplicate_of is None
+
+    def test_off(self, store):
+        """测试关闭检测时不做查重"""
+        _, run = store
+        run("off")
+        assert run("off", offset_seconds=30).duplicate_of is None
+
+    def test_outside_window(self, store):
+        """测试超出时间窗口的相同标签视为新的一盘"""
+        _, run = store
+        run("reject")
+        assert run("reject", offset_seconds=601).duplicate_of is None
+
+    def test_different_reel_same_batch(self, store):
+        """测试字段相同但图片明显不同（同批次的另一盘）不算重复"""
+        _, run = store
+        first = dhash(_label("reel 1"))
+        other = first ^ ((1 << 32) - 1)
+        run("reject", image_hash=first)
+        assert run("reject", offset_seconds=30, image_hash=other).duplicate_of is None
+        with pytest.raises(DuplicateResultError):
+            run("reject", offset_seconds=60, image_hash=first ^ 0b101)
+
+    def test_concurrent_reject(self, store):
+        """测试同一盘卷并发提交时查重与插入串行，只有一条入库"""
+        session, _ = store
+        pipeline = session.query(Pipeline).one()
+        pipeline.duplicate_policy = "reject"
+        pipeline.duplicate_window_seconds = 600
+        engine = session.get_bind()
+        probe = duplicate_service.find_duplicate
+        barrier = threading.Barrier(2)
+        outcomes = []
+
+        @contextmanager
+        def thread_session():
+            with Session(engine) as own:
+                yield own
+
+        def slow_probe(*args, **kwargs):
+            # 查完后停顿，放大查重与插入之间的窗口
+            original = probe(*args, **kwargs)
+            time.sleep(0.1)
+            return original
+
+        def submit(offset_seconds: int):
+            barrier.wait()
+            try:
+                outcomes.append(pipeline_service.store_result(pipeline, _reel(offset_seconds)))
+            except DuplicateResultError as exc:
+                outcomes.append(exc)
+
+        with patch("app.services.pipeline_service.get_session", side_effect=lambda: thread_session()), \
+                patch("app.services.pipeline_service.find_duplicate", side_effect=slow_probe):
+            threads = [threading.Thread(target=submit, args=(offset,)) for offset in (0, 5)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert sorted(type(outcome).__name__ for outcome in outcomes) == ["DuplicateResultError", "RecognitionResult"]
+        session.expire_all()
+        assert session.query(RecognitionResult).count() == 1
+
+
+class TestStoreBatchPolicies:
+    """测试 store_results 整批查重：与已有记录及批内重复"""
+
+    def test_reject(self, store):
+        """测试与已有记录、批内重复的条目都被拒绝，其余照常入库"""
+        session, run = store
+        original = run("reject")
+        results = run.batch("reject", [
+            _reel(30),
+            _reel(40, batch="B2511B"),
+            _reel(50, batch="B2511B"),
+        ])
+
+        assert isinstance(results[0], DuplicateResultError)
+        assert results[0].original_id == original.id
+        assert results[1].id is not None
+        assert isinstance(results[2], DuplicateResultError)
+        assert results[2].original_id == results[1].id
+        assert session.query(RecognitionResult).count() == 2
+
+    def test_flag(self, store):
+        """测试批内重复在同一事务中指向批内第一次出现的条目"""
+        session, run = store
+        first, second, third = run.batch("flag", [_reel(0), _reel(10), _reel(20)])
+
+        assert first.duplicate_of is None
+        assert second.duplicate_of == first.id
+        assert third.duplicate_of == first.id
+        assert session.get(RecognitionResult, third.id).duplicate_of == first.id
+
+    def test_merge(self, store):
+        """测试批内重复补齐第一次出现的条目后只入库一条"""
+        session, run = store
+        first, merged = run.batch("merge", [_reel(0), _reel(10, brand="Sunlord")])
+
+        assert merged.id == first.id
+        assert merged.duplicate_of == first.id
+        assert session.query(RecognitionResult).count() == 1
+        assert session.get(RecognitionResult, first.id).brand == "Sunlord"
+
+    def test_many_fingerprints(self, store):
+        """测试不同指纹超过单条复合查询上限（500 项）时分块查重"""
+        session, run = store
+        original = run("reject")
+        rows = [_reel(i, batch=f"B{i:04d}") for i in range(1, 600)] + [_reel(30)]
+
+        results = run.batch("reject", rows)
+
+        assert all(result.id is not None for result in results[:-1])
+        assert isinstance(results[-1], DuplicateResultError)
+        assert results[-1].original_id == original.id
+        assert session.query(RecognitionResult).count() == 600
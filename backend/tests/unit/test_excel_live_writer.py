@@ -0,0 +1,125 @@
+"""测试实时 Excel 后台写入线程"""
+from __future__ import annotations
+
+import threading
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import patch
+
+from openpyxl import load_workbook
+
+from app.models.pipeline import RecognitionResult
+from app.services import excel_live_writer
+from app.services.excel_live_writer import ExcelLiveWriter
+from app.utils.excel_writer import append_results
+
+
+def _result(i: int) -> RecognitionResult:
+    return RecognitionResult(
+        id=i,
+        pipeline_id=1,
+        material_code=f"SL-IND-1008-{i:03d}",
+        quantity=1000,
+        recognized_at=datetime(2025, 11, 30, 12, 0, 0),
+    )
+
+
+class TestExcelLiveWriter:
+    """测试按批次合并写入的 Excel 写入线程"""
+
+    def test_batches_rows_into_single_save(self, temp_data_dir: Path):
+        """测试多条结果合并为一次 load/save"""
+        excel_path = temp_data_dir / "live.xlsx"
+        calls = []
+
+        def recording_append(path, results):
+            calls.append(len(results))
+            return append_results(path, results)
+
+        with patch("app.services.excel_live_writer.append_results", side_effect=recording_append):
+            writer = ExcelLiveWriter(excel_path, max_rows=100, flush_interval_ms=200)
+            for i in range(1, 6):
+                writer.submit(_result(i))
+            writer.close(timeout=10)
+
+        assert sum(calls) == 5
+        assert len(calls) < 5
+
+        ws = load_workbook(excel_path).active
+        assert ws.max_row == 6  # 表头 + 5 行数据
+        assert [ws.cell(row, 1).value for row in range(2, 7)] == [1, 2, 3, 4, 5]
+        assert ws.cell(6, 3).value == "SL-IND-1008-005"
+
+    def test_flush_respects_max_rows(self, temp_data_dir: Path):
+        """测试单批行数不超过 max_rows"""
+        excel_path = temp_data_dir / "live.xlsx"
+        calls = []
+
+        def recording_append(path, results):
+            calls.append(len(results))
+            return append_results(path, results)
+
+        with patch("app.services.excel_live_writer.append_results", side_effect=recording_append):
+            writer = ExcelLiveWriter(excel_path, max_rows=2, flush_interval_ms=1000)
+            for i in range(1, 6):
+                writer.submit(_result(i))
+            writer.close(timeout=10)
+
+        assert sum(calls) == 5
+        assert max(calls) <= 2
+
+    def test_concurrent_submits_do_not_lose_rows(self, temp_data_dir: Path):
+        """测试并发提交时不丢行"""
+        excel_path = temp_data_dir / "live.xlsx"
+        writer = ExcelLiveWriter(excel_path, max_rows=50, flush_interval_ms=20)
+
+        def submit_many(offset: int):
+            for i in range(10):
+                writer.submit(_result(offset + i))
+
+        threads = [threading.Thread(target=submit_many, args=(n * 10,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        writer.close(timeout=10)
+
+        assert load_workbook(excel_path).active.max_row == 41
+        stats = writer.stats()
+        assert stats["queue_depth"] == 0
+        assert stats["flushed_rows"] == 40
+        assert stats["flush_count"] >= 1
+        assert stats["max_flush_ms"] >= stats["last_flush_ms"] > 0
+
+    def test_submit_after_close_rejected(self, temp_data_dir: Path):
+        """测试关闭后拒绝新结果"""
+        writer = ExcelLiveWriter(temp_data_dir / "live.xlsx", max_rows=10, flush_interval_ms=10)
+        writer.close(timeout=10)
+
+        try:
+            writer.submit(_result(1))
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("关闭后的写入线程应拒绝提交")
+
+
+def test_enqueue_after_shutdown_rejected(temp_data_dir: Path):
+    """测试关闭后 enqueue_result 抛出 RuntimeError 而不是启动新的写入线程，重新启动后恢复"""
+    path = temp_data_dir / "late.xlsx"
+    excel_live_writer.shutdown_excel_writers()
+    try:
+        try:
+            excel_live_writer.enqueue_result(path, _result(1))
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("关闭后不应再创建写入线程")
+        assert excel_live_writer.excel_writer_stats() == []
+    finally:
+        excel_live_writer.start_excel_writers()
+
+    excel_live_writer.enqueue_result(path, _result(2))
+    excel_live_writer.shutdown_excel_writers()
+    excel_live_writer.start_excel_writers()
+    assert load_workbook(path).active.max_row == 2
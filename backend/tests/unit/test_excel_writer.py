@@ -8,7 +8,7 @@ import pytest
 from openpyxl import load_workbook
 
 from app.models.pipeline import RecognitionResult
-from app.utils.excel_writer import append_result, initialize_excel
+from app.utils.excel_writer import append_result, build_export, initialize_excel
 
 
 class TestExcelWriter:
@@ -122,3 +122,44 @@ class TestExcelWriter:
         ws = wb.active
         assert ws.max_row == 2  # 表头 + 1 行数据
 
+
+    def test_build_export(self, temp_data_dir: Path):
+        """测试以流式方式生成导出文件"""
+        excel_path = temp_data_dir / "exports" / "export.xlsx"
+
+        results = (
+            RecognitionResult(
+                id=i,
+                pipeline_id=1,
+                material_code=f"SL-IND-1008-{i:03d}",
+                quantity=1000 * i,
+                recognized_at=datetime(2025, 11, 30, 12, 0, 0),
+            )
+            for i in range(1, 4)
+        )
+
+        rows = build_export(excel_path, results)
+
+        assert rows == 3
+        assert excel_path.exists()
+        # 临时文件已被原子替换，不应残留
+        assert list(excel_path.parent.iterdir()) == [excel_path]
+
+        wb = load_workbook(excel_path)
+        ws = wb.active
+        assert ws.title == "识别记录"
+        assert ws.max_row == 4  # 表头 + 3 行数据
+        assert ws.cell(1, 1).value == "序号"
+        assert ws.cell(2, 1).value == 1
+        assert ws.cell(4, 1).value == 3
+        assert ws.cell(4, 3).value == "SL-IND-1008-003"
+        assert ws.cell(4, 4).value == 3000
+
+    def test_build_export_empty(self, temp_data_dir: Path):
+        """测试无数据时仅写出表头"""
+        excel_path = temp_data_dir / "empty.xlsx"
+
+        assert build_export(excel_path, []) == 0
+
+        ws = load_workbook(excel_path).active
+        assert ws.max_row == 1
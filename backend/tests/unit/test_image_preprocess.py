@@ -0,0 +1,79 @@
+"""测试 OCR 前图片预处理"""
+from __future__ import annotations
+
+import io
+
+import pytest
+from PIL import Image
+
+from app.utils.image_preprocess import ImagePreprocessor
+
+
+def _jpeg(size: tuple[int, int], orientation: int | None = None, quality: int = 95) -> bytes:
+    image = Image.effect_noise(size, 40).convert("RGB")
+    exif = Image.Exif()
+    if orientation is not None:
+        exif[0x0112] = orientation
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality, exif=exif)
+    return buffer.getvalue()
+
+
+class TestImagePreprocessor:
+    """测试缩放、方向校正、灰度与重新编码"""
+
+    def test_downscale_to_max_long_edge(self):
+        """测试按最长边等比缩放并减小体积"""
+        data = _jpeg((2000, 1000))
+        preprocessor = ImagePreprocessor(max_long_edge=800)
+
+        output, info = preprocessor.process(data)
+
+        assert info["preprocessed"] is True
+        assert Image.open(io.BytesIO(output)).size == (800, 400)
+        assert len(output) < len(data)
+        assert set(info["timings_ms"]) == {"decode", "resize", "orient", "grayscale", "encode"}
+        assert preprocessor.stats()["processed"] == 1
+
+    def test_exif_orientation(self):
+        """测试按 EXIF Orientation 旋转（6 = 顺时针 90 度）"""
+        data = _jpeg((1200, 600), orientation=6)
+
+        output, _ = ImagePreprocessor(max_long_edge=600).process(data)
+
+        assert Image.open(io.BytesIO(output)).size == (300, 600)
+
+    def test_grayscale_and_webp(self):
+        """测试灰度转换与 WebP 输出"""
+        data = _jpeg((1200, 600))
+
+        output, _ = ImagePreprocessor(max_long_edge=600, grayscale=True, fmt="webp").process(data)
+
+        image = Image.open(io.BytesIO(output))
+        assert image.format == "WEBP"
+        # WebP 没有灰度模式，解码为三通道相同的 RGB
+        r, g, b = image.getpixel((10, 10))
+        assert r == g == b
+
+    def test_small_image_passthrough(self):
+        """测试无需处理的小图原样发送"""
+        data = _jpeg((400, 300), quality=70)
+        preprocessor = ImagePreprocessor(max_long_edge=2048)
+
+        output, info = preprocessor.process(data)
+
+        assert output is data
+        assert info["preprocessed"] is False
+        assert preprocessor.stats()["passthrough"] == 1
+
+    def test_undecodable_passthrough(self):
+        """测试无法解码的数据原样交给 OCR 处理"""
+        output, info = ImagePreprocessor().process(b"fake image data")
+
+        assert output == b"fake image data"
+        assert info["preprocessed"] is False
+
+    def test_unsupported_format(self):
+        """测试不支持的输出格式"""
+        with pytest.raises(ValueError, match="不支持的预处理输出格式"):
+            ImagePreprocessor(fmt="GIF")
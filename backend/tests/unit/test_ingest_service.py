@@ -0,0 +1,48 @@
+"""测试批量推送的 NDJSON 解析"""
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from app.services.ingest_service import BulkPayloadTooLargeError, iter_ndjson
+
+
+async def _stream(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+async def _collect(stream, max_bytes: int = 1 << 20, max_line_bytes: int = 1 << 10) -> list:
+    return [record async for record in iter_ndjson(stream, max_bytes, max_line_bytes)]
+
+
+@pytest.mark.asyncio
+async def test_lines_split_across_chunks():
+    """测试跨分块的行、空行与末尾无换行的最后一行"""
+    body = b'{"a": 1}\n\n{"a": 2}\n{"a": 3}'
+    chunks = [body[i:i + 3] for i in range(0, len(body), 3)]
+
+    assert await _collect(_stream(*chunks)) == [{"a": 1}, {"a": 2}, {"a": 3}]
+
+
+@pytest.mark.asyncio
+async def test_invalid_line_reported():
+    """测试无法解析的行产出 ValueError，不影响后续行"""
+    records = await _collect(_stream(b'{bad\n{"a": 1}\n'))
+
+    assert isinstance(records[0], ValueError)
+    assert records[1] == {"a": 1}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("chunks, max_bytes", [
+    # 单行超过上限（分多个分块到达，尚未出现换行）
+    ([b'{"a": "' + b"x" * 600, b"x" * 600], 1 << 20),
+    # 请求体累计超过上限
+    ([json.dumps({"a": i}).encode() + b"\n" for i in range(100)], 200),
+])
+async def test_limits(chunks, max_bytes):
+    """测试单行与请求体上限"""
+    with pytest.raises(BulkPayloadTooLargeError):
+        await _collect(_stream(*chunks), max_bytes=max_bytes)
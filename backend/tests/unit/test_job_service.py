@@ -0,0 +1,147 @@
+"""测试异步扫描任务服务"""
+from __future__ import annotations
+
+import io
+from contextlib import contextmanager
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import UploadFile
+
+from app.models.pipeline import Pipeline, RecognitionResult, ScanJob
+from app.services import job_service
+from app.utils.upload import save_upload
+
+
+@pytest.fixture
+def job_env(temp_db, temp_data_dir: Path):
+    """让任务服务与流水线服务共用临时数据库，并把图片落盘到临时目录"""
+    pipeline = Pipeline(code="line_001", name="流水线1", excel_path=str(temp_data_dir / "line_001.xlsx"))
+    temp_db.add(pipeline)
+    temp_db.commit()
+    temp_db.refresh(pipeline)
+
+    @contextmanager
+    def mock_session():
+        yield temp_db
+
+    with patch("app.services.job_service.get_session", side_effect=lambda: mock_session()), \
+            patch("app.services.pipeline_service.get_session", side_effect=lambda: mock_session()), \
+            patch("app.services.pipeline_service.enqueue_result"), \
+            patch.object(job_service.settings, "jobs_root", temp_data_dir / "jobs"):
+        yield pipeline
+
+
+async def _submit(pipeline: Pipeline, filename: str, content: bytes) -> ScanJob:
+    """与 POST /scan/jobs 相同：分配路径、分块落盘后写入任务表"""
+    job_id, image_path = job_service.new_job_image_path(filename)
+    await save_upload(UploadFile(io.BytesIO(content), filename=filename), image_path, 1024 * 1024)
+    return job_service.register_scan_job(pipeline, job_id, filename, image_path)
+
+
+class TestScanJobs:
+    """测试任务持久化、执行与重启恢复"""
+
+    @pytest.mark.asyncio
+    async def test_run_scan_job_success(self, job_env, temp_db):
+        """测试任务执行后写入识别结果并删除落盘图片"""
+        job = await _submit(job_env, "test.jpg", b"image bytes")
+        assert job.status == job_service.JOB_QUEUED
+        assert Path(job.image_path).read_bytes() == b"image bytes"
+
+        mock_service = MagicMock()
+        mock_service.classify_and_recognize_async = AsyncMock(return_value={
+            "raw_ocr_text": "Sunlord SL-IND-1008-100 Qty:4000",
+            "image_filename": "test.jpg",
+        })
+        with patch("app.services.job_service.get_ocr_service", return_value=mock_service):
+            await job_service.run_scan_job(job.id)
+
+        temp_db.expire_all()
+        stored = temp_db.get(ScanJob, job.id)
+        assert stored.status == job_service.JOB_SUCCEEDED
+        assert stored.attempts == 1
+        result = temp_db.get(RecognitionResult, stored.result_id)
+        assert result.material_code == "SL-IND-1008-100"
+        assert not Path(job.image_path).exists()
+
+        # 已完成的任务不会被重复执行
+        await job_service.run_scan_job(job.id)
+        mock_service.classify_and_recognize_async.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_run_scan_job_ocr_failure(self, job_env, temp_db):
+        """测试 OCR 失败时任务标记为 failed 并记录错误"""
+        from app.services.ocr_service import OcrServiceError
+
+        job = await _submit(job_env, "test.jpg", b"image bytes")
+        mock_service = MagicMock()
+        mock_service.classify_and_recognize_async = AsyncMock(side_effect=OcrServiceError("OCR 服务失败"))
+        with patch("app.services.job_service.get_ocr_service", return_value=mock_service):
+            await job_service.run_scan_job(job.id)
+
+        temp_db.expire_all()
+        stored = temp_db.get(ScanJob, job.id)
+        assert stored.status == job_service.JOB_FAILED
+        assert stored.error == "OCR 服务失败"
+
+    @pytest.mark.asyncio
+    async def test_circuit_open_requeue_limited(self, job_env, temp_db):
+        """测试熔断期间任务重新排队，执行次数用尽后判为失败"""
+        from app.services.ocr_service import OcrCircuitOpenError
+
+        job = await _submit(job_env, "test.jpg", b"image bytes")
+        mock_service = MagicMock()
+        mock_service.classify_and_recognize_async = AsyncMock(side_effect=OcrCircuitOpenError(30))
+        with patch("app.services.job_service.get_ocr_service", return_value=mock_service), \
+                patch.object(job_service.settings, "scan_job_max_attempts", 2):
+            await job_service.run_scan_job(job.id)
+            temp_db.expire_all()
+            assert temp_db.get(ScanJob, job.id).status == job_service.JOB_QUEUED
+
+            await job_service.run_scan_job(job.id)
+
+        temp_db.expire_all()
+        stored = temp_db.get(ScanJob, job.id)
+        assert stored.status == job_service.JOB_FAILED
+        assert stored.attempts == 2
+        assert "OCR 服务不可用" in stored.error
+        assert not Path(job.image_path).exists()
+
+    @pytest.mark.asyncio
+    async def test_interrupted_job_not_stored_twice(self, job_env, temp_db):
+        """测试关闭时中断、但结果已在线程池中入库的任务，重启后直接完成而不重复入库"""
+        from app.services.pipeline_service import store_result
+
+        job = await _submit(job_env, "test.jpg", b"image bytes")
+        job_service._claim_job(job.id)
+        result = store_result(job_env, {"material_code": "SL-IND-1008-100", "batch": "B2511A"}, job.id)
+
+        assert job_service._pending_job_ids() == [job.id]
+        mock_service = MagicMock()
+        with patch("app.services.job_service.get_ocr_service", return_value=mock_service):
+            await job_service.run_scan_job(job.id)
+
+        temp_db.expire_all()
+        stored = temp_db.get(ScanJob, job.id)
+        assert stored.status == job_service.JOB_SUCCEEDED
+        assert stored.result_id == result.id
+        assert temp_db.query(RecognitionResult).count() == 1
+        mock_service.classify_and_recognize_async.assert_not_called()
+        assert not Path(job.image_path).exists()
+
+    @pytest.mark.asyncio
+    async def test_pending_jobs_recovered(self, job_env, temp_db):
+        """测试重启时 queued 与中断的 running 任务重新排队"""
+        queued = await _submit(job_env, "a.jpg", b"a")
+        running = await _submit(job_env, "b.jpg", b"b")
+        done = await _submit(job_env, "c.jpg", b"c")
+        job_service._update_job(running.id, status=job_service.JOB_RUNNING)
+        job_service._update_job(done.id, status=job_service.JOB_SUCCEEDED)
+
+        pending = job_service._pending_job_ids()
+
+        assert set(pending) == {queued.id, running.id}
+        temp_db.expire_all()
+        assert temp_db.get(ScanJob, running.id).status == job_service.JOB_QUEUED
@@ -0,0 +1,122 @@
+"""测试 Aho-Corasick 自动机与品牌词典"""
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from app.services.label_dictionary import DictionaryHit, LabelDictionary
+from app.services.parser_service import BRANDS, extract_brand, extract_fields
+from app.utils.aho_corasick import AhoCorasick
+
+
+def _naive_matches(patterns: list[str], text: str) -> list[tuple[int, int, str]]:
+    found = []
+    for pattern in patterns:
+        start = text.find(pattern)
+        while start >= 0:
+            found.append((start, start + len(pattern), pattern))
+            start = text.find(pattern, start + 1)
+    return sorted(found)
+
+
+class TestAhoCorasick:
+    """测试自动机找出全部（含重叠）命中"""
+
+    def test_overlapping_matches(self):
+        """测试经典用例 he/she/his/hers"""
+        automaton = AhoCorasick()
+        for pattern in ("he", "she", "his", "hers"):
+            automaton.add(pattern, pattern)
+
+        assert automaton.find_all("ushers") == [(1, 4, "she"), (2, 4, "he"), (2, 6, "hers")]
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_matches_naive_search(self, seed):
+        """测试随机模式与文本下结果与逐个 str.find 一致"""
+        rng = random.Random(seed)
+        alphabet = "abc顺络"
+        patterns = sorted({"".join(rng.choices(alphabet, k=rng.randint(1, 4))) for _ in range(30)})
+        automaton = AhoCorasick()
+        for pattern in patterns:
+            automaton.add(pattern, pattern)
+        automaton.build()
+
+        for _ in range(50):
+            text = "".join(rng.choices(alphabet + "xy", k=rng.randint(0, 60)))
+            assert sorted(automaton.find_all(text)) == _naive_matches(patterns, text)
+
+    def test_empty(self):
+        """测试空词典与空模式"""
+        automaton = AhoCorasick()
+        assert automaton.find_all("anything") == []
+        with pytest.raises(ValueError):
+            automaton.add("", "x")
+
+
+class TestLabelDictionary:
+    """测试词典加载与品牌/别名匹配"""
+
+    def test_brands_only_matches_legacy_loop(self):
+        """测试仅含 BRANDS 的词典与原先逐个 `in` 判断的结果一致"""
+        dictionary = LabelDictionary({brand: [] for brand in BRANDS})
+        rng = random.Random(7)
+        fragments = [*BRANDS, "sunLORD", "tdk", "MURAT", "Vish", "ay", "ß", "Coil", "craft", " ", "\n", "顺络"]
+
+        def legacy(text: str) -> str | None:
+            text_upper = text.upper()
+            return next((brand for brand in BRANDS if brand.upper() in text_upper), None)
+
+        for _ in range(2000):
+            text = "".join(rng.choices(fragments, k=rng.randint(0, 8)))
+            assert dictionary.find_brand(text) == legacy(text), text
+
+    def test_aliases_and_priority(self):
+        """测试别名映射到规范品牌名，多个品牌时按词典顺序"""
+        dictionary = LabelDictionary({"Sunlord": ["顺络"], "TDK": []})
+
+        assert dictionary.find_brand("深圳顺络电子 电感") == "Sunlord"
+        assert dictionary.find_brand("TDK / sunlord") == "Sunlord"
+        assert dictionary.find_brand("no brand") is None
+
+    def test_hit_positions(self):
+        """测试命中位置指向原文（包括 upper() 改变长度的字符）"""
+        dictionary = LabelDictionary({"TDK": [], "Sunlord": ["顺络"]})
+        text = "straße TDK 顺络: 7"
+
+        hits = dictionary.find_all(text)
+
+        assert hits == [
+            DictionaryHit(7, 10, "TDK", "TDK"),
+            DictionaryHit(11, 13, "Sunlord", "顺络"),
+        ]
+        assert [text[hit.start:hit.end] for hit in hits] == ["TDK", "顺络"]
+
+    def test_load_json(self, tmp_path):
+        """测试从 JSON 加载，品牌可写成字符串或带别名的对象"""
+        path = tmp_path / "dictionary.json"
+        path.write_text('{"brands": [{"name": "Yageo", "aliases": ["国巨"]}, "Samsung"]}', encoding="utf-8")
+
+        dictionary = LabelDictionary.from_file(path)
+
+        assert dictionary.brands == {"Yageo": ["Yageo", "国巨"], "Samsung": ["Samsung"]}
+        assert dictionary.find_brand("国巨 RC0603") == "Yageo"
+
+    def test_load_csv(self, tmp_path):
+        """测试从 CSV（物料主数据导出）加载"""
+        path = tmp_path / "dictionary.csv"
+        path.write_text(
+            "name,alias\nSunlord,\nSunlord,顺络\nMurata,村田\n",
+            encoding="utf-8",
+        )
+
+        dictionary = LabelDictionary.from_file(path)
+
+        assert dictionary.brands == {"Sunlord": ["Sunlord", "顺络"], "Murata": ["Murata", "村田"]}
+        assert [hit.name for hit in dictionary.find_all("村田 顺络")] == ["Murata", "Sunlord"]
+
+
+def test_extract_brand_uses_default_dictionary():
+    """测试内置词典的中文别名"""
+    assert extract_brand("顺络 SL-IND-1008-100") == "Sunlord"
+    assert extract_fields("村田 Qty:100", ["brand"]) == {"brand": "Murata"}
@@ -0,0 +1,129 @@
+"""测试标签模板的编译、匹配与缓存"""
+from __future__ import annotations
+
+import pickle
+
+import pytest
+
+from app.services.label_template import CompiledTemplate, LabelTemplateError, TemplateCache, select_template
+from app.services.parser_service import parse_ocr_payload
+
+ACME_DEFINITION = {
+    "name": "ACME 卷盘标签",
+    "fingerprint": ["ACME", "P/N"],
+    "fields": {
+        "material_code": {"anchor": "P/N", "pattern": r"([A-Z0-9-]+)", "post": ["upper"]},
+        "quantity": {"anchor": "Q'ty", "pattern": r"([\d,]+)", "post": ["int"]},
+        "batch": {"anchor": "Lot No.", "pattern": r"(\S+)"},
+        "date": {"anchor": "MFG", "pattern": r"(\S+)", "post": ["date"]},
+        "brand": {"value": "ACME"},
+    },
+}
+
+ACME_TEXT = "ACME Components\nP/N: ac-0402-10k\nQ'ty : 10,000 PCS\nLot No. L2405-7\nMFG 2024/05/06\nQty 5"
+
+
+class TestCompiledTemplate:
+    """测试模板定义校验与字段抽取"""
+
+    def test_extract_anchored_fields(self):
+        """测试锚点后取值与后处理"""
+        template = CompiledTemplate(ACME_DEFINITION)
+
+        assert template.extract(ACME_TEXT) == {
+            "material_code": "AC-0402-10K",
+            "quantity": 10000,
+            "batch": "L2405-7",
+            "date": "2024-05-06",
+            "brand": "ACME",
+        }
+
+    def test_missing_anchor_skips_field(self):
+        """测试锚点缺失或后处理无结果时字段不出现"""
+        template = CompiledTemplate(ACME_DEFINITION)
+
+        assert template.extract("ACME P/N: X1\nMFG unknown", ["material_code", "date", "batch"]) == {
+            "material_code": "X1"
+        }
+
+    @pytest.mark.parametrize("definition", [
+        {"fingerprint": [], "fields": {"batch": {"pattern": "x"}}},
+        {"fingerprint": ["a"], "fields": {}},
+        {"fingerprint": ["a"], "fields": {"color": {"pattern": "x"}}},
+        {"fingerprint": ["a"], "fields": {"batch": {"pattern": "("}}},
+        {"fingerprint": ["a"], "fields": {"batch": {"pattern": "x", "post": ["reverse"]}}},
+        {"fingerprint": ["a"], "fields": {"batch": {"anchor": "Lot"}}},
+        {"fingerprint": ["a"], "fields": {"quantity": {"pattern": "x", "post": ["int", "upper"]}}},
+        {"fingerprint": ["a"], "fields": {"batch": {"pattern": "x", "post": ["int"]}}},
+        {"fingerprint": ["a"], "fields": {"batch": {"pattern": "x", "post": "upper"}}},
+        {"fingerprint": ["a"], "fields": {"quantity": {"value": "many"}}},
+    ])
+    def test_invalid_definition(self, definition):
+        """测试非法定义在编译时报错"""
+        with pytest.raises(LabelTemplateError):
+            CompiledTemplate(definition)
+
+    def test_typed_fields_converted(self):
+        """测试 quantity / date 未写 int / date 后处理时自动转换，固定值同样转换"""
+        template = CompiledTemplate({
+            "fingerprint": ["ACME"],
+            "fields": {
+                "quantity": {"anchor": "Q'ty", "pattern": r"([\d,]+)"},
+                "date": {"anchor": "MFG", "pattern": r"(\S+)", "post": ["strip"]},
+            },
+        })
+        assert template.extract(ACME_TEXT) == {"quantity": 10000, "date": "2024-05-06"}
+
+        fixed = CompiledTemplate({"fingerprint": ["ACME"], "fields": {"quantity": {"value": "3,000"}}})
+        assert fixed.extract(ACME_TEXT) == {"quantity": 3000}
+
+    def test_picklable(self):
+        """测试编译结果可发送到进程池"""
+        template = pickle.loads(pickle.dumps(CompiledTemplate(ACME_DEFINITION, 1, 2)))
+
+        assert (template.template_id, template.version) == (1, 2)
+        assert template.extract(ACME_TEXT, ["quantity"]) == {"quantity": 10000}
+
+
+def test_select_template_by_fingerprint():
+    """测试按优先级选择第一个指纹全部命中的模板"""
+    generic = CompiledTemplate({"fingerprint": ["p/n"], "fields": {"brand": {"value": "Other"}}})
+    acme = CompiledTemplate(ACME_DEFINITION)
+
+    assert select_template([acme, generic], ACME_TEXT) is acme
+    assert select_template([generic, acme], ACME_TEXT) is generic
+    assert select_template([acme], "Sunlord P/N") is None
+    assert select_template([], ACME_TEXT) is None
+
+
+def test_template_cache_versions():
+    """测试缓存命中与版本变更后重新编译"""
+    cache = TemplateCache(max_entries=2)
+    loads = []
+
+    def load():
+        loads.append(1)
+        return ACME_DEFINITION
+
+    first = cache.get(1, 1, load)
+    assert cache.get(1, 1, load) is first
+    assert cache.get(1, 2, load) is not first
+    cache.get(2, 1, load)
+
+    assert len(loads) == 3
+    assert not cache.cached(1, 1)
+    assert cache.stats() == {"entries": 2, "hits": 1, "misses": 3}
+
+
+def test_parse_ocr_payload_prefers_template():
+    """测试模板字段优先，未覆盖的字段仍走通用解析"""
+    template = CompiledTemplate({
+        "fingerprint": ["ACME"],
+        "fields": {"quantity": {"anchor": "Q'ty", "pattern": r"([\d,]+)", "post": ["int"]}},
+    })
+    payload = {"raw_ocr_text": ACME_TEXT, "scan_time": None}
+
+    assert parse_ocr_payload(payload)["quantity"] == 5
+    normalized = parse_ocr_payload(payload, template=template)
+    assert normalized["quantity"] == 10000
+    assert normalized["date"] == "2024-05-06"
@@ -0,0 +1,111 @@
+"""测试 Prometheus 指标注册表与各阶段埋点"""
+from __future__ import annotations
+
+import json
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from app.core.metrics import IN_FLIGHT, OCR_UPSTREAM_RESPONSES, STAGE_SECONDS, MetricFamily, MetricsRegistry
+from app.services.ocr_resilience import RetryPolicy
+from app.services.ocr_service import OcrService
+
+
+def _stage_count(stage: str) -> int:
+    return sum(STAGE_SECONDS.labels(stage).counts)
+
+
+class TestMetricsRegistry:
+    """测试文本格式输出"""
+
+    def test_counter_and_gauge(self):
+        """测试计数器与仪表按标签输出，标签值转义"""
+        registry = MetricsRegistry()
+        counter = registry.counter("test_requests_total", "Requests", ["status"])
+        gauge = registry.gauge("test_in_flight", "In flight", ["operation"])
+        counter.inc(200)
+        counter.inc(200)
+        counter.inc('say "hi"\n', amount=3)
+        with gauge.track("ocr"):
+            assert gauge.labels("ocr").value == 1
+
+        text = registry.render()
+        assert "# TYPE test_requests_total counter" in text
+        assert 'test_requests_total{status="200"} 2' in text
+        assert 'test_requests_total{status="say \\"hi\\"\\n"} 3' in text
+        assert 'test_in_flight{operation="ocr"} 0' in text
+
+    def test_histogram_buckets_cumulative(self):
+        """测试直方图分桶累计输出，边界值落入 le 等于该值的桶"""
+        registry = MetricsRegistry()
+        histogram = registry.histogram("test_seconds", "Latency", ["stage"], buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe("parse", value=value)
+
+        lines = registry.render().splitlines()
+        assert 'test_seconds_bucket{stage="parse",le="0.1"} 2' in lines
+        assert 'test_seconds_bucket{stage="parse",le="1"} 3' in lines
+        assert 'test_seconds_bucket{stage="parse",le="+Inf"} 4' in lines
+        assert 'test_seconds_count{stage="parse"} 4' in lines
+        assert 'test_seconds_sum{stage="parse"} 2.65' in lines
+
+    def test_disabled_records_nothing(self):
+        """测试关闭后记录为空操作"""
+        registry = MetricsRegistry(enabled=False)
+        histogram = registry.histogram("test_seconds", "Latency", ["stage"])
+        with histogram.time("parse"):
+            pass
+        registry.counter("test_total", "Total", ["status"]).inc(200)
+
+        assert "test_seconds_count" not in registry.render()
+        assert "test_total{" not in registry.render()
+
+    def test_collectors_and_validation(self):
+        """测试采集函数在抓取时调用；重复注册与标签数不符时报错"""
+        registry = MetricsRegistry()
+        calls = []
+
+        def collect():
+            calls.append(1)
+            yield MetricFamily("test_pool", "gauge", "Pool", [({"state": "idle"}, 3)])
+
+        registry.register_collector(collect)
+        assert calls == []
+        assert 'test_pool{state="idle"} 3' in registry.render()
+        assert calls == [1]
+
+        counter = registry.counter("test_total", "Total", ["status"])
+        with pytest.raises(ValueError):
+            registry.counter("test_total", "Total")
+        with pytest.raises(ValueError):
+            counter.labels(200, "extra")
+
+
+class TestOcrInstrumentation:
+    """测试 OCR 调用记录各阶段耗时与上游状态"""
+
+    @pytest.mark.asyncio
+    @patch("app.services.ocr_service.settings")
+    async def test_stages_and_upstream_status(self, mock_settings):
+        """测试一次 503 重试后成功：整体 1 次，上游与编码各 2 次，状态码分别计数"""
+        mock_settings.paddleocr_api_url = "https://test-api.example.com/layout-parsing"
+        mock_settings.paddleocr_token = "test-token"
+        statuses = iter([503, 200])
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            json.loads(request.content)
+            return httpx.Response(next(statuses), json={"result": {"layoutParsingResults": []}})
+
+        before = {stage: _stage_count(stage) for stage in ("ocr", "ocr_upstream", "encode")}
+        before_status = {code: OCR_UPSTREAM_RESPONSES.labels(code).value for code in (503, 200)}
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as async_client:
+            service = OcrService(async_client=async_client, retry=RetryPolicy(attempts=2, base_delay=0))
+            await service.classify_and_recognize_async(b"fake image data", "test.jpg")
+
+        assert _stage_count("ocr") - before["ocr"] == 1
+        assert _stage_count("ocr_upstream") - before["ocr_upstream"] == 2
+        assert _stage_count("encode") - before["encode"] == 2
+        for code in (503, 200):
+            assert OCR_UPSTREAM_RESPONSES.labels(code).value - before_status[code] == 1
+        assert IN_FLIGHT.labels("ocr").value == 0
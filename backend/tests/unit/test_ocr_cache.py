@@ -0,0 +1,138 @@
+"""测试 OCR 结果缓存"""
+from __future__ import annotations
+
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from app.services.ocr_cache import OcrResultCache, make_cache_key
+from app.services.ocr_service import OcrService
+
+
+def _payload(text: str = "Sunlord Qty:4000") -> dict:
+    return {
+        "raw_ocr_text": text,
+        "image_filename": "test.jpg",
+        "scan_time": "2025-11-30T12:00:00",
+        "_raw_response": {"layoutParsingResults": []},
+    }
+
+
+class TestOcrResultCache:
+    """测试两级缓存读写与淘汰"""
+
+    def test_key_depends_on_content_and_options(self):
+        """测试缓存键由图片内容与请求参数共同决定"""
+        key = make_cache_key(b"image", {"fileType": 1})
+        assert key == make_cache_key(b"image", {"fileType": 1})
+        assert key != make_cache_key(b"image2", {"fileType": 1})
+        assert key != make_cache_key(b"image", {"fileType": 0})
+
+    def test_memory_hit_and_miss(self):
+        """测试内存层命中与未命中计数"""
+        cache = OcrResultCache(None)
+        assert cache.get("k") is None
+
+        cache.set("k", _payload())
+        cached = cache.get("k")
+
+        assert cached["raw_ocr_text"] == "Sunlord Qty:4000"
+        # 与单次请求相关的字段不进入缓存
+        assert "image_filename" not in cached
+        assert "scan_time" not in cached
+        stats = cache.stats()
+        assert stats["memory_hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_ratio"] == 0.5
+
+    def test_disk_tier_survives_restart(self, temp_data_dir: Path):
+        """测试持久层在新实例中仍可命中"""
+        path = temp_data_dir / "ocr_cache.db"
+        cache = OcrResultCache(path)
+        cache.set("k", _payload())
+        cache.close()
+
+        reopened = OcrResultCache(path)
+        assert reopened.get("k")["raw_ocr_text"] == "Sunlord Qty:4000"
+        assert reopened.stats()["disk_hits"] == 1
+        # 持久层命中后提升到内存层
+        assert reopened.get("k") is not None
+        assert reopened.stats()["memory_hits"] == 1
+        reopened.close()
+
+    def test_ttl_expiry(self, temp_data_dir: Path):
+        """测试过期条目不再返回"""
+        cache = OcrResultCache(temp_data_dir / "ocr_cache.db", ttl_seconds=60)
+        with patch("app.services.ocr_cache.time.time", return_value=1000.0):
+            cache.set("k", _payload())
+        with patch("app.services.ocr_cache.time.time", return_value=1030.0):
+            assert cache.get("k") is not None
+        with patch("app.services.ocr_cache.time.time", return_value=1100.0):
+            assert cache.get("k") is None
+        assert cache.stats()["disk_bytes"] == 0
+        cache.close()
+
+    def test_size_based_eviction(self, temp_data_dir: Path):
+        """测试持久层超过容量时淘汰最久未访问的条目"""
+        cache = OcrResultCache(temp_data_dir / "ocr_cache.db", memory_entries=0, max_disk_bytes=2000)
+        for i in range(20):
+            cache.set(f"k{i}", _payload("x" * 200))
+
+        stats = cache.stats()
+        assert stats["disk_bytes"] <= 2000
+        assert stats["evictions"] > 0
+        assert cache.get("k19") is not None
+        assert cache.get("k0") is None
+        cache.close()
+
+    def test_oversized_entry_not_persisted(self, temp_data_dir: Path):
+        """测试单条超过持久层容量的结果不写入磁盘，大小统计与表内一致"""
+        cache = OcrResultCache(temp_data_dir / "ocr_cache.db", memory_entries=0, max_disk_bytes=500)
+        cache.set("small", _payload("x" * 100))
+        disk_bytes = cache.stats()["disk_bytes"]
+        cache.set("huge", _payload("x" * 1000))
+
+        assert cache.get("huge") is None
+        assert cache.get("small") is not None
+        assert cache.stats()["disk_bytes"] == disk_bytes
+        cache.close()
+
+    def test_returned_payload_is_isolated(self):
+        """测试修改返回结果（含嵌套结构）或写入后的原对象不影响缓存"""
+        cache = OcrResultCache(None)
+        payload = _payload()
+        cache.set("k", payload)
+        payload["_raw_response"]["layoutParsingResults"].append("written")
+
+        first = cache.get("k")
+        first["_raw_response"]["layoutParsingResults"].append("mutated")
+
+        assert cache.get("k")["_raw_response"] == {"layoutParsingResults": []}
+
+
+class TestOcrServiceCache:
+    """测试 OCR 服务命中缓存时跳过上游调用"""
+
+    @patch("app.services.ocr_service.settings")
+    @patch("app.services.ocr_service.httpx.Client")
+    def test_cache_hit_skips_upstream(self, mock_client_class, mock_settings):
+        mock_settings.paddleocr_api_url = "https://test-api.example.com/layout-parsing"
+        mock_settings.paddleocr_token = "test-token"
+
+        mock_response = MagicMock()
+        mock_response.json.return_value = {
+            "result": {"layoutParsingResults": [{"markdown": {"text": "Sunlord Qty:4000"}}]}
+        }
+        mock_client = MagicMock()
+        mock_client.post.return_value = mock_response
+        mock_client_class.return_value = mock_client
+
+        service = OcrService(cache=OcrResultCache(None))
+        first = service.classify_and_recognize(b"same image", "a.jpg")
+        second = service.classify_and_recognize(b"same image", "b.jpg")
+
+        assert mock_client.post.call_count == 1
+        assert second["raw_ocr_text"] == first["raw_ocr_text"]
+        assert second["image_filename"] == "b.jpg"
+
+        service.classify_and_recognize(b"other image", "c.jpg")
+        assert mock_client.post.call_count == 2
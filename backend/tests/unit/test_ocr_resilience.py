@@ -0,0 +1,120 @@
+"""测试 OCR 重试策略与熔断器"""
+from __future__ import annotations
+
+from unittest.mock import MagicMock
+
+import httpx
+
+from app.services.ocr_resilience import (
+    CIRCUIT_CLOSED,
+    CIRCUIT_HALF_OPEN,
+    CIRCUIT_OPEN,
+    CircuitBreaker,
+    RetryPolicy,
+    is_upstream_failure,
+)
+
+
+def _status_error(status: int, headers: dict[str, str] | None = None) -> httpx.HTTPStatusError:
+    response = httpx.Response(status, headers=headers, request=httpx.Request("POST", "https://ocr.example.com"))
+    return httpx.HTTPStatusError("error", request=response.request, response=response)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestRetryPolicy:
+    """测试可重试错误的判定与退避时间"""
+
+    def test_retryable_errors(self):
+        """测试 429/5xx 与连接错误可重试，4xx 与读超时不重试"""
+        policy = RetryPolicy()
+        assert policy.is_retryable(_status_error(429))
+        assert policy.is_retryable(_status_error(503))
+        assert policy.is_retryable(httpx.ConnectError("reset", request=MagicMock()))
+        assert not policy.is_retryable(_status_error(400))
+        assert not policy.is_retryable(httpx.ReadTimeout("timeout", request=MagicMock()))
+
+    def test_backoff_with_jitter(self):
+        """测试退避时间在指数上限内随机，且不超过 max_delay"""
+        policy = RetryPolicy(base_delay=1, max_delay=5)
+        for attempt, ceiling in [(1, 1), (2, 2), (3, 4), (6, 5)]:
+            delays = [policy.delay(attempt) for _ in range(50)]
+            assert all(0 <= delay <= ceiling for delay in delays)
+
+    def test_retry_after_header(self):
+        """测试优先采用上游 Retry-After"""
+        policy = RetryPolicy(base_delay=1, max_delay=5)
+        assert policy.delay(1, _status_error(429, {"Retry-After": "3"})) == 3
+        assert policy.delay(1, _status_error(503, {"Retry-After": "120"})) == 5
+
+    def test_upstream_failure(self):
+        """测试只有上游不可用类错误计入熔断失败率"""
+        assert is_upstream_failure(_status_error(502))
+        assert is_upstream_failure(httpx.ReadTimeout("timeout", request=MagicMock()))
+        assert not is_upstream_failure(_status_error(422))
+
+
+class TestCircuitBreaker:
+    """测试熔断器状态转换"""
+
+    def test_opens_on_failure_ratio(self):
+        """测试失败率达到阈值后打开并拒绝调用"""
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_ratio=0.5, window=4, min_requests=4, reset_timeout=10, clock=clock)
+
+        for _ in range(2):
+            assert breaker.allow()
+            breaker.record_success()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == CIRCUIT_CLOSED
+        assert breaker.allow()
+        breaker.record_failure()
+
+        assert breaker.state == CIRCUIT_OPEN
+        assert not breaker.allow()
+        assert breaker.retry_after() == 10
+        stats = breaker.stats()
+        assert stats["opens"] == 1
+        assert stats["rejected"] == 1
+        assert stats["state_code"] == 2
+
+    def test_half_open_probe(self):
+        """测试超时后半开，只放行一个探测请求；成功后恢复 closed"""
+        clock = FakeClock()
+        breaker = CircuitBreaker(window=2, min_requests=2, reset_timeout=10, clock=clock)
+        for _ in range(2):
+            breaker.allow()
+            breaker.record_failure()
+        assert breaker.state == CIRCUIT_OPEN
+
+        clock.now = 10
+        assert breaker.state == CIRCUIT_HALF_OPEN
+        assert breaker.allow()
+        assert not breaker.allow()
+
+        breaker.record_success()
+        assert breaker.state == CIRCUIT_CLOSED
+        assert breaker.allow()
+
+    def test_half_open_failure_reopens(self):
+        """测试探测失败后重新打开"""
+        clock = FakeClock()
+        breaker = CircuitBreaker(window=2, min_requests=2, reset_timeout=10, clock=clock)
+        for _ in range(2):
+            breaker.allow()
+            breaker.record_failure()
+
+        clock.now = 15
+        assert breaker.allow()
+        breaker.record_failure()
+
+        assert breaker.state == CIRCUIT_OPEN
+        assert breaker.stats()["opens"] == 2
+        assert breaker.retry_after() == 10
@@ -1,12 +1,16 @@
 """测试 OCR 服务（使用 Mock）"""
 from __future__ import annotations
 
-from unittest.mock import MagicMock, patch
+import base64
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import httpx
 import pytest
 
-from app.services.ocr_service import OcrService, OcrServiceError
+from app.services import ocr_service
+from app.services.ocr_resilience import CircuitBreaker, RetryPolicy
+from app.services.ocr_service import OcrCircuitOpenError, OcrService, OcrServiceError
 
 
 class TestOcrService:
@@ -56,7 +60,10 @@ class TestOcrService:
         call_args = mock_client.post.call_args
         assert call_args[0][0] == "https://test-api.example.com/layout-parsing"
         assert call_args[1]["headers"]["Authorization"] == "token test-token"
-        assert call_args[1]["json"]["fileType"] == 1
+        body = json.loads(b"".join(call_args[1]["content"]))
+        assert body["fileType"] == 1
+        assert base64.b64decode(body["file"]) == b"fake image data"
+        assert int(call_args[1]["headers"]["Content-Length"]) == len(json.dumps(body))
 
     @patch("app.services.ocr_service.settings")
     def test_missing_api_url(self, mock_settings):
@@ -127,3 +134,150 @@ class TestOcrService:
         with pytest.raises(OcrServiceError, match="OCR API 请求失败"):
             service.classify_and_recognize(b"fake image data", "test.jpg")
 
+
+
+class TestOcrServiceAsync:
+    """测试异步 OCR 调用与共享连接池"""
+
+    @pytest.mark.asyncio
+    @patch("app.services.ocr_service.settings")
+    async def test_successful_async_call(self, mock_settings):
+        """测试异步识别复用注入的 AsyncClient"""
+        mock_settings.paddleocr_api_url = "https://test-api.example.com/layout-parsing"
+        mock_settings.paddleocr_token = "test-token"
+
+        mock_response = MagicMock()
+        mock_response.json.return_value = {
+            "result": {"layoutParsingResults": [{"markdown": {"text": "Sunlord Qty:4000"}}]}
+        }
+        mock_response.raise_for_status = MagicMock()
+
+        async_client = MagicMock()
+        async_client.post = AsyncMock(return_value=mock_response)
+
+        service = OcrService(async_client=async_client)
+        result = await service.classify_and_recognize_async(b"fake image data", "test.jpg")
+
+        assert result["raw_ocr_text"] == "Sunlord Qty:4000"
+        assert result["image_filename"] == "test.jpg"
+        async_client.post.assert_awaited_once()
+        assert async_client.post.call_args[1]["headers"]["Authorization"] == "token test-token"
+
+    @pytest.mark.asyncio
+    @patch("app.services.ocr_service.settings")
+    async def test_async_request_error(self, mock_settings):
+        """测试异步请求错误被转换为 OcrServiceError"""
+        mock_settings.paddleocr_api_url = "https://test-api.example.com/layout-parsing"
+        mock_settings.paddleocr_token = "test-token"
+
+        async_client = MagicMock()
+        async_client.post = AsyncMock(side_effect=httpx.ConnectError("Connection reset", request=MagicMock()))
+
+        service = OcrService(async_client=async_client)
+        with pytest.raises(OcrServiceError, match="OCR API 请求失败"):
+            await service.classify_and_recognize_async(b"fake image data", "test.jpg")
+
+    @pytest.mark.asyncio
+    @patch("app.services.ocr_service.settings")
+    async def test_retry_on_transient_error(self, mock_settings):
+        """测试 503 后按退避策略重试并成功"""
+        mock_settings.paddleocr_api_url = "https://test-api.example.com/layout-parsing"
+        mock_settings.paddleocr_token = "test-token"
+
+        request = httpx.Request("POST", "https://test-api.example.com/layout-parsing")
+        unavailable = httpx.Response(503, request=request)
+        ok = httpx.Response(
+            200,
+            json={"result": {"layoutParsingResults": [{"markdown": {"text": "Sunlord Qty:4000"}}]}},
+            request=request,
+        )
+        async_client = MagicMock()
+        async_client.post = AsyncMock(side_effect=[unavailable, ok])
+
+        service = OcrService(async_client=async_client, retry=RetryPolicy(attempts=3, base_delay=0))
+        result = await service.classify_and_recognize_async(b"fake image data", "test.jpg")
+
+        assert result["raw_ocr_text"] == "Sunlord Qty:4000"
+        assert async_client.post.await_count == 2
+        assert service.retries == 1
+
+    @pytest.mark.asyncio
+    @patch("app.services.ocr_service.settings")
+    async def test_circuit_breaker_fails_fast(self, mock_settings):
+        """测试上游持续失败后熔断器打开，后续请求不再调用上游"""
+        mock_settings.paddleocr_api_url = "https://test-api.example.com/layout-parsing"
+        mock_settings.paddleocr_token = "test-token"
+
+        async_client = MagicMock()
+        async_client.post = AsyncMock(side_effect=httpx.ConnectError("Connection refused", request=MagicMock()))
+        breaker = CircuitBreaker(window=2, min_requests=2, reset_timeout=30)
+
+        service = OcrService(async_client=async_client, retry=RetryPolicy(attempts=2, base_delay=0), breaker=breaker)
+        with pytest.raises(OcrServiceError, match="OCR API 请求失败"):
+            await service.classify_and_recognize_async(b"fake image data", "test.jpg")
+        assert async_client.post.await_count == 2
+        assert breaker.state == "open"
+
+        with pytest.raises(OcrCircuitOpenError) as exc_info:
+            await service.classify_and_recognize_async(b"fake image data", "test.jpg")
+        assert async_client.post.await_count == 2
+        assert exc_info.value.retry_after > 0
+
+    @pytest.mark.asyncio
+    @patch("app.services.ocr_service.settings")
+    async def test_preprocess_before_upload(self, mock_settings):
+        """测试配置预处理后发送的是处理后的图片"""
+        mock_settings.paddleocr_api_url = "https://test-api.example.com/layout-parsing"
+        mock_settings.paddleocr_token = "test-token"
+
+        mock_response = MagicMock()
+        mock_response.json.return_value = {"result": {"layoutParsingResults": []}}
+        mock_response.raise_for_status = MagicMock()
+        async_client = MagicMock()
+        async_client.post = AsyncMock(return_value=mock_response)
+        preprocessor = MagicMock()
+        preprocessor.process.return_value = (b"small", {"preprocessed": True})
+
+        service = OcrService(async_client=async_client, preprocessor=preprocessor)
+        await service.classify_and_recognize_async(b"original image", "test.jpg")
+
+        preprocessor.process.assert_called_once_with(b"original image")
+        body = json.loads(b"".join([chunk async for chunk in async_client.post.call_args[1]["content"]]))
+        assert body["file"] == base64.b64encode(b"small").decode("ascii")
+
+    @pytest.mark.asyncio
+    @patch("app.services.ocr_service.settings")
+    async def test_streamed_request_body(self, mock_settings):
+        """测试请求体分块流式发送，带 Content-Length 而非 chunked 编码"""
+        mock_settings.paddleocr_api_url = "https://test-api.example.com/layout-parsing"
+        mock_settings.paddleocr_token = "test-token"
+        image = bytes(range(256)) * 2000
+        received = {}
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            received["headers"] = request.headers
+            received["body"] = json.loads(request.content)
+            return httpx.Response(200, json={"result": {"layoutParsingResults": []}})
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as async_client:
+            service = OcrService(async_client=async_client)
+            await service.classify_and_recognize_async(image, "test.jpg")
+
+        assert "transfer-encoding" not in received["headers"]
+        assert int(received["headers"]["content-length"]) == len(json.dumps(received["body"]))
+        assert base64.b64decode(received["body"]["file"]) == image
+        assert received["body"]["useChartRecognition"] is False
+
+    @pytest.mark.asyncio
+    async def test_shared_service_lifecycle(self):
+        """测试 get_ocr_service 返回同一实例，关闭后释放连接池"""
+        await ocr_service.stop_ocr_service()
+
+        service = await ocr_service.start_ocr_service()
+        assert ocr_service.get_ocr_service() is service
+        assert ocr_service.get_ocr_service().async_client is service.async_client
+
+        await ocr_service.stop_ocr_service()
+        assert service.async_client.is_closed
+        assert ocr_service.get_ocr_service() is not service
+        await ocr_service.stop_ocr_service()
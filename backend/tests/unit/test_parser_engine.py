@@ -0,0 +1,105 @@
+"""预编译提取引擎与 extract_* 函数的差分测试"""
+from __future__ import annotations
+
+import json
+import random
+from pathlib import Path
+
+import pytest
+
+from app.services.parser_service import (
+    extract_batch,
+    extract_brand,
+    extract_date,
+    extract_electrical_characteristics,
+    extract_fields,
+    extract_material_code,
+    extract_numeric,
+    extract_quantity,
+    parse_ocr_payload,
+)
+
+REFERENCE = {
+    "material_code": extract_material_code,
+    "quantity": extract_quantity,
+    "batch": extract_batch,
+    "date": extract_date,
+    "brand": extract_brand,
+    "electrical_characteristics": extract_electrical_characteristics,
+}
+
+LABELS = [
+    "Sunlord SL-IND-1008-100 Qty:4000 Batch:B2511A",
+    "Murata\nPart No: GRM188R71H104KA93D\nQTY 10,000\nLOT: 2345X\n生产日期: 2024/03/15",
+    "TDK MLZ2012N100LT000 数量：2000 批次：A1B2 L = 4.7uH ±20%",
+    "Vishay IHLP-2525CZ-01 quantity 1,234,567 date 15-Mar-2024",
+    "Coilcraft XAL4020-222MEC Lot No 7788 10uH±10% 2024-13-45",
+    "| 物料编码 | SL1008-100 |\n| 数量 | 3,000 |\n| 批次 | B240501 |",
+    "2024-01-15",
+    "15/03/2024",
+    "no fields here",
+    "",
+    "ſunlord ＫTDK lot:xyz qty:12",
+    "İLOT: 99 batch ı 100 KILO ſ",
+    "L=10mH 5% H L\n=\n22uH 10%",
+]
+
+FRAGMENTS = [
+    "Sunlord", "MURATA", "tdk", "Vishay", "coilcraft", "SL-IND-1008-100", "ABC123", "sl1008-100", "GRM188",
+    "Qty", "QTY:", "quantity", "Quantity :", "数量", "数量：", "4000", "4,000", "1,234,567", "12", "007",
+    "Batch", "batch:", "LOT", "lot no", "Lot:", "批次", "B2511A", "b12", "X9", "date", "生产日期",
+    "2024-03-15", "2024/3/5", "15-03-2024", "31/12/2023", "2024.01.01", "15-Mar-2024", "2024-02-30",
+    "L=10uH±10%", "L = 4.7uH", "10uH", "22mH 20%", "100H", "h", "=", ":", "-", ",", "|", "±",
+    "İ", "ı", "ſ", "K", "٣٤٥", "０１２", "\n", "\n\n", "  ", "\t", "pcs", "Part No.", "料号",
+]
+
+
+# 基准语料（真实 PaddleOCR-VL markdown 输出）
+BENCH_CORPUS = Path(__file__).resolve().parents[2] / "benchmarks" / "corpus" / "labels.jsonl"
+
+
+def _corpus(size: int, seed: int = 20251130) -> list[str]:
+    rng = random.Random(seed)
+    texts = list(LABELS)
+    if BENCH_CORPUS.exists():
+        with BENCH_CORPUS.open(encoding="utf-8") as f:
+            texts.extend(json.loads(line)["raw_ocr_text"] for line in f if line.strip())
+    for _ in range(size):
+        parts = rng.choices(FRAGMENTS, k=rng.randint(1, 14))
+        separators = rng.choices(["", " ", "\n", ":", " | "], k=len(parts))
+        texts.append("".join(part + sep for part, sep in zip(parts, separators)))
+    return texts
+
+
+CORPUS = _corpus(3000)
+
+
+class TestExtractionEngine:
+    """逐字段对比引擎与原有函数"""
+
+    @pytest.mark.parametrize("field", list(REFERENCE))
+    def test_matches_reference(self, field):
+        """测试每个字段在语料上与 extract_* 函数完全一致"""
+        mismatches = []
+        for text in CORPUS:
+            expected = REFERENCE[field](text)
+            actual = extract_fields(text, [field])[field]
+            if actual != expected or type(actual) is not type(expected):
+                mismatches.append((text, expected, actual))
+        assert mismatches == []
+
+    def test_all_fields_in_one_call(self):
+        """测试一次调用返回全部字段"""
+        fields = extract_fields("Sunlord SL-IND-1008-100 Qty:4000 Batch:B2511A")
+
+        assert fields == {name: func("Sunlord SL-IND-1008-100 Qty:4000 Batch:B2511A") for name, func in REFERENCE.items()}
+
+    def test_parse_ocr_payload_matches_reference(self):
+        """测试 parse_ocr_payload 与逐个调用 extract_* 的旧流程一致"""
+        for text in CORPUS:
+            parsed = parse_ocr_payload({"raw_ocr_text": text, "scan_time": "t"})
+            for field, func in REFERENCE.items():
+                expected = func(text) if text else None
+                if field == "quantity" and text and not expected:
+                    expected = extract_numeric(text)
+                assert parsed[field] == expected, (field, text)
@@ -8,6 +8,7 @@ import pytest
 from app.services.parser_service import (
     extract_batch,
     extract_brand,
+    extract_date,
     extract_electrical_characteristics,
     extract_material_code,
     extract_quantity,
@@ -38,6 +39,48 @@ class TestNormalizeDate:
         assert normalize_date("Date: 30/11/2025") == "2025-11-30"
 
 
+class TestExtractDate:
+    """测试自由文本日期提取"""
+
+    def test_date_in_label_text(self):
+        """测试多行标签文本中的各种日期格式"""
+        assert extract_date("Sunlord\nQty: 4000\nDate: 2025-11-30") == "2025-11-30"
+        assert extract_date("| 生产日期 | 2024/08/15 |") == "2024-08-15"
+        assert extract_date("Lot: K4401 15-Mar-2024") == "2024-03-15"
+        assert extract_date("LOT No. 3F21K8\n\n2023.06.21") == "2023-06-21"
+        assert extract_date("生产日期：2024年6月1日") == "2024-06-01"
+        assert extract_date("Date: 31/12/2023") == "2023-12-31"
+        assert extract_date("Date: 12/31/2023") == "2023-12-31"
+
+    def test_date_codes(self):
+        """测试关键词后的 YYMMDD / YYWW 日期代码"""
+        assert extract_date("LOT: V2348\nD/C: 2348") == "2023-11-27"
+        assert extract_date("(9D) 2241") == "2022-10-10"
+        assert extract_date("Date Code 240601") == "2024-06-01"
+        assert extract_date("批次20240601生产日期20240602") == "2024-06-02"
+
+    def test_invalid_spans_skipped(self):
+        """测试无效片段被跳过，继续查找后面的日期"""
+        assert extract_date("2024-02-30 / 2024-02-28") == "2024-02-28"
+        assert extract_date("D/C 2399 Date 2024-01-05") == "2024-01-05"
+
+    def test_no_date(self):
+        """测试没有日期时返回 None，而不是原文"""
+        assert extract_date("Qty: 4000\nLot: 2348") is None
+        assert extract_date("12V DC 1000mA") is None
+        assert extract_date("") is None
+        assert extract_date(None) is None
+
+    def test_memoized(self):
+        """测试相同文本命中缓存"""
+        text = "memo Date: 2025-01-09"
+        extract_date(text)
+        hits = extract_date.cache_info().hits
+
+        assert extract_date(text) == "2025-01-09"
+        assert extract_date.cache_info().hits == hits + 1
+
+
 class TestExtractMaterialCode:
     """测试物料编码提取"""
 
@@ -194,3 +237,9 @@ class TestParseOcrPayload:
         assert result["raw_ocr_text"] == ""
         assert result["material_code"] is None
 
+    def test_date_not_raw_text(self):
+        """测试文本中没有日期时 date 为空，不保存整段原文"""
+        result = parse_ocr_payload({"raw_ocr_text": "Sunlord\nQty: 4000", "scan_time": "t"})
+
+        assert result["date"] is None
+
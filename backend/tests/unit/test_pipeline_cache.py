@@ -0,0 +1,75 @@
+"""测试进程内流水线缓存"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from unittest.mock import patch
+
+import pytest
+
+from app.models.pipeline import Pipeline
+from app.services import pipeline_service
+from app.services.pipeline_cache import PIPELINE_CACHE, bump_generation, read_generation
+
+
+@pytest.fixture
+def cache_env(temp_db):
+    pipeline = Pipeline(code="line_001", name="流水线1", excel_path="/tmp/line_001.xlsx")
+    temp_db.add(pipeline)
+    temp_db.commit()
+    temp_db.refresh(pipeline)
+
+    @contextmanager
+    def mock_session():
+        yield temp_db
+
+    cache = pipeline_service.get_pipeline_cache()
+    with patch("app.services.pipeline_service.get_session", side_effect=lambda: mock_session()) as get_session, \
+            patch.object(cache, "check_interval", 3600):
+        yield pipeline, cache, get_session
+
+
+class TestPipelineCache:
+    """测试命中、按编码查询与按代数失效"""
+
+    def test_lookups_hit_cache(self, cache_env):
+        """测试首次查询后按 ID 与编码都命中缓存，不再访问数据库"""
+        pipeline, cache, get_session = cache_env
+        before = cache.stats()
+
+        assert pipeline_service.get_pipeline(pipeline.id).code == "line_001"
+        calls = get_session.call_count
+        assert pipeline_service.get_pipeline(pipeline.id).code == "line_001"
+        assert pipeline_service.get_pipeline_by_code("line_001").id == pipeline.id
+        assert pipeline_service.get_pipeline_by_code("missing") is None
+
+        assert get_session.call_count == calls + 1
+        stats = cache.stats()
+        assert (stats["hits"] - before["hits"], stats["misses"] - before["misses"]) == (2, 2)
+
+    def test_generation_invalidates(self, cache_env, temp_db):
+        """测试其他进程递增代数后，到校验间隔时清空本地缓存"""
+        pipeline, cache, _ = cache_env
+        pipeline_service.get_pipeline(pipeline.id)
+        invalidations = cache.stats()["invalidations"]
+
+        temp_db.get(Pipeline, pipeline.id).name = "已改名"
+        bump_generation(temp_db, PIPELINE_CACHE)
+        temp_db.commit()
+        assert pipeline_service.get_pipeline(pipeline.id).name == "流水线1"
+
+        cache.check_interval = 0
+        assert pipeline_service.get_pipeline(pipeline.id).name == "已改名"
+        assert cache.stats()["invalidations"] == invalidations + 1
+        assert cache.stats()["generation"] == read_generation(temp_db, PIPELINE_CACHE) == 1
+
+    def test_invalidate_and_bypass(self, cache_env, temp_db):
+        """测试本进程修改后立即失效，use_cache=False 直接读库"""
+        pipeline, cache, _ = cache_env
+        pipeline_service.get_pipeline(pipeline.id)
+        temp_db.get(Pipeline, pipeline.id).total_scans = 7
+        temp_db.commit()
+
+        assert pipeline_service.get_pipeline(pipeline.id, use_cache=False).total_scans == 7
+        pipeline_service.invalidate_pipeline_cache()
+        assert cache.stats()["entries"] == 0
+        assert read_generation(temp_db, PIPELINE_CACHE) == 1
@@ -1,18 +1,22 @@
 """测试流水线服务"""
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import date, datetime
 from pathlib import Path
 from unittest.mock import patch
 
 import pytest
+from openpyxl import load_workbook
 
 from app.models.pipeline import Pipeline, RecognitionResult
 from app.services.pipeline_service import (
     create_pipeline,
+    export_pipeline_excel,
     get_pipeline,
     list_pipelines,
+    list_results,
     store_result,
+    _count_scans,
 )
 
 
@@ -126,8 +130,8 @@ class TestPipelineService:
         assert result is None
 
     @patch("app.services.pipeline_service.get_session")
-    @patch("app.services.pipeline_service.append_result")
-    def test_store_result(self, mock_append, mock_get_session, temp_db, temp_data_dir: Path):
+    @patch("app.services.pipeline_service.enqueue_result")
+    def test_store_result(self, mock_enqueue, mock_get_session, temp_db, temp_data_dir: Path):
         """测试存储识别结果"""
         # 创建测试流水线
         pipeline = Pipeline(
@@ -146,7 +150,7 @@ class TestPipelineService:
         def mock_session():
             yield temp_db
 
-        mock_get_session.return_value = mock_session()
+        mock_get_session.side_effect = lambda: mock_session()
 
         # 执行
         result_data = {
@@ -164,5 +168,205 @@ class TestPipelineService:
         assert result.material_code == "SL-IND-1008-100"
         assert result.quantity == 4000
         assert result.pipeline_id == pipeline.id
-        mock_append.assert_called_once()
+        # 冗余计数在同一事务中递增
+        temp_db.refresh(pipeline)
+        assert pipeline.total_scans == 1
+        assert _count_scans(temp_db, pipeline.id) == 1
+        # 结果交给后台写入线程，而不是在请求中重写 Excel 文件
+        mock_enqueue.assert_called_once()
+        assert mock_enqueue.call_args[0][0] == Path(pipeline.excel_path)
+        assert not (temp_data_dir / "line_001.xlsx").exists()
+
+    @patch("app.services.pipeline_service.settings")
+    @patch("app.services.pipeline_service.get_session")
+    def test_export_pipeline_excel_cached_by_latest_id(
+        self, mock_get_session, mock_settings, temp_db, temp_data_dir: Path
+    ):
+        """测试导出文件由数据库生成，并按最新结果 ID 缓存"""
+        mock_settings.exports_root = temp_data_dir / "exports"
+
+        pipeline = Pipeline(
+            code="line_001",
+            name="流水线1",
+            excel_path=str(temp_data_dir / "line_001_MatriQ.xlsx"),
+        )
+        temp_db.add(pipeline)
+        temp_db.commit()
+        temp_db.refresh(pipeline)
+
+        from contextlib import contextmanager
+
+        @contextmanager
+        def mock_session():
+            yield temp_db
+
+        mock_get_session.side_effect = lambda: mock_session()
+
+        # 无识别记录时导出只有表头的文件
+        empty = export_pipeline_excel(pipeline)
+        assert empty is not None and empty.name == "line_001_0.xlsx"
+        assert load_workbook(empty).active.max_row == 1
+
+        for code in ["SL-IND-1008-100", "SL-IND-1009-200"]:
+            temp_db.add(
+                RecognitionResult(
+                    pipeline_id=pipeline.id,
+                    material_code=code,
+                    recognized_at=datetime(2025, 11, 30, 12, 0, 0),
+                )
+            )
+        temp_db.commit()
+
+        first = export_pipeline_excel(pipeline)
+        assert first is not None and first.exists()
+        wb = load_workbook(first)
+        ws = wb.active
+        assert ws.max_row == 3
+        assert ws.cell(3, 1).value == 2
+        assert ws.cell(3, 3).value == "SL-IND-1009-200"
+
+        # 没有新记录时直接复用缓存文件
+        with patch("app.services.pipeline_service.build_export") as mock_build:
+            assert export_pipeline_excel(pipeline) == first
+            mock_build.assert_not_called()
+
+        # 出现新记录后重新生成，并清理旧缓存
+        temp_db.add(
+            RecognitionResult(
+                pipeline_id=pipeline.id,
+                material_code="SL-IND-1010-300",
+                recognized_at=datetime(2025, 11, 30, 13, 0, 0),
+            )
+        )
+        temp_db.commit()
+        second = export_pipeline_excel(pipeline)
+        assert second != first
+        assert second.exists()
+        assert not first.exists()
+        assert not empty.exists()
+        assert load_workbook(second).active.max_row == 4
+
 
+
+class TestListResults:
+    """测试识别结果 keyset 分页查询"""
+
+    @pytest.fixture
+    def seeded(self, temp_db):
+        """创建两条流水线及其识别结果，并让 get_session 使用临时库"""
+        pipeline = Pipeline(code="line_001", name="流水线1", excel_path="/tmp/line_001.xlsx")
+        other = Pipeline(code="line_002", name="流水线2", excel_path="/tmp/line_002.xlsx")
+        temp_db.add(pipeline)
+        temp_db.add(other)
+        temp_db.commit()
+        temp_db.refresh(pipeline)
+        temp_db.refresh(other)
+
+        for i in range(7):
+            temp_db.add(
+                RecognitionResult(
+                    pipeline_id=pipeline.id,
+                    material_code="SL-IND-1008-100" if i % 2 == 0 else "SL-IND-1009-200",
+                    batch=f"B{i}",
+                    brand="Sunlord",
+                    raw_ocr_text=f"raw text {i}",
+                    # 相邻两条识别时间相同，用于验证 id 作为并列排序键
+                    recognized_at=datetime(2025, 11, 30, 12, i // 2, 0),
+                )
+            )
+        temp_db.add(RecognitionResult(pipeline_id=other.id, material_code="OTHER", recognized_at=datetime(2025, 11, 30)))
+        temp_db.commit()
+
+        from contextlib import contextmanager
+
+        @contextmanager
+        def mock_session():
+            yield temp_db
+
+        with patch("app.services.pipeline_service.get_session", side_effect=lambda: mock_session()):
+            yield pipeline
+
+    def _all_pages(self, pipeline_id: int, **kwargs) -> list[dict]:
+        items, cursor = list_results(pipeline_id, **kwargs)
+        collected = list(items)
+        while cursor:
+            items, cursor = list_results(pipeline_id, cursor=cursor, **kwargs)
+            collected.extend(items)
+        return collected
+
+    def test_pages_by_id_desc(self, seeded):
+        """测试按 id 倒序分页且不跨流水线"""
+        items, cursor = list_results(seeded.id, limit=3)
+        assert len(items) == 3
+        assert cursor is not None
+
+        collected = self._all_pages(seeded.id, limit=3)
+        ids = [item["id"] for item in collected]
+        assert len(ids) == 7
+        assert ids == sorted(ids, reverse=True)
+
+    def test_pages_by_recognized_at_asc(self, seeded):
+        """测试按识别时间正序分页，时间相同的记录不重复不遗漏"""
+        collected = self._all_pages(seeded.id, limit=2, order_by="recognized_at", descending=False)
+        keys = [(item["recognized_at"], item["id"]) for item in collected]
+        assert len(keys) == 7
+        assert len(set(keys)) == 7
+        assert keys == sorted(keys)
+
+    def test_raw_text_deferred_and_projection(self, seeded):
+        """测试默认不返回 raw_ocr_text，支持字段投影"""
+        items, _ = list_results(seeded.id, limit=1)
+        assert "raw_ocr_text" not in items[0]
+        assert "material_code" in items[0]
+
+        items, _ = list_results(seeded.id, limit=1, fields=["material_code", "raw_ocr_text"])
+        assert set(items[0]) == {"material_code", "raw_ocr_text"}
+        assert items[0]["raw_ocr_text"].startswith("raw text")
+
+    def test_filters(self, seeded):
+        """测试物料编码、批次与时间范围过滤"""
+        collected = self._all_pages(seeded.id, limit=2, material_code="SL-IND-1008-100")
+        assert len(collected) == 4
+        assert {item["material_code"] for item in collected} == {"SL-IND-1008-100"}
+
+        items, _ = list_results(seeded.id, batch="B3")
+        assert [item["batch"] for item in items] == ["B3"]
+
+        items, _ = list_results(
+            seeded.id,
+            start=datetime(2025, 11, 30, 12, 1, 0),
+            end=datetime(2025, 11, 30, 12, 2, 0),
+        )
+        assert sorted(item["batch"] for item in items) == ["B2", "B3"]
+
+    def test_production_date_filter(self, seeded):
+        """测试入库时由 date 生成 production_date，并按生产日期范围过滤（含两端）"""
+        from app.services import pipeline_service
+
+        with patch.object(pipeline_service.settings, "excel_live_sync", False):
+            results = pipeline_service.store_results(
+                seeded,
+                [
+                    {"batch": "D1", "date": "2025-10-31"},
+                    {"batch": "D2", "date": "2025/11/01"},
+                    {"batch": "D3", "date": "2025-11-30"},
+                    {"batch": "D4", "date": "未知"},
+                ],
+            )
+        assert [result.production_date for result in results] == [
+            date(2025, 10, 31), date(2025, 11, 1), date(2025, 11, 30), None,
+        ]
+
+        items, _ = list_results(seeded.id, date_from=date(2025, 11, 1), date_to=date(2025, 11, 30))
+        assert sorted(item["batch"] for item in items) == ["D2", "D3"]
+
+    def test_invalid_arguments(self, seeded):
+        """测试非法游标与未知字段"""
+        with pytest.raises(ValueError):
+            list_results(seeded.id, cursor="not-a-cursor")
+        with pytest.raises(ValueError):
+            list_results(seeded.id, fields=["password"])
+
+        _, cursor = list_results(seeded.id, limit=1)
+        with pytest.raises(ValueError):
+            list_results(seeded.id, cursor=cursor, order_by="recognized_at")
@@ -0,0 +1,156 @@
+"""用 EXPLAIN QUERY PLAN 确认识别结果的列表、计数、导出与筛选查询都走索引
+
+在迁移得到的数据库上检查 pipeline_service 实际执行的语句；
+调整查询或索引后若退化为全表扫描（SCAN）或额外排序，这里会失败。
+"""
+from __future__ import annotations
+
+from datetime import date, datetime
+
+import pytest
+
+from app.db.session import create_sqlite_engine, upgrade_database
+from app.services import pipeline_service
+
+FIELDS = ["id", "recognized_at", "material_code", "batch", "date"]
+
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    engine = create_sqlite_engine(tmp_path_factory.mktemp("plans") / "plans.db")
+    upgrade_database(engine)
+    yield engine
+    engine.dispose()
+
+
+def query_plan(engine, statement) -> list[str]:
+    sql = str(statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as conn:
+        return [row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+def assert_index(plan: list[str], index: str | None = None, *, sorted_by_index: bool = True) -> None:
+    """每一步都通过索引定位 recognition_results；指定 index 时要求使用该索引"""
+    steps = [step for step in plan if "recognition_results" in step]
+    assert steps, plan
+    for step in steps:
+        assert step.startswith("SEARCH recognition_results USING "), plan
+        assert "INDEX" in step, plan
+    if index is not None:
+        assert any(f"INDEX {index} " in step for step in steps), plan
+    if sorted_by_index:
+        assert not any("TEMP B-TREE" in step for step in plan), plan
+
+
+class TestListQueryPlans:
+    """测试分页列表按索引顺序读取，无需额外排序"""
+
+    @pytest.mark.parametrize("descending", [True, False])
+    def test_order_by_id(self, engine, descending):
+        """测试按 ID 分页（首页与带游标的后续页）"""
+        cursor = pipeline_service.encode_cursor("id", {"id": 100})
+        for page_cursor in (None, cursor):
+            statement = pipeline_service.results_statement(
+                1, FIELDS, cursor=page_cursor, descending=descending
+            )
+            assert_index(query_plan(engine, statement), "ix_recognition_results_pipeline_id_id")
+
+    def test_order_by_recognized_at(self, engine):
+        """测试按识别时间分页"""
+        cursor = pipeline_service.encode_cursor("recognized_at", {"id": 100, "recognized_at": datetime(2025, 11, 30)})
+        statement = pipeline_service.results_statement(1, FIELDS, order_by="recognized_at", cursor=cursor)
+        assert_index(query_plan(engine, statement), "ix_recognition_results_pipeline_id_recognized_at")
+
+
+class TestAggregateQueryPlans:
+    """测试扫描计数、最新结果 ID 与导出"""
+
+    def test_count(self, engine):
+        """测试计数只读索引"""
+        plan = query_plan(engine, pipeline_service.count_statement(1))
+        assert_index(plan)
+        assert any("COVERING INDEX" in step for step in plan), plan
+
+    def test_latest_id(self, engine):
+        """测试最新结果 ID（导出缓存键）只读索引"""
+        plan = query_plan(engine, pipeline_service.latest_id_statement(1))
+        assert_index(plan, "ix_recognition_results_pipeline_id_id")
+        assert any("COVERING INDEX" in step for step in plan), plan
+
+    def test_export(self, engine):
+        """测试导出按 ID 顺序流式读取"""
+        plan = query_plan(engine, pipeline_service.export_statement(1, 1000))
+        assert_index(plan, "ix_recognition_results_pipeline_id_id")
+
+
+class TestFilterQueryPlans:
+    """测试筛选条件使用对应的索引"""
+
+    def test_material_code(self, engine):
+        """测试按物料编码筛选"""
+        statement = pipeline_service.results_statement(1, FIELDS, material_code="SL-IND-1008-100")
+        assert_index(query_plan(engine, statement), "ix_recognition_results_material_code")
+
+    def test_batch(self, engine):
+        """测试按批次筛选"""
+        statement = pipeline_service.results_statement(1, FIELDS, batch="B2511A")
+        assert_index(query_plan(engine, statement), "ix_recognition_results_batch")
+
+    def test_production_date_range(self, engine):
+        """测试生产日期范围筛选（结果集由索引范围限定，允许按 ID 排序）"""
+        statement = pipeline_service.results_statement(
+            1, FIELDS, date_from=date(2025, 11, 1), date_to=date(2025, 11, 30)
+        )
+        assert_index(
+            query_plan(engine, statement),
+            "ix_recognition_results_pipeline_id_production_date",
+            sorted_by_index=False,
+        )
+
+    def test_recognized_at_range(self, engine):
+        """测试识别时间范围筛选"""
+        statement = pipeline_service.results_statement(1, FIELDS, start=datetime(2025, 11, 1), end=datetime(2025, 12, 1))
+        assert_index(
+            query_plan(engine, statement),
+            "ix_recognition_results_pipeline_id_recognized_at",
+            sorted_by_index=False,
+        )
+
+
+class TestSearchQueryPlan:
+    """测试全文检索由 FTS 索引驱动"""
+
+    def test_search(self, engine):
+        """测试先查倒排索引，再按主键回表过滤流水线"""
+        from sqlalchemy import text
+
+        from app.services.search_service import search_statement
+
+        sql = str(search_statement(pipeline_id=1, short_terms=1))
+        params = {"query": '"B2511A"', "pipeline_id": 1, "term0": "%电感%", "limit": 21, "offset": 0}
+        with engine.connect() as conn:
+            plan = [row[3] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params)]
+        assert plan[0].startswith("SCAN recognition_results_fts VIRTUAL TABLE INDEX"), plan
+        assert any(step.startswith("SEARCH r USING INTEGER PRIMARY KEY") for step in plan), plan
+        assert not any(step.startswith("SCAN r ") for step in plan), plan
+
+
+class TestDuplicateProbeQueryPlan:
+    """测试入库查重是一次索引区间探测"""
+
+    def test_probe(self, engine):
+        """测试按 (流水线, 指纹, 识别时间) 索引定位，且无需额外排序"""
+        from app.services.duplicate_service import probe_statement
+
+        statement = probe_statement(1, "0" * 24, datetime(2025, 11, 30, 12), 600)
+        assert_index(query_plan(engine, statement), "ix_recognition_results_pipeline_id_fingerprint")
+
+    def test_batch_probe(self, engine):
+        """测试批量查重的每个指纹都是一次索引区间探测"""
+        from app.services.duplicate_service import batch_probe_statement
+
+        scan_time = datetime(2025, 11, 30, 12)
+        ranges = {"0" * 24: (scan_time, scan_time), "1" * 24: (scan_time, scan_time)}
+        plan = query_plan(engine, batch_probe_statement(1, ranges, 600))
+        searches = [step for step in plan if "INDEX ix_recognition_results_pipeline_id_fingerprint " in step]
+        assert len(searches) == 2, plan
@@ -0,0 +1,187 @@
+"""测试历史识别记录的重新解析"""
+from __future__ import annotations
+
+import json
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from app.models.pipeline import Pipeline, RecognitionResult
+from app.services import reparse_service
+from app.services.duplicate_service import result_fingerprint
+
+
+@pytest.fixture
+def reparse_env(temp_db, temp_data_dir: Path):
+    """两个流水线、若干条旧解析结果（date 存的是整段原文）"""
+    pipelines = [
+        Pipeline(code=f"line_{i}", name=f"流水线{i}", excel_path=str(temp_data_dir / f"line_{i}.xlsx"))
+        for i in (1, 2)
+    ]
+    temp_db.add_all(pipelines)
+    temp_db.commit()
+    for pipeline in pipelines:
+        temp_db.refresh(pipeline)
+
+    rows = []
+    for i in range(25):
+        pipeline = pipelines[i % 2]
+        text = f"Sunlord SL-IND-1008-{i:03d}\nQty: {i + 1},000\nDate: 2025-01-{i + 1:02d}"
+        rows.append(RecognitionResult(
+            pipeline_id=pipeline.id,
+            material_code=f"SL-IND-1008-{i:03d}",
+            quantity=(i + 1) * 1000,
+            date=text if i % 5 == 0 else f"2025-01-{i + 1:02d}",
+            brand="Sunlord",
+            raw_ocr_text=text,
+            recognized_at=datetime(2025, 1, i + 1),
+        ))
+    rows.append(RecognitionResult(pipeline_id=pipelines[0].id, raw_ocr_text=None))
+    temp_db.add_all(rows)
+    temp_db.commit()
+
+    @contextmanager
+    def mock_session():
+        yield temp_db
+
+    with patch("app.services.reparse_service.get_session", side_effect=lambda: mock_session()), \
+            patch("app.services.reparse_service.discard_export_cache") as discard:
+        yield pipelines, discard
+
+
+def _dates(temp_db) -> dict[int, str | None]:
+    temp_db.expire_all()
+    return {row.id: row.date for row in temp_db.query(RecognitionResult).all()}
+
+
+class TestReparse:
+    """测试分块重新解析、差异与断点续跑"""
+
+    def test_updates_changed_fields(self, reparse_env, temp_db):
+        """测试只写回有变化的字段，并清理受影响流水线的导出缓存"""
+        _, discard = reparse_env
+
+        stats = reparse_service.reparse_results(chunk_size=4, workers=1)
+
+        assert (stats.total, stats.scanned, stats.changed, stats.updated) == (25, 25, 5, 5)
+        dates = _dates(temp_db)
+        assert all(value is None or "\n" not in value for value in dates.values())
+        assert {call.args[0] for call in discard.call_args_list} == {"line_1", "line_2"}
+
+    def test_fingerprint_follows_fields(self, reparse_env, temp_db):
+        """测试只重解析日期时，按其余字段的当前值重新计算查重指纹"""
+        pipelines, _ = reparse_env
+        text = "Sunlord SL-IND-1008-100\nBatch: B2511A\nDate: 2025-02-01"
+        row = RecognitionResult(
+            pipeline_id=pipelines[0].id,
+            material_code="SL-IND-1008-100",
+            batch="B2511A",
+            quantity=4000,
+            date=text,
+            raw_ocr_text=text,
+            fingerprint=result_fingerprint("SL-IND-1008-100", "B2511A", 4000, text),
+            recognized_at=datetime(2025, 2, 1),
+        )
+        temp_db.add(row)
+        temp_db.commit()
+
+        reparse_service.reparse_results(fields=["date"], workers=1)
+
+        temp_db.refresh(row)
+        assert row.date == "2025-02-01"
+        assert row.fingerprint == result_fingerprint("SL-IND-1008-100", "B2511A", 4000, "2025-02-01")
+
+    def test_unparsed_fields_kept(self, reparse_env, temp_db):
+        """测试新规则解析不出的字段保留原值，不会被写成 NULL"""
+        pipelines, _ = reparse_env
+        row = RecognitionResult(
+            pipeline_id=pipelines[0].id,
+            material_code="ABC-123",
+            quantity=500,
+            batch="B1",
+            brand="Murata",
+            date="2025-01-02",
+            raw_ocr_text="仅有说明文字",
+            recognized_at=datetime(2025, 3, 1),
+        )
+        temp_db.add(row)
+        temp_db.commit()
+        diffs = []
+
+        reparse_service.reparse_results(workers=1, on_diff=lambda result_id, diff: diffs.append(result_id))
+
+        temp_db.refresh(row)
+        assert (row.material_code, row.quantity, row.batch, row.brand, row.date) == (
+            "ABC-123", 500, "B1", "Murata", "2025-01-02"
+        )
+        assert row.id not in diffs
+
+    def test_dry_run_reports_diff_without_writing(self, reparse_env, temp_db):
+        """测试 dry-run 只产出差异"""
+        before = _dates(temp_db)
+        diffs = []
+
+        stats = reparse_service.reparse_results(
+            workers=1, dry_run=True, on_diff=lambda result_id, diff: diffs.append((result_id, diff))
+        )
+
+        assert stats.changed == 5 and stats.updated == 0
+        assert _dates(temp_db) == before
+        result_id, diff = diffs[0]
+        assert list(diff) == ["date"]
+        assert diff["date"] == (before[result_id], "2025-01-01")
+
+    def test_filters(self, reparse_env, temp_db):
+        """测试按流水线与识别时间过滤"""
+        pipelines, _ = reparse_env
+
+        stats = reparse_service.reparse_results(
+            pipeline_id=pipelines[0].id,
+            since=datetime(2025, 1, 1),
+            until=datetime(2025, 1, 11),
+            workers=1,
+            dry_run=True,
+        )
+
+        # 第 1、3、5、7、9 天属于流水线 1
+        assert stats.total == 5
+        assert stats.changed == 1
+
+    def test_resume_from_checkpoint(self, reparse_env, temp_db, temp_data_dir):
+        """测试中断后从断点继续，完成后删除断点文件"""
+        checkpoint = temp_data_dir / "reparse.ckpt"
+        progress = []
+
+        def interrupt(stats):
+            progress.append(stats.last_id)
+            if len(progress) == 2:
+                raise KeyboardInterrupt
+
+        with pytest.raises(KeyboardInterrupt):
+            reparse_service.reparse_results(chunk_size=5, workers=1, checkpoint=checkpoint, on_progress=interrupt)
+        saved = json.loads(checkpoint.read_text(encoding="utf-8"))
+        assert saved["last_id"] == progress[-1]
+
+        stats = reparse_service.reparse_results(chunk_size=5, workers=1, checkpoint=checkpoint)
+
+        assert stats.total == 25 - 10
+        assert not checkpoint.exists()
+        assert all(value is None or "\n" not in value for value in _dates(temp_db).values())
+
+    def test_checkpoint_scope_mismatch(self, reparse_env, temp_data_dir):
+        """测试断点条件不一致时拒绝续跑"""
+        checkpoint = temp_data_dir / "reparse.ckpt"
+        checkpoint.write_text(json.dumps({"scope": {"pipeline_id": 99}, "last_id": 3}), encoding="utf-8")
+
+        with pytest.raises(ValueError):
+            reparse_service.reparse_results(workers=1, checkpoint=checkpoint)
+
+    def test_process_pool(self, reparse_env, temp_db):
+        """测试多进程解析结果与单进程一致"""
+        stats = reparse_service.reparse_results(chunk_size=3, workers=2, fields=["date"])
+
+        assert stats.updated == 5
+        assert _dates(temp_db)[1] == "2025-01-01"
@@ -0,0 +1,106 @@
+"""测试识别结果组提交"""
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from app.models.pipeline import Pipeline, RecognitionResult
+from app.services import pipeline_service
+from app.services.result_writer import GroupCommitWriter
+
+
+class TestGroupCommitWriter:
+    """测试合并批次与失败隔离"""
+
+    def test_concurrent_writes_are_batched(self):
+        """测试并发提交被合并，每个调用方拿到自己的主键"""
+        batches: list[int] = []
+        next_id = iter(range(1, 1000))
+
+        def commit(rows):
+            batches.append(len(rows))
+            return [next(next_id) for _ in rows]
+
+        writer = GroupCommitWriter(commit, max_rows=100, window_ms=20)
+        ids: dict[int, int] = {}
+        barrier = threading.Barrier(40)
+
+        def worker(index: int) -> None:
+            barrier.wait()
+            ids[index] = writer.write(1, {"quantity": index}, timeout=5)
+
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(40)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        writer.close()
+
+        assert sorted(ids.values()) == list(range(1, 41))
+        assert sum(batches) == 40 and len(batches) < 40
+        assert writer.stats()["committed_rows"] == 40
+
+    def test_failed_row_is_isolated(self):
+        """测试整批失败后逐条重试，只有出错的结果抛出异常"""
+        def commit(rows):
+            if any(values.get("bad") for _, values in rows):
+                if len(rows) == 1:
+                    raise ValueError("bad row")
+                raise RuntimeError("batch failed")
+            return [values["quantity"] for _, values in rows]
+
+        writer = GroupCommitWriter(commit, max_rows=10, window_ms=50)
+        futures = [writer.submit(1, {"quantity": index, "bad": index == 2}) for index in range(4)]
+
+        assert [futures[index].result(5) for index in (0, 1, 3)] == [0, 1, 3]
+        with pytest.raises(ValueError):
+            futures[2].result(5)
+        writer.close()
+        assert writer.stats()["failed_rows"] == 1
+
+    def test_closed_writer_rejects(self):
+        """测试关闭后不再接收结果"""
+        writer = GroupCommitWriter(lambda rows: [1] * len(rows), max_rows=10, window_ms=0)
+        writer.close()
+        with pytest.raises(RuntimeError):
+            writer.submit(1, {})
+
+
+def test_store_result_group_commit(temp_db, temp_data_dir: Path):
+    """测试并发 store_result 走组提交：主键通过 RETURNING 回填，扫描计数累加"""
+    pipeline = Pipeline(code="line_001", name="流水线1", excel_path=str(temp_data_dir / "line_001.xlsx"))
+    temp_db.add(pipeline)
+    temp_db.commit()
+    temp_db.refresh(pipeline)
+
+    @contextmanager
+    def mock_session():
+        yield temp_db
+
+    results: list[RecognitionResult] = []
+    with patch("app.services.pipeline_service.get_session", side_effect=lambda: mock_session()), \
+            patch("app.services.pipeline_service.enqueue_result"), \
+            patch.object(pipeline_service.settings, "result_group_commit", True):
+        threads = [
+            threading.Thread(
+                target=lambda index=index: results.append(
+                    pipeline_service.store_result(pipeline, {"material_code": f"SL-{index}", "quantity": index})
+                )
+            )
+            for index in range(20)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        pipeline_service.shutdown_result_writer()
+
+    temp_db.expire_all()
+    stored = {row.id: row.material_code for row in temp_db.query(RecognitionResult).all()}
+    assert {result.id: result.material_code for result in results} == stored
+    assert len(stored) == 20
+    assert temp_db.get(Pipeline, pipeline.id).total_scans == 20
@@ -0,0 +1,132 @@
+"""测试识别结果全文检索（FTS5 trigram）"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from unittest.mock import patch
+
+import pytest
+from sqlmodel import Session
+
+from app.db.session import create_sqlite_engine, upgrade_database
+from app.models.pipeline import Pipeline, RecognitionResult
+from app.services.search_service import SearchQueryError, parse_query, search_results
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_sqlite_engine(tmp_path / "search.db")
+    upgrade_database(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def seeded(engine):
+    """两条流水线的识别结果，get_session 指向迁移后的临时库"""
+    with Session(engine) as session:
+        lines = [Pipeline(code=f"line_{i}", name=f"流水线{i}", excel_path=f"/tmp/line_{i}.xlsx") for i in (1, 2)]
+        session.add_all(lines)
+        session.commit()
+        first, second = (line.id for line in lines)
+        session.add_all([
+            RecognitionResult(
+                pipeline_id=first,
+                material_code="SL-IND-1008-100",
+                batch="B2511A",
+                raw_ocr_text="Sunlord 电感 SL-IND-1008-100 Qty: 4,000 批次 B2511A",
+            ),
+            RecognitionResult(
+                pipeline_id=first,
+                material_code="GRM188R71H104",
+                raw_ocr_text="Murata 电容 GRM188R71H104 附件 SL-IND-1008-100 Lot X1",
+            ),
+            RecognitionResult(pipeline_id=second, material_code="SL-IND-1008-100", raw_ocr_text="Sunlord 电感 4,000"),
+        ])
+        session.commit()
+
+    @contextmanager
+    def session_for_test():
+        with Session(engine) as session:
+            yield session
+
+    with patch("app.services.search_service.get_session", side_effect=lambda: session_for_test()):
+        yield first, second
+
+
+class TestParseQuery:
+    """测试搜索内容解析"""
+
+    def test_terms_quoted(self):
+        """测试每个词作为短语匹配，FTS5 语法字符被转义"""
+        assert parse_query('B2511A "NEAR(x') == ('"B2511A" AND """NEAR(x"', [])
+
+    def test_short_terms(self):
+        """测试短词单独返回，只有短词时拒绝"""
+        assert parse_query("电感 4000") == ('"4000"', ["电感"])
+        with pytest.raises(SearchQueryError):
+            parse_query("电感")
+        with pytest.raises(SearchQueryError):
+            parse_query("   ")
+
+
+class TestSearchResults:
+    """测试检索、排序、分页与索引同步"""
+
+    def test_ranked_and_scoped(self, seeded):
+        """测试命中物料编码的记录排在只在原文中出现的记录之前，并可限定流水线"""
+        first, second = seeded
+        items, next_offset = search_results("sl-ind-1008", pipeline_id=first)
+        assert [item["material_code"] for item in items] == ["SL-IND-1008-100", "GRM188R71H104"]
+        assert items[0]["score"] > items[1]["score"]
+        assert "[" in items[0]["snippet"]
+        assert next_offset is None
+
+        items, _ = search_results("sl-ind-1008")
+        assert {item["pipeline_id"] for item in items} == {first, second}
+
+    def test_short_terms_filter(self, seeded):
+        """测试短词在索引命中的行上按子串过滤"""
+        items, _ = search_results("电容 SL-IND")
+        assert [item["material_code"] for item in items] == ["GRM188R71H104"]
+
+    def test_pagination(self, seeded):
+        """测试按 offset 分页"""
+        items, next_offset = search_results("SL-IND", limit=2)
+        assert len(items) == 2 and next_offset == 2
+        rest, next_offset = search_results("SL-IND", limit=2, offset=next_offset)
+        assert len(rest) == 1 and next_offset is None
+        assert {item["id"] for item in items}.isdisjoint(item["id"] for item in rest)
+
+    def test_index_follows_writes(self, seeded, engine):
+        """测试触发器随更新、删除同步索引"""
+        with engine.begin() as conn:
+            conn.exec_driver_sql("UPDATE recognition_results SET raw_ocr_text = 'TDK 磁珠 MPZ1608' WHERE batch = 'B2511A'")
+            conn.exec_driver_sql("DELETE FROM recognition_results WHERE material_code = 'GRM188R71H104'")
+
+        assert [item["batch"] for item in search_results("MPZ1608")[0]] == ["B2511A"]
+        assert search_results("Murata")[0] == []
+        # 物料编码未变，仍可按编码检索
+        assert len(search_results("SL-IND-1008")[0]) == 2
+
+    def test_existing_rows_indexed_on_upgrade(self, tmp_path):
+        """测试升级时为已有记录建立索引"""
+        engine = create_sqlite_engine(tmp_path / "legacy.db")
+        upgrade_database(engine, "0002")
+        # 按 0002 时的表结构直接写入，模型已包含之后迁移新增的列
+        with engine.begin() as conn:
+            conn.exec_driver_sql(
+                "INSERT INTO pipelines (id, code, name, excel_path, created_at) "
+                "VALUES (1, 'line_1', '流水线1', '/tmp/line_1.xlsx', '2025-11-30 12:00:00')"
+            )
+            conn.exec_driver_sql(
+                "INSERT INTO recognition_results (pipeline_id, raw_ocr_text, recognized_at) "
+                "VALUES (1, 'Sunlord 电感 B2511A', '2025-11-30 12:00:00')"
+            )
+        upgrade_database(engine)
+
+        with engine.connect() as conn:
+            rows = conn.exec_driver_sql(
+                "SELECT rowid FROM recognition_results_fts WHERE recognition_results_fts MATCH '\"b2511a\"'"
+            ).all()
+        assert len(rows) == 1
+        engine.dispose()
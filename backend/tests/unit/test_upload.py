@@ -0,0 +1,75 @@
+"""测试上传文件的分块读取与大小限制"""
+from __future__ import annotations
+
+import io
+from pathlib import Path
+
+import pytest
+from fastapi import UploadFile
+
+from app.utils.upload import UploadTooLargeError, read_upload, save_upload
+
+
+class CountingFile(io.BytesIO):
+    """记录实际读取的字节数"""
+
+    def __init__(self, data: bytes):
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, size: int | None = -1) -> bytes:
+        chunk = super().read(size)
+        self.bytes_read += len(chunk)
+        return chunk
+
+
+class TestUpload:
+    """测试 read_upload / save_upload"""
+
+    @pytest.mark.asyncio
+    async def test_read_within_limit(self):
+        """测试未超限时读取完整内容"""
+        upload = UploadFile(io.BytesIO(b"x" * 2500), filename="a.jpg")
+
+        assert await read_upload(upload, max_bytes=3000, chunk_size=1000) == b"x" * 2500
+
+    @pytest.mark.asyncio
+    async def test_read_stops_early_when_too_large(self):
+        """测试大小未知时超限即停止读取，不读完整个文件"""
+        file = CountingFile(b"x" * 10_000)
+        upload = UploadFile(file, filename="a.jpg")
+
+        with pytest.raises(UploadTooLargeError):
+            await read_upload(upload, max_bytes=3000, chunk_size=1000)
+        assert file.bytes_read == 4000
+
+    @pytest.mark.asyncio
+    async def test_read_rejects_declared_size(self):
+        """测试已知大小超限时不读取内容"""
+        file = CountingFile(b"x" * 10_000)
+        upload = UploadFile(file, filename="a.jpg", size=10_000)
+
+        with pytest.raises(UploadTooLargeError):
+            await read_upload(upload, max_bytes=3000)
+        assert file.bytes_read == 0
+
+    @pytest.mark.asyncio
+    async def test_save_upload(self, temp_data_dir: Path):
+        """测试分块写入磁盘"""
+        upload = UploadFile(io.BytesIO(b"y" * 2500), filename="a.jpg")
+        destination = temp_data_dir / "jobs" / "a.jpg"
+
+        written = await save_upload(upload, destination, max_bytes=3000, chunk_size=1000)
+
+        assert written == 2500
+        assert destination.read_bytes() == b"y" * 2500
+
+    @pytest.mark.asyncio
+    async def test_save_upload_too_large_removes_partial(self, temp_data_dir: Path):
+        """测试超限时删除已写入的部分文件"""
+        upload = UploadFile(io.BytesIO(b"y" * 5000), filename="a.jpg")
+        destination = temp_data_dir / "a.jpg"
+
+        with pytest.raises(UploadTooLargeError):
+            await save_upload(upload, destination, max_bytes=3000, chunk_size=1000)
+        assert not destination.exists()